@@ -10,7 +10,6 @@ from dotenv import load_dotenv
 # 모델: gemini-2.5-flash-image (이미지 생성)
 MODEL_NAME = os.getenv("GEMINI_IMAGE_MODEL", "gemini-2.5-flash-image")
 
-_client = None
 log = logging.getLogger("gemini")
 
 # 서비스별 분리: ai/.env를 우선 로드, 없으면 루트 .env 폴백
@@ -32,7 +31,11 @@ try:
 except Exception as _e:
     log.warning(f"[gemini] failed to load .env: {_e}")
 
-def _get_client():
+_client: Optional[genai.Client] = None
+
+
+def _get_client() -> genai.Client:
+    # 모델 계층은 서빙 패키지에 의존하지 않음: 서빙 앱은 공유 클라이언트를 client 인자로 주입
     global _client
     api_key = os.getenv("GOOGLE_API_KEY")
     if not api_key:
@@ -114,12 +117,13 @@ def _build_prompt_from_fields(payload: Dict[str, Any]) -> str:
     return (base + " " + " ".join(lines)).strip()
 
 
-def generate_image_from_payload(payload: Dict[str, Any]):
+def generate_image_from_payload(payload: Dict[str, Any], client: Optional[genai.Client] = None):
     """
  권장 진입점: 프론트/백에서 받은 원본 JSON을 그대로 넣어 호출.
-    예) generate_image_from_payload(req.dict())
+    예) generate_image_from_payload(req.dict(), client=get_genai_client())
+    client를 주지 않으면 이 모듈의 클라이언트를 지연 생성해 씁니다(노트북/스크립트).
     """
-    client = _get_client()
+    client = client or _get_client()
     prompt = _build_prompt_from_fields(payload)
     log.info(f"[gemini] prompt: {prompt[:300]}{'...' if len(prompt)>300 else ''}")
 
@@ -0,0 +1,196 @@
+"""
+[파트 개요] 인프로세스 비동기 작업(Job) 관리자
+- submit()으로 코루틴 팩토리를 등록하면 job_id를 즉시 반환하고,
+  최대 workers개까지만 동시에 실행합니다(나머지는 queued 대기).
+- 상태: queued → running → succeeded | failed | cancelled
+- 종료된 작업 결과는 ttl초 동안 보관 후 조회 시점에 정리됩니다.
+  결과(data URI)가 클 수 있으므로 보관 개수도 max_finished개로 제한하고, 넘으면 오래 전에 끝난 것부터 버립니다.
+- wait_change()로 상태 변화를 기다릴 수 있어 SSE 스트림에 사용합니다.
+
+주의: 작업은 프로세스 메모리에만 있으므로 여러 워커로 띄울 때는
+같은 워커로 라우팅되도록(단일 워커 또는 sticky) 구성해야 합니다.
+"""
+import asyncio
+import logging
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from fastapi import HTTPException
+
+log = logging.getLogger("ai-jobs")
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+TERMINAL = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, meta: Optional[Dict[str, Any]] = None) -> None:
+        self.id = uuid.uuid4().hex
+        self.status = QUEUED
+        self.meta: Dict[str, Any] = dict(meta or {})
+        self.result: Any = None
+        self.error: Any = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.version = 0
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    @property
+    def done(self) -> bool:
+        return self.status in TERMINAL
+
+    def _touch(self, status: str) -> None:
+        self.status = status
+        self.version += 1
+        if status == RUNNING:
+            self.started_at = time.time()
+        elif status in TERMINAL:
+            self.finished_at = time.time()
+        # 대기 중인 SSE 구독자 깨우기
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def to_dict(self, include_result: bool = True) -> Dict[str, Any]:
+        out: Dict[str, Any] = {
+            "job_id": self.id,
+            "status": self.status,
+            "meta": self.meta,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if self.error is not None:
+            out["error"] = self.error
+        if include_result and self.status == SUCCEEDED:
+            out["result"] = self.result
+        return out
+
+
+class JobManager:
+    def __init__(self, workers: int = 2, ttl: float = 600.0, max_pending: int = 32, max_finished: int = 64) -> None:
+        self.workers = max(1, int(workers))
+        self.ttl = float(ttl)
+        self.max_pending = max(1, int(max_pending))
+        self.max_finished = max(1, int(max_finished))
+        self._jobs: Dict[str, Job] = {}
+        self._sem: Optional[asyncio.Semaphore] = None
+        self.submitted = 0
+        self.completed = 0
+        self.evicted = 0
+
+    def _slots(self) -> asyncio.Semaphore:
+        # 이벤트 루프 안에서 지연 생성(임포트 시점에는 루프가 없을 수 있음)
+        if self._sem is None:
+            self._sem = asyncio.Semaphore(self.workers)
+        return self._sem
+
+    def _sweep(self) -> None:
+        now = time.time()
+        expired = [
+            jid for jid, j in self._jobs.items()
+            if j.done and j.finished_at is not None and now - j.finished_at > self.ttl
+        ]
+        for jid in expired:
+            self._jobs.pop(jid, None)
+        self._trim_finished()
+
+    def _trim_finished(self) -> None:
+        finished = [j for j in self._jobs.values() if j.done]
+        if len(finished) <= self.max_finished:
+            return
+        finished.sort(key=lambda j: j.finished_at or 0.0)
+        for j in finished[: len(finished) - self.max_finished]:
+            self._jobs.pop(j.id, None)
+            self.evicted += 1
+
+    def pending(self) -> int:
+        return sum(1 for j in self._jobs.values() if not j.done)
+
+    def submit(self, fn: Callable[[], Awaitable[Any]], meta: Optional[Dict[str, Any]] = None) -> Job:
+        self._sweep()
+        if self.pending() >= self.max_pending:
+            raise JobQueueFull()
+        job = Job(meta)
+        self._jobs[job.id] = job
+        job.task = asyncio.create_task(self._run(job, fn))
+        self.submitted += 1
+        return job
+
+    async def _run(self, job: Job, fn: Callable[[], Awaitable[Any]]) -> None:
+        try:
+            async with self._slots():
+                job._touch(RUNNING)
+                result = await fn()
+            job.result = result
+            job._touch(SUCCEEDED)
+        except asyncio.CancelledError:
+            job._touch(CANCELLED)
+        except HTTPException as e:
+            job.error = {"status": e.status_code, "detail": e.detail}
+            job._touch(FAILED)
+        except Exception as e:
+            log.warning("job %s failed: %s", job.id, e)
+            job.error = {"status": 500, "detail": str(e)}
+            job._touch(FAILED)
+        finally:
+            self.completed += 1
+            # 아무도 조회하지 않는 작업이 몰려도 결과 보관 메모리가 늘지 않도록 완료 시점에 바로 정리
+            self._trim_finished()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self._sweep()
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """실행/대기 중이면 취소, 이미 끝난 작업이면 결과를 삭제합니다."""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        if job.done:
+            self._jobs.pop(job_id, None)
+        elif job.task is not None:
+            job.task.cancel()
+        return job
+
+    async def wait_change(self, job: Job, version: int, timeout: float) -> bool:
+        """job.version이 version보다 커질 때까지(최대 timeout초) 대기. 변화가 있으면 True."""
+        if job.version > version:
+            return True
+        try:
+            await asyncio.wait_for(job._changed.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return False
+        return job.version > version
+
+    async def shutdown(self) -> None:
+        tasks = [j.task for j in self._jobs.values() if j.task is not None and not j.done]
+        for t in tasks:
+            t.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for j in self._jobs.values():
+            counts[j.status] = counts.get(j.status, 0) + 1
+        return {
+            "workers": self.workers,
+            "ttl": self.ttl,
+            "max_pending": self.max_pending,
+            "max_finished": self.max_finished,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "evicted": self.evicted,
+            "by_status": counts,
+        }
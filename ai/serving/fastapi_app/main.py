@@ -1,6 +1,6 @@
 """
 SelfStar AI FastAPI entrypoint
-- Exposes: /health, /predict, /chat, /chat/image, /chat/health
+- Exposes: /health, /predict, /chat, /chat/image, /chat/image/jobs, /chat/health
 - Loads repo root .env so GOOGLE_API_KEY etc are available
 """
 from fastapi import FastAPI
@@ -15,6 +15,7 @@ if _ROOT not in sys.path:
 	sys.path.insert(0, _ROOT)
 load_dotenv(dotenv_path=os.path.join(_ROOT, ".env"), override=True)
 
+from ai.serving.fastapi_app.providers import init_clients, close_clients, clients_info
 from ai.serving.fastapi_app.routes.image_model import router as image_router
 try:
 	from ai.serving.fastapi_app.routes.caption import router as caption_router
@@ -33,6 +34,22 @@ except Exception as e:
 	_HAS_CHAT = False
 
 app = FastAPI(title="SelfStar AI", version="0.1.0")
+
+
+@app.on_event("startup")
+async def _init_clients():
+	# 공용 Gemini/HTTP 클라이언트를 기동 시 1회 생성(요청 경로의 연결 설정 제거)
+	await init_clients()
+
+
+@app.on_event("shutdown")
+async def _close_clients():
+	if _HAS_CHAT:
+		# 진행 중인 /chat/image 작업 취소
+		from ai.serving.fastapi_app.routes.chat import _jobs
+		await _jobs.shutdown()
+	await close_clients()
+
 app.include_router(image_router)
 if _HAS_CHAT:
 	app.include_router(chat_router)
@@ -47,6 +64,10 @@ except Exception as e:
 	import logging
 	logging.getLogger("ai-main").error("comment router import failed: %s", e)
 
+@app.get("/__clients")
+def __clients():
+	return clients_info()
+
 @app.get("/__routes")
 def __routes():
 	# quick route list for debugging
@@ -0,0 +1,111 @@
+"""
+[파트 개요] AI 서비스 공용 클라이언트 제공자
+- Gemini(google-genai) 클라이언트 1개와 풀링된 httpx.AsyncClient 1개를 프로세스 단위로 보유
+- 앱 lifespan(startup/shutdown)에서 init_clients()/close_clients()로 생성/정리하고,
+  라우터는 get_genai_client()/get_http_client()만 사용합니다.
+- lifespan 밖(노트북/스크립트/테스트)에서 호출되면 최초 1회 지연 생성합니다.
+
+튜닝(환경변수)
+- AI_HTTP_MAX_CONNECTIONS (기본 50), AI_HTTP_MAX_KEEPALIVE (기본 20)
+- AI_HTTP_KEEPALIVE_EXPIRY (초, 기본 30), AI_HTTP_TIMEOUT (초, 기본 20)
+- AI_HTTP2=1 이면 HTTP/2 사용(h2 패키지가 설치된 경우에만)
+"""
+import logging
+import os
+from typing import Any, Dict, Optional
+
+import httpx
+from google import genai
+
+log = logging.getLogger("ai-providers")
+
+_genai_client: Optional[genai.Client] = None
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def _float_env(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+def _http2_enabled() -> bool:
+    if os.getenv("AI_HTTP2", "1").strip().lower() not in ("1", "true", "yes"):
+        return False
+    try:
+        import h2  # noqa: F401
+    except Exception:
+        return False
+    return True
+
+
+def get_genai_client() -> genai.Client:
+    """프로세스 공유 Gemini 클라이언트(동기/비동기 .aio 모두 제공)."""
+    global _genai_client
+    api_key = os.getenv("GOOGLE_API_KEY")
+    if not api_key:
+        raise RuntimeError("GOOGLE_API_KEY 환경변수가 설정되지 않았습니다.")
+    if _genai_client is None:
+        _genai_client = genai.Client(api_key=api_key)
+    return _genai_client
+
+
+def _new_http_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=int(_float_env("AI_HTTP_MAX_CONNECTIONS", 50)),
+        max_keepalive_connections=int(_float_env("AI_HTTP_MAX_KEEPALIVE", 20)),
+        keepalive_expiry=_float_env("AI_HTTP_KEEPALIVE_EXPIRY", 30.0),
+    )
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(_float_env("AI_HTTP_TIMEOUT", 20.0)),
+        limits=limits,
+        http2=_http2_enabled(),
+        follow_redirects=True,
+    )
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """프로세스 공유 httpx.AsyncClient(keep-alive 풀). 닫혀 있으면 새로 만듭니다."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = _new_http_client()
+    return _http_client
+
+
+async def init_clients() -> None:
+    """startup: HTTP 풀 생성, 키가 있으면 Gemini 클라이언트도 미리 생성."""
+    get_http_client()
+    try:
+        get_genai_client()
+    except Exception as e:
+        # 키 미설정이어도 서버는 기동(요청 시 503/폴백 처리)
+        log.warning("genai client not initialized: %s", e)
+    log.info("AI clients ready (http2=%s)", _http2_enabled())
+
+
+async def close_clients() -> None:
+    """shutdown: HTTP 풀과 Gemini 비동기 세션 정리."""
+    global _http_client, _genai_client
+    http, _http_client = _http_client, None
+    if http is not None:
+        try:
+            await http.aclose()
+        except Exception as e:
+            log.warning("http client close failed: %s", e)
+    client, _genai_client = _genai_client, None
+    if client is not None:
+        try:
+            aclose = getattr(client.aio, "aclose", None)
+            if aclose is not None:
+                await aclose()
+        except Exception as e:
+            log.warning("genai client close failed: %s", e)
+
+
+def clients_info() -> Dict[str, Any]:
+    return {
+        "genai": _genai_client is not None,
+        "http": _http_client is not None and not _http_client.is_closed,
+        "http2": _http2_enabled(),
+    }
@@ -3,28 +3,15 @@ from typing import Optional, Tuple
 import logging
 import os
 import base64
-import httpx
 
-from google import genai
 from google.genai import types
+from ai.serving.fastapi_app.providers import get_genai_client as _get_client, get_http_client
 
 from ai.serving.fastapi_app.schemas.caption import CaptionRequest, CaptionResponse
 
 router = APIRouter()
 log = logging.getLogger("ai-caption")
 
-_client = None
-
-
-def _get_client():
-    global _client
-    api_key = os.getenv("GOOGLE_API_KEY")
-    if not api_key:
-        raise RuntimeError("GOOGLE_API_KEY 환경변수가 설정되지 않았습니다.")
-    if _client is None:
-        _client = genai.Client(api_key=api_key)
-    return _client
-
 
 GEMINI_TEXT_MODEL = os.getenv("GEMINI_TEXT_MODEL", "gemini-2.5-flash")
 CAPTION_PROMPT_OVERRIDE = os.getenv("CAPTION_PROMPT")  # If set, use this exact prompt text from the notebook
@@ -53,11 +40,10 @@ async def _fetch_image_bytes(uri_or_url: str) -> Tuple[bytes, str]:
     # http(s)
     if uri_or_url.startswith("http://") or uri_or_url.startswith("https://"):
         try:
-            async with httpx.AsyncClient(timeout=20.0) as client:
-                r = await client.get(uri_or_url)
-                r.raise_for_status()
-                mime = r.headers.get("content-type", "image/jpeg").split(";")[0]
-                return r.content, mime
+            r = await get_http_client().get(uri_or_url, timeout=20.0)
+            r.raise_for_status()
+            mime = r.headers.get("content-type", "image/jpeg").split(";")[0]
+            return r.content, mime
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"failed_to_fetch_image: {e}")
     raise HTTPException(status_code=400, detail="image must be a data URI or http(s) URL")
@@ -129,7 +115,7 @@ async def generate_caption(req: CaptionRequest):
         if CAPTION_MAX_TOKENS:
             gen_cfg.max_output_tokens = CAPTION_MAX_TOKENS
 
-        resp = client.models.generate_content(
+        resp = await client.aio.models.generate_content(
             model=GEMINI_TEXT_MODEL,
             contents=parts,
             config=gen_cfg,
@@ -1,13 +1,17 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 import os
 import logging
 import traceback
 import base64
-from typing import Optional, Dict, Tuple, Any
-import httpx
-from google import genai
+import json
+from typing import Optional, Dict, NamedTuple, Tuple, Any
 from google.genai import types
+from ai.serving.fastapi_app.providers import get_genai_client as _get_client, get_http_client
 from ai.serving.fastapi_app.schemas.chat import ChatRequest, ChatResponse
+from ai.serving.fastapi_app.jobs import Job, JobManager, JobQueueFull
+from ai.serving.fastapi_app.transport import binary_response, to_data_uri, wants_binary
+from ai.serving.fastapi_app.storage import sanitize_prefix, store_image
 from pydantic import BaseModel, Field
 try:
     from PIL import Image, ImageDraw
@@ -17,8 +21,14 @@ except Exception:
 router = APIRouter()
 log = logging.getLogger("ai-chat")
 
-_client = None
-_jobs: Dict[str, Dict] = {}
+# /chat/image 비동기 작업: 동시 실행 수/결과 보관(초)/최대 대기 작업 수/최대 보관 결과 수
+_jobs = JobManager(
+    workers=int(os.getenv("CHAT_IMAGE_JOB_WORKERS", "2")),
+    ttl=float(os.getenv("CHAT_IMAGE_JOB_TTL", "600")),
+    max_pending=int(os.getenv("CHAT_IMAGE_JOB_MAX_PENDING", "32")),
+    max_finished=int(os.getenv("CHAT_IMAGE_JOB_MAX_FINISHED", "64")),
+)
+JOB_SSE_HEARTBEAT = float(os.getenv("CHAT_IMAGE_JOB_SSE_HEARTBEAT", "15"))
 
 # ===== Session memory (LangChain) =====
 try:
@@ -141,16 +151,6 @@ async def chat_session_clear(body: dict | None = None):
         return {"ok": False, "error": str(e)}
 
 
-def _get_client():
-    global _client
-    api_key = os.getenv("GOOGLE_API_KEY")
-    if not api_key:
-        raise RuntimeError("GOOGLE_API_KEY 환경변수가 설정되지 않았습니다.")
-    if _client is None:
-        _client = genai.Client(api_key=api_key)
-    return _client
-
-
 GEMINI_TEXT_MODEL = os.getenv("GEMINI_TEXT_MODEL", "gemini-2.5-flash")
 GEMINI_IMAGE_MODEL = os.getenv("GEMINI_IMAGE_MODEL", "gemini-2.5-flash-image")
 
@@ -209,7 +209,7 @@ async def chat(req: ChatRequest):
         parts.append(types.Part.from_text(text=f"User: {last_user}"))
 
         try:
-            resp = client.models.generate_content(
+            resp = await client.aio.models.generate_content(
                 model=GEMINI_TEXT_MODEL,
                 contents=parts,
                 config=types.GenerateContentConfig(
@@ -247,6 +247,7 @@ class ChatImageRequest(BaseModel):
     persona: Optional[str] = None      # persona data stringified if any
     ls_session_id: Optional[str] = None
     style_img: Optional[str] = None    # Optional: outfit/style reference image
+    store_prefix: Optional[str] = None  # 지정 시 버킷에 직접 업로드하고 {key,size,mime}만 반환
 
 
 class ChatImageResponse(BaseModel):
@@ -255,8 +256,16 @@ class ChatImageResponse(BaseModel):
     image: str  # data URI
 
 
-def _placeholder_image_data_uri(text: str) -> str:
-    """Generate a simple placeholder PNG as data URI.
+class ChatImageStoredResponse(BaseModel):
+    ok: bool = True
+    prompt: str
+    key: str
+    size: int
+    mime: str
+
+
+def _placeholder_image_bytes(text: str) -> Tuple[bytes, str]:
+    """Generate a simple placeholder PNG as (bytes, mime).
     Tries PIL first; if unavailable, returns a tiny 1x1 PNG.
     """
     try:
@@ -268,15 +277,14 @@ def _placeholder_image_data_uri(text: str) -> str:
             import io
             buf = io.BytesIO()
             img.save(buf, format="PNG")
-            import base64 as _b64
-            return f"data:image/png;base64,{_b64.b64encode(buf.getvalue()).decode('ascii')}"
+            return buf.getvalue(), "image/png"
     except Exception:
         pass
     # 1x1 transparent PNG
     tiny_png_b64 = (
         "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR4nGNgYAAAAAMAASsJTYQAAAAASUVORK5CYII="
     )
-    return f"data:image/png;base64,{tiny_png_b64}"
+    return base64.b64decode(tiny_png_b64), "image/png"
 
 
 def _build_meta_prompt(persona: str, user_text: str, has_style_img: bool) -> str:
@@ -365,18 +373,38 @@ async def _fetch_image_bytes(uri_or_url: str) -> Tuple[bytes, str]:
     # http(s) URL
     if uri_or_url.startswith("http://") or uri_or_url.startswith("https://"):
         try:
-            async with httpx.AsyncClient(timeout=20.0) as client:
-                r = await client.get(uri_or_url)
-                r.raise_for_status()
-                mime = r.headers.get("content-type", "image/jpeg").split(";")[0]
-                return r.content, mime
+            r = await get_http_client().get(uri_or_url, timeout=20.0)
+            r.raise_for_status()
+            mime = r.headers.get("content-type", "image/jpeg").split(";")[0]
+            return r.content, mime
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"failed_to_fetch_image: {e}")
     raise HTTPException(status_code=400, detail="persona_img must be a data URI or http(s) URL")
 
 
-@router.post("/chat/image", response_model=ChatImageResponse)
-async def chat_image(req: ChatImageRequest):
+class _ImageResult(NamedTuple):
+    prompt: str
+    data: bytes
+    mime: str
+    fallback: bool = False
+
+
+async def _generate_chat_image(req: ChatImageRequest) -> ChatImageResponse:
+    """JSON(data URI) 응답용 래퍼. job 워커도 이 형태로 결과를 보관합니다."""
+    res = await _generate_chat_image_bytes(req)
+    return ChatImageResponse(ok=True, prompt=res.prompt, image=to_data_uri(res.data, res.mime))
+
+
+async def _generate_chat_image_stored(req: ChatImageRequest) -> ChatImageStoredResponse:
+    """store_prefix 모드: 생성 후 버킷에 직접 업로드하고 키만 반환."""
+    res = await _generate_chat_image_bytes(req)
+    stored = await store_image(res.data, res.mime, req.store_prefix or "")
+    return ChatImageStoredResponse(prompt=res.prompt, **stored)
+
+
+async def _generate_chat_image_bytes(req: ChatImageRequest) -> _ImageResult:
+    """2단계 플로우(메타 프롬프트 LLM → 이미지 모델). 결과는 원본 바이트로 반환."""
+    rt = lsc = None
     try:
         require_model = (
             os.getenv("AI_REQUIRE_MODEL", "1").strip().lower() in ("1", "true", "yes")
@@ -424,7 +452,7 @@ async def chat_image(req: ChatImageRequest):
         generated_prompt = ""
         if client is not None:
             try:
-                llm_resp = client.models.generate_content(
+                llm_resp = await client.aio.models.generate_content(
                     model=GEMINI_TEXT_MODEL,
                     contents=[types.Part.from_text(text=meta_prompt)],
                     config=types.GenerateContentConfig(
@@ -487,7 +515,7 @@ async def chat_image(req: ChatImageRequest):
                 if style_bytes:
                     contents.append(types.Part.from_bytes(data=style_bytes, mime_type=style_mime))
                 contents.append(types.Part.from_bytes(data=persona_bytes, mime_type=persona_mime))
-                img_resp = client.models.generate_content(
+                img_resp = await client.aio.models.generate_content(
                     model=GEMINI_IMAGE_MODEL,
                     contents=contents,
                     config=types.GenerateContentConfig(
@@ -545,14 +573,13 @@ async def chat_image(req: ChatImageRequest):
                 if require_model:
                     raise HTTPException(status_code=502, detail="image_not_returned")
                 # Fallback to placeholder
-                data_uri = _placeholder_image_data_uri(req.user_text)
+                ph_bytes, ph_mime = _placeholder_image_bytes(req.user_text)
                 if rt:
                     rt.end(outputs={"ok": True, "fallback": True})
                     rt.post(lsc)
-                return ChatImageResponse(ok=True, prompt=generated_prompt, image=data_uri)
+                return _ImageResult(generated_prompt, ph_bytes, ph_mime, fallback=True)
             else:
                 # Normal successful generation path
-                data_uri = f"data:{out_mime};base64,{base64.b64encode(out_bytes).decode('ascii')}"
                 if rt:
                     rt.end(outputs={"ok": True, "image_mime": out_mime, "image_len": len(out_bytes)})
                     rt.post(lsc)
@@ -564,16 +591,16 @@ async def chat_image(req: ChatImageRequest):
                         mem.chat_memory.add_ai_message("[image_generated]")
                     except Exception:
                         pass
-                return ChatImageResponse(ok=True, prompt=generated_prompt, image=data_uri)
+                return _ImageResult(generated_prompt, out_bytes, out_mime)
         else:
             # Fallback placeholder image
             if require_model:
                 raise HTTPException(status_code=503, detail="model_unavailable")
-            data_uri = _placeholder_image_data_uri(req.user_text)
+            ph_bytes, ph_mime = _placeholder_image_bytes(req.user_text)
             if rt:
                 rt.end(outputs={"ok": True, "fallback": True})
                 rt.post(lsc)
-            return ChatImageResponse(ok=True, prompt=generated_prompt, image=data_uri)
+            return _ImageResult(generated_prompt, ph_bytes, ph_mime, fallback=True)
     except HTTPException:
         # Pass-through but try to mark error in run
         try:
@@ -594,6 +621,101 @@ async def chat_image(req: ChatImageRequest):
         raise HTTPException(status_code=500, detail={"error": "chat_image_failed", "message": str(e)})
 
 
+@router.post("/chat/image", response_model=ChatImageResponse)
+async def chat_image(req: ChatImageRequest, request: Request, format: Optional[str] = None):
+    """기본은 JSON(data URI). `?format=binary`/`Accept: image/*`면 원본 바이트 + 헤더(X-Image-Prompt).
+    store_prefix가 있으면 버킷에 직접 올리고 {prompt, key, size, mime}만 반환합니다.
+    """
+    if req.store_prefix:
+        sanitize_prefix(req.store_prefix)
+        return JSONResponse((await _generate_chat_image_stored(req)).model_dump())
+    if not wants_binary(request, format):
+        return await _generate_chat_image(req)
+    res = await _generate_chat_image_bytes(req)
+    return binary_response(res.data, res.mime, prompt=res.prompt, fallback=res.fallback)
+
+
+# ======= Async job mode for /chat/image =======
+
+class ChatImageJobRequest(ChatImageRequest):
+    # 호출자(백엔드)가 결과 처리에 쓰는 부가 정보(예: user_id, persona_num). 그대로 돌려줌
+    meta: Optional[Dict[str, Any]] = None
+
+
+def _job_body(job: Job) -> Dict[str, Any]:
+    body = job.to_dict()
+    if isinstance(body.get("result"), BaseModel):
+        body["result"] = body["result"].model_dump()
+    return {"ok": True, **body}
+
+
+def _require_job(job_id: str) -> Job:
+    job = _jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job_not_found")
+    return job
+
+
+@router.post("/chat/image/jobs", status_code=202)
+async def submit_chat_image_job(req: ChatImageJobRequest):
+    """작업 등록 후 즉시 job_id 반환. 결과는 GET /chat/image/jobs/{id} 또는 /events(SSE)로 확인."""
+    gen_req = ChatImageRequest(**req.model_dump(exclude={"meta"}))
+    if gen_req.store_prefix:
+        sanitize_prefix(gen_req.store_prefix)
+        work = lambda: _generate_chat_image_stored(gen_req)  # noqa: E731
+    else:
+        work = lambda: _generate_chat_image(gen_req)  # noqa: E731
+    try:
+        job = _jobs.submit(work, meta=req.meta)
+    except JobQueueFull:
+        raise HTTPException(status_code=429, detail="job_queue_full")
+    return {"ok": True, "job_id": job.id, "status": job.status}
+
+
+@router.get("/chat/image/jobs/{job_id}")
+async def get_chat_image_job(job_id: str):
+    return _job_body(_require_job(job_id))
+
+
+@router.get("/chat/image/jobs/{job_id}/events")
+async def chat_image_job_events(job_id: str):
+    """SSE: 상태가 바뀔 때마다 `event: status`를 보내고, 종료 상태에서 결과와 함께 닫습니다."""
+    job = _require_job(job_id)
+
+    async def stream():
+        version = -1
+        while True:
+            if job.version != version:
+                version = job.version
+                yield f"event: status\ndata: {json.dumps(_job_body(job), ensure_ascii=False)}\n\n"
+                if job.done:
+                    return
+            changed = await _jobs.wait_change(job, version, timeout=JOB_SSE_HEARTBEAT)
+            if not changed:
+                # 프록시 유휴 타임아웃 방지용 주석 라인
+                yield ": keep-alive\n\n"
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.delete("/chat/image/jobs/{job_id}")
+async def cancel_chat_image_job(job_id: str):
+    """대기/실행 중이면 취소하고, 이미 끝난 작업이면 보관된 결과를 삭제합니다."""
+    job = _jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job_not_found")
+    return {"ok": True, "job_id": job.id, "status": job.status}
+
+
+@router.get("/chat/image/jobs")
+async def chat_image_jobs_stats():
+    return {"ok": True, **_jobs.stats()}
+
+
 @router.get("/chat/health")
 async def chat_health():
     # Simple ping to confirm AI chat router is alive
@@ -3,27 +3,14 @@ import logging
 import os
 from typing import List
 
-from google import genai
 from google.genai import types
-import httpx
+from ai.serving.fastapi_app.providers import get_genai_client as _get_client, get_http_client
 
 from ai.serving.fastapi_app.schemas.comment import CommentReplyRequest, CommentReplyResponse
 
 router = APIRouter()
 log = logging.getLogger("ai-comment")
 
-_client = None
-
-
-def _get_client():
-    global _client
-    api_key = os.getenv("GOOGLE_API_KEY")
-    if not api_key:
-        raise RuntimeError("GOOGLE_API_KEY 환경변수가 설정되지 않았습니다.")
-    if _client is None:
-        _client = genai.Client(api_key=api_key)
-    return _client
-
 
 GEMINI_TEXT_MODEL = os.getenv("GEMINI_TEXT_MODEL", "gemini-2.5-flash")
 
@@ -72,7 +59,7 @@ async def generate_comment_reply(req: CommentReplyRequest):
 
     try:
         # Mirror the notebook pattern: pass the prompt string and use resp.text
-        resp = client.models.generate_content(
+        resp = await client.aio.models.generate_content(
             model=GEMINI_TEXT_MODEL,
             contents=prompt,
             config=types.GenerateContentConfig(
@@ -122,8 +109,7 @@ async def generate_comment_reply(req: CommentReplyRequest):
                     }
                 ]
             }
-            with httpx.Client(timeout=20) as client2:
-                r = client2.post(url, json=payload)
+            r = await get_http_client().post(url, json=payload, timeout=20)
             if r.status_code != 200:
                 raise RuntimeError(f"rest_status_{r.status_code}:{r.text[:200]}")
             data = r.json() or {}
@@ -2,8 +2,8 @@
 [파트 개요] AI 서빙 라우터 (Gemini 고정)
 - 이 모듈은 FastAPI Router만 제공하며, 최상위 ai/main.py에서 앱에 포함됩니다.
 """
-from fastapi import APIRouter, HTTPException
-from typing import Any
+from fastapi import APIRouter, HTTPException, Request
+from typing import Any, Optional
 import base64
 from io import BytesIO
 import logging
@@ -11,8 +11,10 @@ import traceback
 import os
 from dotenv import load_dotenv
 import sys
-from google import genai
 from google.genai import types
+from ai.serving.fastapi_app.providers import get_genai_client as _get_client
+from ai.serving.fastapi_app.transport import binary_response, to_data_uri, wants_binary
+from ai.serving.fastapi_app.storage import sanitize_prefix, store_image
 
 try:
     from PIL import Image, ImageDraw, ImageFont
@@ -47,19 +49,6 @@ from ai.serving.fastapi_app.schemas.predict import PredictRequest
 # 기본적으로 모델 필요(폴백 비활성화 유지)
 os.environ.setdefault("AI_REQUIRE_MODEL", "1")
 
-# Gemini 클라이언트
-_gemini_client = None
-
-
-def _get_client():
-    global _gemini_client
-    api_key = os.getenv("GOOGLE_API_KEY")
-    if not api_key:
-        raise RuntimeError("GOOGLE_API_KEY 환경변수가 설정되지 않았습니다.")
-    if _gemini_client is None:
-        _gemini_client = genai.Client(api_key=api_key)
-    return _gemini_client
-
 
 # 모델명(고정 기본값)
 GEMINI_IMAGE_MODEL = os.getenv("GEMINI_IMAGE_MODEL", "gemini-2.5-flash-image")
@@ -122,7 +111,21 @@ def _build_prompt_from_fields(payload: dict) -> str:
 
 
 @router.post("/predict")
-async def predict(req: PredictRequest):
+async def predict(req: PredictRequest, request: Request, format: Optional[str] = None):
+    """기본은 JSON(data URI). `?format=binary`/`Accept: image/*`면 원본 바이트로 응답."""
+    binary = wants_binary(request, format)
+    store_prefix = req.store_prefix
+    if store_prefix:
+        sanitize_prefix(store_prefix)
+
+    async def _out(data: bytes, mime: str, fallback: bool = False):
+        # store_prefix 모드: 버킷에 직접 업로드 후 키/크기/타입만 반환
+        if store_prefix:
+            return {"ok": True, **(await store_image(data, mime, store_prefix))}
+        if binary:
+            return binary_response(data, mime, fallback=fallback)
+        return {"ok": True, "image": to_data_uri(data, mime)}
+
     try:
         require_model = (
             os.getenv("AI_REQUIRE_MODEL", "1").strip().lower() in ("1", "true", "yes")
@@ -137,10 +140,10 @@ async def predict(req: PredictRequest):
         # Gemini 직접 호출
         result: Any = None
         try:
-            payload = req.dict(exclude_none=True)
+            payload = req.dict(exclude_none=True, exclude={"store_prefix"})
             prompt = _build_prompt_from_fields(payload)
             client = _get_client()
-            image_response = client.models.generate_content(
+            image_response = await client.aio.models.generate_content(
                 model=GEMINI_IMAGE_MODEL,
                 contents=[types.Part.from_text(text=prompt)],
                 config=types.GenerateContentConfig(
@@ -191,18 +194,14 @@ async def predict(req: PredictRequest):
         if Image is not None and isinstance(result, Image.Image):
             buf = BytesIO()
             result.save(buf, format="PNG")
-            data = base64.b64encode(buf.getvalue()).decode("ascii")
-            return {"ok": True, "image": f"data:image/png;base64,{data}"}
+            return await _out(buf.getvalue(), "image/png")
 
         elif isinstance(result, tuple) and len(result) == 2 and isinstance(result[0], (bytes, bytearray)):
             buf, mime = result
-            mime = mime or "image/png"
-            data = base64.b64encode(buf).decode("ascii")
-            return {"ok": True, "image": f"data:{mime};base64,{data}"}
+            return await _out(bytes(buf), mime or "image/png")
 
         elif isinstance(result, (bytes, bytearray)):
-            data = base64.b64encode(result).decode("ascii")
-            return {"ok": True, "image": f"data:image/png;base64,{data}"}
+            return await _out(bytes(result), "image/png")
 
         # ---- 폴백 (모델 불필요 모드에서만) ----
         if not require_model and Image is not None:
@@ -215,8 +214,10 @@ async def predict(req: PredictRequest):
                 draw.text((24, 24), text, fill=(30, 30, 30))
                 buf = BytesIO()
                 img.save(buf, format="PNG")
-                data = base64.b64encode(buf.getvalue()).decode("ascii")
-                return {"ok": True, "image": f"data:image/png;base64,{data}"}
+                return await _out(buf.getvalue(), "image/png", fallback=True)
+            except HTTPException:
+                # 업로드 실패 등 _out이 올린 오류는 503으로 덮지 않음
+                raise
             except Exception as fe:
                 log.warning("Fallback image failed: %s", fe)
 
@@ -22,3 +22,6 @@ class PredictRequest(BaseModel):
     # 하위호환 필드
     feature: Optional[str] = Field(None, max_length=2000)
     featureCombined: Optional[str] = Field(None, max_length=2000)
+
+    # 지정 시 버킷의 이 prefix 아래로 직접 업로드하고 {key, size, mime}만 반환
+    store_prefix: Optional[str] = Field(None, max_length=200)
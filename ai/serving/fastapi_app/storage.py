@@ -0,0 +1,88 @@
+"""
+[파트 개요] AI 서비스 → 오브젝트 스토리지 직접 업로드
+- 요청에 store_prefix가 오면 생성 이미지를 응답 본문 대신 버킷에 바로 올리고
+  {key, size, mime}만 돌려줍니다(백엔드는 키 기록/프리사인만 수행).
+- 설정은 백엔드와 같은 NCP_S3_* 환경변수(리포지토리 루트 .env)를 사용합니다.
+- boto3 호출은 블로킹이므로 스레드에서 실행해 이벤트 루프를 막지 않습니다.
+"""
+import asyncio
+import logging
+import mimetypes
+import os
+import re
+import uuid
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException
+
+log = logging.getLogger("ai-storage")
+
+_SEGMENT = re.compile(r"^[A-Za-z0-9._-]{1,100}$")
+_EXT = {
+    "image/png": ".png",
+    "image/jpeg": ".jpg",
+    "image/jpg": ".jpg",
+    "image/webp": ".webp",
+}
+
+
+def _env(name: str, default: Optional[str] = None) -> Optional[str]:
+    v = os.getenv(name)
+    return v if v not in {None, ""} else default
+
+
+def storage_enabled() -> bool:
+    return bool(_env("NCP_S3_BUCKET") and _env("NCP_S3_ACCESS_KEY") and _env("NCP_S3_SECRET_KEY"))
+
+
+@lru_cache(maxsize=1)
+def _get_s3_client():
+    import boto3  # type: ignore
+
+    return boto3.session.Session().client(
+        "s3",
+        endpoint_url=_env("NCP_S3_ENDPOINT", "https://kr.object.ncloudstorage.com"),
+        region_name=_env("NCP_S3_REGION", "kr-standard"),
+        aws_access_key_id=_env("NCP_S3_ACCESS_KEY"),
+        aws_secret_access_key=_env("NCP_S3_SECRET_KEY"),
+    )
+
+
+def sanitize_prefix(prefix: str) -> str:
+    """호출자 prefix 검증: 상위 경로/빈 값 금지, 세그먼트는 [A-Za-z0-9._-]만 허용."""
+    parts = [p for p in (prefix or "").replace("\\", "/").strip("/").split("/") if p]
+    if not parts or any(p == ".." or not _SEGMENT.match(p) for p in parts):
+        raise HTTPException(status_code=400, detail="invalid_store_prefix")
+    return "/".join(parts)
+
+
+def build_key(prefix: str, mime: str) -> str:
+    ext = _EXT.get(mime) or mimetypes.guess_extension(mime or "") or ".bin"
+    ts = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+    # 같은 초에 여러 장이 생성돼도 덮어쓰지 않도록 짧은 난수 접미사
+    return f"{sanitize_prefix(prefix)}/gen_{ts}_{uuid.uuid4().hex[:8]}{ext}"
+
+
+def _put(key: str, data: bytes, mime: str) -> None:
+    extra: Dict[str, Any] = {"ContentType": mime}
+    sse = _env("NCP_S3_SSE")
+    if sse:
+        extra["ServerSideEncryption"] = sse
+    _get_s3_client().put_object(Bucket=_env("NCP_S3_BUCKET"), Key=key, Body=data, **extra)
+
+
+async def store_image(data: bytes, mime: str, prefix: str) -> Dict[str, Any]:
+    """이미지 바이트를 {prefix}/gen_{ts}_{rand}{ext}로 업로드하고 {key, size, mime} 반환."""
+    if not storage_enabled():
+        raise HTTPException(status_code=503, detail="storage_not_configured")
+    mime = mime or "image/png"
+    key = build_key(prefix, mime)
+    try:
+        await asyncio.to_thread(_put, key, data, mime)
+    except Exception as e:
+        log.error("direct upload failed for %s: %s", key, e)
+        raise HTTPException(status_code=502, detail=f"storage_upload_failed: {e}")
+    log.info("Uploaded generated image: %s (%s, %d bytes)", key, mime, len(data))
+    return {"key": key, "size": len(data), "mime": mime}
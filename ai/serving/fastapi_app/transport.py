@@ -0,0 +1,40 @@
+"""
+[파트 개요] 이미지 응답 전송 형식
+- 기본은 JSON(`image`: data URI) — 브라우저/기존 호출자 호환
+- `?format=binary` 또는 `Accept: image/*`/`application/octet-stream` 요청이면
+  원본 바이트를 그대로 응답하고, 부가 정보는 헤더로 전달합니다.
+  (base64 인코딩 33% 증가와 JSON 파싱/디코딩 복사를 없애기 위함)
+
+헤더
+- Content-Type: 이미지 MIME
+- X-Image-Prompt: 생성 프롬프트(UTF-8 퍼센트 인코딩)
+- X-Image-Fallback: 1 이면 모델 대신 플레이스홀더 이미지
+"""
+import base64
+from typing import Optional
+from urllib.parse import quote
+
+from fastapi import Request
+from fastapi.responses import Response
+
+BINARY_FORMATS = ("binary", "raw", "bytes")
+
+
+def wants_binary(request: Request, fmt: Optional[str] = None) -> bool:
+    if fmt:
+        return fmt.strip().lower() in BINARY_FORMATS
+    accept = (request.headers.get("accept") or "").lower()
+    return accept.startswith("image/") or accept.startswith("application/octet-stream")
+
+
+def to_data_uri(data: bytes, mime: str) -> str:
+    return f"data:{mime or 'image/png'};base64,{base64.b64encode(data).decode('ascii')}"
+
+
+def binary_response(data: bytes, mime: str, prompt: Optional[str] = None, fallback: bool = False) -> Response:
+    headers = {"Cache-Control": "no-store"}
+    if prompt:
+        headers["X-Image-Prompt"] = quote(prompt, safe="")
+    if fallback:
+        headers["X-Image-Fallback"] = "1"
+    return Response(content=data, media_type=mime or "image/png", headers=headers)
@@ -0,0 +1,115 @@
+import os
+import sys
+from types import SimpleNamespace
+from urllib.parse import unquote
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if _ROOT not in sys.path:
+    sys.path.insert(0, _ROOT)
+
+from ai.serving.fastapi_app.main import app  # noqa: E402
+from ai.serving.fastapi_app.routes import chat as chat_route  # noqa: E402
+from ai.serving.fastapi_app.routes import image_model as image_route  # noqa: E402
+
+_IMG = b"\x89PNG\r\n\x1a\nfake-bytes"
+
+
+class _FakeModels:
+    async def generate_content(self, model, contents, config=None):
+        modalities = getattr(config, "response_modalities", None) or []
+        if any("IMAGE" in str(m) for m in modalities):
+            part = SimpleNamespace(text=None, inline_data=SimpleNamespace(data=_IMG, mime_type="image/png"))
+        else:
+            part = SimpleNamespace(text="카페 셀카 프롬프트", inline_data=None)
+        return SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=[part]))])
+
+
+@pytest.fixture
+def fake_client(monkeypatch):
+    fake = SimpleNamespace(aio=SimpleNamespace(models=_FakeModels()))
+    monkeypatch.setattr(chat_route, "_get_client", lambda: fake)
+    monkeypatch.setattr(image_route, "_get_client", lambda: fake)
+    return fake
+
+
+def _client():
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://test", timeout=10)
+
+
+@pytest.mark.asyncio
+async def test_chat_image_binary_and_json(fake_client):
+    body = {"user_text": "카페", "persona_img": "data:image/png;base64,iVBORw0KGgo="}
+    async with _client() as ac:
+        r = await ac.post("/chat/image?format=binary", json=body)
+        assert r.status_code == 200
+        assert r.headers["content-type"] == "image/png"
+        assert r.content == _IMG
+        assert unquote(r.headers["x-image-prompt"]) == "카페 셀카 프롬프트"
+
+        r = await ac.post("/chat/image", json=body, headers={"Accept": "image/*"})
+        assert r.content == _IMG
+
+        r = await ac.post("/chat/image", json=body)
+        assert r.json()["image"].startswith("data:image/png;base64,")
+
+
+@pytest.mark.asyncio
+async def test_predict_binary(fake_client):
+    async with _client() as ac:
+        r = await ac.post("/predict?format=binary", json={"name": "a", "gender": "female"})
+        assert r.status_code == 200
+        assert r.headers["content-type"] == "image/png"
+        assert r.content == _IMG
+
+        r = await ac.post("/predict", json={"name": "a", "gender": "female"})
+        assert r.json()["image"].startswith("data:image/png;base64,")
+
+
+@pytest.mark.asyncio
+async def test_store_prefix_uploads_directly(fake_client, monkeypatch):
+    from ai.serving.fastapi_app import storage
+
+    puts = []
+    monkeypatch.setattr(storage, "storage_enabled", lambda: True)
+    monkeypatch.setattr(storage, "_put", lambda key, data, mime: puts.append((key, data, mime)))
+    body = {"user_text": "카페", "persona_img": "data:image/png;base64,iVBORw0KGgo=", "store_prefix": "chat/7/2"}
+    async with _client() as ac:
+        r = await ac.post("/chat/image", json=body)
+        assert r.status_code == 200, r.text
+        out = r.json()
+        assert "image" not in out
+        assert out["key"].startswith("chat/7/2/gen_") and out["key"].endswith(".png")
+        assert (out["size"], out["mime"]) == (len(_IMG), "image/png")
+        assert puts == [(out["key"], _IMG, "image/png")]
+
+        r = await ac.post("/predict", json={"name": "a", "gender": "female", "store_prefix": "personas"})
+        assert r.json()["key"].startswith("personas/gen_")
+
+        r = await ac.post("/chat/image", json={**body, "store_prefix": "../etc"})
+        assert r.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_fallback_keeps_upload_error(monkeypatch):
+    pytest.importorskip("PIL")
+    from ai.serving.fastapi_app import storage
+
+    class _TextOnly:
+        async def generate_content(self, model, contents, config=None):
+            part = SimpleNamespace(text="no image", inline_data=None)
+            return SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=[part]))])
+
+    def _put(key, data, mime):
+        raise OSError("bucket down")
+
+    monkeypatch.setattr(image_route, "_get_client", lambda: SimpleNamespace(aio=SimpleNamespace(models=_TextOnly())))
+    monkeypatch.setenv("AI_REQUIRE_MODEL", "0")
+    monkeypatch.setattr(storage, "storage_enabled", lambda: True)
+    monkeypatch.setattr(storage, "_put", _put)
+    async with _client() as ac:
+        r = await ac.post("/predict", json={"name": "a", "gender": "female", "store_prefix": "personas"})
+    # 폴백 이미지 업로드 실패는 503 unsupported_model_output으로 덮이지 않음
+    assert r.status_code == 502 and r.json()["detail"].startswith("storage_upload_failed")
@@ -0,0 +1,126 @@
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if _ROOT not in sys.path:
+    sys.path.insert(0, _ROOT)
+
+from ai.serving.fastapi_app.jobs import JobManager, JobQueueFull  # noqa: E402
+from ai.serving.fastapi_app.main import app  # noqa: E402
+from ai.serving.fastapi_app.routes import chat as chat_route  # noqa: E402
+
+
+@pytest.fixture
+def jobs(monkeypatch):
+    manager = JobManager(workers=1, ttl=60, max_pending=4)
+    monkeypatch.setattr(chat_route, "_jobs", manager)
+    gate = asyncio.Event()
+
+    async def fake_generate(req):
+        await gate.wait()
+        return chat_route.ChatImageResponse(ok=True, prompt=f"p:{req.user_text}", image="data:image/png;base64,AAAA")
+
+    monkeypatch.setattr(chat_route, "_generate_chat_image", fake_generate)
+    return manager, gate
+
+
+def _client():
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://test", timeout=10)
+
+
+@pytest.mark.asyncio
+async def test_submit_poll_and_result(jobs):
+    manager, gate = jobs
+    async with _client() as ac:
+        r = await ac.post("/chat/image/jobs", json={"user_text": "hi", "meta": {"user_id": 7}})
+        assert r.status_code == 202
+        job_id = r.json()["job_id"]
+
+        st = (await ac.get(f"/chat/image/jobs/{job_id}")).json()
+        assert st["status"] in ("queued", "running")
+        assert st["meta"] == {"user_id": 7}
+
+        gate.set()
+        await manager.get(job_id).task
+        st = (await ac.get(f"/chat/image/jobs/{job_id}")).json()
+        assert st["status"] == "succeeded"
+        assert st["result"]["prompt"] == "p:hi"
+        assert st["result"]["image"].startswith("data:image/png")
+
+
+@pytest.mark.asyncio
+async def test_sse_stream_ends_with_result(jobs):
+    manager, gate = jobs
+    async with _client() as ac:
+        job_id = (await ac.post("/chat/image/jobs", json={"user_text": "x"})).json()["job_id"]
+        asyncio.get_running_loop().call_later(0.1, gate.set)
+        events = []
+        async with ac.stream("GET", f"/chat/image/jobs/{job_id}/events") as resp:
+            assert resp.headers["content-type"].startswith("text/event-stream")
+            async for line in resp.aiter_lines():
+                if line.startswith("data: "):
+                    events.append(json.loads(line[len("data: "):]))
+        assert events[-1]["status"] == "succeeded"
+        assert events[-1]["result"]["prompt"] == "p:x"
+
+
+@pytest.mark.asyncio
+async def test_cancel_queued_job_and_bounded_workers(jobs):
+    manager, gate = jobs
+    async with _client() as ac:
+        first = (await ac.post("/chat/image/jobs", json={"user_text": "a"})).json()["job_id"]
+        second = (await ac.post("/chat/image/jobs", json={"user_text": "b"})).json()["job_id"]
+        await asyncio.sleep(0.05)
+        # workers=1 → 두 번째는 대기 중
+        assert manager.get(first).status == "running"
+        assert manager.get(second).status == "queued"
+
+        r = await ac.delete(f"/chat/image/jobs/{second}")
+        assert r.status_code == 200
+        await asyncio.gather(manager.get(second).task, return_exceptions=True)
+        assert manager.get(second).status == "cancelled"
+
+        gate.set()
+        await manager.get(first).task
+        assert manager.get(first).status == "succeeded"
+
+
+@pytest.mark.asyncio
+async def test_queue_limit_and_ttl():
+    manager = JobManager(workers=1, ttl=0, max_pending=1)
+    gate = asyncio.Event()
+
+    async def work():
+        await gate.wait()
+        return 1
+
+    job = manager.submit(work)
+    with pytest.raises(JobQueueFull):
+        manager.submit(work)
+    gate.set()
+    await job.task
+    await asyncio.sleep(0.01)
+    # ttl=0 → 종료된 작업은 다음 조회 시 정리
+    assert manager.get(job.id) is None
+
+
+@pytest.mark.asyncio
+async def test_finished_jobs_are_capped_oldest_first():
+    manager = JobManager(workers=4, ttl=600, max_pending=8, max_finished=2)
+
+    async def work():
+        return "x" * 1024
+
+    jobs = []
+    for _ in range(4):
+        job = manager.submit(work)
+        await job.task
+        jobs.append(job)
+    # 한 번도 조회하지 않아도 완료 시점에 가장 오래된 결과부터 버림
+    assert [manager._jobs.get(j.id) is not None for j in jobs] == [False, False, True, True]
+    assert manager.stats()["evicted"] == 2
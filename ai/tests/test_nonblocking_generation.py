@@ -0,0 +1,81 @@
+import asyncio
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if _ROOT not in sys.path:
+    sys.path.insert(0, _ROOT)
+
+from ai.serving.fastapi_app.main import app  # noqa: E402
+from ai.serving.fastapi_app.routes import chat as chat_route  # noqa: E402
+from ai.serving.fastapi_app.routes import comment_model as comment_route  # noqa: E402
+
+_PNG_1x1 = (
+    "data:image/png;base64,"
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR4nGNgYAAAAAMAASsJTYQAAAAASUVORK5CYII="
+)
+IMAGE_DELAY = 1.0
+
+
+def _text_resp(text):
+    part = SimpleNamespace(text=text, inline_data=None, data=None)
+    return SimpleNamespace(text=text, candidates=[SimpleNamespace(content=SimpleNamespace(parts=[part]))])
+
+
+def _image_resp():
+    inline = SimpleNamespace(data=b"\x89PNG\r\n\x1a\nfake", mime_type="image/png")
+    part = SimpleNamespace(text=None, inline_data=inline)
+    return SimpleNamespace(text=None, candidates=[SimpleNamespace(content=SimpleNamespace(parts=[part]))])
+
+
+class _FakeModels:
+    async def generate_content(self, model, contents, config=None):
+        modalities = getattr(config, "response_modalities", None) or []
+        if any("IMAGE" in str(m) for m in modalities):
+            await asyncio.sleep(IMAGE_DELAY)
+            return _image_resp()
+        return _text_resp("네, 감사합니다!")
+
+
+class _FakeClient:
+    def __init__(self):
+        self.aio = SimpleNamespace(models=_FakeModels())
+
+    def __getattribute__(self, name):
+        if name == "models":
+            raise AssertionError("sync client.models must not be used in request handlers")
+        return object.__getattribute__(self, name)
+
+
+@pytest.mark.asyncio
+async def test_text_requests_served_while_image_generation_in_flight(monkeypatch):
+    fake = _FakeClient()
+    monkeypatch.setattr(chat_route, "_get_client", lambda: fake)
+    monkeypatch.setattr(comment_route, "_get_client", lambda: fake)
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test", timeout=10) as ac:
+        started = time.perf_counter()
+        image_task = asyncio.create_task(
+            ac.post("/chat/image", json={"user_text": "카페에서 셀카", "persona_img": _PNG_1x1})
+        )
+        await asyncio.sleep(0.05)
+
+        text_started = time.perf_counter()
+        r = await ac.post("/comment/reply", json={"text": "사진 멋져요"})
+        text_elapsed = time.perf_counter() - text_started
+
+        assert r.status_code == 200, r.text
+        assert r.json()["reply"]
+        # 이미지 생성(1초)이 끝나기 전에 텍스트 응답이 돌아와야 함
+        assert not image_task.done()
+        assert text_elapsed < IMAGE_DELAY / 2
+
+        img = await image_task
+        assert img.status_code == 200, img.text
+        assert img.json()["image"].startswith("data:image/png;base64,")
+        assert time.perf_counter() - started >= IMAGE_DELAY
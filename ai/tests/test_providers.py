@@ -0,0 +1,51 @@
+import os
+import sys
+
+import httpx
+import pytest
+
+_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if _ROOT not in sys.path:
+    sys.path.insert(0, _ROOT)
+
+from ai.serving.fastapi_app import providers  # noqa: E402
+from ai.serving.fastapi_app.routes import caption, chat  # noqa: E402
+
+
+@pytest.mark.asyncio
+async def test_http_client_shared_and_recreated_after_close(monkeypatch):
+    monkeypatch.delenv("GOOGLE_API_KEY", raising=False)
+    await providers.close_clients()
+    await providers.init_clients()
+    first = providers.get_http_client()
+    assert providers.get_http_client() is first
+    assert providers.clients_info()["genai"] is False
+
+    await providers.close_clients()
+    assert first.is_closed
+    assert providers.get_http_client() is not first
+    await providers.close_clients()
+
+
+@pytest.mark.asyncio
+async def test_genai_client_shared_across_routes(monkeypatch):
+    monkeypatch.setenv("GOOGLE_API_KEY", "test-key")
+    monkeypatch.setattr(providers, "_genai_client", None)
+    assert chat._get_client() is caption._get_client()
+    monkeypatch.setattr(providers, "_genai_client", None)
+
+
+@pytest.mark.asyncio
+async def test_fetch_image_bytes_uses_pooled_client(monkeypatch):
+    seen = []
+
+    def handler(request):
+        seen.append(str(request.url))
+        return httpx.Response(200, content=b"img", headers={"content-type": "image/webp"})
+
+    pooled = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(providers, "_http_client", pooled)
+    data, mime = await chat._fetch_image_bytes("https://example.test/a.webp")
+    assert (data, mime) == (b"img", "image/webp")
+    assert seen == ["https://example.test/a.webp"]
+    await pooled.aclose()
@@ -0,0 +1,281 @@
+"""
+[파트 개요] 공유 Graph API HTTP 클라이언트
+- 외부 통신: graph.facebook.com (Instagram Graph API)
+
+프로세스당 httpx.AsyncClient 하나를 keep-alive/커넥션 상한과 함께 공유합니다
+(요청마다 새 클라이언트 → 매번 TLS 핸드셰이크하던 비용 제거). h2 패키지가 있으면 HTTP/2.
+앱 startup에서 init_graph_client(), shutdown에서 close_graph_client()를 호출하고,
+라우트는 기존 `async with httpx.AsyncClient(...) as client:` 자리에
+`async with graph_session() as client:`를 사용합니다(블록이 끝나도 공유 클라이언트는 닫지 않음).
+
+- 상대 경로("/{id}/media")는 GRAPH 기준 주소에 붙이고, 절대 URL(paging.next 등)은 그대로 사용
+- 호출별 지연/상태 코드를 엔드포인트(숫자 ID는 {id}로 치환) 단위로 graph_stats()에 집계
+- 사용률 헤더/스로틀 오류에 따른 대기열·백오프는 graph_limits.GraphLimits가 담당
+
+설정(환경변수)
+- META_GRAPH: 기준 주소(기본 https://graph.facebook.com/v20.0)
+- GRAPH_TIMEOUT(기본 30초), GRAPH_CONNECT_TIMEOUT(기본 5초), GRAPH_PUBLISH_TIMEOUT(게시용, 기본 60초)
+- GRAPH_MAX_CONNECTIONS(기본 20), GRAPH_MAX_KEEPALIVE(기본 10), GRAPH_KEEPALIVE_EXPIRY(기본 30초)
+- GRAPH_HTTP2=0 이면 HTTP/1.1만 사용
+"""
+import logging
+import os
+import re
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.api.core.graph_limits import (
+    GRAPH_MAX_RETRIES,
+    GraphLimits,
+    account_key,
+    backoff_delay,
+    throttle_code,
+)
+
+log = logging.getLogger("graph")
+
+GRAPH = (os.getenv("META_GRAPH") or "https://graph.facebook.com/v20.0").rstrip("/")
+
+
+def _float_env(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name) or default)
+    except ValueError:
+        return default
+
+
+GRAPH_TIMEOUT = _float_env("GRAPH_TIMEOUT", 30.0)
+GRAPH_CONNECT_TIMEOUT = _float_env("GRAPH_CONNECT_TIMEOUT", 5.0)
+GRAPH_PUBLISH_TIMEOUT = _float_env("GRAPH_PUBLISH_TIMEOUT", 60.0)
+GRAPH_MAX_CONNECTIONS = int(_float_env("GRAPH_MAX_CONNECTIONS", 20))
+GRAPH_MAX_KEEPALIVE = int(_float_env("GRAPH_MAX_KEEPALIVE", 10))
+GRAPH_KEEPALIVE_EXPIRY = _float_env("GRAPH_KEEPALIVE_EXPIRY", 30.0)
+_HTTP2 = (os.getenv("GRAPH_HTTP2") or "1").strip().lower() in ("1", "true", "yes")
+
+_ID_SEGMENT = re.compile(r"^[0-9_]+$")
+_VERSION_SEGMENT = re.compile(r"^v\d+(\.\d+)?$")
+_MAX_ENDPOINTS = 256
+
+
+def _timeout(total: Optional[float] = None) -> httpx.Timeout:
+    return httpx.Timeout(total if total is not None else GRAPH_TIMEOUT, connect=GRAPH_CONNECT_TIMEOUT)
+
+
+def _endpoint(method: str, url: str) -> str:
+    """지표 키: 'GET /{id}/media' (버전/숫자 ID 제거, 쿼리 제외 → 토큰이 남지 않음)."""
+    parts = urlsplit(url)
+    segs = [s for s in parts.path.split("/") if s]
+    if segs and _VERSION_SEGMENT.match(segs[0]):
+        segs = segs[1:]
+    path = "/" + "/".join("{id}" if _ID_SEGMENT.match(s) else s for s in segs)
+    host = "" if url.startswith(GRAPH) else parts.netloc
+    return f"{method.upper()} {host}{path}"
+
+
+class _GraphMetrics:
+    def __init__(self) -> None:
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.endpoints: Dict[str, Dict[str, Any]] = {}
+
+    def start(self) -> None:
+        self.requests += 1
+        self.in_flight += 1
+
+    def record(self, endpoint: str, status: Any, ms: float, error: Optional[str] = None) -> None:
+        self.in_flight -= 1
+        if endpoint not in self.endpoints and len(self.endpoints) >= _MAX_ENDPOINTS:
+            endpoint = "other"
+        e = self.endpoints.setdefault(endpoint, {"calls": 0, "errors": 0, "status": {}, "total_ms": 0.0, "max_ms": 0.0})
+        e["calls"] += 1
+        e["total_ms"] += ms
+        e["max_ms"] = max(e["max_ms"], ms)
+        if error is not None:
+            self.errors += 1
+            e["errors"] += 1
+            e["status"][error] = e["status"].get(error, 0) + 1
+        else:
+            key = str(status)
+            e["status"][key] = e["status"].get(key, 0) + 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "endpoints": {
+                name: {
+                    "calls": e["calls"],
+                    "errors": e["errors"],
+                    "status": dict(e["status"]),
+                    "avg_ms": round(e["total_ms"] / e["calls"], 2) if e["calls"] else 0.0,
+                    "max_ms": round(e["max_ms"], 2),
+                }
+                for name, e in sorted(self.endpoints.items())
+            },
+        }
+
+
+_metrics = _GraphMetrics()
+
+
+class GraphClient:
+    """공유 httpx.AsyncClient 위의 얇은 래퍼(httpx와 같은 get/post/delete 시그니처)."""
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        base: str = GRAPH,
+        timeout: Optional[float] = None,
+        limits: Optional[GraphLimits] = None,
+    ) -> None:
+        self._client = client
+        self.base = base.rstrip("/")
+        self._timeout = timeout
+        self.limits = limits if limits is not None else GraphLimits()
+
+    def url(self, path: str) -> str:
+        if path.startswith("http://") or path.startswith("https://"):
+            return path
+        return f"{self.base}/{path.lstrip('/')}"
+
+    def with_timeout(self, timeout: Optional[float]) -> "GraphClient":
+        return GraphClient(self._client, self.base, timeout, self.limits)
+
+    async def request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        full = self.url(url)
+        if "timeout" not in kwargs and self._timeout is not None:
+            kwargs["timeout"] = _timeout(self._timeout)
+        endpoint = _endpoint(method, full)
+        limits = self.limits
+        account = limits.account(account_key(kwargs.get("params"), kwargs.get("data"), full))
+        attempt = 0
+        while True:
+            if not await limits.acquire(account):
+                # 차단이 GRAPH_MAX_WAIT보다 길게 남음 → Graph를 부르지 않고 로컬 429
+                _metrics.start()
+                _metrics.record(endpoint, "throttled", 0.0)
+                return _throttled_response(method, full)
+            _metrics.start()
+            started = time.perf_counter()
+            try:
+                r = await self._client.request(method, full, **kwargs)
+            except Exception as e:
+                _metrics.record(endpoint, None, (time.perf_counter() - started) * 1000, error=type(e).__name__)
+                raise
+            finally:
+                await limits.release(account)
+            _metrics.record(endpoint, r.status_code, (time.perf_counter() - started) * 1000)
+            limits.observe(account, r.headers)
+            code = throttle_code(r.status_code, _error_body(r)) if r.status_code >= 400 else None
+            if code is None or attempt >= GRAPH_MAX_RETRIES:
+                return r
+            delay = backoff_delay(attempt)
+            limits.throttled(account, code, delay)
+            limits.retries += 1
+            attempt += 1
+            log.warning("Graph throttled (code=%s) on %s, retry %d in %.1fs", code, endpoint, attempt, delay)
+
+    async def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def delete(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("DELETE", url, **kwargs)
+
+    async def __aenter__(self) -> "GraphClient":
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        # 공유 클라이언트는 블록 종료 시 닫지 않음(close_graph_client에서 정리)
+        return None
+
+
+def _error_body(r: httpx.Response) -> Any:
+    try:
+        return r.json()
+    except Exception:
+        return None
+
+
+def _throttled_response(method: str, url: str) -> httpx.Response:
+    return httpx.Response(
+        429,
+        json={"error": {"message": "Graph API rate limit (throttled locally)", "code": 4, "is_transient": True}},
+        headers={"X-Local-Throttle": "1"},
+        request=httpx.Request(method, url),
+    )
+
+
+_client: Optional[GraphClient] = None
+_http2_active = False
+
+
+def _http2_available() -> bool:
+    if not _HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401
+    except Exception:
+        return False
+    return True
+
+
+def init_graph_client(transport: Optional[httpx.AsyncBaseTransport] = None) -> GraphClient:
+    """공유 클라이언트 생성(이미 있으면 그대로 반환). transport는 테스트용 주입 지점."""
+    global _client, _http2_active
+    if _client is not None:
+        return _client
+    http2 = transport is None and _http2_available()
+    raw = httpx.AsyncClient(
+        timeout=_timeout(),
+        limits=httpx.Limits(
+            max_connections=GRAPH_MAX_CONNECTIONS,
+            max_keepalive_connections=GRAPH_MAX_KEEPALIVE,
+            keepalive_expiry=GRAPH_KEEPALIVE_EXPIRY,
+        ),
+        http2=http2,
+        transport=transport,
+    )
+    _client = GraphClient(raw)
+    _http2_active = http2
+    log.info(
+        "Graph client created (http2=%s max_connections=%s keepalive=%s)",
+        http2, GRAPH_MAX_CONNECTIONS, GRAPH_MAX_KEEPALIVE,
+    )
+    return _client
+
+
+def get_graph_client() -> GraphClient:
+    """공유 클라이언트. startup 전이면 지연 생성."""
+    return _client if _client is not None else init_graph_client()
+
+
+def graph_session(timeout: Optional[float] = None) -> GraphClient:
+    """`async with graph_session() as client:` — 공유 클라이언트(선택적으로 이 블록의 타임아웃만 변경)."""
+    client = get_graph_client()
+    return client.with_timeout(timeout) if timeout is not None else client
+
+
+async def close_graph_client() -> None:
+    global _client
+    client, _client = _client, None
+    if client is not None:
+        await client._client.aclose()
+
+
+def graph_stats() -> Dict[str, Any]:
+    return {
+        **_metrics.snapshot(),
+        "limits": _client.limits.snapshot() if _client is not None else None,
+        "http2": _http2_active,
+        "max_connections": GRAPH_MAX_CONNECTIONS,
+        "max_keepalive": GRAPH_MAX_KEEPALIVE,
+        "timeout": GRAPH_TIMEOUT,
+    }
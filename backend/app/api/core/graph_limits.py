@@ -0,0 +1,281 @@
+"""
+[파트 개요] Graph API 레이트 리밋 대응(적응형 대기열 + 지터 백오프)
+- 내부 통신: app.api.core.graph.GraphClient가 모든 호출 전후에 사용
+
+Meta는 응답 헤더로 사용률을 알려 줍니다(최근 1시간 기준 %).
+- X-App-Usage: {"call_count", "total_cputime", "total_time"} → 앱 전체
+- X-Business-Use-Case-Usage: {"<id>": [{"type", "call_count", "total_cputime", "total_time",
+  "estimated_time_to_regain_access"(분)}]} → IG 계정(비즈니스 유스케이스)별
+한도를 넘으면 오류 코드 4(앱), 17(사용자), 32(페이지), 613(호출 수)로 약 1시간 차단되므로
+100%에 닿기 전에 스스로 속도를 줄입니다.
+
+- 리미터는 앱 전체 1개 + 계정별(access_token 지문 기준) 1개씩이며, 요청은 두 리미터를 모두 통과해야 합니다.
+- 사용률 < GRAPH_USAGE_SOFT(기본 75%): 동시 GRAPH_APP_CONCURRENCY / GRAPH_ACCOUNT_CONCURRENCY
+- 그 이상: 동시 1개로 줄이고 시작 간격을 사용률에 비례해(최대 GRAPH_MAX_PACING초) 벌립니다.
+- 사용률 추정치는 마지막 헤더 이후 시간에 따라 선형으로 감소(1시간 창이 굴러가므로).
+- 차단(오류 코드/재획득 시간) 중인 키는 풀릴 때까지 대기열에서 기다리고,
+  GRAPH_MAX_WAIT초보다 오래 걸리면 Graph를 호출하지 않고 로컬 429(throttled)를 돌려줍니다.
+- 스로틀 오류는 full-jitter 지수 백오프로 GRAPH_MAX_RETRIES회까지 재시도합니다.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import time
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+log = logging.getLogger("graph")
+
+
+def _float_env(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name) or default)
+    except ValueError:
+        return default
+
+
+GRAPH_APP_CONCURRENCY = int(_float_env("GRAPH_APP_CONCURRENCY", 16))
+GRAPH_ACCOUNT_CONCURRENCY = int(_float_env("GRAPH_ACCOUNT_CONCURRENCY", 4))
+GRAPH_USAGE_SOFT = _float_env("GRAPH_USAGE_SOFT", 75.0)
+GRAPH_MAX_PACING = _float_env("GRAPH_MAX_PACING", 10.0)
+GRAPH_MAX_WAIT = _float_env("GRAPH_MAX_WAIT", 60.0)
+GRAPH_MAX_RETRIES = int(_float_env("GRAPH_MAX_RETRIES", 3))
+GRAPH_BACKOFF_BASE = _float_env("GRAPH_BACKOFF_BASE", 1.0)
+GRAPH_BACKOFF_CAP = _float_env("GRAPH_BACKOFF_CAP", 30.0)
+
+# 앱 단위 / 계정 단위 스로틀 오류 코드
+APP_THROTTLE_CODES = frozenset({4})
+ACCOUNT_THROTTLE_CODES = frozenset({17, 32, 613})
+THROTTLE_CODES = APP_THROTTLE_CODES | ACCOUNT_THROTTLE_CODES
+
+_WINDOW = 3600.0
+_MAX_ACCOUNTS = 1024
+
+
+def _usage_of(entry: Dict[str, Any]) -> float:
+    vals = [entry.get(k) for k in ("call_count", "total_cputime", "total_time")]
+    return max([float(v) for v in vals if isinstance(v, (int, float))] or [0.0])
+
+
+def parse_app_usage(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        data = json.loads(value)
+    except ValueError:
+        return None
+    return _usage_of(data) if isinstance(data, dict) else None
+
+
+def parse_buc_usage(value: Optional[str]) -> Tuple[Optional[float], float]:
+    """(계정 사용률 최대값, 재획득까지 초). 헤더가 없거나 해석 불가면 (None, 0)."""
+    if not value:
+        return None, 0.0
+    try:
+        data = json.loads(value)
+    except ValueError:
+        return None, 0.0
+    usage: Optional[float] = None
+    regain = 0.0
+    for entries in (data.values() if isinstance(data, dict) else []):
+        for e in entries if isinstance(entries, list) else []:
+            if not isinstance(e, dict):
+                continue
+            usage = max(usage or 0.0, _usage_of(e))
+            minutes = e.get("estimated_time_to_regain_access")
+            if isinstance(minutes, (int, float)) and minutes > 0:
+                regain = max(regain, float(minutes) * 60)
+    return usage, regain
+
+
+def throttle_code(status: int, body: Any) -> Optional[int]:
+    """응답이 스로틀 오류면 Graph 오류 코드(HTTP 429는 4로 취급), 아니면 None."""
+    code = None
+    if isinstance(body, dict) and isinstance(body.get("error"), dict):
+        code = body["error"].get("code")
+    if isinstance(code, int) and code in THROTTLE_CODES:
+        return code
+    return 4 if status == 429 else None
+
+
+def backoff_delay(attempt: int) -> float:
+    """full jitter: U(0, min(cap, base * 2^attempt))"""
+    return random.uniform(0, min(GRAPH_BACKOFF_CAP, GRAPH_BACKOFF_BASE * (2 ** attempt)))
+
+
+def account_key(params: Any, data: Any, url: str = "") -> Optional[str]:
+    """요청의 access_token 지문(토큰 = IG 계정 연결 1개). 토큰 원문은 보관하지 않음.
+
+    paging.next 같은 절대 URL은 토큰이 쿼리에 들어 있으므로 URL도 확인합니다.
+    """
+    token = None
+    for src in (params, data):
+        if isinstance(src, dict) and src.get("access_token"):
+            token = src["access_token"]
+            break
+    if token is None and "access_token=" in url:
+        token = (parse_qs(urlsplit(url).query).get("access_token") or [None])[0]
+    if not token:
+        return None
+    return hashlib.sha256(str(token).encode()).hexdigest()[:16]
+
+
+class Limiter:
+    """사용률 기반 동시성/간격 제어와 차단 대기를 하는 대기열."""
+
+    def __init__(self, name: str, concurrency: int) -> None:
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self.usage = 0.0
+        self.usage_at = 0.0
+        self.blocked_until = 0.0
+        self.active = 0
+        self.waiting = 0
+        self.last_start = 0.0
+        self.last_used = time.monotonic()
+        self.throttled = 0
+        self._cond = asyncio.Condition()
+
+    def current_usage(self, now: float) -> float:
+        return max(0.0, self.usage - (now - self.usage_at) * 100.0 / _WINDOW)
+
+    def observe(self, usage: Optional[float], regain: float = 0.0, now: Optional[float] = None) -> None:
+        now = time.monotonic() if now is None else now
+        if usage is not None:
+            self.usage = usage
+            self.usage_at = now
+        if regain > 0:
+            self.block(regain, now)
+
+    def block(self, seconds: float, now: Optional[float] = None) -> None:
+        now = time.monotonic() if now is None else now
+        self.blocked_until = max(self.blocked_until, now + seconds)
+
+    def _capacity(self, now: float) -> int:
+        return 1 if self.current_usage(now) >= GRAPH_USAGE_SOFT else self.concurrency
+
+    def _pacing(self, now: float) -> float:
+        usage = self.current_usage(now)
+        if usage < GRAPH_USAGE_SOFT:
+            return 0.0
+        ratio = min(1.0, (usage - GRAPH_USAGE_SOFT) / max(1.0, 100.0 - GRAPH_USAGE_SOFT))
+        return GRAPH_MAX_PACING * ratio
+
+    def wait_time(self, now: float) -> float:
+        return max(self.blocked_until - now, self.last_start + self._pacing(now) - now, 0.0)
+
+    async def acquire(self, deadline: float) -> bool:
+        """슬롯을 얻으면 True. deadline(monotonic)까지 못 얻으면 False."""
+        async with self._cond:
+            self.waiting += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = self.wait_time(now)
+                    if wait <= 0 and self.active < self._capacity(now):
+                        break
+                    if now + wait > deadline or now >= deadline:
+                        self.throttled += 1
+                        return False
+                    try:
+                        await asyncio.wait_for(self._cond.wait(), timeout=wait if wait > 0 else deadline - now)
+                    except asyncio.TimeoutError:
+                        pass
+            finally:
+                self.waiting -= 1
+            self.active += 1
+            self.last_start = self.last_used = time.monotonic()
+            return True
+
+    async def release(self) -> None:
+        async with self._cond:
+            self.active -= 1
+            self._cond.notify_all()
+
+    def snapshot(self, now: float) -> Dict[str, Any]:
+        return {
+            "usage": round(self.current_usage(now), 1),
+            "blocked_for": round(max(0.0, self.blocked_until - now), 1),
+            "active": self.active,
+            "waiting": self.waiting,
+            "capacity": self._capacity(now),
+            "throttled": self.throttled,
+        }
+
+
+class GraphLimits:
+    """앱 리미터 1개 + 계정별 리미터."""
+
+    def __init__(self) -> None:
+        self.app = Limiter("app", GRAPH_APP_CONCURRENCY)
+        self.accounts: Dict[str, Limiter] = {}
+        self.retries = 0
+
+    def account(self, key: Optional[str]) -> Optional[Limiter]:
+        if key is None:
+            return None
+        lim = self.accounts.get(key)
+        if lim is None:
+            if len(self.accounts) >= _MAX_ACCOUNTS:
+                self._prune()
+            lim = self.accounts[key] = Limiter(key, GRAPH_ACCOUNT_CONCURRENCY)
+        return lim
+
+    def _prune(self) -> None:
+        now = time.monotonic()
+        idle = [k for k, v in self.accounts.items() if not v.active and not v.waiting and v.blocked_until <= now]
+        idle.sort(key=lambda k: self.accounts[k].last_used)
+        for k in idle[: max(1, len(idle) // 2)]:
+            del self.accounts[k]
+
+    async def acquire(self, account: Optional[Limiter], max_wait: Optional[float] = None) -> bool:
+        deadline = time.monotonic() + (GRAPH_MAX_WAIT if max_wait is None else max_wait)
+        # 계정 → 앱 순서로 획득(계정 차단 중인 요청이 앱 슬롯을 점유하지 않도록)
+        if account is not None and not await account.acquire(deadline):
+            return False
+        try:
+            ok = await self.app.acquire(deadline)
+        except BaseException:
+            # 앱 슬롯 대기 중 취소(wait_for 타임아웃 등) → 잡아 둔 계정 슬롯을 반드시 반납
+            if account is not None:
+                await asyncio.shield(account.release())
+            raise
+        if not ok:
+            if account is not None:
+                await account.release()
+            return False
+        return True
+
+    async def release(self, account: Optional[Limiter]) -> None:
+        await self.app.release()
+        if account is not None:
+            await account.release()
+
+    def observe(self, account: Optional[Limiter], headers: Any) -> None:
+        app_usage = parse_app_usage(headers.get("x-app-usage"))
+        if app_usage is not None:
+            self.app.observe(app_usage)
+        buc, regain = parse_buc_usage(headers.get("x-business-use-case-usage"))
+        if account is not None and (buc is not None or regain > 0):
+            account.observe(buc, regain)
+        if (app_usage or 0) >= GRAPH_USAGE_SOFT or (buc or 0) >= GRAPH_USAGE_SOFT:
+            log.info("Graph usage high: app=%s account=%s regain=%ss", app_usage, buc, regain)
+
+    def throttled(self, account: Optional[Limiter], code: int, delay: float) -> None:
+        """스로틀 오류: 해당 범위(앱/계정)를 delay 동안 막아 대기열의 다른 요청도 함께 쉬게 함."""
+        target = self.app if code in APP_THROTTLE_CODES or account is None else account
+        target.block(delay)
+        target.throttled += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        busiest = sorted(self.accounts.values(), key=lambda l: l.current_usage(now), reverse=True)[:10]
+        return {
+            "app": self.app.snapshot(now),
+            "accounts": len(self.accounts),
+            "busiest_accounts": {l.name: l.snapshot(now) for l in busiest},
+            "retries": self.retries,
+        }
@@ -0,0 +1,812 @@
+"""
+[파트 개요] Instagram 웹훅 수집 파이프라인(내구성 큐 → 워커 → 로컬 댓글 저장소)
+- 내부 통신: ss_instagram_webhook_event(큐), ss_instagram_comment(페르소나별 댓글 저장소),
+  ss_instagram_comment_sync(페르소나별 저장소 동기화 시각), ss_instagram_comment_media(개요 미디어 메타데이터),
+  ss_persona(ig_user_id → 페르소나), ss_instagram_media_likes(댓글 활동 시각 — like_totals 참고)
+- 외부 통신: 없음(웹훅 본문만 정규화하며 Graph를 호출하지 않음)
+
+흐름
+1. POST /webhooks/instagram: X-Hub-Signature-256(없으면 구형 X-Hub-Signature)을 META_APP_SECRET으로
+   원문 바이트 기준 검증한 뒤 entry[].changes[]를 한 행씩 큐에 INSERT하고 바로 200을 돌려줍니다.
+   DB 기록에 실패하면 5xx → Meta가 재전송하므로 이벤트가 유실되지 않습니다.
+2. 워커(start_worker, 앱 startup): 대기 행을 `UPDATE ... ORDER BY event_id LIMIT n`으로 선점(claim_token)하고
+   comments/live_comments/mentions를 정규화해 댓글 저장소에 upsert, 같은 트랜잭션에서 done으로 표시합니다.
+   댓글이 달린 내 미디어는 좋아요 저장소에 활동 시각을 남겨 다음 스냅샷이 카운터를 다시 읽게 합니다.
+   선점 UPDATE가 원자적이라 여러 워커 프로세스가 떠 있어도 한 행은 한 워커만 처리합니다.
+   묶음이 실패하면 이벤트별 트랜잭션으로 다시 처리해 문제 행만 실패로 표시합니다(나머지는 done).
+   실패 행은 attempts가 IG_WEBHOOK_MAX_ATTEMPTS 미만이면 pending으로 되돌리고, 넘으면 failed로 둡니다.
+   IG_WEBHOOK_CLAIM_TIMEOUT 안에 끝나지 않은 선점(워커 종료 등)은 다음 배치에서 pending으로 복구합니다.
+3. 댓글 개요는 저장소가 신선한(IG_COMMENT_STORE_TTL 이내 동기화) 페르소나를 인덱스 질의 두 번(미디어/댓글)으로 읽고,
+   나머지(캐시 미스)만 Graph로 수집한 뒤 save_graph_items()로 저장소를 채웁니다. 수집한 미디어 메타데이터도
+   함께 저장하므로 댓글이 없는 미디어와 캡션/썸네일이 저장소 응답에서도 Graph 응답과 같게 유지됩니다.
+   수집한 미디어에서 Graph가 더 이상 돌려주지 않는 댓글(삭제됨)은 같은 트랜잭션에서 저장소에서도 지웁니다.
+
+설정(환경변수)
+- META_APP_SECRET: 서명 검증 키. 없으면 수신을 거부(IG_WEBHOOK_ALLOW_UNSIGNED=1이면 개발용으로 허용)
+- IG_COMMENT_STORE: 1/0으로 저장소 사용 강제(기본: META_APP_SECRET이 있을 때만 사용 — 웹훅이 없으면
+  TTL 동안 새 댓글이 보이지 않으므로)
+- IG_COMMENT_STORE_TTL(기본 21600초), IG_COMMENT_STORE_DAYS(개요 조회 기간, 기본 30일)
+- IG_WEBHOOK_BATCH(기본 100), IG_WEBHOOK_POLL_INTERVAL(기본 5초), IG_WEBHOOK_MAX_ATTEMPTS(기본 5),
+  IG_WEBHOOK_CLAIM_TIMEOUT(기본 300초), IG_WEBHOOK_RETENTION_DAYS(처리 완료 행 보관, 기본 7일)
+"""
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import aiomysql
+
+from app.api.core import like_totals
+from app.api.core.mysql import get_mysql_pool
+from app.api.core.schema import register_migration
+
+log = logging.getLogger("ig_webhooks")
+
+
+def _float_env(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name) or default)
+    except ValueError:
+        return default
+
+
+META_APP_SECRET = os.getenv("META_APP_SECRET") or ""
+ALLOW_UNSIGNED = (os.getenv("IG_WEBHOOK_ALLOW_UNSIGNED") or "").strip().lower() in ("1", "true", "yes")
+_STORE_FLAG = (os.getenv("IG_COMMENT_STORE") or "").strip().lower()
+COMMENT_STORE_ENABLED = _STORE_FLAG in ("1", "true", "yes") if _STORE_FLAG else bool(META_APP_SECRET)
+COMMENT_STORE_TTL = _float_env("IG_COMMENT_STORE_TTL", 6 * 3600)
+COMMENT_STORE_DAYS = _float_env("IG_COMMENT_STORE_DAYS", 30)
+WEBHOOK_BATCH = int(_float_env("IG_WEBHOOK_BATCH", 100))
+WEBHOOK_POLL_INTERVAL = _float_env("IG_WEBHOOK_POLL_INTERVAL", 5.0)
+WEBHOOK_MAX_ATTEMPTS = int(_float_env("IG_WEBHOOK_MAX_ATTEMPTS", 5))
+WEBHOOK_CLAIM_TIMEOUT = int(_float_env("IG_WEBHOOK_CLAIM_TIMEOUT", 300))
+WEBHOOK_RETENTION_DAYS = int(_float_env("IG_WEBHOOK_RETENTION_DAYS", 7))
+
+# 처리 대상 필드 → 저장소 kind
+_FIELD_KINDS = {"comments": "comment", "live_comments": "comment", "mentions": "mention"}
+# 개요 질의 1회 최대 행 수(페르소나 수 × media_limit × comments_limit보다 넉넉하게)
+_OVERVIEW_MAX_ROWS = 5000
+_PURGE_INTERVAL = 3600.0
+
+
+# ----- 스키마 -----
+
+@register_migration("ss_instagram_webhook_event.v1")
+async def _ensure_event_table():
+    pool = await get_mysql_pool()
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS ss_instagram_webhook_event (
+                  event_id BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+                  object VARCHAR(32) NOT NULL,
+                  entry_id VARCHAR(64) NULL,
+                  field VARCHAR(64) NOT NULL,
+                  payload MEDIUMTEXT NOT NULL,
+                  event_time DATETIME NULL,
+                  status VARCHAR(16) NOT NULL DEFAULT 'pending',
+                  attempts INT NOT NULL DEFAULT 0,
+                  claim_token VARCHAR(32) NULL,
+                  claimed_at DATETIME NULL,
+                  last_error VARCHAR(500) NULL,
+                  received_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                  processed_at DATETIME NULL,
+                  KEY idx_status (status, event_id),
+                  KEY idx_claim (claim_token)
+                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+                """
+            )
+            try:
+                await conn.commit()
+            except Exception:
+                pass
+
+
+@register_migration("ss_instagram_comment.v1")
+async def _ensure_comment_tables():
+    pool = await get_mysql_pool()
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS ss_instagram_comment (
+                  user_id INT NOT NULL,
+                  user_persona_num INT NOT NULL,
+                  comment_id VARCHAR(64) NOT NULL,
+                  ig_user_id VARCHAR(64) NOT NULL,
+                  media_id VARCHAR(64) NULL,
+                  parent_id VARCHAR(64) NULL,
+                  kind VARCHAR(16) NOT NULL DEFAULT 'comment',
+                  username VARCHAR(255) NULL,
+                  text TEXT NULL,
+                  like_count INT NULL,
+                  commented_at DATETIME NULL,
+                  source VARCHAR(16) NOT NULL DEFAULT 'webhook',
+                  updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                  PRIMARY KEY (user_id, user_persona_num, comment_id),
+                  KEY idx_persona_time (user_id, user_persona_num, kind, commented_at),
+                  KEY idx_media (media_id)
+                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+                """
+            )
+            await cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS ss_instagram_comment_sync (
+                  user_id INT NOT NULL,
+                  user_persona_num INT NOT NULL,
+                  ig_user_id VARCHAR(64) NOT NULL,
+                  synced_at DATETIME NOT NULL,
+                  PRIMARY KEY (user_id, user_persona_num)
+                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+                """
+            )
+            try:
+                await conn.commit()
+            except Exception:
+                pass
+
+
+@register_migration("ss_instagram_comment_media.v1")
+async def _ensure_comment_media_table():
+    """Graph로 채운 개요의 미디어 메타데이터(댓글이 없는 미디어도 개요에 남도록)."""
+    pool = await get_mysql_pool()
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS ss_instagram_comment_media (
+                  user_id INT NOT NULL,
+                  user_persona_num INT NOT NULL,
+                  media_id VARCHAR(64) NOT NULL,
+                  ig_user_id VARCHAR(64) NOT NULL,
+                  media_type VARCHAR(32) NULL,
+                  media_url TEXT NULL,
+                  thumbnail_url TEXT NULL,
+                  permalink VARCHAR(512) NULL,
+                  caption TEXT NULL,
+                  posted_at DATETIME NULL,
+                  updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                  PRIMARY KEY (user_id, user_persona_num, media_id),
+                  KEY idx_persona_posted (user_id, user_persona_num, posted_at)
+                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+                """
+            )
+            try:
+                await conn.commit()
+            except Exception:
+                pass
+
+
+@register_migration("ss_persona.ig_user_id_index.v1")
+async def _ensure_persona_ig_index():
+    """웹훅 entry.id(ig_user_id) → 페르소나 조회용 인덱스."""
+    pool = await get_mysql_pool()
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                """
+                SELECT COUNT(*) FROM INFORMATION_SCHEMA.STATISTICS
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'ss_persona' AND COLUMN_NAME = 'ig_user_id'
+                """
+            )
+            (n,) = await cur.fetchone()
+            if not n:
+                await cur.execute("ALTER TABLE ss_persona ADD INDEX idx_ig_user_id (ig_user_id)")
+                try:
+                    await conn.commit()
+                except Exception:
+                    pass
+
+
+# ----- 수신(서명 검증 + 큐 적재) -----
+
+def verify_signature(body: bytes, signature_256: Optional[str], signature_1: Optional[str] = None, secret: Optional[str] = None) -> bool:
+    """X-Hub-Signature-256: "sha256=<hex>"(우선) 또는 X-Hub-Signature: "sha1=<hex>"를 원문 바이트로 검증."""
+    secret = META_APP_SECRET if secret is None else secret
+    if not secret:
+        return False
+    for header, algo in ((signature_256, hashlib.sha256), (signature_1, hashlib.sha1)):
+        if not header:
+            continue
+        prefix, _, digest = header.strip().partition("=")
+        if prefix.lower() != algo().name or not digest:
+            return False
+        expected = hmac.new(secret.encode(), body, algo).hexdigest()
+        return hmac.compare_digest(expected, digest.lower())
+    return False
+
+
+def _utc(ts: Any) -> Optional[datetime]:
+    """웹훅 time(초/밀리초 epoch) 또는 Graph ISO 문자열 → naive UTC datetime."""
+    if ts is None or ts == "":
+        return None
+    try:
+        if isinstance(ts, (int, float)):
+            secs = float(ts) / 1000 if ts > 1e11 else float(ts)
+            return datetime.fromtimestamp(secs, tz=timezone.utc).replace(tzinfo=None)
+        dt = datetime.strptime(str(ts), "%Y-%m-%dT%H:%M:%S%z")
+        return dt.astimezone(timezone.utc).replace(tzinfo=None)
+    except (ValueError, OverflowError, OSError):
+        return None
+
+
+def _iso(dt: Any) -> Optional[str]:
+    """DB datetime → Graph와 같은 형식("2024-05-01T12:00:00+0000")."""
+    if isinstance(dt, datetime):
+        return dt.strftime("%Y-%m-%dT%H:%M:%S+0000")
+    return dt
+
+
+def split_events(body: Dict[str, Any]) -> List[Tuple[Any, ...]]:
+    """웹훅 본문 → 큐 행 (object, entry_id, field, payload, event_time). changes가 없는 entry는 건너뜀."""
+    obj = str(body.get("object") or "")
+    rows: List[Tuple[Any, ...]] = []
+    for entry in body.get("entry") or []:
+        if not isinstance(entry, dict):
+            continue
+        entry_id = str(entry["id"]) if entry.get("id") is not None else None
+        event_time = _utc(entry.get("time"))
+        for change in entry.get("changes") or []:
+            if not isinstance(change, dict) or not change.get("field"):
+                continue
+            payload = json.dumps(change.get("value") or {}, ensure_ascii=False)
+            rows.append((obj, entry_id, str(change["field"]), payload, event_time))
+    return rows
+
+
+async def enqueue(body: Dict[str, Any]) -> int:
+    """큐에 적재하고 적재한 행 수를 반환. 실패는 호출자에게 전파(→ 5xx → Meta 재전송)."""
+    rows = split_events(body)
+    if not rows:
+        return 0
+    pool = await get_mysql_pool()
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            await cur.executemany(
+                """
+                INSERT INTO ss_instagram_webhook_event (object, entry_id, field, payload, event_time)
+                VALUES (%s, %s, %s, %s, %s)
+                """,
+                rows,
+            )
+        await conn.commit()
+    _stats["received"] += len(rows)
+    notify()
+    return len(rows)
+
+
+# ----- 정규화 -----
+
+def normalize_change(entry_id: Optional[str], field: str, value: Dict[str, Any], event_time: Optional[datetime]) -> Optional[Dict[str, Any]]:
+    """큐 행 하나 → 댓글 저장소 행(ig_user_id 기준, 페르소나 미정). 처리 대상이 아니면 None.
+
+    - comments/live_comments: {"id", "text", "from": {"id", "username"}, "media": {"id"}, "parent_id"?}
+    - mentions: {"media_id", "comment_id"?} — 본문이 없으므로 ID만 기록(캡션 멘션은 media_id를 ID로)
+    """
+    kind = _FIELD_KINDS.get(field)
+    if kind is None or not entry_id or not isinstance(value, dict):
+        return None
+    if kind == "mention":
+        media_id = value.get("media_id")
+        cid = value.get("comment_id") or media_id
+        if not cid:
+            return None
+        return {
+            "comment_id": str(cid), "ig_user_id": entry_id, "media_id": str(media_id) if media_id else None,
+            "parent_id": None, "kind": kind, "username": None, "text": None, "like_count": None,
+            "commented_at": event_time,
+        }
+    cid = value.get("id")
+    if not cid:
+        return None
+    media = value.get("media") if isinstance(value.get("media"), dict) else {}
+    sender = value.get("from") if isinstance(value.get("from"), dict) else {}
+    return {
+        "comment_id": str(cid),
+        "ig_user_id": entry_id,
+        "media_id": str(media["id"]) if media.get("id") else None,
+        "parent_id": str(value["parent_id"]) if value.get("parent_id") else None,
+        "kind": kind,
+        "username": sender.get("username"),
+        "text": value.get("text"),
+        "like_count": None,
+        "commented_at": _utc(value.get("timestamp")) or event_time,
+    }
+
+
+_UPSERT_SQL = """
+INSERT INTO ss_instagram_comment (
+  user_id, user_persona_num, comment_id, ig_user_id, media_id, parent_id, kind,
+  username, text, like_count, commented_at, source
+) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE
+  media_id=COALESCE(VALUES(media_id), media_id),
+  parent_id=COALESCE(VALUES(parent_id), parent_id),
+  username=COALESCE(VALUES(username), username),
+  text=COALESCE(VALUES(text), text),
+  like_count=COALESCE(VALUES(like_count), like_count),
+  commented_at=COALESCE(commented_at, VALUES(commented_at))
+"""
+
+
+_MEDIA_UPSERT_SQL = """
+INSERT INTO ss_instagram_comment_media (
+  user_id, user_persona_num, media_id, ig_user_id, media_type, media_url, thumbnail_url,
+  permalink, caption, posted_at
+) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE
+  ig_user_id=VALUES(ig_user_id),
+  media_type=VALUES(media_type),
+  media_url=VALUES(media_url),
+  thumbnail_url=VALUES(thumbnail_url),
+  permalink=VALUES(permalink),
+  caption=VALUES(caption),
+  posted_at=COALESCE(VALUES(posted_at), posted_at)
+"""
+
+
+def _upsert_params(user_id: int, persona_num: int, c: Dict[str, Any], source: str) -> Tuple[Any, ...]:
+    return (
+        int(user_id), int(persona_num), c["comment_id"], c["ig_user_id"], c.get("media_id"), c.get("parent_id"),
+        c.get("kind") or "comment", c.get("username"), c.get("text"), c.get("like_count"),
+        c.get("commented_at"), source,
+    )
+
+
+async def _personas_by_ig(cur: Any, ig_user_ids: Iterable[str]) -> Dict[str, List[Tuple[int, int]]]:
+    ids = sorted(set(ig_user_ids))
+    if not ids:
+        return {}
+    ph = ",".join(["%s"] * len(ids))
+    await cur.execute(
+        f"SELECT ig_user_id, user_id, user_persona_num FROM ss_persona WHERE ig_user_id IN ({ph})",
+        ids,
+    )
+    out: Dict[str, List[Tuple[int, int]]] = {}
+    for ig, uid, num in (await cur.fetchall() or []):
+        out.setdefault(str(ig), []).append((int(uid), int(num)))
+    return out
+
+
+# ----- 워커 -----
+
+_stats: Dict[str, Any] = {
+    "received": 0, "batches": 0, "events": 0, "comments": 0, "unmatched": 0,
+    "ignored": 0, "retried": 0, "failed": 0, "recovered": 0, "store_reads": 0, "last_error": None,
+}
+_wake: Optional[asyncio.Event] = None
+_task: Optional["asyncio.Task[None]"] = None
+_last_purge = 0.0
+
+
+def notify() -> None:
+    """같은 프로세스의 워커를 즉시 깨움(다른 프로세스의 워커는 폴링 주기로 처리)."""
+    if _wake is not None:
+        _wake.set()
+
+
+async def _recover_stale(cur: Any) -> None:
+    await cur.execute(
+        """
+        UPDATE ss_instagram_webhook_event
+        SET status='pending', claim_token=NULL
+        WHERE status='processing' AND claimed_at < NOW() - INTERVAL %s SECOND
+        """,
+        (WEBHOOK_CLAIM_TIMEOUT,),
+    )
+    _stats["recovered"] += cur.rowcount or 0
+
+
+async def _purge_done(cur: Any) -> None:
+    global _last_purge
+    now = time.monotonic()
+    if _last_purge and now - _last_purge < _PURGE_INTERVAL:
+        return
+    _last_purge = now
+    await cur.execute(
+        """
+        DELETE FROM ss_instagram_webhook_event
+        WHERE status='done' AND processed_at < NOW() - INTERVAL %s DAY
+        LIMIT 10000
+        """,
+        (WEBHOOK_RETENTION_DAYS,),
+    )
+
+
+async def _apply_events(cur: Any, events: List[Tuple[Any, ...]]) -> Dict[str, int]:
+    """선점한 이벤트를 정규화해 댓글 저장소에 upsert(호출자의 트랜잭션 안). 커밋 후 더할 카운터를 반환."""
+    counts = {"ignored": 0, "unmatched": 0, "comments": 0}
+    normalized: List[Dict[str, Any]] = []
+    for _eid, entry_id, field, payload, event_time, _attempts in events:
+        try:
+            value = json.loads(payload) if payload else {}
+        except ValueError:
+            value = None
+        c = normalize_change(entry_id, field, value, event_time)
+        if c is None:
+            counts["ignored"] += 1
+        else:
+            normalized.append(c)
+    personas = await _personas_by_ig(cur, (c["ig_user_id"] for c in normalized))
+    params = []
+    activity = []
+    for c in normalized:
+        targets = personas.get(c["ig_user_id"]) or []
+        if not targets:
+            counts["unmatched"] += 1
+        params.extend(_upsert_params(uid, num, c, "webhook") for uid, num in targets)
+        if c["kind"] == "comment":
+            # 멘션의 media_id는 남의 미디어이므로 제외
+            activity.extend((uid, num, c.get("media_id"), c["ig_user_id"], c.get("commented_at")) for uid, num in targets)
+    if params:
+        await cur.executemany(_UPSERT_SQL, params)
+    await like_totals.mark_activity(cur, activity)
+    counts["comments"] = len(params)
+    return counts
+
+
+def _count(counts: Dict[str, int]) -> None:
+    for key, n in counts.items():
+        _stats[key] += n
+
+
+async def _rollback(conn: Any) -> None:
+    try:
+        await conn.rollback()
+    except Exception:
+        pass
+
+
+async def _process_each(conn: Any, cur: Any, token: str, events: List[Tuple[Any, ...]]) -> Tuple[int, Optional[Exception]]:
+    """묶음 처리가 실패했을 때 이벤트를 하나씩 다시 처리. 실패한 행에만 시도 횟수/오류를 남깁니다.
+
+    반환: (처리한 이벤트 수, 마지막 오류)
+    """
+    done = 0
+    error: Optional[Exception] = None
+    for ev in events:
+        try:
+            await conn.begin()
+            counts = await _apply_events(cur, [ev])
+            await cur.execute(
+                """
+                UPDATE ss_instagram_webhook_event
+                SET status='done', processed_at=NOW(), claim_token=NULL, last_error=NULL
+                WHERE event_id=%s AND claim_token=%s
+                """,
+                (ev[0], token),
+            )
+            await conn.commit()
+        except Exception as e:
+            await _rollback(conn)
+            error = e
+            await cur.execute(
+                """
+                UPDATE ss_instagram_webhook_event
+                SET status=IF(attempts >= %s, 'failed', 'pending'), claim_token=NULL, last_error=%s
+                WHERE event_id=%s AND claim_token=%s
+                """,
+                (WEBHOOK_MAX_ATTEMPTS, str(e)[:500], ev[0], token),
+            )
+            await conn.commit()
+            _stats["retried" if ev[5] < WEBHOOK_MAX_ATTEMPTS else "failed"] += 1
+            _stats["last_error"] = str(e)[:200]
+            log.warning("webhook event %s failed: %s", ev[0], e)
+            continue
+        _count(counts)
+        done += 1
+    return done, error
+
+
+async def process_batch(limit: Optional[int] = None) -> int:
+    """대기 이벤트를 최대 limit개 처리하고 선점한 행 수를 반환(0이면 큐가 비어 있음).
+
+    묶음 트랜잭션이 실패하면 이벤트별 트랜잭션으로 다시 처리해, 문제 행만 시도 횟수를 소모하게 합니다.
+    """
+    limit = limit or WEBHOOK_BATCH
+    token = secrets.token_hex(8)
+    pool = await get_mysql_pool()
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            await _recover_stale(cur)
+            await cur.execute(
+                """
+                UPDATE ss_instagram_webhook_event
+                SET status='processing', claim_token=%s, claimed_at=NOW(), attempts=attempts+1
+                WHERE status='pending'
+                ORDER BY event_id
+                LIMIT %s
+                """,
+                (token, int(limit)),
+            )
+            await conn.commit()
+            await cur.execute(
+                """
+                SELECT event_id, entry_id, field, payload, event_time, attempts
+                FROM ss_instagram_webhook_event
+                WHERE claim_token=%s
+                ORDER BY event_id
+                """,
+                (token,),
+            )
+            events = await cur.fetchall() or []
+            if not events:
+                await _purge_done(cur)
+                await conn.commit()
+                return 0
+            try:
+                # 풀은 autocommit — upsert와 done 표시를 한 트랜잭션으로 묶음
+                await conn.begin()
+                counts = await _apply_events(cur, events)
+                await cur.execute(
+                    """
+                    UPDATE ss_instagram_webhook_event
+                    SET status='done', processed_at=NOW(), claim_token=NULL, last_error=NULL
+                    WHERE claim_token=%s
+                    """,
+                    (token,),
+                )
+                await conn.commit()
+                _count(counts)
+            except Exception as e:
+                await _rollback(conn)
+                log.warning("webhook batch failed, retrying %d events one by one: %s", len(events), e)
+                done, error = await _process_each(conn, cur, token, events)
+                if not done and error is not None:
+                    raise error
+    _stats["batches"] += 1
+    _stats["events"] += len(events)
+    return len(events)
+
+
+async def _worker_loop() -> None:
+    assert _wake is not None
+    while True:
+        try:
+            n = await process_batch()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log.warning("webhook worker batch failed: %s", e)
+            n = 0
+        if n >= WEBHOOK_BATCH:
+            # 밀린 이벤트가 더 있을 수 있음 → 바로 다음 배치
+            continue
+        try:
+            await asyncio.wait_for(_wake.wait(), timeout=WEBHOOK_POLL_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        _wake.clear()
+
+
+def start_worker() -> None:
+    """앱 startup에서 1회 호출(이미 돌고 있으면 무시)."""
+    global _wake, _task
+    if _task is not None and not _task.done():
+        return
+    _wake = asyncio.Event()
+    _task = asyncio.create_task(_worker_loop())
+
+
+async def stop_worker() -> None:
+    global _task
+    task, _task = _task, None
+    if task is None:
+        return
+    task.cancel()
+    try:
+        await task
+    except (asyncio.CancelledError, Exception):
+        pass
+
+
+def webhook_stats() -> Dict[str, Any]:
+    return {**_stats, "running": _task is not None and not _task.done(), "store_enabled": COMMENT_STORE_ENABLED}
+
+
+# ----- 댓글 저장소 조회/채움 -----
+
+async def fresh_personas(user_id: int, persona_nums: List[int]) -> Dict[int, str]:
+    """COMMENT_STORE_TTL 안에 동기화된(저장소만으로 개요를 만들 수 있는) 페르소나 → 동기화 당시 ig_user_id.
+
+    호출자는 현재 매핑과 ig_user_id가 다르면(재연동) 미스로 취급합니다.
+    """
+    if not persona_nums:
+        return {}
+    since = datetime.utcnow() - timedelta(seconds=COMMENT_STORE_TTL)
+    ph = ",".join(["%s"] * len(persona_nums))
+    pool = await get_mysql_pool()
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                f"""
+                SELECT user_persona_num, ig_user_id FROM ss_instagram_comment_sync
+                WHERE user_id=%s AND user_persona_num IN ({ph}) AND synced_at >= %s
+                """,
+                [int(user_id), *persona_nums, since],
+            )
+            return {int(r[0]): str(r[1]) for r in (await cur.fetchall() or [])}
+
+
+def group_overview(
+    rows: List[Dict[str, Any]],
+    media_limit: int,
+    comments_limit: int,
+    media_rows: Iterable[Dict[str, Any]] = (),
+) -> Dict[int, List[Dict[str, Any]]]:
+    """저장소 행(페르소나, 작성 시각 내림차순) → 페르소나별 개요 items(미디어는 게시 시각 내림차순).
+
+    media_rows(ss_instagram_comment_media)의 미디어는 댓글이 없어도 빈 comments로 포함합니다.
+    """
+    grouped: Dict[int, Dict[str, Dict[str, Any]]] = {}
+    for r in [*media_rows, *rows]:
+        media = grouped.setdefault(int(r["user_persona_num"]), {})
+        mid = r.get("media_id")
+        if not mid:
+            continue
+        item = media.get(mid)
+        if item is None:
+            item = media[mid] = {
+                "media_id": mid,
+                "caption": r.get("caption"),
+                "permalink": r.get("permalink"),
+                "media_type": r.get("media_type"),
+                "media_url": r.get("media_url"),
+                "thumbnail_url": r.get("thumbnail_url"),
+                "timestamp": _iso(r.get("posted_at")),
+                "comments": [],
+                "_order": r.get("posted_at") or r.get("commented_at"),
+            }
+        if r.get("comment_id") and len(item["comments"]) < comments_limit:
+            item["comments"].append({
+                "id": r.get("comment_id"),
+                "text": r.get("text"),
+                "username": r.get("username"),
+                "timestamp": _iso(r.get("commented_at")),
+                "like_count": r.get("like_count"),
+            })
+    out: Dict[int, List[Dict[str, Any]]] = {}
+    for num, media in grouped.items():
+        items = sorted(media.values(), key=lambda m: m["_order"] or datetime.min, reverse=True)[:media_limit]
+        for m in items:
+            m.pop("_order", None)
+        out[num] = items
+    return out
+
+
+async def load_overview(user_id: int, persona_nums: List[int], media_limit: int, comments_limit: int) -> Dict[int, List[Dict[str, Any]]]:
+    """페르소나들의 최근 미디어/댓글을 인덱스 질의 두 번으로 조회.
+
+    미디어는 save_graph_items가 채운 ss_instagram_comment_media에서 페르소나별 최신 media_limit개를 읽어
+    댓글이 없어도 포함합니다. 그 밖의 미디어(웹훅으로만 본 새 글)는 sync_posts의 ss_instagram_post 메타데이터를
+    씁니다(둘 다 없으면 None 필드).
+    """
+    if not persona_nums:
+        return {}
+    since = datetime.utcnow() - timedelta(days=COMMENT_STORE_DAYS)
+    ph = ",".join(["%s"] * len(persona_nums))
+    cap = min(_OVERVIEW_MAX_ROWS, max(1, len(persona_nums) * media_limit * comments_limit * 4))
+    pool = await get_mysql_pool()
+    async with pool.acquire() as conn:
+        async with conn.cursor(aiomysql.DictCursor) as cur:
+            media_sql = " UNION ALL ".join(
+                [
+                    """
+                    (SELECT user_persona_num, media_id, caption, permalink, media_type, media_url, thumbnail_url, posted_at
+                     FROM ss_instagram_comment_media
+                     WHERE user_id=%s AND user_persona_num=%s
+                     ORDER BY posted_at DESC
+                     LIMIT %s)
+                    """
+                ] * len(persona_nums)
+            )
+            await cur.execute(
+                media_sql,
+                [v for num in persona_nums for v in (int(user_id), num, int(media_limit))],
+            )
+            media_rows = await cur.fetchall() or []
+            await cur.execute(
+                f"""
+                SELECT c.user_persona_num, c.media_id, c.comment_id, c.text, c.username,
+                       c.like_count, c.commented_at,
+                       COALESCE(m.caption, p.caption) AS caption,
+                       COALESCE(m.permalink, p.permalink) AS permalink,
+                       COALESCE(m.media_type, p.media_type) AS media_type,
+                       COALESCE(m.media_url, p.media_url) AS media_url,
+                       COALESCE(m.thumbnail_url, p.thumbnail_url) AS thumbnail_url,
+                       COALESCE(m.posted_at, p.posted_at) AS posted_at
+                FROM ss_instagram_comment c
+                LEFT JOIN ss_instagram_comment_media m
+                  ON m.user_id = c.user_id AND m.user_persona_num = c.user_persona_num AND m.media_id = c.media_id
+                LEFT JOIN ss_instagram_post p
+                  ON p.media_id = c.media_id AND p.user_id = c.user_id AND p.user_persona_num = c.user_persona_num
+                WHERE c.user_id=%s AND c.user_persona_num IN ({ph}) AND c.kind='comment'
+                  AND c.commented_at >= %s AND c.parent_id IS NULL
+                ORDER BY c.user_persona_num, c.commented_at DESC
+                LIMIT %s
+                """,
+                [int(user_id), *persona_nums, since, cap],
+            )
+            rows = await cur.fetchall() or []
+    _stats["store_reads"] += 1
+    return group_overview(list(rows), media_limit, comments_limit, list(media_rows))
+
+
+async def save_graph_items(user_id: int, persona_num: int, ig_user_id: str, items: List[Dict[str, Any]]) -> None:
+    """Graph로 수집한 개요 items(미디어 메타데이터 + 댓글)를 저장소에 upsert하고 동기화 시각을 기록(한 트랜잭션).
+
+    수집한 미디어에 달린 최상위 댓글 중 이번 응답에 없는 것(인스타그램에서 삭제됨)은 같은 트랜잭션에서 지웁니다.
+    """
+    media_params = [
+        (
+            int(user_id), int(persona_num), str(m["media_id"]), str(ig_user_id),
+            m.get("media_type"), m.get("media_url"), m.get("thumbnail_url"), m.get("permalink"),
+            m.get("caption"), _utc(m.get("timestamp")),
+        )
+        for m in items
+        if m.get("media_id")
+    ]
+    params = [
+        _upsert_params(user_id, persona_num, {
+            "comment_id": str(c["id"]),
+            "ig_user_id": str(ig_user_id),
+            "media_id": m.get("media_id"),
+            "kind": "comment",
+            "username": c.get("username"),
+            "text": c.get("text"),
+            "like_count": c.get("like_count"),
+            "commented_at": _utc(c.get("timestamp")),
+        }, "graph")
+        for m in items
+        for c in (m.get("comments") or [])
+        if c.get("id")
+    ]
+    pool = await get_mysql_pool()
+    async with pool.acquire() as conn:
+        await conn.begin()
+        try:
+            async with conn.cursor() as cur:
+                # 미디어 목록은 이번 수집 결과로 교체(삭제된 글/재연동 전 계정의 글이 남지 않도록)
+                await cur.execute(
+                    "DELETE FROM ss_instagram_comment_media WHERE user_id=%s AND user_persona_num=%s",
+                    (int(user_id), int(persona_num)),
+                )
+                if media_params:
+                    await cur.executemany(_MEDIA_UPSERT_SQL, media_params)
+                if params:
+                    await cur.executemany(_UPSERT_SQL, params)
+                media_ids = [p[2] for p in media_params]
+                if media_ids:
+                    comment_ids = [p[2] for p in params]
+                    keep = f" AND comment_id NOT IN ({', '.join(['%s'] * len(comment_ids))})" if comment_ids else ""
+                    await cur.execute(
+                        f"""
+                        DELETE FROM ss_instagram_comment
+                        WHERE user_id=%s AND user_persona_num=%s AND kind='comment' AND parent_id IS NULL
+                          AND source IN ('graph', 'webhook')
+                          AND media_id IN ({', '.join(['%s'] * len(media_ids))}){keep}
+                        """,
+                        (int(user_id), int(persona_num), *media_ids, *comment_ids),
+                    )
+                await cur.execute(
+                    """
+                    INSERT INTO ss_instagram_comment_sync (user_id, user_persona_num, ig_user_id, synced_at)
+                    VALUES (%s, %s, %s, UTC_TIMESTAMP())
+                    ON DUPLICATE KEY UPDATE ig_user_id=VALUES(ig_user_id), synced_at=VALUES(synced_at)
+                    """,
+                    (int(user_id), int(persona_num), str(ig_user_id)),
+                )
+            await conn.commit()
+        except Exception:
+            try:
+                await conn.rollback()
+            except Exception:
+                pass
+            raise
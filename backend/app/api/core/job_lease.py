@@ -0,0 +1,279 @@
+"""
+[파트 개요] 백그라운드 작업 단일 실행 보장(리스 테이블 + 하트비트)
+- 내부 통신: ss_job_lease(작업별 보유자/만료 시각/펜싱 토큰)
+- 외부 통신: 없음
+
+여러 uvicorn 워커/레플리카가 같은 스케줄 작업을 시작해도 리스를 잡은 한 프로세스만 실행합니다.
+- acquire: 행이 없거나, 만료됐거나, 이미 내 것이면 가져감(SELECT ... FOR UPDATE 후 판단 → 한 트랜잭션).
+  주인이 바뀔 때마다 token을 1 올립니다(펜싱 토큰).
+- 실행 중에는 TTL/3마다 하트비트로 만료를 연장합니다(owner와 token이 그대로일 때만).
+  연장에 실패하면(다른 프로세스가 가져감) 작업 태스크를 취소하고 LeaseLost를 올립니다.
+  연장 중 DB 오류가 이어져 마지막 성공 연장 + TTL 전에 갱신하지 못할 것 같으면 같은 방식으로 포기합니다.
+- 보유 프로세스가 죽으면 하트비트가 끊기고, TTL이 지나면 다른 프로세스가 가져가 체크포인트부터 이어갑니다.
+- 만료 판단은 DB 시각(UTC_TIMESTAMP) 기준이라 서버 간 시계 차이와 무관합니다.
+
+MySQL GET_LOCK은 커넥션에 묶여 풀 재활용/끊김 시 조용히 풀리고 보유자를 조회하기 어려워 리스 테이블을 씁니다.
+JOB_LEASE_BACKEND=local 이면 프로세스 내 리스(단일 프로세스 개발용, DB 불필요)를 씁니다.
+
+설정(환경변수)
+- JOB_LEASE_TTL(기본 60초), JOB_LEASE_BACKEND(mysql|local, 기본 mysql)
+"""
+import asyncio
+import logging
+import os
+import secrets
+import socket
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from app.api.core.mysql import get_mysql_pool
+from app.api.core.schema import register_migration
+
+log = logging.getLogger("job_lease")
+
+
+def _float_env(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name) or default)
+    except ValueError:
+        return default
+
+
+JOB_LEASE_TTL = max(3.0, _float_env("JOB_LEASE_TTL", 60.0))
+JOB_LEASE_BACKEND = (os.getenv("JOB_LEASE_BACKEND") or "mysql").strip().lower()
+
+# 이 프로세스의 보유자 ID(호스트:pid:난수) — 재시작하면 새 ID이므로 이전 리스를 이어받지 않음
+OWNER_ID = f"{socket.gethostname()}:{os.getpid()}:{secrets.token_hex(4)}"
+
+
+class LeaseLost(Exception):
+    """실행 중 리스를 잃음(하트비트 실패/다른 보유자)."""
+
+
+@dataclass
+class Lease:
+    job: str
+    owner: str
+    token: int
+    ttl: float
+
+
+def may_take(row: Optional[Tuple[str, datetime]], owner: str, now: datetime) -> bool:
+    """현재 행(owner, expires_at)을 owner가 가져갈 수 있는지: 없음/내 것/만료."""
+    return row is None or row[0] == owner or row[1] is None or row[1] <= now
+
+
+@register_migration("ss_job_lease.v1")
+async def _ensure_lease_table():
+    pool = await get_mysql_pool()
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS ss_job_lease (
+                  job VARCHAR(64) NOT NULL PRIMARY KEY,
+                  owner VARCHAR(128) NOT NULL,
+                  token BIGINT NOT NULL DEFAULT 1,
+                  expires_at DATETIME(3) NOT NULL,
+                  acquired_at DATETIME(3) NOT NULL,
+                  heartbeat_at DATETIME(3) NOT NULL
+                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+                """
+            )
+            try:
+                await conn.commit()
+            except Exception:
+                pass
+
+
+class MySQLLeaseStore:
+    async def acquire(self, job: str, owner: str, ttl: float) -> Optional[Lease]:
+        pool = await get_mysql_pool()
+        async with pool.acquire() as conn:
+            try:
+                async with conn.cursor() as cur:
+                    await conn.begin()
+                    await cur.execute(
+                        "SELECT owner, expires_at, token, UTC_TIMESTAMP(3) FROM ss_job_lease WHERE job=%s FOR UPDATE",
+                        (job,),
+                    )
+                    row = await cur.fetchone()
+                    if row is None:
+                        # 동시에 두 프로세스가 INSERT하면 한쪽만 성공(rowcount 0 → 못 잡음)
+                        await cur.execute(
+                            """
+                            INSERT IGNORE INTO ss_job_lease (job, owner, token, expires_at, acquired_at, heartbeat_at)
+                            VALUES (%s, %s, 1, UTC_TIMESTAMP(3) + INTERVAL %s MICROSECOND, UTC_TIMESTAMP(3), UTC_TIMESTAMP(3))
+                            """,
+                            (job, owner, int(ttl * 1_000_000)),
+                        )
+                        lease = Lease(job, owner, 1, ttl) if cur.rowcount else None
+                    elif may_take((row[0], row[1]), owner, row[3]):
+                        token = int(row[2]) if row[0] == owner else int(row[2]) + 1
+                        await cur.execute(
+                            """
+                            UPDATE ss_job_lease
+                            SET owner=%s, token=%s,
+                                expires_at=UTC_TIMESTAMP(3) + INTERVAL %s MICROSECOND,
+                                acquired_at=IF(owner=%s, acquired_at, UTC_TIMESTAMP(3)),
+                                heartbeat_at=UTC_TIMESTAMP(3)
+                            WHERE job=%s
+                            """,
+                            (owner, token, int(ttl * 1_000_000), row[0], job),
+                        )
+                        lease = Lease(job, owner, token, ttl)
+                    else:
+                        lease = None
+                await conn.commit()
+            except Exception:
+                try:
+                    await conn.rollback()
+                except Exception:
+                    pass
+                raise
+        return lease
+
+    async def renew(self, lease: Lease) -> bool:
+        pool = await get_mysql_pool()
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(
+                    """
+                    UPDATE ss_job_lease
+                    SET expires_at=UTC_TIMESTAMP(3) + INTERVAL %s MICROSECOND, heartbeat_at=UTC_TIMESTAMP(3)
+                    WHERE job=%s AND owner=%s AND token=%s
+                    """,
+                    (int(lease.ttl * 1_000_000), lease.job, lease.owner, lease.token),
+                )
+                ok = bool(cur.rowcount)
+            await conn.commit()
+        return ok
+
+    async def release(self, lease: Lease) -> None:
+        pool = await get_mysql_pool()
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                # 행은 남겨 token이 계속 증가하도록 만료만 당김
+                await cur.execute(
+                    "UPDATE ss_job_lease SET expires_at=UTC_TIMESTAMP(3) WHERE job=%s AND owner=%s AND token=%s",
+                    (lease.job, lease.owner, lease.token),
+                )
+            await conn.commit()
+
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+class LocalLeaseStore:
+    """프로세스 내 리스(단일 프로세스용). clock은 테스트에서 시간을 돌리기 위한 주입 지점."""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        self.clock = clock
+        self.rows: Dict[str, Dict[str, Any]] = {}
+
+    def _now(self) -> datetime:
+        return _EPOCH + timedelta(seconds=self.clock())
+
+    async def acquire(self, job: str, owner: str, ttl: float) -> Optional[Lease]:
+        now = self._now()
+        row = self.rows.get(job)
+        if not may_take((row["owner"], row["expires_at"]) if row else None, owner, now):
+            return None
+        token = 1 if row is None else (row["token"] if row["owner"] == owner else row["token"] + 1)
+        self.rows[job] = {"owner": owner, "token": token, "expires_at": now + timedelta(seconds=ttl)}
+        return Lease(job, owner, token, ttl)
+
+    async def renew(self, lease: Lease) -> bool:
+        row = self.rows.get(lease.job)
+        if not row or row["owner"] != lease.owner or row["token"] != lease.token:
+            return False
+        row["expires_at"] = self._now() + timedelta(seconds=lease.ttl)
+        return True
+
+    async def release(self, lease: Lease) -> None:
+        row = self.rows.get(lease.job)
+        if row and row["owner"] == lease.owner and row["token"] == lease.token:
+            row["expires_at"] = self._now()
+
+
+_store: Any = None
+
+
+def get_lease_store() -> Any:
+    global _store
+    if _store is None:
+        _store = LocalLeaseStore() if JOB_LEASE_BACKEND == "local" else MySQLLeaseStore()
+    return _store
+
+
+_stats: Dict[str, Any] = {"owner": OWNER_ID, "acquired": 0, "skipped": 0, "lost": 0, "held": {}}
+
+
+async def _heartbeat(store: Any, lease: Lease, work: "asyncio.Task[Any]") -> None:
+    interval = lease.ttl / 3
+    last_ok = time.monotonic()
+    while not work.done():
+        await asyncio.sleep(interval)
+        if work.done():
+            return
+        try:
+            ok = await store.renew(lease)
+        except Exception as e:
+            # 일시적 DB 오류: 만료 전까지는 계속 시도하고, 다음 시도 전에 만료되면 포기
+            log.warning("lease heartbeat failed for %s: %s", lease.job, e)
+            if time.monotonic() + interval < last_ok + lease.ttl:
+                continue
+            log.warning("lease for %s expires without renewal (token=%s), cancelling", lease.job, lease.token)
+            work.cancel()
+            return
+        if not ok:
+            log.warning("lease lost for %s (token=%s), cancelling", lease.job, lease.token)
+            work.cancel()
+            return
+        last_ok = time.monotonic()
+
+
+async def run_singleton(
+    job: str,
+    fn: Callable[[], Awaitable[Any]],
+    ttl: Optional[float] = None,
+    store: Any = None,
+    owner: Optional[str] = None,
+) -> Tuple[bool, Any]:
+    """리스를 잡으면 fn()을 실행하고 (True, 결과). 다른 보유자가 있으면 실행하지 않고 (False, None).
+
+    실행 중 리스를 잃으면 fn을 취소하고 LeaseLost를 올립니다.
+    """
+    store = store if store is not None else get_lease_store()
+    lease = await store.acquire(job, owner or OWNER_ID, float(ttl or JOB_LEASE_TTL))
+    if lease is None:
+        _stats["skipped"] += 1
+        return False, None
+    _stats["acquired"] += 1
+    _stats["held"][job] = lease.token
+    work = asyncio.ensure_future(fn())
+    beat = asyncio.create_task(_heartbeat(store, lease, work))
+    try:
+        try:
+            result = await work
+        except asyncio.CancelledError:
+            if beat.done() and not beat.cancelled():
+                _stats["lost"] += 1
+                raise LeaseLost(job)
+            raise
+        return True, result
+    finally:
+        if not work.done():
+            work.cancel()
+        beat.cancel()
+        _stats["held"].pop(job, None)
+        try:
+            await store.release(lease)
+        except Exception as e:
+            log.warning("lease release failed for %s: %s", job, e)
+
+
+def lease_stats() -> Dict[str, Any]:
+    return {**_stats, "held": dict(_stats["held"]), "ttl": JOB_LEASE_TTL, "backend": JOB_LEASE_BACKEND}
@@ -0,0 +1,323 @@
+"""
+[파트 개요] 미디어별 좋아요 수 저장소와 증분 total_likes 집계(일일 스냅샷용)
+- 내부 통신: ss_instagram_media_likes(미디어별 카운터/댓글 활동 시각),
+  ss_instagram_media_likes_sync(페르소나별 전체 재집계 시각)
+- 외부 통신: Graph /{ig_user_id}/media(최신 구간), /?ids=...(댓글 활동이 있던 미디어만 묶어서 조회)
+
+스냅샷마다 /media를 200개까지 훑어 like_count를 더하던 방식을 대체합니다.
+- 카운터는 posts_sync.apply_scan(게시물 동기화)과 스냅샷이 미디어별로 upsert합니다.
+- 웹훅 워커는 댓글이 달린 미디어의 active_at을 올립니다(mark_activity).
+- 스냅샷(refresh_totals)은 다음만 Graph에서 다시 읽습니다.
+  - 마지막으로 알던 게시물 이후의 새 글과 최근 IG_LIKES_ACTIVE_DAYS 이내 게시물(/media 1~2페이지)
+  - 마지막 갱신 뒤 댓글 활동이 있었거나 아직 한 번도 읽지 않은 미디어(ids 묶음 조회)
+- total_likes는 최신 IG_LIKES_TOTAL_MEDIA개 미디어의 like_count 합입니다(기존과 같은 정의).
+  (user_id, user_persona_num, posted_at) 인덱스를 역순으로 읽는 SQL 집계 한 번으로 구합니다.
+- 오래된 글의 좋아요 변화는 IG_LIKES_FULL_DAYS마다 한 번 하는 전체 재집계로 맞춥니다.
+  IG 계정이 바뀌었거나 상태가 없을 때도 전체 재집계를 합니다.
+
+설정(환경변수)
+- IG_LIKES_TOTAL_MEDIA(기본 200), IG_LIKES_ACTIVE_DAYS(기본 7일), IG_LIKES_FULL_DAYS(기본 7일)
+"""
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import httpx
+
+from app.api.core import posts_sync
+from app.api.core.graph import GraphClient
+from app.api.core.mysql import get_mysql_pool
+from app.api.core.schema import register_migration
+
+LIKES_TOTAL_MEDIA = int(os.getenv("IG_LIKES_TOTAL_MEDIA") or 200)
+LIKES_ACTIVE_DAYS = int(os.getenv("IG_LIKES_ACTIVE_DAYS") or 7)
+LIKES_FULL_DAYS = int(os.getenv("IG_LIKES_FULL_DAYS") or 7)
+LIKE_FIELDS = "id,timestamp,like_count,comments_count"
+_IDS_PER_CALL = 50
+
+
+@register_migration("ss_instagram_media_likes.v1")
+async def _ensure_like_tables():
+    pool = await get_mysql_pool()
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS ss_instagram_media_likes (
+                  user_id INT NOT NULL,
+                  user_persona_num INT NOT NULL,
+                  media_id VARCHAR(64) NOT NULL,
+                  ig_user_id VARCHAR(64) NOT NULL,
+                  posted_at DATETIME NULL,
+                  like_count INT NOT NULL DEFAULT 0,
+                  comments_count INT NOT NULL DEFAULT 0,
+                  active_at DATETIME NULL,
+                  refreshed_at DATETIME NULL,
+                  PRIMARY KEY (user_id, user_persona_num, media_id),
+                  KEY idx_persona_posted (user_id, user_persona_num, posted_at)
+                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+                """
+            )
+            await cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS ss_instagram_media_likes_sync (
+                  user_id INT NOT NULL,
+                  user_persona_num INT NOT NULL,
+                  ig_user_id VARCHAR(64) NOT NULL,
+                  full_at DATETIME NOT NULL,
+                  PRIMARY KEY (user_id, user_persona_num)
+                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+                """
+            )
+            try:
+                await conn.commit()
+            except Exception:
+                pass
+
+
+# Graph에서 방금 읽은 값이 기준(좋아요 취소로 줄어들 수 있으므로 GREATEST를 쓰지 않음)
+UPSERT_SQL = """
+INSERT INTO ss_instagram_media_likes (
+  user_id, user_persona_num, media_id, ig_user_id, posted_at, like_count, comments_count, refreshed_at
+) VALUES (%s, %s, %s, %s, %s, %s, %s, UTC_TIMESTAMP())
+ON DUPLICATE KEY UPDATE
+  ig_user_id=VALUES(ig_user_id),
+  posted_at=COALESCE(VALUES(posted_at), posted_at),
+  like_count=VALUES(like_count),
+  comments_count=VALUES(comments_count),
+  refreshed_at=VALUES(refreshed_at)
+"""
+
+# 웹훅 댓글 → 활동 표시. 처음 보는 미디어는 refreshed_at이 NULL인 행으로 만들어 다음 스냅샷에서 읽음
+ACTIVITY_SQL = """
+INSERT INTO ss_instagram_media_likes (user_id, user_persona_num, media_id, ig_user_id, active_at)
+VALUES (%s, %s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE
+  active_at=GREATEST(COALESCE(active_at, VALUES(active_at)), VALUES(active_at))
+"""
+
+DELETE_SQL = "DELETE FROM ss_instagram_media_likes WHERE user_id=%s AND user_persona_num=%s AND media_id=%s"
+
+_TOTAL_SQL = """
+SELECT COALESCE(SUM(like_count), 0) FROM (
+  SELECT like_count FROM ss_instagram_media_likes
+  WHERE user_id=%s AND user_persona_num=%s
+  ORDER BY posted_at DESC
+  LIMIT %s
+) recent
+"""
+
+
+def like_params(user_id: int, persona_num: int, ig_user_id: str, m: Dict[str, Any]) -> Tuple[Any, ...]:
+    return (
+        int(user_id), int(persona_num), str(m["id"]), str(ig_user_id),
+        posts_sync.parse_timestamp(m.get("timestamp")),
+        posts_sync._count(m.get("like_count")), posts_sync._count(m.get("comments_count")),
+    )
+
+
+async def mark_activity(cur: Any, rows: Iterable[Tuple[int, int, str, str, Optional[datetime]]]) -> None:
+    """(user_id, persona_num, media_id, ig_user_id, 활동 시각) 목록을 호출자의 트랜잭션 안에서 기록."""
+    params = [r for r in rows if r[2] and r[4] is not None]
+    if params:
+        await cur.executemany(ACTIVITY_SQL, params)
+
+
+async def load_state(user_id: int, persona_num: int) -> Dict[str, Any]:
+    """{"ig_user_id", "full_at", "newest": (posted_at, media_id)|None} — 재집계 이력이 없으면 앞의 둘은 None."""
+    pool = await get_mysql_pool()
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                "SELECT ig_user_id, full_at FROM ss_instagram_media_likes_sync WHERE user_id=%s AND user_persona_num=%s",
+                (int(user_id), int(persona_num)),
+            )
+            row = await cur.fetchone()
+            await cur.execute(
+                """
+                SELECT posted_at, media_id FROM ss_instagram_media_likes
+                WHERE user_id=%s AND user_persona_num=%s AND posted_at IS NOT NULL
+                ORDER BY posted_at DESC
+                LIMIT 1
+                """,
+                (int(user_id), int(persona_num)),
+            )
+            newest = await cur.fetchone()
+    return {
+        "ig_user_id": str(row[0]) if row else None,
+        "full_at": row[1] if row else None,
+        "newest": (newest[0], str(newest[1])) if newest else None,
+    }
+
+
+async def active_media(user_id: int, persona_num: int, limit: int = LIKES_TOTAL_MEDIA) -> List[str]:
+    """마지막 갱신 이후 댓글 활동이 있었거나 아직 카운터를 읽지 않은 미디어 ID."""
+    pool = await get_mysql_pool()
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                """
+                SELECT media_id FROM ss_instagram_media_likes
+                WHERE user_id=%s AND user_persona_num=%s
+                  AND (refreshed_at IS NULL OR active_at > refreshed_at)
+                ORDER BY active_at DESC
+                LIMIT %s
+                """,
+                (int(user_id), int(persona_num), int(limit)),
+            )
+            rows = await cur.fetchall() or []
+    return [str(r[0]) for r in rows]
+
+
+async def stored_total(user_id: int, persona_num: int, total_media: int = LIKES_TOTAL_MEDIA) -> int:
+    pool = await get_mysql_pool()
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(_TOTAL_SQL, (int(user_id), int(persona_num), int(total_media)))
+            row = await cur.fetchone()
+    return int(row[0] or 0) if row else 0
+
+
+def _missing_object(r: httpx.Response) -> bool:
+    """삭제됐거나 접근할 수 없는 미디어(Graph error code 100)."""
+    if r.status_code not in (400, 404):
+        return False
+    try:
+        err = ((r.json() or {}).get("error") or {})
+    except ValueError:
+        return False
+    return str(err.get("code")) == "100"
+
+
+async def fetch_counters(client: GraphClient, token: str, media_ids: List[str]) -> Dict[str, Any]:
+    """미디어 카운터를 ids 묶음(최대 50개)으로 조회. 반환: {"items", "gone", "calls"}.
+
+    묶음 안에 없는 ID가 하나라도 있으면 Graph가 묶음 전체를 실패시키므로 그 묶음만 개별 조회로 가려냅니다.
+    그 밖의 오류(토큰 만료 등)는 posts_sync.SyncError로 올립니다.
+    """
+    items: List[Dict[str, Any]] = []
+    gone: List[str] = []
+    calls = 0
+    for i in range(0, len(media_ids), _IDS_PER_CALL):
+        chunk = media_ids[i:i + _IDS_PER_CALL]
+        r = await client.get("/", params={"ids": ",".join(chunk), "fields": LIKE_FIELDS, "access_token": token})
+        calls += 1
+        if r.status_code == 200:
+            body = r.json() or {}
+            for mid in chunk:
+                m = body.get(mid)
+                if isinstance(m, dict):
+                    items.append({**m, "id": mid})
+                else:
+                    gone.append(mid)
+            continue
+        if not _missing_object(r):
+            raise posts_sync.SyncError(r)
+        for mid in chunk:
+            one = await client.get(f"/{mid}", params={"fields": LIKE_FIELDS, "access_token": token})
+            calls += 1
+            if one.status_code == 200:
+                items.append({**(one.json() or {}), "id": mid})
+            elif _missing_object(one):
+                gone.append(mid)
+            else:
+                raise posts_sync.SyncError(one)
+    return {"items": items, "gone": gone, "calls": calls}
+
+
+async def apply_counters(
+    user_id: int,
+    persona_num: int,
+    ig_user_id: str,
+    items: List[Dict[str, Any]],
+    gone: List[str],
+    full: bool,
+    total_media: int = LIKES_TOTAL_MEDIA,
+) -> Dict[str, int]:
+    """카운터 upsert + 정리 + (전체 재집계면) 상태 갱신을 한 트랜잭션으로 반영. 반환: {"total_likes", "pruned"}.
+
+    full=True면 이번에 읽은 최신 total_media개에 없는 로컬 행(삭제된 글, 집계 범위 밖, 이전 IG 계정)을 모두 지웁니다.
+    """
+    params = [like_params(user_id, persona_num, ig_user_id, m) for m in items if m.get("id")]
+    fetched = {p[2] for p in params}
+    pool = await get_mysql_pool()
+    async with pool.acquire() as conn:
+        try:
+            # 풀은 autocommit — upsert/정리/집계를 명시적 트랜잭션으로 묶음
+            await conn.begin()
+            async with conn.cursor() as cur:
+                if params:
+                    await cur.executemany(UPSERT_SQL, params)
+                drop = list(gone)
+                if full:
+                    await cur.execute(
+                        "SELECT media_id FROM ss_instagram_media_likes WHERE user_id=%s AND user_persona_num=%s",
+                        (int(user_id), int(persona_num)),
+                    )
+                    drop = [str(r[0]) for r in (await cur.fetchall() or []) if str(r[0]) not in fetched]
+                if drop:
+                    await cur.executemany(DELETE_SQL, [(int(user_id), int(persona_num), mid) for mid in drop])
+                if full:
+                    await cur.execute(
+                        """
+                        INSERT INTO ss_instagram_media_likes_sync (user_id, user_persona_num, ig_user_id, full_at)
+                        VALUES (%s, %s, %s, UTC_TIMESTAMP())
+                        ON DUPLICATE KEY UPDATE ig_user_id=VALUES(ig_user_id), full_at=VALUES(full_at)
+                        """,
+                        (int(user_id), int(persona_num), str(ig_user_id)),
+                    )
+                await cur.execute(_TOTAL_SQL, (int(user_id), int(persona_num), int(total_media)))
+                row = await cur.fetchone()
+            await conn.commit()
+        except Exception:
+            try:
+                await conn.rollback()
+            except Exception:
+                pass
+            raise
+    return {"total_likes": int(row[0] or 0) if row else 0, "pruned": len(drop)}
+
+
+async def refresh_totals(
+    client: GraphClient,
+    user_id: int,
+    persona_num: int,
+    ig_user_id: str,
+    token: str,
+    total_media: int = LIKES_TOTAL_MEDIA,
+    active_days: int = LIKES_ACTIVE_DAYS,
+    full_days: int = LIKES_FULL_DAYS,
+    now: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """활동이 있던 미디어만 다시 읽어 저장소를 갱신하고 total_likes를 집계.
+
+    반환: {"total_likes", "full", "fetched", "pruned", "graph_calls"}. Graph 오류는 posts_sync.SyncError.
+    """
+    now = now or datetime.utcnow()
+    state = await load_state(user_id, persona_num)
+    full = (
+        state["ig_user_id"] != str(ig_user_id)
+        or state["full_at"] is None
+        or state["full_at"] <= now - timedelta(days=max(0, int(full_days)))
+    )
+    if full:
+        # 하이워터마크 없이 refresh_days=0 → 최신 total_media개를 채우면 멈춤
+        scan = await posts_sync.scan_media(
+            client, ig_user_id, token, None, limit=total_media, refresh_days=0, now=now, fields=LIKE_FIELDS,
+        )
+        items = [m for _, m in scan["items"]]
+        gone: List[str] = []
+        calls = scan["pages"]
+    else:
+        scan = await posts_sync.scan_media(
+            client, ig_user_id, token, state["newest"], limit=1, refresh_days=active_days, now=now, fields=LIKE_FIELDS,
+        )
+        items = [m for _, m in scan["items"]]
+        seen = {str(m.get("id")) for m in items}
+        stale = [mid for mid in await active_media(user_id, persona_num, limit=total_media) if mid not in seen]
+        extra = await fetch_counters(client, token, stale) if stale else {"items": [], "gone": [], "calls": 0}
+        items.extend(extra["items"])
+        gone = extra["gone"]
+        calls = scan["pages"] + extra["calls"]
+    applied = await apply_counters(user_id, persona_num, ig_user_id, items, gone, full=full, total_media=total_media)
+    return {**applied, "full": full, "fetched": len(items), "graph_calls": calls}
@@ -1,17 +1,181 @@
 """
 [파트 개요] MySQL 연결 풀 헬퍼
-- 내부 통신: aiomysql 풀을 생성하여 DB 접근에 사용
+- 내부 통신: 프로세스당 하나의 aiomysql 풀을 공유하여 DB 접근에 사용
 - 외부 통신: MySQL 서버(project-db-cgi.smhrd.com:3307)와 연결
+
+풀은 앱 startup(lifespan)에서 init_mysql_pool()로 만들고 shutdown에서
+close_mysql_pool()로 닫습니다. 기존 호출부는 그대로 get_mysql_pool()을
+사용하며, lifespan 밖(스크립트/테스트)에서 호출되면 최초 1회 지연 생성합니다.
+
+튜닝(환경변수)
+- DB_POOL_MINSIZE (기본 1), DB_POOL_MAXSIZE (기본 10)
+- DB_POOL_RECYCLE: 커넥션 재활용 주기(초, 기본 3600, -1이면 비활성)
 """
-import aiomysql
+import asyncio
+import logging
 import os
+import time
+from typing import Any, Dict, Optional
+
+import aiomysql
+
+log = logging.getLogger("mysql")
+
+_pool: Optional["MeteredPool"] = None
+_pool_lock: Optional[asyncio.Lock] = None
+
+
+def _int_env(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+class _AcquireStats:
+    """풀 대기 시간 누적 통계(프로세스 단위)."""
+
+    def __init__(self) -> None:
+        self.acquires = 0
+        self.in_use = 0
+        self.waiting = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.errors = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        avg = (self.total_wait_ms / self.acquires) if self.acquires else 0.0
+        return {
+            "acquires": self.acquires,
+            "in_use": self.in_use,
+            "waiting": self.waiting,
+            "avg_wait_ms": round(avg, 3),
+            "max_wait_ms": round(self.max_wait_ms, 3),
+            "total_wait_ms": round(self.total_wait_ms, 3),
+            "errors": self.errors,
+        }
+
+
+class _MeteredAcquire:
+    """`async with pool.acquire() as conn` 형태를 유지하면서 대기 시간을 기록."""
+
+    def __init__(self, pool: "MeteredPool") -> None:
+        self._pool = pool
+        self._conn = None
 
-async def get_mysql_pool():
-    return await aiomysql.create_pool(
+    async def __aenter__(self):
+        stats = self._pool.stats
+        stats.waiting += 1
+        started = time.perf_counter()
+        try:
+            self._conn = await self._pool.raw.acquire()
+        except Exception:
+            stats.errors += 1
+            raise
+        finally:
+            stats.waiting -= 1
+        waited = (time.perf_counter() - started) * 1000.0
+        stats.acquires += 1
+        stats.in_use += 1
+        stats.total_wait_ms += waited
+        if waited > stats.max_wait_ms:
+            stats.max_wait_ms = waited
+        return self._conn
+
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            if self._conn is not None:
+                await self._pool.raw.release(self._conn)
+        finally:
+            self._conn = None
+            self._pool.stats.in_use -= 1
+        return False
+
+
+class MeteredPool:
+    """aiomysql.Pool 래퍼: acquire 대기 지표를 수집하고 나머지는 원본 풀에 위임."""
+
+    def __init__(self, raw: aiomysql.Pool) -> None:
+        self.raw = raw
+        self.stats = _AcquireStats()
+
+    def acquire(self) -> _MeteredAcquire:
+        return _MeteredAcquire(self)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.raw, name)
+
+
+def _pool_kwargs() -> Dict[str, Any]:
+    minsize = max(0, _int_env("DB_POOL_MINSIZE", 1))
+    maxsize = max(1, _int_env("DB_POOL_MAXSIZE", 10))
+    return dict(
         host=os.getenv("DB_HOST", "project-db-cgi.smhrd.com"),
         user=os.getenv("DB_USER", "cgi_25IS_LI1_p3_3"),
         password=os.getenv("DB_PASS", "smhrd3"),
         db=os.getenv("DB_NAME", "cgi_25IS_LI1_p3_3"),
         port=int(os.getenv("DB_PORT", 3307)),
-        autocommit=True
-    )
\ No newline at end of file
+        minsize=min(minsize, maxsize),
+        maxsize=maxsize,
+        pool_recycle=_int_env("DB_POOL_RECYCLE", 3600),
+        autocommit=True,
+    )
+
+
+async def init_mysql_pool() -> MeteredPool:
+    """공유 풀을 생성(이미 있으면 그대로 반환)."""
+    global _pool, _pool_lock
+    if _pool is not None:
+        return _pool
+    if _pool_lock is None:
+        _pool_lock = asyncio.Lock()
+    async with _pool_lock:
+        if _pool is None:
+            kwargs = _pool_kwargs()
+            raw = await aiomysql.create_pool(**kwargs)
+            _pool = MeteredPool(raw)
+            log.info(
+                "MySQL pool created (minsize=%s maxsize=%s recycle=%s)",
+                kwargs["minsize"], kwargs["maxsize"], kwargs["pool_recycle"],
+            )
+    return _pool
+
+
+async def get_mysql_pool() -> MeteredPool:
+    """프로세스 공유 풀 반환. lifespan 밖에서 호출되면 지연 생성합니다."""
+    if _pool is not None:
+        return _pool
+    return await init_mysql_pool()
+
+
+async def close_mysql_pool() -> None:
+    """공유 풀을 닫습니다(shutdown 시 호출)."""
+    global _pool
+    pool, _pool = _pool, None
+    if pool is None:
+        return
+    try:
+        pool.raw.close()
+        await pool.raw.wait_closed()
+        log.info("MySQL pool closed")
+    except Exception as e:
+        log.warning("MySQL pool close failed: %s", e)
+
+
+def mysql_pool_stats() -> Dict[str, Any]:
+    """풀 크기/대기 지표 스냅샷. 풀이 없으면 {"initialized": False}."""
+    pool = _pool
+    if pool is None:
+        return {"initialized": False}
+    out: Dict[str, Any] = {"initialized": True}
+    try:
+        out.update(
+            size=pool.raw.size,
+            freesize=pool.raw.freesize,
+            minsize=pool.raw.minsize,
+            maxsize=pool.raw.maxsize,
+        )
+    except Exception:
+        pass
+    out.update(pool.stats.as_dict())
+    return out
@@ -0,0 +1,326 @@
+"""
+[파트 개요] 게시물 증분 동기화(Graph /{ig_user_id}/media → ss_instagram_post)
+- 내부 통신: ss_instagram_post(게시물 캐시), ss_instagram_post_sync(페르소나별 하이워터마크),
+  ss_instagram_media_likes(스냅샷 total_likes용 미디어별 카운터 — like_totals 참고)
+- 외부 통신: Graph /{ig_user_id}/media (paging.next 커서)
+
+/media는 최신순이므로 페이지를 따라가며 각 미디어를 분류하고, 더 볼 필요가 없는 지점에서 멈춥니다.
+- new: 하이워터마크(마지막으로 본 최신 게시 시각/ID)보다 새 게시물 → 전체 필드 upsert
+- recent: 이미 본 게시물이지만 refresh_days 이내 → 좋아요/댓글 수 갱신(같은 upsert)
+- old: 둘 다 아님 → 여기서 페이징 중단. 단 최신 limit개(화면에 보이는 한 페이지)를 채울 때까지는
+  계속 읽어 recent로 갱신합니다. media_url/thumbnail_url은 만료되는 CDN 서명 URL이라 오래된 글도 다시 받아야 합니다.
+따라서 평소 호출은 새 글 + 최근 N일 분량(최소 limit개)의 1~2페이지만 읽습니다.
+
+훑은 구간(가장 오래된 확인 시각 이후)의 로컬 행 중 Graph에 없는 것은 인스타그램에서 삭제된 것으로 보고 정리합니다.
+upsert(executemany → 다중 행 INSERT ... ON DUPLICATE KEY UPDATE), 정리(DELETE executemany),
+하이워터마크 갱신은 한 트랜잭션으로 커밋합니다. 읽은 카운터는 같은 트랜잭션에서 좋아요 저장소에도 반영합니다. Graph 호출 중에는 DB 커넥션을 잡지 않습니다.
+
+설정(환경변수)
+- IG_POSTS_REFRESH_DAYS: 카운터를 다시 읽는 기간(기본 7일)
+- IG_POSTS_SYNC_MAX_PAGES: 한 번에 따라가는 최대 페이지 수(기본 20)
+"""
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from app.api.core import like_totals
+from app.api.core.graph import GraphClient
+from app.api.core.mysql import get_mysql_pool
+from app.api.core.schema import register_migration
+
+log = logging.getLogger("posts_sync")
+
+POSTS_REFRESH_DAYS = int(os.getenv("IG_POSTS_REFRESH_DAYS") or 7)
+POSTS_SYNC_MAX_PAGES = int(os.getenv("IG_POSTS_SYNC_MAX_PAGES") or 20)
+MEDIA_FIELDS = "id,media_type,media_product_type,media_url,thumbnail_url,permalink,timestamp,caption,like_count,comments_count"
+_MAX_PAGE_SIZE = 100
+
+HighWater = Tuple[datetime, str]
+
+
+class SyncError(Exception):
+    """Graph /media 조회 실패. response로 상태/본문을 확인(토큰 오류 판별 등)."""
+
+    def __init__(self, response: httpx.Response) -> None:
+        super().__init__(f"graph_media_failed:{response.status_code}")
+        self.response = response
+
+
+@register_migration("ss_instagram_post_sync.v1")
+async def _ensure_post_sync_table():
+    pool = await get_mysql_pool()
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS ss_instagram_post_sync (
+                  user_id INT NOT NULL,
+                  user_persona_num INT NOT NULL,
+                  ig_user_id VARCHAR(64) NOT NULL,
+                  last_posted_at DATETIME NULL,
+                  last_media_id VARCHAR(64) NULL,
+                  synced_at DATETIME NULL,
+                  PRIMARY KEY (user_id, user_persona_num)
+                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+                """
+            )
+            try:
+                await conn.commit()
+            except Exception:
+                pass
+
+
+def parse_timestamp(ts: Any) -> Optional[datetime]:
+    """Graph ISO 8601("2024-05-01T12:00:00+0000") → naive UTC datetime(MySQL DATETIME)."""
+    if not isinstance(ts, str) or not ts:
+        return None
+    try:
+        dt = datetime.fromisoformat(ts.replace("Z", "+00:00"))
+    except ValueError:
+        try:
+            dt = datetime.strptime(ts, "%Y-%m-%dT%H:%M:%S%z")
+        except ValueError:
+            return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def _count(v: Any) -> int:
+    try:
+        return int(v or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def classify(posted_at: Optional[datetime], media_id: str, hwm: Optional[HighWater], window_start: datetime) -> str:
+    """'new' | 'recent' | 'old' (모듈 설명 참고). 게시 시각을 모르면 recent로 취급해 갱신만 합니다."""
+    if posted_at is None:
+        return "recent"
+    if hwm is not None and (posted_at > hwm[0] or (posted_at == hwm[0] and media_id != hwm[1])):
+        return "new"
+    return "recent" if posted_at >= window_start else "old"
+
+
+async def scan_media(
+    client: GraphClient,
+    ig_user_id: str,
+    token: str,
+    hwm: Optional[HighWater],
+    limit: int = 18,
+    refresh_days: int = POSTS_REFRESH_DAYS,
+    max_pages: int = POSTS_SYNC_MAX_PAGES,
+    now: Optional[datetime] = None,
+    fields: str = MEDIA_FIELDS,
+) -> Dict[str, Any]:
+    """/media 페이지를 최신순으로 따라가며 new/recent 미디어를 모읍니다.
+
+    반환: {"items": [(kind, media)], "boundary": datetime|None, "complete": bool, "pages": int}
+    - boundary: 이 시각보다 새 로컬 행은 모두 훑었음(정리 기준). complete=False면 정리하지 않습니다.
+    """
+    now = now or datetime.utcnow()
+    window_start = now - timedelta(days=max(0, int(refresh_days)))
+    page_size = max(1, min(int(limit), _MAX_PAGE_SIZE))
+    items: List[Tuple[str, Dict[str, Any]]] = []
+    boundary: Optional[datetime] = None
+    complete = False
+    pages = 0
+    url: Optional[str] = f"/{ig_user_id}/media"
+    params: Optional[Dict[str, Any]] = {"access_token": token, "fields": fields, "limit": page_size}
+    while url is not None:
+        if pages >= max_pages:
+            break
+        r = await client.get(url, params=params)
+        pages += 1
+        if r.status_code != 200:
+            raise SyncError(r)
+        body = r.json() or {}
+        for m in body.get("data") or []:
+            mid = m.get("id")
+            if not mid:
+                continue
+            posted_at = parse_timestamp(m.get("timestamp"))
+            kind = classify(posted_at, str(mid), hwm, window_start)
+            if kind == "old" and len(items) >= limit:
+                # 이 미디어보다 새 구간은 모두 확인함
+                boundary = posted_at
+                complete = True
+                url = None
+                break
+            # 최신 limit개는 기간과 무관하게 표시 필드(만료되는 CDN URL 등)를 다시 받음.
+            # 최초 동기화(하이워터마크 없음)는 모두 new
+            items.append(("new" if hwm is None else ("recent" if kind == "old" else kind), m))
+        else:
+            nxt = (body.get("paging") or {}).get("next")
+            # paging.next는 커서/토큰이 포함된 절대 URL
+            url, params = (nxt, None) if nxt else (None, None)
+            if url is None:
+                # 마지막 페이지까지 봄 → 모든 로컬 행이 정리 대상
+                complete = True
+    if not complete and items:
+        # 페이지 상한에 걸림: 가장 오래된 확인 시각 이상만 확실
+        stamps = [parse_timestamp(m.get("timestamp")) for _, m in items]
+        known = [s for s in stamps if s is not None]
+        if known:
+            boundary = min(known) - timedelta(seconds=1)
+            complete = True
+    return {"items": items, "boundary": boundary, "complete": complete, "pages": pages}
+
+
+_UPSERT_SQL = """
+INSERT INTO ss_instagram_post (
+  media_id, user_id, user_persona_num, ig_user_id,
+  media_type, media_product_type, media_url, thumbnail_url,
+  permalink, caption, posted_at, like_count, comments_count
+) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
+ON DUPLICATE KEY UPDATE
+  media_type=VALUES(media_type),
+  media_product_type=VALUES(media_product_type),
+  media_url=VALUES(media_url),
+  thumbnail_url=VALUES(thumbnail_url),
+  permalink=VALUES(permalink),
+  caption=VALUES(caption),
+  posted_at=VALUES(posted_at),
+  like_count=GREATEST(VALUES(like_count), like_count),
+  comments_count=GREATEST(VALUES(comments_count), comments_count),
+  updated_at=CURRENT_TIMESTAMP
+"""
+
+
+def upsert_params(user_id: int, persona_num: int, ig_user_id: str, m: Dict[str, Any]) -> Tuple[Any, ...]:
+    return (
+        str(m["id"]), int(user_id), int(persona_num), str(ig_user_id),
+        m.get("media_type"), m.get("media_product_type"), m.get("media_url"), m.get("thumbnail_url"),
+        m.get("permalink"), m.get("caption"), parse_timestamp(m.get("timestamp")),
+        _count(m.get("like_count")), _count(m.get("comments_count")),
+    )
+
+
+async def load_high_water(user_id: int, persona_num: int, ig_user_id: str) -> Optional[HighWater]:
+    """저장된 하이워터마크. 없거나 다른 IG 계정으로 재연동된 경우 None(최초 동기화)."""
+    pool = await get_mysql_pool()
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                """
+                SELECT ig_user_id, last_posted_at, last_media_id FROM ss_instagram_post_sync
+                WHERE user_id=%s AND user_persona_num=%s
+                """,
+                (int(user_id), int(persona_num)),
+            )
+            row = await cur.fetchone()
+    if not row or str(row[0]) != str(ig_user_id) or row[1] is None:
+        return None
+    return row[1], str(row[2] or "")
+
+
+async def apply_scan(
+    user_id: int,
+    persona_num: int,
+    ig_user_id: str,
+    scan: Dict[str, Any],
+    hwm: Optional[HighWater],
+    prune: bool = True,
+) -> Dict[str, int]:
+    """scan_media 결과를 한 트랜잭션으로 반영: upsert + 삭제된 게시물 정리 + 하이워터마크 갱신."""
+    items = [m for _, m in scan["items"]]
+    params = [upsert_params(user_id, persona_num, ig_user_id, m) for m in items]
+    fetched = {p[0] for p in params}
+    newest = hwm
+    for p in params:
+        if p[10] is not None and (newest is None or p[10] > newest[0]):
+            newest = (p[10], p[0])
+    pruned = 0
+    pool = await get_mysql_pool()
+    async with pool.acquire() as conn:
+        try:
+            # 풀은 autocommit — upsert/정리/하이워터마크를 명시적 트랜잭션으로 묶음
+            await conn.begin()
+            async with conn.cursor() as cur:
+                if params:
+                    await cur.executemany(_UPSERT_SQL, params)
+                    await cur.executemany(
+                        like_totals.UPSERT_SQL,
+                        [like_totals.like_params(user_id, persona_num, ig_user_id, m) for m in items],
+                    )
+                if prune and scan.get("complete") and (items or scan.get("boundary") is not None):
+                    boundary = scan.get("boundary")
+                    if boundary is None:
+                        await cur.execute(
+                            "SELECT media_id FROM ss_instagram_post WHERE user_id=%s AND user_persona_num=%s",
+                            (int(user_id), int(persona_num)),
+                        )
+                    else:
+                        await cur.execute(
+                            """
+                            SELECT media_id FROM ss_instagram_post
+                            WHERE user_id=%s AND user_persona_num=%s AND posted_at > %s
+                            """,
+                            (int(user_id), int(persona_num), boundary),
+                        )
+                    gone = [str(r[0]) for r in (await cur.fetchall() or []) if r[0] and str(r[0]) not in fetched]
+                    if gone:
+                        await cur.executemany(
+                            "DELETE FROM ss_instagram_post WHERE user_id=%s AND user_persona_num=%s AND media_id=%s",
+                            [(int(user_id), int(persona_num), mid) for mid in gone],
+                        )
+                        await cur.executemany(
+                            like_totals.DELETE_SQL, [(int(user_id), int(persona_num), mid) for mid in gone],
+                        )
+                        pruned = len(gone)
+                await cur.execute(
+                    """
+                    INSERT INTO ss_instagram_post_sync
+                      (user_id, user_persona_num, ig_user_id, last_posted_at, last_media_id, synced_at)
+                    VALUES (%s, %s, %s, %s, %s, UTC_TIMESTAMP())
+                    ON DUPLICATE KEY UPDATE
+                      ig_user_id=VALUES(ig_user_id),
+                      last_posted_at=VALUES(last_posted_at),
+                      last_media_id=VALUES(last_media_id),
+                      synced_at=VALUES(synced_at)
+                    """,
+                    (
+                        int(user_id), int(persona_num), str(ig_user_id),
+                        newest[0] if newest else None, newest[1] if newest else None,
+                    ),
+                )
+            await conn.commit()
+        except Exception:
+            try:
+                await conn.rollback()
+            except Exception:
+                pass
+            raise
+    kinds = [k for k, _ in scan["items"]]
+    return {
+        "synced": len(params),
+        "new": kinds.count("new"),
+        "refreshed": kinds.count("recent"),
+        "pruned": pruned,
+        "pages": int(scan.get("pages") or 0),
+    }
+
+
+async def sync_persona_posts(
+    client: GraphClient,
+    user_id: int,
+    persona_num: int,
+    ig_user_id: str,
+    token: str,
+    limit: int = 18,
+    refresh_days: int = POSTS_REFRESH_DAYS,
+    prune: bool = True,
+    full: bool = False,
+) -> Dict[str, int]:
+    """페르소나 하나를 증분 동기화. full=True면 하이워터마크를 무시하고 최초 동기화처럼 limit개 이상을 다시 읽음."""
+    try:
+        hwm = None if full else await load_high_water(user_id, persona_num, ig_user_id)
+    except Exception as e:
+        # 상태 테이블 미존재 등 → 최초 동기화로 진행
+        log.info("post sync state unavailable: %s", e)
+        hwm = None
+    scan = await scan_media(client, ig_user_id, token, hwm, limit=limit, refresh_days=refresh_days)
+    return await apply_scan(user_id, persona_num, ig_user_id, scan, hwm, prune=prune)
@@ -0,0 +1,171 @@
+"""
+[파트 개요] 버킷 ↔ DB 정합성 점검(고아 오브젝트 정리)
+- 내부 통신: ss_chat_img(img_key/persona_chat_img), ss_persona(persona_img)를 키 순으로 스트리밍 조회
+- 외부 통신: S3 list_objects_v2 페이지 조회 / DeleteObjects 일괄 삭제
+
+DB 행이 사라진 뒤 남은 오브젝트(chat/, personas/)를 찾습니다.
+S3 목록은 키의 UTF-8 바이트 순으로 오므로 DB도 CAST(... AS BINARY) 순으로 정렬해
+두 정렬 스트림을 머지 조인합니다. 어느 쪽도 전체를 메모리에 올리지 않습니다
+(S3 한 페이지 + DB fetchmany 한 묶음 + 삭제 배치 하나).
+
+- 파생본(`__thumb.webp` 등)은 같은 stem의 원본이 살아 있으면 유지합니다.
+  같은 stem으로 시작하는 키는 목록에서 연속 구간을 이루고 원본(`stem.ext`)이
+  파생본(`stem__size.webp`)보다 앞에 오므로, 진행 중인 stem만 기억하면 됩니다.
+- 업로드 직후 DB 기록 전인 오브젝트를 지우지 않도록 min_age(초)보다 최근 것은 건너뜁니다.
+"""
+import logging
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple
+
+import aiomysql
+
+from app.api.core.mysql import get_mysql_pool
+from app.core.derivatives import derivative_key, forget as forget_derivatives, is_derivative_key
+from app.core.s3 import S3_DELETE_BATCH, adelete_objects, aiter_objects
+
+log = logging.getLogger("reconcile")
+
+DEFAULT_PREFIXES = ("chat/", "personas/")
+DEFAULT_MIN_AGE = 24 * 3600
+_FETCH = 1000
+
+_LIVE_KEYS_SQL = """
+SELECT k FROM (
+    SELECT {chat_col} AS k FROM ss_chat_img WHERE {chat_col} IS NOT NULL
+    UNION ALL
+    SELECT CASE
+               WHEN persona_img LIKE 'http://localhost%%' OR persona_img LIKE 'http://127.0.0.1%%'
+               THEN SUBSTRING(persona_img, LOCATE('/', persona_img, 8) + 1)
+               ELSE persona_img
+           END AS k
+    FROM ss_persona WHERE persona_img IS NOT NULL
+) t
+WHERE k LIKE %s
+ORDER BY CAST(k AS BINARY)
+"""
+
+
+def _like_prefix(prefix: str) -> str:
+    return prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def _stem(key: str) -> str:
+    """원본/파생본 키의 공통 stem(파생본 키 규칙과 동일하게 확장자/접미사 제거)."""
+    if is_derivative_key(key):
+        return key.rsplit("__", 1)[0]
+    return derivative_key(key, "thumb")[: -len("__thumb.webp")]
+
+
+async def live_keys(prefix: str) -> AsyncIterator[str]:
+    """DB가 참조하는 prefix 아래 키를 바이트 순으로 스트리밍(서버 측 커서)."""
+    pool = await get_mysql_pool()
+    async with pool.acquire() as conn:
+        async with conn.cursor(aiomysql.SSCursor) as cur:
+            try:
+                await cur.execute(_LIVE_KEYS_SQL.format(chat_col="img_key"), (_like_prefix(prefix),))
+            except Exception:
+                # 구 스키마(persona_chat_img)
+                await cur.execute(_LIVE_KEYS_SQL.format(chat_col="persona_chat_img"), (_like_prefix(prefix),))
+            while True:
+                rows = await cur.fetchmany(_FETCH)
+                if not rows:
+                    return
+                for (k,) in rows:
+                    if k:
+                        yield k
+
+
+async def _next(it: AsyncIterator[str]) -> Optional[str]:
+    try:
+        return await it.__anext__()
+    except StopAsyncIteration:
+        return None
+
+
+async def find_orphans(
+    objects: AsyncIterator[Tuple[str, Any]],
+    live: AsyncIterator[str],
+    min_age: float = DEFAULT_MIN_AGE,
+    stats: Optional[Dict[str, int]] = None,
+    now: Optional[datetime] = None,
+) -> AsyncIterator[str]:
+    """정렬된 오브젝트 스트림과 정렬된 DB 키 스트림을 머지 조인해 고아 키를 내보냅니다."""
+    stats = stats if stats is not None else {}
+    for name in ("scanned", "live", "recent", "orphans"):
+        stats.setdefault(name, 0)
+    now = now or datetime.now(timezone.utc)
+    current = await _next(live)
+    # 아직 구간이 끝나지 않은, 원본이 살아 있는 stem들(중첩 깊이만큼만 유지)
+    kept_stems: Dict[str, None] = {}
+    async for key, modified in objects:
+        stats["scanned"] += 1
+        for stem in [s for s in kept_stems if not key.startswith(s)]:
+            del kept_stems[stem]
+        while current is not None and current < key:
+            current = await _next(live)
+
+        derived = is_derivative_key(key)
+        if derived and _stem(key) in kept_stems:
+            stats["live"] += 1
+            continue
+        if not derived and current == key:
+            stats["live"] += 1
+            kept_stems[_stem(key)] = None
+            continue
+        if modified is not None and (now - modified).total_seconds() < min_age:
+            stats["recent"] += 1
+            if not derived:
+                kept_stems[_stem(key)] = None
+            continue
+        stats["orphans"] += 1
+        yield key
+
+
+async def _flush(batch: List[str], stats: Dict[str, int]) -> None:
+    result = await adelete_objects(batch)
+    stats["deleted"] += len(result["deleted"])
+    stats["errors"] += len(result["errors"])
+    for key, err in result["errors"].items():
+        log.warning("reconcile: failed to delete %s: %s", key, err)
+    for key in result["deleted"]:
+        if not is_derivative_key(key):
+            forget_derivatives(key)
+    batch.clear()
+
+
+async def reconcile_prefix(
+    prefix: str,
+    delete: bool = False,
+    min_age: float = DEFAULT_MIN_AGE,
+    on_orphan: Optional[Callable[[str], None]] = None,
+    objects: Optional[AsyncIterator[Tuple[str, Any]]] = None,
+    live: Optional[AsyncIterator[str]] = None,
+) -> Dict[str, Any]:
+    """prefix 하나를 점검. delete=True면 고아를 S3_DELETE_BATCH 단위로 일괄 삭제."""
+    stats: Dict[str, Any] = {"prefix": prefix, "deleted": 0, "errors": 0}
+    objects = objects if objects is not None else aiter_objects(prefix)
+    live = live if live is not None else live_keys(prefix)
+    batch: List[str] = []
+    async for key in find_orphans(objects, live, min_age=min_age, stats=stats):
+        if on_orphan is not None:
+            on_orphan(key)
+        if delete:
+            batch.append(key)
+            if len(batch) >= S3_DELETE_BATCH:
+                await _flush(batch, stats)
+    if batch:
+        await _flush(batch, stats)
+    log.info("reconcile %s: %s", prefix, stats)
+    return stats
+
+
+async def reconcile(
+    prefixes: Iterable[str] = DEFAULT_PREFIXES,
+    delete: bool = False,
+    min_age: float = DEFAULT_MIN_AGE,
+    on_orphan: Optional[Callable[[str], None]] = None,
+) -> List[Dict[str, Any]]:
+    return [
+        await reconcile_prefix(p, delete=delete, min_age=min_age, on_orphan=on_orphan)
+        for p in prefixes
+    ]
@@ -0,0 +1,129 @@
+"""
+[파트 개요] 스키마 부트스트랩 레지스트리
+- 내부 통신: 공유 aiomysql 풀로 1회성 DDL(_ensure_*)을 실행하고 적용 버전을 기록
+- 외부 통신: 없음
+
+각 모듈은 @register_migration("버전")으로 멱등 DDL 함수를 등록하고,
+앱 startup에서 ensure_schema()가 미적용 버전만 순서대로 실행한 뒤
+ss_schema_migrations에 기록합니다. 이후 요청 경로의 ensure_schema()
+호출은 플래그만 확인하므로 INFORMATION_SCHEMA 조회/CREATE TABLE이 없습니다.
+
+SCHEMA_BOOTSTRAP=0 이면 DDL을 전혀 실행하지 않습니다(DDL 권한 없는 운영 DB용).
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+import aiomysql
+
+from app.api.core.mysql import get_mysql_pool
+
+log = logging.getLogger("schema")
+
+Migration = Callable[[], Awaitable[None]]
+
+_MIGRATIONS: List[Tuple[str, Migration]] = []
+_done = False
+_lock: Optional[asyncio.Lock] = None
+_last_failure = 0.0
+# 부트스트랩이 실패했을 때 요청마다 재시도하지 않도록 하는 최소 간격(초)
+_RETRY_INTERVAL = 30.0
+
+
+def register_migration(version: str) -> Callable[[Migration], Migration]:
+    """멱등 DDL 함수를 버전과 함께 등록하는 데코레이터(등록 순서대로 실행)."""
+
+    def deco(fn: Migration) -> Migration:
+        if any(v == version for v, _ in _MIGRATIONS):
+            raise ValueError(f"duplicate_migration_version:{version}")
+        _MIGRATIONS.append((version, fn))
+        return fn
+
+    return deco
+
+
+def registered_versions() -> List[str]:
+    return [v for v, _ in _MIGRATIONS]
+
+
+def schema_ready() -> bool:
+    return _done
+
+
+async def _load_applied() -> Set[str]:
+    pool = await get_mysql_pool()
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS ss_schema_migrations (
+                  version VARCHAR(100) NOT NULL PRIMARY KEY,
+                  applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+                """
+            )
+        async with conn.cursor(aiomysql.DictCursor) as cur:
+            await cur.execute("SELECT version FROM ss_schema_migrations")
+            return {str(r["version"]) for r in (await cur.fetchall() or [])}
+
+
+async def _record_applied(version: str) -> None:
+    pool = await get_mysql_pool()
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                "INSERT IGNORE INTO ss_schema_migrations (version) VALUES (%s)",
+                (version,),
+            )
+            try:
+                await conn.commit()
+            except Exception:
+                pass
+
+
+async def ensure_schema(force: bool = False) -> Dict[str, List[str]]:
+    """등록된 마이그레이션 중 미적용분을 1회 실행합니다.
+
+    두 번째 호출부터는 플래그만 확인하고 즉시 반환합니다(force=True 제외).
+    부트스트랩이 진행 중이면 끝날 때까지 기다리고, 실패로 끝난 뒤에는 최소 간격 동안 재시도하지 않습니다.
+    반환: {"applied": [...], "skipped": [...], "failed": [...]}
+    """
+    global _done, _lock, _last_failure
+    result: Dict[str, List[str]] = {"applied": [], "skipped": [], "failed": []}
+    if _done and not force:
+        return result
+    if os.getenv("SCHEMA_BOOTSTRAP", "1").strip().lower() in ("0", "false", "no"):
+        _done = True
+        return result
+    if _lock is None:
+        _lock = asyncio.Lock()
+    async with _lock:
+        if _done and not force:
+            return result
+        if not force and _last_failure and (time.monotonic() - _last_failure) < _RETRY_INTERVAL:
+            return result
+        try:
+            applied = await _load_applied()
+        except Exception as e:
+            # DB 미연결: 다음 호출(최소 간격 이후)에서 재시도
+            log.warning("schema bootstrap deferred: %s", e)
+            _last_failure = time.monotonic()
+            return result
+        for version, fn in list(_MIGRATIONS):
+            if version in applied:
+                result["skipped"].append(version)
+                continue
+            try:
+                await fn()
+                await _record_applied(version)
+                result["applied"].append(version)
+                log.info("schema migration applied: %s", version)
+            except Exception as e:
+                # 개별 실패는 기록만 하고 요청 경로를 막지 않음(최소 간격 이후 다음 호출에서 재시도)
+                result["failed"].append(version)
+                log.warning("schema migration failed: %s: %s", version, e)
+        _done = not result["failed"]
+        _last_failure = 0.0 if _done else time.monotonic()
+    return result
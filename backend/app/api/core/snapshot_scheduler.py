@@ -0,0 +1,326 @@
+"""
+[파트 개요] 일일 인사이트 스냅샷 스케줄러
+- 내부 통신: ss_persona + ss_instagram_connector_persona(대상 페르소나 keyset 페이징),
+  ss_job_run(실행 체크포인트), instagram_insights.perform_snapshot(페르소나 1개 스냅샷)
+- 외부 통신: perform_snapshot이 공유 Graph 클라이언트로 호출(레이트 리밋 대기열 적용)
+
+- 매일 고정 벽시계 시각(SNAPSHOT_TIME, SNAPSHOT_TZ 기준)에 실행합니다. 프로세스 기동 시각과 무관합니다.
+- 대상 페르소나는 (user_id, user_persona_num) keyset 페이지(SNAPSHOT_PAGE_SIZE)로 끝까지 읽습니다(개수 상한 없음).
+- 한 페이지 안에서는 SNAPSHOT_CONCURRENCY개까지 동시에 스냅샷합니다. Graph 사용률이 높으면
+  graph_limits 대기열이 호출 간격을 벌리므로 스케줄러가 따로 속도를 조절하지 않습니다.
+- 페이지가 끝날 때마다 ss_job_run에 커서(마지막 키)와 성공/실패 수를 기록합니다. 재시작하면 같은 run_date의
+  미완료 실행을 커서 다음부터 이어갑니다(최대 한 페이지 재실행, ss_dashboard upsert라 중복 무해).
+- 스냅샷 행의 날짜는 실행 시각이 아니라 run_date입니다. 늦게 이어받은 실행도 예정된 날짜의 행을 채웁니다.
+- 기동 시 가장 최근 예정 시각의 실행이 끝나지 않았으면(놓친 실행 포함) 바로 실행합니다.
+- 실행 지표(소요 시간, 성공/실패, 실패 사유별 수)는 scheduler_stats()(/__jobs)로 노출합니다.
+- 모든 프로세스에서 루프가 돌지만 실행은 job_lease.run_singleton으로 리스를 잡은 하나만 합니다.
+  나머지는 JOB_LEASE_TTL마다 다시 시도하므로, 보유자가 죽으면 리스 만료 후 체크포인트부터 이어받습니다.
+
+설정(환경변수)
+- SNAPSHOT_ENABLED(기본 1), SNAPSHOT_TIME("HH:MM", 기본 00:10), SNAPSHOT_TZ(기본 UTC — ss_dashboard.date가 UTC 날짜)
+- SNAPSHOT_CONCURRENCY(기본 4), SNAPSHOT_PAGE_SIZE(기본 200), SNAPSHOT_RETRY_INTERVAL(DB 오류 시 재시도 간격, 기본 300초)
+"""
+import asyncio
+import logging
+import os
+import time
+from datetime import date, datetime, timedelta, timezone, tzinfo
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.api.core.job_lease import JOB_LEASE_TTL, lease_stats, run_singleton
+from app.api.core.mysql import get_mysql_pool
+from app.api.core.schema import register_migration
+
+log = logging.getLogger("snapshot_scheduler")
+
+JOB_NAME = "insights_snapshot"
+
+
+def _int_env(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name) or default)
+    except ValueError:
+        return default
+
+
+def _parse_time(value: str) -> Tuple[int, int]:
+    try:
+        hh, mm = value.strip().split(":", 1)
+        h, m = int(hh), int(mm)
+        if 0 <= h < 24 and 0 <= m < 60:
+            return h, m
+    except ValueError:
+        pass
+    log.warning("invalid SNAPSHOT_TIME %r, using 00:10", value)
+    return 0, 10
+
+
+def _zone(name: str) -> tzinfo:
+    if name.upper() == "UTC":
+        return timezone.utc
+    try:
+        from zoneinfo import ZoneInfo
+        return ZoneInfo(name)
+    except Exception:
+        log.warning("unknown SNAPSHOT_TZ %r, using UTC", name)
+        return timezone.utc
+
+
+SNAPSHOT_ENABLED = (os.getenv("SNAPSHOT_ENABLED") or "1").strip().lower() in ("1", "true", "yes")
+SNAPSHOT_TIME = _parse_time(os.getenv("SNAPSHOT_TIME") or "00:10")
+SNAPSHOT_TZ = _zone(os.getenv("SNAPSHOT_TZ") or "UTC")
+SNAPSHOT_CONCURRENCY = max(1, _int_env("SNAPSHOT_CONCURRENCY", 4))
+SNAPSHOT_PAGE_SIZE = max(1, _int_env("SNAPSHOT_PAGE_SIZE", 200))
+SNAPSHOT_RETRY_INTERVAL = max(1, _int_env("SNAPSHOT_RETRY_INTERVAL", 300))
+
+Key = Tuple[int, int]
+SnapshotFn = Callable[[int, int, date], Awaitable[Any]]
+
+
+@register_migration("ss_job_run.v1")
+async def _ensure_job_run_table():
+    pool = await get_mysql_pool()
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS ss_job_run (
+                  job VARCHAR(64) NOT NULL,
+                  run_date DATE NOT NULL,
+                  status VARCHAR(16) NOT NULL DEFAULT 'running',
+                  cursor_user_id INT NULL,
+                  cursor_persona_num INT NULL,
+                  ok_count INT NOT NULL DEFAULT 0,
+                  failed_count INT NOT NULL DEFAULT 0,
+                  started_at DATETIME NULL,
+                  finished_at DATETIME NULL,
+                  updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                  PRIMARY KEY (job, run_date)
+                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+                """
+            )
+            try:
+                await conn.commit()
+            except Exception:
+                pass
+
+
+# ----- 시각 계산 -----
+
+def slot_at(day: date, tz: tzinfo = SNAPSHOT_TZ, at: Tuple[int, int] = SNAPSHOT_TIME) -> datetime:
+    return datetime(day.year, day.month, day.day, at[0], at[1], tzinfo=tz)
+
+
+def current_run_date(now: datetime, tz: tzinfo = SNAPSHOT_TZ, at: Tuple[int, int] = SNAPSHOT_TIME) -> date:
+    """now 이전의 가장 최근 예정 시각이 속한 날짜(그 실행의 run_date)."""
+    local = now.astimezone(tz)
+    return local.date() if local >= slot_at(local.date(), tz, at) else local.date() - timedelta(days=1)
+
+
+def next_run_at(now: datetime, tz: tzinfo = SNAPSHOT_TZ, at: Tuple[int, int] = SNAPSHOT_TIME) -> datetime:
+    """now 이후의 다음 예정 시각(aware datetime)."""
+    return slot_at(current_run_date(now, tz, at) + timedelta(days=1), tz, at)
+
+
+# ----- 체크포인트 -----
+
+async def load_run(job: str, run_date: date) -> Optional[Dict[str, Any]]:
+    pool = await get_mysql_pool()
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                """
+                SELECT status, cursor_user_id, cursor_persona_num, ok_count, failed_count
+                FROM ss_job_run WHERE job=%s AND run_date=%s
+                """,
+                (job, run_date),
+            )
+            row = await cur.fetchone()
+    if not row:
+        return None
+    cursor = (int(row[1]), int(row[2])) if row[1] is not None and row[2] is not None else None
+    return {"status": row[0], "cursor": cursor, "ok": int(row[3] or 0), "failed": int(row[4] or 0)}
+
+
+async def save_run(job: str, run_date: date, status: str, cursor: Optional[Key], ok: int, failed: int) -> None:
+    pool = await get_mysql_pool()
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                """
+                INSERT INTO ss_job_run
+                  (job, run_date, status, cursor_user_id, cursor_persona_num, ok_count, failed_count, started_at, finished_at)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, UTC_TIMESTAMP(), IF(%s = 'done', UTC_TIMESTAMP(), NULL))
+                ON DUPLICATE KEY UPDATE
+                  status=VALUES(status),
+                  cursor_user_id=VALUES(cursor_user_id),
+                  cursor_persona_num=VALUES(cursor_persona_num),
+                  ok_count=VALUES(ok_count),
+                  failed_count=VALUES(failed_count),
+                  finished_at=VALUES(finished_at)
+                """,
+                (
+                    job, run_date, status,
+                    cursor[0] if cursor else None, cursor[1] if cursor else None,
+                    int(ok), int(failed), status,
+                ),
+            )
+        await conn.commit()
+
+
+async def linked_personas_page(after: Optional[Key], limit: int) -> List[Key]:
+    """IG 연동 + 페르소나 토큰이 있는 페르소나를 (user_id, user_persona_num) 순으로 after 다음부터."""
+    au, ap = after if after is not None else (-1, -1)
+    pool = await get_mysql_pool()
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                """
+                SELECT p.user_id, p.user_persona_num
+                FROM ss_persona p
+                JOIN ss_instagram_connector_persona t
+                  ON t.user_id = p.user_id AND t.user_persona_num = p.user_persona_num
+                WHERE p.ig_user_id IS NOT NULL
+                  AND (p.user_id > %s OR (p.user_id = %s AND p.user_persona_num > %s))
+                ORDER BY p.user_id, p.user_persona_num
+                LIMIT %s
+                """,
+                (au, au, ap, int(limit)),
+            )
+            return [(int(u), int(n)) for u, n in (await cur.fetchall() or [])]
+
+
+# ----- 실행 -----
+
+_stats: Dict[str, Any] = {"runs": 0, "last_run": None, "current": None, "next_run_at": None, "errors": 0, "standby": 0}
+
+
+def _failure_reason(e: BaseException) -> str:
+    detail = getattr(e, "detail", None)
+    return str(detail) if isinstance(detail, str) else type(e).__name__
+
+
+async def run_snapshot(
+    run_date: date,
+    snapshot: Optional[SnapshotFn] = None,
+    page: Optional[Callable[[Optional[Key], int], Awaitable[List[Key]]]] = None,
+    concurrency: int = SNAPSHOT_CONCURRENCY,
+    page_size: int = SNAPSHOT_PAGE_SIZE,
+    job: str = JOB_NAME,
+) -> Dict[str, Any]:
+    """run_date 실행 1회(체크포인트가 있으면 이어서). 이미 done이면 아무것도 하지 않음."""
+    if snapshot is None:
+        from app.api.routes.instagram_insights import perform_snapshot as snapshot
+    page = page or linked_personas_page
+    state = await load_run(job, run_date)
+    if state is not None and state["status"] == "done":
+        return {"run_date": str(run_date), "skipped": "already_done"}
+    cursor: Optional[Key] = state["cursor"] if state else None
+    ok = state["ok"] if state else 0
+    failed = state["failed"] if state else 0
+    reasons: Dict[str, int] = {}
+    started = time.monotonic()
+    current = {"run_date": str(run_date), "resumed_from": list(cursor) if cursor else None, "ok": ok, "failed": failed}
+    _stats["current"] = current
+    if state is None:
+        await save_run(job, run_date, "running", None, 0, 0)
+    sem = asyncio.Semaphore(max(1, concurrency))
+
+    async def one(key: Key) -> bool:
+        async with sem:
+            try:
+                await snapshot(key[0], key[1], run_date)
+                return True
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                reason = _failure_reason(e)
+                reasons[reason] = reasons.get(reason, 0) + 1
+                log.warning("snapshot failed: user_id=%s persona_num=%s: %s", key[0], key[1], reason)
+                return False
+
+    try:
+        while True:
+            keys = await page(cursor, page_size)
+            if not keys:
+                break
+            results = await asyncio.gather(*(one(k) for k in keys))
+            ok += sum(1 for r in results if r)
+            failed += sum(1 for r in results if not r)
+            cursor = keys[-1]
+            current.update(ok=ok, failed=failed, cursor=list(cursor))
+            await save_run(job, run_date, "running", cursor, ok, failed)
+            if len(keys) < page_size:
+                break
+        await save_run(job, run_date, "done", cursor, ok, failed)
+    finally:
+        _stats["current"] = None
+    result = {
+        "run_date": str(run_date),
+        "ok": ok,
+        "failed": failed,
+        "failure_reasons": reasons,
+        "resumed": state is not None,
+        "duration_s": round(time.monotonic() - started, 3),
+        "finished_at": datetime.now(timezone.utc).isoformat(),
+    }
+    _stats["runs"] += 1
+    _stats["last_run"] = result
+    log.info("insights snapshot run: %s", result)
+    return result
+
+
+async def _scheduler_loop() -> None:
+    while True:
+        run_date = current_run_date(datetime.now(timezone.utc))
+        try:
+            # 여러 워커/레플리카 중 리스를 잡은 하나만 실행(나머지는 대기하다 보유자가 죽으면 이어받음)
+            ran, _ = await run_singleton(JOB_NAME, lambda: run_snapshot(run_date))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # DB 장애/리스 상실 등: 체크포인트가 남아 있으므로 잠시 후 이어서 재시도
+            _stats["errors"] += 1
+            log.warning("insights snapshot run failed, retrying in %ss: %s", SNAPSHOT_RETRY_INTERVAL, e)
+            await asyncio.sleep(SNAPSHOT_RETRY_INTERVAL)
+            continue
+        if not ran:
+            _stats["standby"] += 1
+            await asyncio.sleep(JOB_LEASE_TTL)
+            continue
+        nxt = next_run_at(datetime.now(timezone.utc))
+        _stats["next_run_at"] = nxt.isoformat()
+        await asyncio.sleep(max(1.0, (nxt - datetime.now(timezone.utc)).total_seconds()))
+
+
+_task: Optional["asyncio.Task[None]"] = None
+
+
+def start_scheduler() -> None:
+    global _task
+    if not SNAPSHOT_ENABLED or (_task is not None and not _task.done()):
+        return
+    _task = asyncio.create_task(_scheduler_loop())
+
+
+async def stop_scheduler() -> None:
+    global _task
+    task, _task = _task, None
+    if task is None:
+        return
+    task.cancel()
+    try:
+        await task
+    except (asyncio.CancelledError, Exception):
+        pass
+
+
+def scheduler_stats() -> Dict[str, Any]:
+    return {
+        **_stats,
+        "running": _task is not None and not _task.done(),
+        "time": "%02d:%02d" % SNAPSHOT_TIME,
+        "tz": str(SNAPSHOT_TZ),
+        "concurrency": SNAPSHOT_CONCURRENCY,
+        "lease": lease_stats(),
+    }
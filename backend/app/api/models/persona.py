@@ -1,16 +1,109 @@
 """
 [파트 개요] persona 모델 액세스
 - 내부 통신: aiomysql 풀을 이용해 ss_persona 테이블에 INSERT
+- 조회는 (user_id, user_persona_num) 키의 프로세스 내 TTL/LRU 캐시를 거칩니다.
+  persona_parameters는 파싱된 dict로 보관하며, 쓰기 함수(create/update/delete,
+  IG link/unlink)가 해당 키를 무효화합니다. 다른 워커 프로세스의 변경은
+  PERSONA_CACHE_TTL(기본 300초) 안에 반영됩니다. 없는 페르소나(빈 목록)는
+  PERSONA_CACHE_NEG_TTL(기본 30초)만 캐시해 다른 워커에서 만든 행이 곧 보이게 합니다.
 """
 from __future__ import annotations
 import aiomysql
+import copy
 import json
-from typing import Any, Dict, List
+import os
+from typing import Any, Dict, List, Optional
 from app.api.core.mysql import get_mysql_pool
+from app.core.cache import TTLCache
 import logging
 
 log = logging.getLogger("personas")
 
+# key: (user_id, user_persona_num) → row dict | None, (user_id, None) → 전체 목록
+_persona_cache = TTLCache(
+    maxsize=int(os.getenv("PERSONA_CACHE_MAX", "2048")),
+    ttl=float(os.getenv("PERSONA_CACHE_TTL", "300")),
+)
+_PERSONA_NEG_TTL = float(os.getenv("PERSONA_CACHE_NEG_TTL", "30"))
+
+_PERSONA_COLUMNS = "user_persona_num, persona_img, persona_parameters, ig_user_id, ig_username, fb_page_id"
+_PERSONA_COLUMNS_BASE = "user_persona_num, persona_img, persona_parameters"
+
+
+def _parse_params(raw: Any) -> Dict[str, Any]:
+    if isinstance(raw, dict):
+        return raw
+    if not raw:
+        return {}
+    try:
+        val = json.loads(raw)
+    except Exception:
+        return {}
+    return val if isinstance(val, dict) else {}
+
+
+def _normalize_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    out = dict(row)
+    out["persona_parameters"] = _parse_params(row.get("persona_parameters"))
+    for k in ("ig_user_id", "ig_username", "fb_page_id"):
+        out.setdefault(k, None)
+    return out
+
+
+def _copy_row(row: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    # 호출부가 결과를 수정해도 캐시가 오염되지 않도록 복사본 반환
+    return copy.deepcopy(row) if row is not None else None
+
+
+async def _select_personas(user_id: int, persona_num: Optional[int] = None) -> List[Dict[str, Any]]:
+    where = "user_id = %s"
+    args: tuple = (user_id,)
+    if persona_num is not None:
+        where += " AND user_persona_num = %s"
+        args = (user_id, int(persona_num))
+    pool = await get_mysql_pool()
+    async with pool.acquire() as conn:
+        async with conn.cursor(aiomysql.DictCursor) as cur:
+            try:
+                await cur.execute(
+                    f"SELECT {_PERSONA_COLUMNS} FROM ss_persona WHERE {where} ORDER BY user_persona_num",
+                    args,
+                )
+            except Exception:
+                # IG 매핑 컬럼이 아직 없는 DB(부트스트랩 전) 호환
+                await cur.execute(
+                    f"SELECT {_PERSONA_COLUMNS_BASE} FROM ss_persona WHERE {where} ORDER BY user_persona_num",
+                    args,
+                )
+            rows = await cur.fetchall() or []
+    return [_normalize_row(r) for r in rows]
+
+
+async def get_persona(user_id: int, persona_num: int) -> Optional[Dict[str, Any]]:
+    """단일 페르소나 행(파싱된 persona_parameters 포함)을 캐시 우선으로 반환."""
+    key = (int(user_id), int(persona_num))
+    cached = _persona_cache.get(key, default=_persona_cache)
+    if cached is not _persona_cache:
+        return _copy_row(cached)
+    rows = await _select_personas(int(user_id), int(persona_num))
+    row = rows[0] if rows else None
+    _persona_cache.set(key, row, ttl=None if row is not None else _PERSONA_NEG_TTL)
+    return _copy_row(row)
+
+
+def invalidate_persona(user_id: int, persona_num: Optional[int] = None) -> None:
+    """쓰기 이후 캐시 무효화. persona_num 생략 시 해당 사용자 전체."""
+    uid = int(user_id)
+    if persona_num is None:
+        _persona_cache.invalidate_where(lambda k: k[0] == uid)
+        return
+    _persona_cache.invalidate((uid, int(persona_num)))
+    _persona_cache.invalidate((uid, None))
+
+
+def persona_cache_stats() -> Dict[str, Any]:
+    return _persona_cache.stats()
+
 
 async def _dict_cursor(conn) -> aiomysql.cursors.DictCursor:
     return conn.cursor(aiomysql.DictCursor)
@@ -57,28 +150,25 @@ async def create_persona(
                 pass
             rid = cur.lastrowid or 0
             log.info("persona inserted id=%s for user_id=%s num=%s", rid, user_id, next_num)
+            invalidate_persona(user_id, next_num)
             return rid, next_num
     
 async def get_user_personas(user_id: int) -> List[Dict[str, Any]]:
     """
-    사용자 ID에 대한 모든 페르소나를 반환합니다.
+    사용자 ID에 대한 모든 페르소나를 반환합니다(캐시 우선).
     """
-    pool = await get_mysql_pool()
-    async with pool.acquire() as conn:
-        async with conn.cursor(aiomysql.DictCursor) as cur:
-            await cur.execute(
-                """
-                SELECT user_persona_num, persona_img, persona_parameters
-                FROM ss_persona
-                WHERE user_id = %s
-                ORDER BY user_persona_num
-                """,
-                (user_id,),
-            )
-            personas = await cur.fetchall()
-            for persona in personas:
-                persona['persona_parameters'] = json.loads(persona['persona_parameters'])
-            return personas
+    uid = int(user_id)
+    cached = _persona_cache.get((uid, None))
+    if cached is None:
+        cached = await _select_personas(uid)
+        _persona_cache.set((uid, None), cached, ttl=None if cached else _PERSONA_NEG_TTL)
+        # 목록을 읽은 김에 단건 키도 채워 이후 조회를 0쿼리로
+        for row in cached:
+            try:
+                _persona_cache.set((uid, int(row["user_persona_num"])), row)
+            except Exception:
+                pass
+    return [_copy_row(r) for r in cached]
 
 
 async def update_persona_img(user_id: int, persona_num: int, img_value: str) -> None:
@@ -102,6 +192,7 @@ async def update_persona_img(user_id: int, persona_num: int, img_value: str) ->
                 await conn.commit()
             except Exception:
                 pass
+    invalidate_persona(user_id, persona_num)
 
 
 async def update_persona_fields(
@@ -163,6 +254,7 @@ async def update_persona_fields(
                 await conn.commit()
             except Exception:
                 pass
+    invalidate_persona(user_id, persona_num)
 
 
 async def delete_persona(user_id: int, persona_num: int) -> None:
@@ -201,3 +293,4 @@ async def delete_persona(user_id: int, persona_num: int) -> None:
                 await conn.commit()
             except Exception:
                 pass
+    invalidate_persona(user_id, persona_num)
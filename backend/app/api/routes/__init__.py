@@ -91,3 +91,9 @@ try:
     router.include_router(chat_router)
 except Exception:
     pass
+
+try:
+    from .storage import router as storage_router
+    router.include_router(storage_router)
+except Exception:
+    pass
@@ -1,18 +1,70 @@
 from fastapi import APIRouter, HTTPException, Request, Body
 from pydantic import BaseModel, Field
-from typing import List, Literal, Optional
+from typing import Any, Dict, List, Literal, Optional
+import json
 import os
-from urllib.parse import urlparse, urlunparse
+import secrets
+import tempfile
+import time
+from urllib.parse import unquote, urlparse, urlunparse
 import httpx
 import logging
 import aiomysql
 from app.api.core.mysql import get_mysql_pool
-from app.core.s3 import s3_enabled, presign_get_url, put_data_uri, delete_object
+from app.api.models.persona import get_persona
+from app.core.storage import local_storage_enabled
+from app.core.s3 import s3_enabled, adelete_objects, apresign_get_url, apresign_many, aput_data_uri, aput_fileobj
+from app.api.core.schema import register_migration
+from app.core.derivatives import (
+    SIZES as DERIVATIVE_SIZES,
+    derivative_keys,
+    derivative_urls,
+    forget as forget_derivatives,
+    schedule_derivatives,
+)
 
 # 파트: 채팅/이미지 생성 API
 router = APIRouter(prefix="/api/chat", tags=["chat"])
 log = logging.getLogger("chat")
 
+# AI 이미지 전송 형식(S3 설정 시): binary(기본, 바이트 수신 후 업로드) | direct(AI가 버킷에 직접 업로드) | json(data URI)
+# (direct는 S3 백엔드 전용 — STORAGE_BACKEND=local 이면 binary로 동작)
+# 바이너리 수신 상한/메모리 버퍼 크기
+AI_IMAGE_TRANSPORT = (os.getenv("AI_IMAGE_TRANSPORT") or "binary").strip().lower()
+AI_IMAGE_MAX_BYTES = int(os.getenv("AI_IMAGE_MAX_BYTES", str(20 * 1024 * 1024)))
+AI_IMAGE_SPOOL_BYTES = int(os.getenv("AI_IMAGE_SPOOL_BYTES", str(8 * 1024 * 1024)))
+
+# 작업 모드 저장 선점: 이 시간 안에 끝나지 않은 선점(워커 종료 등)은 다음 조회가 다시 가져감(초)
+CHAT_IMAGE_JOB_STORE_TIMEOUT = int(os.getenv("CHAT_IMAGE_JOB_STORE_TIMEOUT", "120"))
+# 저장 완료 기록 보관(시간) — 이후 조회는 AI 쪽 작업도 없으므로 job_not_found
+CHAT_IMAGE_JOB_RETENTION_HOURS = int(os.getenv("CHAT_IMAGE_JOB_RETENTION_HOURS", "24"))
+_last_job_purge = 0.0
+
+
+@register_migration("ss_chat_image_job.v1")
+async def _ensure_image_job_table():
+    pool = await get_mysql_pool()
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS ss_chat_image_job (
+                  job_id VARCHAR(64) NOT NULL PRIMARY KEY,
+                  user_id INT NOT NULL,
+                  status VARCHAR(16) NOT NULL DEFAULT 'storing',
+                  claim_token VARCHAR(32) NULL,
+                  body MEDIUMTEXT NULL,
+                  claimed_at DATETIME NOT NULL,
+                  updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                  KEY idx_updated (updated_at)
+                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+                """
+            )
+            try:
+                await conn.commit()
+            except Exception:
+                pass
+
 
 class ChatMessage(BaseModel):
     role: Literal["user", "assistant", "system"]
@@ -36,21 +88,9 @@ async def send(req: ChatRequest, request: Request):
     persona_img: Optional[str] = None
     if req.persona_num is not None:
         try:
-            pool = await get_mysql_pool()
-            async with pool.acquire() as conn:
-                async with conn.cursor(aiomysql.DictCursor) as cur:
-                    await cur.execute(
-                        """
-                        SELECT persona_img
-                        FROM ss_persona
-                        WHERE user_id = %s AND user_persona_num = %s
-                        LIMIT 1
-                        """,
-                        (int(user_id), int(req.persona_num)),
-                    )
-                    row = await cur.fetchone()
-                    if row and row.get("persona_img"):
-                        persona_img = row["persona_img"]
+            row = await get_persona(int(user_id), int(req.persona_num))
+            if row and row.get("persona_img"):
+                persona_img = row["persona_img"]
         except Exception as e:
             log.warning("persona lookup failed: %s", e)
 
@@ -58,7 +98,7 @@ async def send(req: ChatRequest, request: Request):
     try:
         if persona_img and not persona_img.lower().startswith("http") and not persona_img.startswith("data:") and not persona_img.startswith("/"):
             if s3_enabled():
-                persona_img = presign_get_url(persona_img)
+                persona_img = await apresign_get_url(persona_img)
     except Exception as _e:
         log.warning("persona_img presign failed: %s", _e)
 
@@ -107,42 +147,22 @@ class ChatImageRequest(BaseModel):
     ls_session_id: Optional[str] = None
     # style_img: data URI 또는 URL(선택) — 의상 유지 참고 이미지
     style_img: Optional[str] = None
+    # True면 AI 작업 큐에 등록하고 job_id만 즉시 반환(GET /api/chat/image/jobs/{job_id}로 확인)
+    async_job: bool = False
 
 
-@router.post("/image")
-async def image(req: ChatImageRequest, request: Request):
-    user_id = request.session.get("user_id") if hasattr(request, "session") else None
-    if not user_id:
-        raise HTTPException(status_code=401, detail="not_logged_in")
-
+async def _prepare_image_payload(user_id: int, req: ChatImageRequest) -> Dict[str, Any]:
+    """페르소나 조회 + AI 전송 payload 구성(동기/작업 모드 공용)."""
     # 1) 페르소나 이미지/파라미터 조회
     persona_img: Optional[str] = None
     persona_params_json: Optional[str] = None
     try:
-        pool = await get_mysql_pool()
-        async with pool.acquire() as conn:
-            async with conn.cursor(aiomysql.DictCursor) as cur:
-                await cur.execute(
-                    """
-                    SELECT persona_img, persona_parameters
-                    FROM ss_persona
-                    WHERE user_id = %s AND user_persona_num = %s
-                    LIMIT 1
-                    """,
-                    (int(user_id), int(req.persona_num)),
-                )
-                row = await cur.fetchone()
-                if not row:
-                    raise HTTPException(status_code=404, detail="persona_not_found")
-                persona_db_id = int(req.persona_num)
-                persona_img = row.get("persona_img")
-                # persona_parameters는 JSON 문자열 또는 dict일 수 있음 → 문자열로 보냄
-                pp = row.get("persona_parameters")
-                if isinstance(pp, (dict, list)):
-                    import json as _json
-                    persona_params_json = _json.dumps(pp, ensure_ascii=False)
-                else:
-                    persona_params_json = pp
+        row = await get_persona(int(user_id), int(req.persona_num))
+        if not row:
+            raise HTTPException(status_code=404, detail="persona_not_found")
+        persona_img = row.get("persona_img")
+        # persona_parameters는 캐시에서 dict로 옴 → AI에는 문자열로 보냄
+        persona_params_json = json.dumps(row.get("persona_parameters") or {}, ensure_ascii=False)
     except HTTPException:
         raise
     except Exception as e:
@@ -152,118 +172,98 @@ async def image(req: ChatImageRequest, request: Request):
     if not persona_img:
         raise HTTPException(status_code=400, detail="persona_img_missing")
 
-    # 2) AI에서 접근 가능한 URL로 정규화 + S3 키면 프리사인
-    def _normalize_persona_img(raw: str) -> str:
-        try:
-            if raw.startswith("data:"):
-                return raw
-            if raw.startswith("/"):
-                base = (os.getenv("BACKEND_INTERNAL_URL") or "http://backend:8000").rstrip("/")
-                return f"{base}{raw}"
-            if raw.startswith("http://localhost") or raw.startswith("http://127.0.0.1"):
-                # 호스트만 backend로 교체
-                p = urlparse(raw)
-                repl = p._replace(netloc="backend:8000")
-                return urlunparse(repl)
-            # 그 외(http/https, /media가 아닌 경우) → S3 키로 보고 프리사인 시도
-            if s3_enabled():
-                return presign_get_url(raw)
-            return raw
-        except Exception:
-            return raw
-
-    persona_img_norm = _normalize_persona_img(persona_img)
+    persona_img_norm = await _normalize_persona_img(persona_img)
     if persona_img_norm != persona_img:
         log.info("persona_img normalized: %s -> %s", persona_img, persona_img_norm)
 
-    ai_url = (os.getenv("AI_SERVICE_URL") or "http://localhost:8600").rstrip("/")
-    # 전송: POST {ai}/chat/image
     # payload: { user_text, persona_img, persona(JSON str), ls_session_id?, style_img? }
-    payload = {
+    return {
         "user_text": req.user_text,
         "persona_img": persona_img_norm,
         "persona": persona_params_json or "",
         "ls_session_id": req.ls_session_id,
         "style_img": req.style_img,
     }
-    log.info("/chat/image forwarding -> user_id=%s persona_num=%s", user_id, req.persona_num)
+
+
+async def _normalize_persona_img(raw: str) -> str:
+    """AI에서 접근 가능한 URL로 정규화 + S3 키면 프리사인"""
     try:
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            r = await client.post(f"{ai_url}/chat/image", json=payload)
-    except Exception as e:
-        raise HTTPException(status_code=502, detail=f"ai_delegate_error: {e}")
+        if raw.startswith("data:"):
+            return raw
+        if raw.startswith("/"):
+            base = (os.getenv("BACKEND_INTERNAL_URL") or "http://backend:8000").rstrip("/")
+            return f"{base}{raw}"
+        if raw.startswith("http://localhost") or raw.startswith("http://127.0.0.1"):
+            # 호스트만 backend로 교체
+            p = urlparse(raw)
+            repl = p._replace(netloc="backend:8000")
+            return urlunparse(repl)
+        # 그 외(http/https, /media가 아닌 경우) → S3 키로 보고 프리사인 시도
+        if s3_enabled():
+            return await apresign_get_url(raw)
+        return raw
+    except Exception:
+        return raw
+
+
+def _ai_failed(r: httpx.Response) -> HTTPException:
+    # return AI body for easier debugging in frontend
+    detail = None
+    try:
+        detail = r.json()
+    except Exception:
+        detail = r.text
+    return HTTPException(status_code=502, detail={"ai_failed": True, "status": r.status_code, "body": detail})
+
+
+def _chat_key_prefix(user_id: int, persona_db_id: int) -> str:
+    # 키 경로: chat/{user_id}/{persona_id}
+    return f"chat/{int(user_id)}/{int(persona_db_id)}"
+
+
+async def _record_stored_image(
+    user_id: int, persona_db_id: int, key: str, prompt: str = "", size: Optional[int] = None, mime: Optional[str] = None
+) -> Dict[str, Any]:
+    """이미 버킷에 올라간 키를 ss_chat_img에 기록하고 프리사인 URL로 응답을 구성"""
+    url = await apresign_get_url(key)
+    chat_id = await _insert_chat_img(user_id, persona_db_id, key)
+    schedule_derivatives(key)
+    return {
+        "ok": True,
+        "prompt": prompt,
+        "image": url,
+        "stored": {"key": key, "url": url, "id": chat_id, "size": size, "mime": mime},
+    }
 
-    if r.status_code != 200:
-        # return AI body for easier debugging in frontend
-        detail = None
-        try:
-            detail = r.json()
-        except Exception:
-            detail = r.text
-        raise HTTPException(status_code=502, detail={"ai_failed": True, "status": r.status_code, "body": detail})
-    ai_json = r.json()
 
-    # 3) 이미지 파일 저장(+ DB 기록) — S3(chat/{user_id}/{persona_id})에 저장하고 ss_chat_img에 기록
+async def _store_chat_image(user_id: int, persona_db_id: int, ai_json: Any) -> Dict[str, Any]:
+    """이미지 파일 저장(+ DB 기록) — S3(chat/{user_id}/{persona_id})에 저장하고 ss_chat_img에 기록"""
+    # direct 모드: AI가 이미 업로드했으면 키만 기록
+    if isinstance(ai_json, dict) and ai_json.get("key") and not ai_json.get("image"):
+        key = str(ai_json["key"])
+        if not key.startswith(_chat_key_prefix(user_id, persona_db_id) + "/"):
+            raise HTTPException(status_code=502, detail="ai_invalid_key")
+        return await _record_stored_image(
+            user_id, persona_db_id, key, ai_json.get("prompt") or "", ai_json.get("size"), ai_json.get("mime")
+        )
     stored = None
     try:
         img_str = ai_json.get("image") if isinstance(ai_json, dict) else None
         if isinstance(img_str, str) and img_str.startswith("data:"):
             if not s3_enabled():
                 raise HTTPException(status_code=400, detail="s3_not_configured")
-            # 키 경로: chat/{user_id}/{persona_id}
-            key = put_data_uri(
+            key = await aput_data_uri(
                 img_str,
                 model=None,
-                key_prefix=f"chat/{int(user_id)}/{int(persona_db_id)}",
+                key_prefix=_chat_key_prefix(user_id, persona_db_id),
                 base_prefix="",
                 include_model=False,
                 include_date=False,
             )
-            url = presign_get_url(key)
-
-            # DB 기록: ss_chat_img(img_id PK auto, user_id, persona_id, img_key, created_at)
-            chat_id = None
-            try:
-                pool = await get_mysql_pool()
-                async with pool.acquire() as conn:
-                    async with conn.cursor() as cur:
-                        inserted = False
-                        # 1차 시도: 최신 컬럼(img_key)
-                        try:
-                            await cur.execute(
-                                """
-                                INSERT INTO ss_chat_img (user_id, persona_id, img_key)
-                                VALUES (%s, %s, %s)
-                                """,
-                                (int(user_id), int(persona_db_id), key),
-                            )
-                            inserted = True
-                        except Exception as _ie:
-                            # 2차 시도: 구 스키마(persona_chat_img)
-                            try:
-                                await cur.execute(
-                                    """
-                                    INSERT INTO ss_chat_img (user_id, persona_id, persona_chat_img)
-                                    VALUES (%s, %s, %s)
-                                    """,
-                                    (int(user_id), int(persona_db_id), key),
-                                )
-                                inserted = True
-                            except Exception as _ie2:
-                                log.warning("ss_chat_img insert failed (both schemas): %s / %s", _ie, _ie2)
-                        if inserted:
-                            try:
-                                await conn.commit()
-                            except Exception:
-                                pass
-                            try:
-                                chat_id = cur.lastrowid
-                            except Exception:
-                                chat_id = None
-            except Exception as _e:
-                log.warning("ss_chat_img insert outer failed: %s", _e)
-                chat_id = None
-
+            url = await apresign_get_url(key)
+            chat_id = await _insert_chat_img(int(user_id), int(persona_db_id), key)
+            schedule_derivatives(key)
             stored = {"key": key, "url": url, "id": chat_id}
     except HTTPException:
         raise
@@ -277,17 +277,379 @@ async def image(req: ChatImageRequest, request: Request):
     return {"ok": True, "image": ai_json, "stored": stored}
 
 
+async def _insert_chat_img(user_id: int, persona_db_id: int, key: str) -> Optional[int]:
+    """DB 기록: ss_chat_img(img_id PK auto, user_id, persona_id, img_key, created_at)"""
+    chat_id = None
+    try:
+        pool = await get_mysql_pool()
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                inserted = False
+                # 1차 시도: 최신 컬럼(img_key)
+                try:
+                    await cur.execute(
+                        """
+                        INSERT INTO ss_chat_img (user_id, persona_id, img_key)
+                        VALUES (%s, %s, %s)
+                        """,
+                        (user_id, persona_db_id, key),
+                    )
+                    inserted = True
+                except Exception as _ie:
+                    # 2차 시도: 구 스키마(persona_chat_img)
+                    try:
+                        await cur.execute(
+                            """
+                            INSERT INTO ss_chat_img (user_id, persona_id, persona_chat_img)
+                            VALUES (%s, %s, %s)
+                            """,
+                            (user_id, persona_db_id, key),
+                        )
+                        inserted = True
+                    except Exception as _ie2:
+                        log.warning("ss_chat_img insert failed (both schemas): %s / %s", _ie, _ie2)
+                if inserted:
+                    try:
+                        await conn.commit()
+                    except Exception:
+                        pass
+                    try:
+                        chat_id = cur.lastrowid
+                    except Exception:
+                        chat_id = None
+    except Exception as _e:
+        log.warning("ss_chat_img insert outer failed: %s", _e)
+        chat_id = None
+    return chat_id
+
+
+@router.post("/image")
+async def image(req: ChatImageRequest, request: Request):
+    user_id = request.session.get("user_id") if hasattr(request, "session") else None
+    if not user_id:
+        raise HTTPException(status_code=401, detail="not_logged_in")
+
+    payload = await _prepare_image_payload(int(user_id), req)
+    ai_url = _ai_url()
+    if s3_enabled() and not local_storage_enabled() and AI_IMAGE_TRANSPORT == "direct":
+        # AI가 chat/{user_id}/{persona_num} 아래로 직접 업로드 → 응답엔 키/크기/타입만
+        payload["store_prefix"] = _chat_key_prefix(int(user_id), int(req.persona_num))
+
+    # 작업 모드: AI에 등록만 하고 즉시 job_id 반환(결과는 GET /api/chat/image/jobs/{id})
+    if req.async_job:
+        log.info("/chat/image enqueue -> user_id=%s persona_num=%s", user_id, req.persona_num)
+        body = {**payload, "meta": {"user_id": int(user_id), "persona_num": int(req.persona_num)}}
+        try:
+            async with httpx.AsyncClient(timeout=10.0) as client:
+                r = await client.post(f"{ai_url}/chat/image/jobs", json=body)
+        except Exception as e:
+            raise HTTPException(status_code=502, detail=f"ai_delegate_error: {e}")
+        if r.status_code == 429:
+            raise HTTPException(status_code=429, detail="ai_job_queue_full")
+        if r.status_code not in (200, 202):
+            raise _ai_failed(r)
+        j = r.json() or {}
+        return {"ok": True, "job_id": j.get("job_id"), "status": j.get("status")}
+
+    # 전송: POST {ai}/chat/image
+    log.info("/chat/image forwarding -> user_id=%s persona_num=%s", user_id, req.persona_num)
+    if s3_enabled() and AI_IMAGE_TRANSPORT == "binary":
+        return await _image_binary(int(user_id), int(req.persona_num), ai_url, payload)
+    try:
+        async with httpx.AsyncClient(timeout=60.0) as client:
+            r = await client.post(f"{ai_url}/chat/image", json=payload)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"ai_delegate_error: {e}")
+
+    if r.status_code != 200:
+        raise _ai_failed(r)
+    return await _store_chat_image(int(user_id), int(req.persona_num), r.json())
+
+
+async def _image_binary(user_id: int, persona_db_id: int, ai_url: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """바이너리 전송: AI 응답 바이트를 임시 버퍼로 받아 그대로 S3에 올립니다(data URI/base64 없음).
+
+    응답 image에는 data URI 대신 프리사인 URL이 들어갑니다. 구버전 AI가 JSON으로 답하면 기존 경로로 처리.
+    """
+    try:
+        async with httpx.AsyncClient(timeout=60.0) as client:
+            async with client.stream(
+                "POST", f"{ai_url}/chat/image", params={"format": "binary"}, json=payload
+            ) as r:
+                if r.status_code != 200:
+                    await r.aread()
+                    raise _ai_failed(r)
+                ctype = (r.headers.get("content-type") or "").split(";")[0].strip().lower()
+                if ctype == "application/json":
+                    await r.aread()
+                    return await _store_chat_image(user_id, persona_db_id, r.json())
+                prompt = unquote(r.headers.get("x-image-prompt") or "")
+                buf = tempfile.SpooledTemporaryFile(max_size=AI_IMAGE_SPOOL_BYTES)
+                size = 0
+                async for chunk in r.aiter_bytes():
+                    size += len(chunk)
+                    if size > AI_IMAGE_MAX_BYTES:
+                        buf.close()
+                        raise HTTPException(status_code=502, detail="ai_image_too_large")
+                    buf.write(chunk)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"ai_delegate_error: {e}")
+
+    try:
+        if size == 0:
+            raise HTTPException(status_code=502, detail="image_not_returned")
+        buf.seek(0)
+        key = await aput_fileobj(
+            buf,
+            ctype or "image/png",
+            model=None,
+            key_prefix=_chat_key_prefix(user_id, persona_db_id),
+            base_prefix="",
+            include_model=False,
+            include_date=False,
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        log.warning("image store failed: %s", e)
+        raise HTTPException(status_code=500, detail="image_store_failed")
+    finally:
+        buf.close()
+    return await _record_stored_image(user_id, persona_db_id, key, prompt, size, ctype)
+
+
+def _ai_url() -> str:
+    return (os.getenv("AI_SERVICE_URL") or "http://localhost:8600").rstrip("/")
+
+
+async def _get_owned_job(user_id: int, job_id: str) -> Dict[str, Any]:
+    try:
+        async with httpx.AsyncClient(timeout=10.0) as client:
+            r = await client.get(f"{_ai_url()}/chat/image/jobs/{job_id}")
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"ai_delegate_error: {e}")
+    if r.status_code == 404:
+        raise HTTPException(status_code=404, detail="job_not_found")
+    if r.status_code != 200:
+        raise _ai_failed(r)
+    job = r.json() or {}
+    meta = job.get("meta") or {}
+    # 다른 사용자의 작업은 존재하지 않는 것으로 취급
+    if int(meta.get("user_id") or 0) != int(user_id):
+        raise HTTPException(status_code=404, detail="job_not_found")
+    return job
+
+
+async def _job_record(job_id: str) -> Optional[Dict[str, Any]]:
+    """저장 선점/완료 기록: {"user_id", "status": storing|done, "body", "stale"} 또는 None."""
+    pool = await get_mysql_pool()
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                """
+                SELECT user_id, status, body, claimed_at < UTC_TIMESTAMP() - INTERVAL %s SECOND
+                FROM ss_chat_image_job WHERE job_id=%s
+                """,
+                (CHAT_IMAGE_JOB_STORE_TIMEOUT, job_id),
+            )
+            row = await cur.fetchone()
+    if not row:
+        return None
+    body = None
+    if row[2]:
+        try:
+            body = json.loads(row[2])
+        except ValueError:
+            body = None
+    return {"user_id": int(row[0]), "status": str(row[1]), "body": body, "stale": bool(row[3])}
+
+
+async def _claim_job(job_id: str, user_id: int) -> Optional[str]:
+    """작업 결과 저장을 원자적으로 선점. 다른 조회(다른 워커 포함)가 이미 잡았으면 None."""
+    token = secrets.token_hex(8)
+    pool = await get_mysql_pool()
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                """
+                INSERT IGNORE INTO ss_chat_image_job (job_id, user_id, status, claim_token, claimed_at)
+                VALUES (%s, %s, 'storing', %s, UTC_TIMESTAMP())
+                """,
+                (job_id, int(user_id), token),
+            )
+            claimed = bool(cur.rowcount)
+            if not claimed:
+                # 저장 중 죽은 선점은 만료 후 가져감
+                await cur.execute(
+                    """
+                    UPDATE ss_chat_image_job SET claim_token=%s, claimed_at=UTC_TIMESTAMP()
+                    WHERE job_id=%s AND status='storing'
+                      AND claimed_at < UTC_TIMESTAMP() - INTERVAL %s SECOND
+                    """,
+                    (token, job_id, CHAT_IMAGE_JOB_STORE_TIMEOUT),
+                )
+                claimed = bool(cur.rowcount)
+        await conn.commit()
+    return token if claimed else None
+
+
+async def _finish_job(job_id: str, token: str, body: Dict[str, Any]) -> None:
+    global _last_job_purge
+    record = dict(body)
+    stored = record.get("stored")
+    # 저장된 이미지의 data URI 사본은 기록하지 않음(재조회 시 키로 URL을 다시 발급)
+    if isinstance(record.get("image"), str) and record["image"].startswith("data:") and isinstance(stored, dict) and stored.get("url"):
+        record["image"] = stored["url"]
+    pool = await get_mysql_pool()
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                """
+                UPDATE ss_chat_image_job SET status='done', body=%s, claim_token=NULL
+                WHERE job_id=%s AND claim_token=%s
+                """,
+                (json.dumps(record, ensure_ascii=False, default=str), job_id, token),
+            )
+            now = time.monotonic()
+            if not _last_job_purge or now - _last_job_purge > 3600:
+                _last_job_purge = now
+                await cur.execute(
+                    "DELETE FROM ss_chat_image_job WHERE updated_at < NOW() - INTERVAL %s HOUR LIMIT 1000",
+                    (CHAT_IMAGE_JOB_RETENTION_HOURS,),
+                )
+        await conn.commit()
+
+
+async def _release_job(job_id: str, token: str) -> None:
+    """저장 실패: 선점을 풀어 다음 조회가 다시 시도하게 함."""
+    try:
+        pool = await get_mysql_pool()
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(
+                    "DELETE FROM ss_chat_image_job WHERE job_id=%s AND claim_token=%s AND status='storing'",
+                    (job_id, token),
+                )
+            await conn.commit()
+    except Exception as e:
+        log.warning("image job release failed: %s", e)
+
+
+async def _stored_job_body(rec: Dict[str, Any], user_id: int) -> Dict[str, Any]:
+    if rec["user_id"] != int(user_id):
+        raise HTTPException(status_code=404, detail="job_not_found")
+    body = dict(rec["body"] or {})
+    stored = body.get("stored")
+    # 저장된 프리사인 URL은 만료될 수 있으므로 키로 다시 발급
+    if isinstance(stored, dict) and stored.get("key"):
+        try:
+            url = await apresign_get_url(str(stored["key"]))
+            body["stored"] = {**stored, "url": url}
+            if isinstance(body.get("image"), str) and not body["image"].startswith("data:"):
+                body["image"] = url
+        except Exception as e:
+            log.warning("stored job presign failed: %s", e)
+    return body
+
+
+@router.get("/image/jobs/{job_id}")
+async def image_job_status(job_id: str, request: Request):
+    """작업 모드 상태 조회. 성공 시 1회 저장(S3 + ss_chat_img) 후 동기 모드와 같은 본문을 반환.
+
+    저장은 ss_chat_image_job에 job_id로 선점(INSERT IGNORE)한 조회 하나만 수행하고,
+    겹친 조회나 다른 워커의 조회는 같은 기록에서 결과를 돌려받습니다(저장 중이면 status=storing).
+    """
+    user_id = request.session.get("user_id") if hasattr(request, "session") else None
+    if not user_id:
+        raise HTTPException(status_code=401, detail="not_logged_in")
+
+    rec = await _job_record(job_id)
+    if rec is not None and rec["status"] == "done":
+        return await _stored_job_body(rec, int(user_id))
+    if rec is not None and not rec["stale"]:
+        if rec["user_id"] != int(user_id):
+            raise HTTPException(status_code=404, detail="job_not_found")
+        return {"ok": True, "job_id": job_id, "status": "storing"}
+
+    job = await _get_owned_job(int(user_id), job_id)
+    status = job.get("status")
+    if status != "succeeded":
+        out: Dict[str, Any] = {"ok": status not in ("failed", "cancelled"), "job_id": job_id, "status": status}
+        if job.get("error") is not None:
+            out["error"] = job.get("error")
+        return out
+
+    token = await _claim_job(job_id, int(user_id))
+    if token is None:
+        rec = await _job_record(job_id)
+        if rec is not None and rec["status"] == "done":
+            return await _stored_job_body(rec, int(user_id))
+        return {"ok": True, "job_id": job_id, "status": "storing"}
+
+    persona_num = int((job.get("meta") or {}).get("persona_num") or 0)
+    try:
+        body = await _store_chat_image(int(user_id), persona_num, job.get("result") or {})
+    except BaseException:
+        await _release_job(job_id, token)
+        raise
+    if not (isinstance(body, dict) and body.get("stored")):
+        # 업로드 실패: data URI 본문을 기록하지 않고 선점만 풀어 다음 조회가 다시 저장
+        await _release_job(job_id, token)
+        raise HTTPException(status_code=502, detail="image_store_failed")
+    body.update({"job_id": job_id, "status": status})
+    try:
+        await _finish_job(job_id, token, body)
+    except Exception as e:
+        # 기록 실패: AI 쪽 작업을 남겨 두어 선점 만료 후 다시 저장할 수 있게 함
+        log.warning("image job record failed: %s", e)
+        return body
+    # 저장 기록이 남았으므로 AI 쪽 결과(data URI)는 즉시 해제
+    try:
+        async with httpx.AsyncClient(timeout=5.0) as client:
+            await client.delete(f"{_ai_url()}/chat/image/jobs/{job_id}")
+    except Exception:
+        pass
+    return body
+
+
+@router.delete("/image/jobs/{job_id}")
+async def image_job_cancel(job_id: str, request: Request):
+    user_id = request.session.get("user_id") if hasattr(request, "session") else None
+    if not user_id:
+        raise HTTPException(status_code=401, detail="not_logged_in")
+    await _get_owned_job(int(user_id), job_id)
+    try:
+        async with httpx.AsyncClient(timeout=10.0) as client:
+            r = await client.delete(f"{_ai_url()}/chat/image/jobs/{job_id}")
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"ai_delegate_error: {e}")
+    if r.status_code != 200:
+        raise _ai_failed(r)
+    return r.json()
+
+
 @router.get("/gallery")
-async def list_gallery(request: Request, persona_num: Optional[int] = None, limit: int = 60, offset: int = 0):
+async def list_gallery(
+    request: Request,
+    persona_num: Optional[int] = None,
+    limit: int = 60,
+    offset: int = 0,
+    size: Optional[str] = None,
+):
     """현재 로그인 사용자의 채팅 생성 이미지 갤러리 목록을 반환.
 
     - 기본 정렬: 최신순(img_id DESC)
     - persona_num이 있으면 해당 페르소나로 필터링
     - 반환 시 persona_chat_img가 S3 키면 프리사인 URL로 변환하여 url 필드에 넣어줌
+    - size=thumb|mid 이면 url은 WebP 파생본(아직 없으면 원본, 생성은 백그라운드 예약)
     """
     user_id = request.session.get("user_id") if hasattr(request, "session") else None
     if not user_id:
         raise HTTPException(status_code=401, detail="not_logged_in")
+    if size is not None and size not in DERIVATIVE_SIZES:
+        raise HTTPException(status_code=400, detail="invalid_size")
 
     try:
         persona_db_id = None
@@ -355,15 +717,24 @@ async def list_gallery(request: Request, persona_num: Optional[int] = None, limi
                         # 운영 DB 권한/스키마 문제로 테이블이 없거나 조회 실패 시 빈 목록 반환
                         log.warning("gallery select failed on both schemas; returning empty. err1=%s err2=%s", _se, _se2)
                         rows = []
+        # 목록의 S3 키를 한 번에 프리사인(캐시 재사용, 실패한 키는 원본 유지)
+        presigned = {}
+        if s3_enabled():
+            s3_keys = [
+                k for k in ((r.get("img_key") or "") for r in rows)
+                if k and not k.lower().startswith("http") and not k.startswith("/")
+            ]
+            try:
+                if size:
+                    presigned = await derivative_urls(s3_keys, size)
+                missing = [k for k in s3_keys if k not in presigned]
+                if missing:
+                    presigned.update(await apresign_many(missing))
+            except Exception as _pe:
+                log.warning("gallery presign failed: %s", _pe)
         for r in rows:
             key = r.get("img_key") or ""
-            url = key
-            if key and not key.lower().startswith("http") and not key.startswith("/"):
-                try:
-                    if s3_enabled():
-                        url = presign_get_url(key)
-                except Exception:
-                    url = key
+            url = presigned.get(key) or key
             # created_at이 문자열로 반환되는 운영 DB 대비
             ca = r.get("created_at")
             if ca:
@@ -399,6 +770,7 @@ async def delete_gallery_item(request: Request, img_id: int):
         raise HTTPException(status_code=401, detail="not_logged_in")
 
     key: Optional[str] = None
+    shared = False
     # Look up the row to get key and ensure ownership
     try:
         pool = await get_mysql_pool()
@@ -440,13 +812,22 @@ async def delete_gallery_item(request: Request, img_id: int):
                     await conn.commit()
                 except Exception:
                     pass
+                # 콘텐츠 주소 키는 여러 행이 같은 객체를 가리킬 수 있음 → 남은 참조가 있으면 객체 유지
+                if key:
+                    try:
+                        await cur2.execute("SELECT 1 FROM ss_chat_img WHERE img_key=%s LIMIT 1", (key,))
+                    except Exception:
+                        await cur2.execute("SELECT 1 FROM ss_chat_img WHERE persona_chat_img=%s LIMIT 1", (key,))
+                    shared = bool(await cur2.fetchone())
     except Exception as e:
         log.warning("delete_gallery lookup/delete failed: %s", e)
 
     # Attempt to delete S3 object if key looks like one
     try:
-        if key and not key.lower().startswith("http") and not key.startswith("/"):
-            delete_object(key)
+        if key and not shared and not key.lower().startswith("http") and not key.startswith("/"):
+            # 원본 + 파생본을 DeleteObjects 한 번으로 삭제
+            await adelete_objects([key, *derivative_keys(key)])
+            forget_derivatives(key)
     except Exception:
         pass
     return {"ok": True}
@@ -3,7 +3,9 @@ import os
 from typing import Optional
 from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
-from app.core.s3 import s3_enabled, put_data_uri, presign_get_url
+from app.core.s3 import s3_enabled, aput_data_uri, aput_fileobj, apresign_get_url
+from app.core.uploads import read_image_upload
+from app.api.routes.images import _current_user_id
 
 # 파트: 파일/URL 유틸리티 — 공개 URL 보장(S3 우선)
 router = APIRouter(prefix="/api/files", tags=["files"]) 
@@ -58,7 +60,7 @@ async def ensure_public(request: Request, body: EnsurePublicBody):
         key_prefix = (
             f"chat/{int(user_id)}/{int(body.persona_num)}" if body.persona_num is not None else f"uploads/{int(user_id)}"
         )
-        key = put_data_uri(
+        key = await aput_data_uri(
             img,
             model=None,
             key_prefix=key_prefix,
@@ -66,7 +68,43 @@ async def ensure_public(request: Request, body: EnsurePublicBody):
             include_model=False,
             include_date=False,
         )
-        url = presign_get_url(key)
+        url = await apresign_get_url(key)
         return {"ok": True, "url": url, "key": key}
 
     raise HTTPException(status_code=400, detail="unsupported_image_format")
+
+
+@router.post("/upload")
+async def upload_public(request: Request, persona_num: Optional[int] = None):
+    """ensure_public의 바이너리 버전: multipart(file/image) 또는 raw image/* 본문을 S3에 올리고 프리사인 URL 반환.
+
+    base64 사본 없이 청크 단위로 스풀/업로드하며 상한은 UPLOAD_MAX_BYTES입니다.
+    """
+    if not s3_enabled():
+        raise HTTPException(status_code=400, detail="s3_not_configured")
+    user_id = _current_user_id(request)
+    if not user_id:
+        raise HTTPException(status_code=401, detail="not_authenticated")
+
+    upload = await read_image_upload(request)
+    try:
+        num = upload.fields.get("persona_num") or persona_num
+        try:
+            num = int(num) if num not in (None, "") else None
+        except ValueError:
+            raise HTTPException(status_code=422, detail="invalid_persona_num")
+        # 경로: chat/{user_id}/{persona_num} 또는 uploads/{user_id}
+        key_prefix = f"chat/{int(user_id)}/{num}" if num is not None else f"uploads/{int(user_id)}"
+        key = await aput_fileobj(
+            upload.file,
+            upload.content_type,
+            model=None,
+            key_prefix=key_prefix,
+            base_prefix="",
+            include_model=False,
+            include_date=False,
+        )
+    finally:
+        await upload.close()
+    url = await apresign_get_url(key)
+    return {"ok": True, "url": url, "key": key, "size": upload.size, "mime": upload.content_type}
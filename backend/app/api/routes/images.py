@@ -4,14 +4,17 @@ import os
 import httpx
 import logging
 import re
+from typing import Optional
 
 from app.api.schemas.images import (
     GenerateImageRequest,
     ImageSaveRequest,
     ImageUrlRequest,
 )
-from app.core.s3 import s3_enabled, put_data_uri, presign_get_url
+from app.core.s3 import s3_enabled, aput_data_uri, aput_fileobj, apresign_get_url
+from app.core.uploads import read_image_upload
 from app.api.models.persona import update_persona_img
+from app.core.derivatives import schedule_derivatives
 
 router = APIRouter(prefix="/api", tags=["images"])
 log = logging.getLogger("images")
@@ -66,7 +69,7 @@ async def save_image(body: ImageSaveRequest, request: Request):
         if not s3_enabled():
             raise HTTPException(status_code=400, detail="s3_not_configured")
 
-        key = put_data_uri(
+        key = await aput_data_uri(
             body.image,
             model=body.model,
             key_prefix=body.prefix,
@@ -74,7 +77,9 @@ async def save_image(body: ImageSaveRequest, request: Request):
             include_model=bool(body.include_model) if body.include_model is not None else True,
             include_date=bool(body.include_date) if body.include_date is not None else True,
         )
-        url = presign_get_url(key)
+        url = await apresign_get_url(key)
+        # 목록/그리드용 WebP 파생본은 백그라운드에서 생성
+        schedule_derivatives(key)
     # 선택: body.persona_num 이 있으면 ss_persona.persona_img 에 즉시 저장
         if body.persona_num:
             try:
@@ -91,7 +96,79 @@ async def save_image(body: ImageSaveRequest, request: Request):
         raise HTTPException(status_code=500, detail="save_failed")
 
 
-    
+def _current_user_id(request: Request):
+    """세션 사용자. DEV_ALLOW_DEBUG_USER=1이면 X-Debug-User-Id 헤더 허용(로컬 검증 전용)."""
+    user_id = request.session.get("user_id")
+    if not user_id and os.getenv("DEV_ALLOW_DEBUG_USER", "0") in ("1", "true", "yes"):
+        debug_uid = request.headers.get("X-Debug-User-Id")
+        if debug_uid and debug_uid.isdigit():
+            user_id = int(debug_uid)
+    return user_id
+
+
+def _flag(v, default: bool) -> bool:
+    if v is None or v == "":
+        return default
+    return str(v).strip().lower() in ("1", "true", "yes")
+
+
+@router.post("/images/upload", summary="이미지 바이너리 저장(multipart/raw)")
+async def upload_image(
+    request: Request,
+    model: Optional[str] = None,
+    prefix: Optional[str] = None,
+    base_prefix: Optional[str] = None,
+    include_model: Optional[bool] = None,
+    include_date: Optional[bool] = None,
+    persona_num: Optional[int] = None,
+):
+    """/images/save의 바이너리 버전.
+
+    본문: multipart/form-data(file 또는 image 필드) 또는 raw image/* 바이트.
+    옵션은 쿼리 파라미터(또는 multipart 텍스트 필드)로 /images/save와 같은 의미입니다.
+    data URI/base64 변환 없이 스풀 파일을 그대로 S3로 업로드합니다(상한: UPLOAD_MAX_BYTES).
+    """
+    user_id = _current_user_id(request)
+    if not user_id:
+        raise HTTPException(status_code=401, detail="not_authenticated")
+    if not s3_enabled():
+        raise HTTPException(status_code=400, detail="s3_not_configured")
+
+    upload = await read_image_upload(request)
+    try:
+        f = upload.fields
+        persona = f.get("persona_num") or persona_num
+        try:
+            persona = int(persona) if persona not in (None, "") else None
+        except ValueError:
+            raise HTTPException(status_code=422, detail="invalid_persona_num")
+        key = await aput_fileobj(
+            upload.file,
+            upload.content_type,
+            model=f.get("model") or model,
+            key_prefix=f.get("prefix") or prefix,
+            base_prefix=f.get("base_prefix", base_prefix),
+            include_model=_flag(f.get("include_model", include_model), True),
+            include_date=_flag(f.get("include_date", include_date), True),
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="invalid_prefix")
+    except HTTPException:
+        raise
+    except Exception as e:
+        log.warning("failed to upload image: %s", e)
+        raise HTTPException(status_code=500, detail="save_failed")
+    finally:
+        await upload.close()
+
+    url = await apresign_get_url(key)
+    schedule_derivatives(key)
+    if persona:
+        try:
+            await update_persona_img(int(user_id), int(persona), key)
+        except Exception as _e:
+            log.warning("failed to update persona_img: %s", _e)
+    return {"ok": True, "key": key, "url": url, "size": upload.size, "mime": upload.content_type}
 
 
 @router.post("/images/url", summary="S3 오브젝트 URL 재발급(프리사인)")
@@ -103,7 +180,7 @@ async def renew_image_url(req: ImageUrlRequest):
     try:
         if not s3_enabled():
             raise HTTPException(status_code=400, detail="s3_not_configured")
-        url = presign_get_url(req.key)
+        url = await apresign_get_url(req.key)
         return {"ok": True, "key": req.key, "url": url}
     except HTTPException:
         raise
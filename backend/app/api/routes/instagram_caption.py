@@ -3,11 +3,9 @@ from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel, Field
 from typing import Optional
 import os
-import json
 import httpx
-import aiomysql
 
-from app.api.core.mysql import get_mysql_pool
+from app.api.models.persona import get_persona
 
 router = APIRouter(prefix="/api/instagram", tags=["instagram"])
 
@@ -45,46 +43,30 @@ async def caption_draft(request: Request, body: CaptionDraftBody):
     # Load persona parameters to extract personality
     personality: str = ""  # MBTI 타입(ex: ISTJ)
     try:
-        pool = await get_mysql_pool()
-        async with pool.acquire() as conn:
-            async with conn.cursor(aiomysql.DictCursor) as cur:
-                await cur.execute(
-                    """
-                    SELECT persona_parameters
-                    FROM ss_persona
-                    WHERE user_id=%s AND user_persona_num=%s
-                    LIMIT 1
-                    """,
-                    (int(uid), int(body.persona_num)),
-                )
-                row = await cur.fetchone()
-                if row:
-                    pp_raw = row.get("persona_parameters")
-                    try:
-                        pp = json.loads(pp_raw) if isinstance(pp_raw, str) else (pp_raw or {})
-                    except Exception:
-                        pp = {}
-                    # 우선순위: MBTI 전용 키
-                    for key in ("mbti", "MBTI", "mbti_type", "personality_mbti"):
-                        val = pp.get(key) if isinstance(pp, dict) else None
-                        if isinstance(val, str) and val.strip():
-                            personality = val.strip()
+        row = await get_persona(int(uid), int(body.persona_num))
+        if row:
+            pp = row.get("persona_parameters") or {}
+            # 우선순위: MBTI 전용 키
+            for key in ("mbti", "MBTI", "mbti_type", "personality_mbti"):
+                val = pp.get(key)
+                if isinstance(val, str) and val.strip():
+                    personality = val.strip()
+                    break
+            # 보조: 기존 personality/tone/style/voice 중 MBTI 패턴(예: INFP)
+            if not personality and isinstance(pp, dict):
+                import re as _re
+                for key in ("personality", "tone", "style", "voice"):
+                    val = pp.get(key)
+                    if isinstance(val, str) and val.strip():
+                        s = val.strip().upper()
+                        if _re.match(r"^[E|I][N|S][F|T][P|J]$", s):
+                            personality = s
                             break
-                    # 보조: 기존 personality/tone/style/voice 중 MBTI 패턴(예: INFP)
-                    if not personality and isinstance(pp, dict):
-                        import re as _re
-                        for key in ("personality", "tone", "style", "voice"):
-                            val = pp.get(key)
-                            if isinstance(val, str) and val.strip():
-                                s = val.strip().upper()
-                                if _re.match(r"^[E|I][N|S][F|T][P|J]$", s):
-                                    personality = s
-                                    break
-                    if not personality:
-                        igp = (pp.get("instagram") or {}) if isinstance(pp, dict) else {}
-                        val = igp.get("personality") or igp.get("tone")
-                        if isinstance(val, str) and val.strip():
-                            personality = val.strip()
+            if not personality:
+                igp = (pp.get("instagram") or {}) if isinstance(pp, dict) else {}
+                val = igp.get("personality") or igp.get("tone")
+                if isinstance(val, str) and val.strip():
+                    personality = val.strip()
     except Exception:
         # Non-fatal: continue with empty personality
         pass
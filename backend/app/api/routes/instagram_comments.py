@@ -1,4 +1,5 @@
 from __future__ import annotations
+import asyncio
 import os
 from typing import Any, Dict, List, Optional, Tuple
 
@@ -12,111 +13,192 @@ from .oauth_instagram import (
     _require_login,               # 세션에서 user_id 확인
     _get_persona_token,           # 페르소나별 long-lived user token 조회
     _get_persona_instagram_mapping,  # ss_persona에 저장된 IG 매핑(ig_user_id/fb_page_id)
+    _get_persona_tokens,          # 여러 페르소나 토큰 일괄 조회
+    _mapping_from_persona_row,
+    _invalidate_token,            # Graph 190(토큰 무효) 시 토큰 캐시 제거
+    _is_token_error,
 )
 from app.api.models.persona import get_user_personas as _get_user_personas
-from app.core.s3 import s3_enabled, presign_get_url
+from app.core.s3 import s3_enabled, apresign_many, stored_image_key
+from app.api.core import ig_webhooks, posts_sync
+from app.api.core.graph import GraphClient, graph_session
 from app.api.core.mysql import get_mysql_pool
 import aiomysql
-from datetime import datetime, timedelta
 
 
 router = APIRouter(prefix="/api/instagram", tags=["instagram"])
 log = logging.getLogger("instagram_comments")
 
 
+_COMMENT_FIELDS = "id,text,username,timestamp,like_count"
+_MEDIA_FIELDS = "id,caption,permalink,media_type,media_url,thumbnail_url,timestamp"
+# expand: /media 1회 호출에 comments.limit(N){...} 필드 확장 사용(기본)
+# per_media: 미디어별 /{media_id}/comments 개별 호출
+COMMENTS_FETCH_MODE = (os.getenv("IG_COMMENTS_FETCH_MODE") or "expand").strip().lower()
+# per_media 호출(폴백 포함) 동시 실행 상한
+COMMENTS_FETCH_CONCURRENCY = max(1, int(os.getenv("IG_COMMENTS_FETCH_CONCURRENCY", "5")))
+
+
+def _normalize_comments(comments: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "id": c.get("id"),
+            "text": c.get("text"),
+            "username": c.get("username"),
+            "timestamp": c.get("timestamp"),
+            "like_count": c.get("like_count"),
+        }
+        for c in comments
+        if c.get("id")
+    ]
+
+
+def _media_item(m: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "media_id": m.get("id"),
+        "caption": m.get("caption"),
+        "permalink": m.get("permalink"),
+        "media_type": m.get("media_type"),
+        "media_url": m.get("media_url"),
+        "thumbnail_url": m.get("thumbnail_url"),
+        "timestamp": m.get("timestamp"),
+        "comments": [],
+    }
+
+
+def _error_body(r: httpx.Response) -> Any:
+    try:
+        return r.json()
+    except Exception:
+        return {"text": r.text}
+
+
+async def _fetch_comments_per_media(
+    client: GraphClient,
+    items: List[Dict[str, Any]],
+    access_token: str,
+    comments_limit: int,
+    debug_info: Optional[Dict[str, Any]],
+    return_debug: bool,
+) -> Optional[Dict[str, Any]]:
+    """items 각각의 댓글을 /{media_id}/comments로 동시에(상한 적용) 채웁니다."""
+    sem = asyncio.Semaphore(COMMENTS_FETCH_CONCURRENCY)
+
+    async def one(item: Dict[str, Any]):
+        async with sem:
+            return await client.get(
+                f"{IG_GRAPH}/{item['media_id']}/comments",
+                params={
+                    "access_token": access_token,
+                    # username/text/timestamp/like_count 정도만 사용 (일반 코멘터의 프로필 이미지/ID는 제공되지 않음)
+                    "fields": _COMMENT_FIELDS,
+                    "limit": max(1, int(comments_limit)),
+                },
+            )
+
+    responses = await asyncio.gather(*(one(it) for it in items))
+    for item, cr in zip(items, responses):
+        if cr.status_code == 200:
+            item["comments"] = _normalize_comments((cr.json() or {}).get("data") or [])
+            continue
+        cbody = _error_body(cr)
+        log.warning("IG comments fetch failed: media_id=%s status=%s body=%s", item["media_id"], cr.status_code, cbody)
+        if return_debug:
+            if debug_info is None:
+                debug_info = {}
+            debug_info.setdefault("comments", []).append({
+                "media_id": item["media_id"],
+                "status": cr.status_code,
+                "body": cbody,
+            })
+    return debug_info
+
+
 async def _fetch_recent_media_and_comments(
-    client: httpx.AsyncClient,
+    client: GraphClient,
     ig_user_id: str,
     access_token: str,
     media_limit: int = 5,
     comments_limit: int = 10,
     return_debug: bool = False,
+    mode: Optional[str] = None,
 ) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
     """지정 IG 사용자에 대한 최근 미디어와 각 미디어의 최신 댓글 수집.
 
+    mode="expand"(기본)는 comments.limit(N){...} 필드 확장으로 1회 호출에 가져오고,
+    확장 결과가 잘린 미디어(댓글 엣지 누락/부족)만 미디어별 호출로 동시에 보충합니다.
+    확장 호출 자체가 실패하면 per_media 모드로 전체 재시도합니다.
+
     반환 items 요소:
     {
       "media_id", "caption", "permalink", "media_type", "media_url", "thumbnail_url", "timestamp",
       "comments": [ { "id", "text", "username", "timestamp", "like_count" } ]
     }
     """
+    mode = (mode or COMMENTS_FETCH_MODE).lower()
+    n_comments = max(1, int(comments_limit))
+    expand = mode == "expand"
+    fields = _MEDIA_FIELDS
+    if expand:
+        fields += f",comments_count,comments.limit({n_comments}){{{_COMMENT_FIELDS}}}"
     # 1) 최근 미디어 조회
-    media_items: List[Dict[str, Any]] = []
     r = await client.get(
         f"{IG_GRAPH}/{ig_user_id}/media",
         params={
             "access_token": access_token,
-            "fields": "id,caption,permalink,media_type,media_url,thumbnail_url,timestamp",
+            "fields": fields,
             "limit": max(1, int(media_limit)),
         },
     )
     debug_info: Optional[Dict[str, Any]] = None
     if r.status_code != 200:
+        body = _error_body(r)
+        if expand and not _is_token_error(body):
+            # 응답 과대(code 1 "reduce the amount of data") 등 → 미디어별 호출로 재시도
+            log.info("IG media expand fetch failed, falling back to per_media: status=%s", r.status_code)
+            return await _fetch_recent_media_and_comments(
+                client, ig_user_id, access_token, media_limit, comments_limit, return_debug, mode="per_media",
+            )
         # 미디어 접근 불가 — 상태/본문 로깅 및 디버그 수집
-        try:
-            body = r.json()
-        except Exception:
-            body = {"text": r.text}
         log.warning("IG media fetch failed: status=%s body=%s", r.status_code, body)
         if return_debug:
             debug_info = {"media_status": r.status_code, "media_body": body}
         return ([], debug_info)
     data = (r.json() or {}).get("data") or []
 
+    media_items: List[Dict[str, Any]] = []
+    pending: List[Dict[str, Any]] = []
     for m in data:
-        mid = m.get("id")
-        if not mid:
+        if not m.get("id"):
             continue
-        item = {
-            "media_id": mid,
-            "caption": m.get("caption"),
-            "permalink": m.get("permalink"),
-            "media_type": m.get("media_type"),
-            "media_url": m.get("media_url"),
-            "thumbnail_url": m.get("thumbnail_url"),
-            "timestamp": m.get("timestamp"),
-            "comments": [],
-        }
-        # 2) 각 미디어의 댓글 조회
-        cr = await client.get(
-            f"{IG_GRAPH}/{mid}/comments",
-            params={
-                "access_token": access_token,
-                # username/text/timestamp/like_count 정도만 사용 (일반 코멘터의 프로필 이미지/ID는 제공되지 않음)
-                "fields": "id,text,username,timestamp,like_count",
-                "limit": max(1, int(comments_limit)),
-            },
+        item = _media_item(m)
+        media_items.append(item)
+        if not expand:
+            pending.append(item)
+            continue
+        edge = m.get("comments")
+        got = (edge.get("data") or []) if isinstance(edge, dict) else []
+        try:
+            total = int(m.get("comments_count") or 0)
+        except Exception:
+            total = 0
+        # 확장 결과가 잘렸으면 해당 미디어만 개별 조회:
+        # 댓글이 있는데 엣지가 빠졌거나, N개 미만인데 다음 페이지가 남은 경우
+        truncated = (edge is None and total > 0) or (
+            isinstance(edge, dict)
+            and len(got) < n_comments
+            and bool((edge.get("paging") or {}).get("next"))
         )
-        comments: List[Dict[str, Any]] = []
-        if cr.status_code == 200:
-            comments = (cr.json() or {}).get("data") or []
+        if truncated:
+            pending.append(item)
         else:
-            try:
-                cbody = cr.json()
-            except Exception:
-                cbody = {"text": cr.text}
-            log.warning("IG comments fetch failed: media_id=%s status=%s body=%s", mid, cr.status_code, cbody)
-            if return_debug:
-                if debug_info is None:
-                    debug_info = {}
-                debug_info.setdefault("comments", []).append({
-                    "media_id": mid,
-                    "status": cr.status_code,
-                    "body": cbody,
-                })
-        # 정규화해서 담기
-        item["comments"] = [
-            {
-                "id": c.get("id"),
-                "text": c.get("text"),
-                "username": c.get("username"),
-                "timestamp": c.get("timestamp"),
-                "like_count": c.get("like_count"),
-            }
-            for c in comments
-            if c.get("id")
-        ]
-        media_items.append(item)
+            item["comments"] = _normalize_comments(got)
+
+    # 2) 남은 미디어의 댓글 조회(동시)
+    if pending:
+        debug_info = await _fetch_comments_per_media(
+            client, pending, access_token, n_comments, debug_info, return_debug,
+        )
     return (media_items, debug_info)
 
 
@@ -187,14 +269,18 @@ async def sync_posts(
     limit: int = 18,
     days: Optional[int] = None,
     prune_missing: bool = True,
+    full: bool = False,
 ):
-    """Fetch recent posts from Graph and upsert into DB for this persona.
+    """Incrementally sync posts from Graph into DB for this persona (app.api.core.posts_sync).
 
     Behavior:
-    - Upserts the most recent posts returned by Graph API.
-    - If `days` is provided, adds `since` to Graph query and PRUNES local cached posts within that window
-      that are not returned by Graph (handles 'deleted on Instagram' cases).
-    - If `days` is not provided and `prune_missing=True`, prunes only among the latest `limit` local rows.
+    - Follows /media paging cursors only until it passes both the persona's high-water mark
+      (newest media seen by the previous sync) and the counter refresh window.
+    - New media are inserted; media younger than `days` (default IG_POSTS_REFRESH_DAYS) get
+      like/comment counters refreshed. The first sync (or `full=true`) reads at least `limit` posts.
+    - If `prune_missing=True`, local rows inside the scanned range that Graph no longer returns
+      are deleted ('deleted on Instagram' cases).
+    - Upserts, prunes and the high-water mark are committed in one transaction.
     """
     uid = _require_login(request)
     if persona_num is None:
@@ -207,150 +293,29 @@ async def sync_posts(
     if not token:
         raise HTTPException(status_code=401, detail="persona_oauth_required")
 
+    refresh_days = int(days) if isinstance(days, int) and days > 0 else posts_sync.POSTS_REFRESH_DAYS
     try:
-        async with httpx.AsyncClient(timeout=30) as client:
-            params = {
-                "access_token": token,
-                "fields": "id,media_type,media_product_type,media_url,thumbnail_url,permalink,timestamp,caption,like_count,comments_count",
-                "limit": max(1, int(limit)),
-            }
-            if days and isinstance(days, int) and days > 0:
-                params["since"] = (datetime.utcnow() - timedelta(days=int(days))).strftime('%Y-%m-%d')
-            r = await client.get(
-                f"{IG_GRAPH}/{mapping['ig_user_id']}/media",
-                params=params,
+        async with graph_session() as client:
+            result = await posts_sync.sync_persona_posts(
+                client,
+                int(uid),
+                int(persona_num),
+                str(mapping["ig_user_id"]),
+                token,
+                limit=max(1, int(limit)),
+                refresh_days=refresh_days,
+                prune=prune_missing,
+                full=full,
             )
-        if r.status_code != 200:
-            try:
-                body = r.json()
-                err = (body or {}).get("error") or {}
-                if err.get("code") == 190:
-                    raise HTTPException(status_code=401, detail="persona_oauth_required")
-            except HTTPException:
-                raise
-            except Exception:
-                pass
-            if r.status_code == 404:
-                return {"ok": True, "synced": 0}
-            raise HTTPException(status_code=r.status_code, detail=r.text)
-
-        data = (r.json() or {}).get("data") or []
-        # Even if empty, continue to possible prune step below when days provided
-
-        pool = await get_mysql_pool()
-        async with pool.acquire() as conn:
-            async with conn.cursor() as cur:
-                upcnt = 0
-                fetched_ids: set[str] = set()
-                for m in data:
-                    mid = m.get("id")
-                    if not mid:
-                        continue
-                    try:
-                        fetched_ids.add(str(mid))
-                    except Exception:
-                        pass
-                    media_type = m.get("media_type")
-                    product_type = m.get("media_product_type")
-                    media_url = m.get("media_url")
-                    thumbnail_url = m.get("thumbnail_url")
-                    permalink = m.get("permalink")
-                    caption = m.get("caption")
-                    timestamp = m.get("timestamp")
-                    like_count = int(m.get("like_count") or 0)
-                    comments_count = int(m.get("comments_count") or 0)
-                    # Normalize timestamp to MySQL DATETIME string
-                    posted_at = None
-                    if isinstance(timestamp, str):
-                        # IG returns ISO 8601; MySQL accepts 'YYYY-MM-DD HH:MM:SS'
-                        try:
-                            dt = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
-                            posted_at = dt.strftime("%Y-%m-%d %H:%M:%S")
-                        except Exception:
-                            posted_at = None
-                    try:
-                        await cur.execute(
-                            """
-                            INSERT INTO ss_instagram_post (
-                              media_id, user_id, user_persona_num, ig_user_id,
-                              media_type, media_product_type, media_url, thumbnail_url,
-                              permalink, caption, posted_at, like_count, comments_count
-                            ) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-                            ON DUPLICATE KEY UPDATE
-                              media_type=VALUES(media_type),
-                              media_product_type=VALUES(media_product_type),
-                              media_url=VALUES(media_url),
-                              thumbnail_url=VALUES(thumbnail_url),
-                              permalink=VALUES(permalink),
-                              caption=VALUES(caption),
-                              posted_at=VALUES(posted_at),
-                              like_count=GREATEST(VALUES(like_count), like_count),
-                              comments_count=GREATEST(VALUES(comments_count), comments_count),
-                              updated_at=CURRENT_TIMESTAMP
-                            """,
-                            (
-                                str(mid), int(uid), int(persona_num), str(mapping["ig_user_id"]),
-                                media_type, product_type, media_url, thumbnail_url,
-                                permalink, caption, posted_at, like_count, comments_count,
-                            ),
-                        )
-                        upcnt += 1
-                    except Exception:
-                        # Continue on individual failure
-                        pass
-                pruned = 0
-                if prune_missing:
-                    try:
-                        if days and isinstance(days, int) and days > 0:
-                            # Prune within the since window: rows not in fetched_ids
-                            since_dt = (datetime.utcnow() - timedelta(days=int(days)))
-                            since_str = since_dt.strftime("%Y-%m-%d %H:%M:%S")
-                            # Collect local ids in window
-                            await cur.execute(
-                                """
-                                SELECT media_id FROM ss_instagram_post
-                                WHERE user_id=%s AND user_persona_num=%s AND (posted_at IS NULL OR posted_at >= %s)
-                                """,
-                                (int(uid), int(persona_num), since_str),
-                            )
-                            rows = await cur.fetchall() or []
-                            local_ids = {str(r[0]) if not isinstance(r, dict) else str(r.get('media_id')) for r in rows}
-                            to_delete = [i for i in local_ids if i and i not in fetched_ids]
-                            if to_delete:
-                                ph = ",".join(["%s"] * len(to_delete))
-                                await cur.execute(
-                                    f"DELETE FROM ss_instagram_post WHERE user_id=%s AND user_persona_num=%s AND media_id IN ({ph})",
-                                    (int(uid), int(persona_num), *to_delete),
-                                )
-                                pruned = cur.rowcount or 0
-                        else:
-                            # No days: prune among top-N recent locals
-                            await cur.execute(
-                                """
-                                SELECT media_id FROM ss_instagram_post
-                                WHERE user_id=%s AND user_persona_num=%s
-                                ORDER BY (posted_at IS NULL) ASC, posted_at DESC, updated_at DESC
-                                LIMIT %s
-                                """,
-                                (int(uid), int(persona_num), int(limit)),
-                            )
-                            rows = await cur.fetchall() or []
-                            local_ids = {str(r[0]) if not isinstance(r, dict) else str(r.get('media_id')) for r in rows}
-                            to_delete = [i for i in local_ids if i and i not in fetched_ids]
-                            if to_delete:
-                                ph = ",".join(["%s"] * len(to_delete))
-                                await cur.execute(
-                                    f"DELETE FROM ss_instagram_post WHERE user_id=%s AND user_persona_num=%s AND media_id IN ({ph})",
-                                    (int(uid), int(persona_num), *to_delete),
-                                )
-                                pruned = cur.rowcount or 0
-                    except Exception:
-                        pruned = 0
-                try:
-                    await conn.commit()
-                except Exception:
-                    pass
-        return {"ok": True, "synced": upcnt, "pruned": pruned}
+        return {"ok": True, **result}
+    except posts_sync.SyncError as e:
+        r = e.response
+        if _is_token_error(r):
+            _invalidate_token(uid, persona_num)
+            raise HTTPException(status_code=401, detail="persona_oauth_required")
+        if r.status_code == 404:
+            return {"ok": True, "synced": 0}
+        raise HTTPException(status_code=r.status_code, detail=r.text)
     except HTTPException:
         raise
     except Exception as e:
@@ -383,7 +348,7 @@ async def delete_post(
             mapping = await _get_persona_instagram_mapping(int(uid), int(persona_num))
             token = await _get_persona_token(int(uid), int(persona_num))
             if mapping and token and media_id:
-                async with httpx.AsyncClient(timeout=15) as client:
+                async with graph_session() as client:
                     r = await client.delete(f"{IG_GRAPH}/{media_id}", params={"access_token": token})
                 if r.status_code in (200, 204):
                     deleted_on_instagram = True
@@ -420,6 +385,71 @@ async def delete_post(
     return {"ok": True, "deleted_on_instagram": bool(deleted_on_instagram)}
 
 
+# 개요: 페르소나 동시 처리 상한 / 페르소나별 Graph 수집 제한 시간(초)
+OVERVIEW_PERSONA_CONCURRENCY = max(1, int(os.getenv("IG_OVERVIEW_CONCURRENCY", "4")))
+OVERVIEW_PERSONA_TIMEOUT = float(os.getenv("IG_OVERVIEW_PERSONA_TIMEOUT", "15"))
+
+
+def _browser_persona_img(persona_img: Optional[str], presigned: Optional[Dict[str, str]] = None) -> Optional[str]:
+    """Normalize persona_img for browser use: presign S3 keys and fix legacy localhost URLs
+
+    presigned: apresign_many() 결과(키 → URL). 서명에 실패한 키는 원본 값을 그대로 둡니다.
+    """
+    presigned = presigned or {}
+    try:
+        s = str(persona_img) if persona_img is not None else ""
+        if s and not s.lower().startswith("http") and not s.startswith("data:") and not s.startswith("/"):
+            if s3_enabled():
+                persona_img = presigned.get(s) or persona_img
+        elif s.lower().startswith("http://localhost") or s.lower().startswith("http://127.0.0.1"):
+            from urllib.parse import urlparse
+            purl = urlparse(s)
+            path = purl.path or ""
+            backend_url = (os.getenv("BACKEND_URL") or "http://localhost:8000").rstrip("/")
+            if path.startswith("/personas/") or path.startswith("/uploads/"):
+                if s3_enabled():
+                    persona_img = presigned.get(path.lstrip("/")) or persona_img
+                else:
+                    persona_img = f"{backend_url}{path}"
+            elif path.startswith("/media/"):
+                persona_img = f"{backend_url}{path}"
+            else:
+                persona_img = f"{backend_url}{path or '/'}"
+    except Exception:
+        pass
+    return persona_img
+
+
+async def _load_seen_comment_ids(comment_ids: List[str]) -> set[str]:
+    """ss_instagram_event_seen에서 확인(ack)된 댓글 ID 조회(커넥션 1개, 100개 단위 IN)."""
+    seen_ids: set[str] = set()
+    if not comment_ids:
+        return seen_ids
+    pool = await get_mysql_pool()
+    chunks = [comment_ids[i:i+100] for i in range(0, len(comment_ids), 100)]
+    async with pool.acquire() as conn:
+        async with conn.cursor(aiomysql.DictCursor) as cur:
+            for chunk in chunks:
+                ph = ",".join(["%s"] * len(chunk))
+                try:
+                    await cur.execute(
+                        f"""
+                        SELECT external_id
+                        FROM ss_instagram_event_seen
+                        WHERE external_id IN ({ph})
+                        """,
+                        chunk,
+                    )
+                    for r in (await cur.fetchall()) or []:
+                        sid = r.get("external_id")
+                        if isinstance(sid, str):
+                            seen_ids.add(sid)
+                except Exception:
+                    # 테이블 미존재 등은 무시하고 전체 반환
+                    return set()
+    return seen_ids
+
+
 @router.get("/comments/overview")
 async def comments_overview(
     request: Request,
@@ -427,128 +457,144 @@ async def comments_overview(
     comments_limit: int = 10,
     exclude_seen: bool = True,
     debug: bool = False,
+    refresh: bool = False,
 ):
     """현재 로그인 사용자의 '연동된' 페르소나별 최근 댓글 개요를 반환.
 
     - 각 페르소나에 대해 최근 N개의 미디어와 각 미디어의 최근 M개의 댓글을 포함
     - 토큰 또는 매핑이 없는 페르소나는 생략
+    - 웹훅 댓글 저장소가 켜져 있으면(ig_webhooks.COMMENT_STORE_ENABLED) 신선한 페르소나는
+      저장소에서 한 번에 읽고(source="store"), 캐시 미스인 페르소나만 Graph로 수집해 저장소를 채움.
+      debug/refresh=true면 모두 Graph로 수집
+    - Graph 수집은 페르소나 동시(IG_OVERVIEW_CONCURRENCY)로 처리하며, IG_OVERVIEW_PERSONA_TIMEOUT을
+      넘긴 페르소나는 items=[] / error="timeout"으로 표시하고 나머지 결과는 그대로 반환
     """
     user_id = _require_login(request)
 
-    # 사용자 페르소나 조회
+    # 사용자 페르소나 조회(매핑 컬럼 포함, 캐시) + 토큰 일괄 조회
     personas = await _get_user_personas(int(user_id))
     if not personas:
         return {"ok": True, "personas": []}
 
-    results: List[Dict[str, Any]] = []
-    async with httpx.AsyncClient(timeout=30) as client:
-        for p in personas:
-            num = p.get("user_persona_num")
-            if num is None:
-                continue
-            # IG 매핑/토큰 검사
-            mapping = await _get_persona_instagram_mapping(int(user_id), int(num))
-            if not mapping or not mapping.get("ig_user_id"):
-                continue
-            token = await _get_persona_token(int(user_id), int(num))
-            if not token:
-                continue
-
-            media, dbg = await _fetch_recent_media_and_comments(
-                client,
-                mapping["ig_user_id"],
-                token,
-                media_limit=media_limit,
-                comments_limit=comments_limit,
-                return_debug=bool(debug),
+    linked: List[Tuple[Dict[str, Any], Dict[str, Any]]] = []
+    for p in personas:
+        num = p.get("user_persona_num")
+        if num is None:
+            continue
+        mapping = _mapping_from_persona_row(int(user_id), int(num), p)
+        if mapping and mapping.get("ig_user_id"):
+            linked.append((p, mapping))
+    if not linked:
+        return {"ok": True, "personas": []}
+    tokens = await _get_persona_tokens(int(user_id), [int(p["user_persona_num"]) for p, _ in linked])
+    presigned: Dict[str, str] = {}
+    if s3_enabled():
+        try:
+            presigned = await apresign_many(k for k in (stored_image_key(p.get("persona_img")) for p, _ in linked) if k)
+        except Exception as e:
+            log.warning("persona_img presign failed: %s", e)
+
+    # 저장소 히트: 동기화 후 TTL 이내이고 그 사이 IG 계정이 바뀌지 않은 페르소나
+    stored: Dict[int, List[Dict[str, Any]]] = {}
+    if ig_webhooks.COMMENT_STORE_ENABLED and not (debug or refresh):
+        try:
+            fresh = await ig_webhooks.fresh_personas(
+                int(user_id), [int(p["user_persona_num"]) for p, _ in linked if tokens.get(int(p["user_persona_num"]))]
             )
+            hits = [
+                int(p["user_persona_num"])
+                for p, mapping in linked
+                if fresh.get(int(p["user_persona_num"])) == str(mapping.get("ig_user_id"))
+            ]
+            if hits:
+                stored = await ig_webhooks.load_overview(int(user_id), hits, media_limit, comments_limit)
+                for n in hits:
+                    stored.setdefault(n, [])
+        except Exception as e:
+            # 저장소 장애 시 전부 Graph로(기존 동작)
+            log.warning("comment store read failed: %s", e)
+            stored = {}
 
-            # 선택적으로 '확인된(ack)' 알림은 제외
-            if exclude_seen and media:
-                try:
-                    # 댓글 ID 수집
-                    all_comment_ids: List[str] = []
-                    for m in media:
-                        for c in m.get("comments") or []:
-                            cid = c.get("id")
-                            if isinstance(cid, str):
-                                all_comment_ids.append(cid)
-                    # 없으면 건너뜀
-                    if all_comment_ids:
-                        # IN 절은 너무 길어지지 않도록 100개 단위로 분할
-                        seen_ids: set[str] = set()
-                        pool = await get_mysql_pool()
-                        chunks = [all_comment_ids[i:i+100] for i in range(0, len(all_comment_ids), 100)]
-                        async with pool.acquire() as conn:
-                            async with conn.cursor(aiomysql.DictCursor) as cur:
-                                for chunk in chunks:
-                                    ph = ",".join(["%s"] * len(chunk))
-                                    try:
-                                        await cur.execute(
-                                            f"""
-                                            SELECT external_id
-                                            FROM ss_instagram_event_seen
-                                            WHERE external_id IN ({ph})
-                                            """,
-                                            chunk,
-                                        )
-                                        for r in (await cur.fetchall()) or []:
-                                            sid = r.get("external_id")
-                                            if isinstance(sid, str):
-                                                seen_ids.add(sid)
-                                    except Exception:
-                                        # 테이블 미존재 등은 무시하고 전체 반환
-                                        seen_ids = set()
-                                        break
-                        if seen_ids:
-                            # 각 미디어의 comments에서 seen_ids 제거
-                            for m in media:
-                                cs = m.get("comments") or []
-                                m["comments"] = [c for c in cs if c.get("id") not in seen_ids]
-                except Exception:
-                    # 필터링 실패 시 원본 반환(치명적 아님)
-                    pass
+    sem = asyncio.Semaphore(OVERVIEW_PERSONA_CONCURRENCY)
+    results: List[Dict[str, Any]] = []
+    async with graph_session() as client:
 
-            # 표시용 이름/이미지
+        async def one(p: Dict[str, Any], mapping: Dict[str, Any], token: str) -> Dict[str, Any]:
+            num = p.get("user_persona_num")
             params = p.get("persona_parameters") or {}
-            disp_name = params.get("name") or f"프로필 {num}"
-            persona_img = p.get("persona_img")
-            # Normalize persona_img for browser use: presign S3 keys and fix legacy localhost URLs
-            try:
-                s = str(persona_img) if persona_img is not None else ""
-                if s and not s.lower().startswith("http") and not s.startswith("data:") and not s.startswith("/"):
-                    if s3_enabled():
-                        persona_img = presign_get_url(s)
-                elif s.lower().startswith("http://localhost") or s.lower().startswith("http://127.0.0.1"):
-                    from urllib.parse import urlparse
-                    purl = urlparse(s)
-                    path = purl.path or ""
-                    if path.startswith("/personas/") or path.startswith("/uploads/"):
-                        if s3_enabled():
-                            persona_img = presign_get_url(path.lstrip("/"))
-                        else:
-                            backend_url = (os.getenv("BACKEND_URL") or "http://localhost:8000").rstrip("/")
-                            persona_img = f"{backend_url}{path}"
-                    elif path.startswith("/media/"):
-                        backend_url = (os.getenv("BACKEND_URL") or "http://localhost:8000").rstrip("/")
-                        persona_img = f"{backend_url}{path}"
-                    else:
-                        backend_url = (os.getenv("BACKEND_URL") or "http://localhost:8000").rstrip("/")
-                        persona_img = f"{backend_url}{path or '/'}"
-            except Exception:
-                pass
-
-            results.append(
-                {
-                    "persona_num": num,
-                    "persona_name": disp_name,
-                    "persona_img": persona_img,
-                    "ig_user_id": mapping.get("ig_user_id"),
-                    "ig_username": mapping.get("ig_username"),
-                    "items": media,
-                    **({"debug": dbg} if debug and dbg is not None else {}),
-                }
-            )
+            entry: Dict[str, Any] = {
+                "persona_num": num,
+                # 표시용 이름/이미지
+                "persona_name": params.get("name") or f"프로필 {num}",
+                "persona_img": _browser_persona_img(p.get("persona_img"), presigned),
+                "ig_user_id": mapping.get("ig_user_id"),
+                "ig_username": mapping.get("ig_username"),
+                "items": [],
+            }
+            if int(num) in stored:
+                entry["items"] = stored[int(num)]
+                entry["source"] = "store"
+                return entry
+            entry["source"] = "graph"
+            dbg: Optional[Dict[str, Any]] = None
+            async with sem:
+                try:
+                    media, dbg = await asyncio.wait_for(
+                        _fetch_recent_media_and_comments(
+                            client,
+                            mapping["ig_user_id"],
+                            token,
+                            media_limit=media_limit,
+                            comments_limit=comments_limit,
+                            return_debug=True,
+                        ),
+                        timeout=OVERVIEW_PERSONA_TIMEOUT,
+                    )
+                    entry["items"] = media
+                    # 미디어 조회가 성공한 경우에만 저장소를 채우고 동기화 시각 기록
+                    if ig_webhooks.COMMENT_STORE_ENABLED and not (dbg and dbg.get("media_status")):
+                        try:
+                            await ig_webhooks.save_graph_items(int(user_id), int(num), mapping["ig_user_id"], media)
+                        except Exception as e:
+                            log.warning("comment store backfill failed: user_id=%s persona_num=%s: %s", user_id, num, e)
+                except asyncio.TimeoutError:
+                    log.warning("comments overview timed out: user_id=%s persona_num=%s", user_id, num)
+                    entry["error"] = "timeout"
+                except Exception as e:
+                    log.warning("comments overview failed: user_id=%s persona_num=%s: %s", user_id, num, e)
+                    entry["error"] = "fetch_failed"
+            if dbg and _is_token_error(dbg.get("media_body")):
+                _invalidate_token(int(user_id), int(num))
+            if debug and dbg is not None:
+                entry["debug"] = dbg
+            return entry
+
+        results = list(await asyncio.gather(*(
+            one(p, mapping, tokens[int(p["user_persona_num"])])
+            for p, mapping in linked
+            if tokens.get(int(p["user_persona_num"]))
+        )))
+
+    # 선택적으로 '확인된(ack)' 알림은 제외 — 전체 페르소나의 댓글 ID를 한 번에 조회
+    if exclude_seen:
+        try:
+            all_comment_ids: List[str] = [
+                c["id"]
+                for entry in results
+                for m in entry["items"]
+                for c in (m.get("comments") or [])
+                if isinstance(c.get("id"), str)
+            ]
+            seen_ids = await _load_seen_comment_ids(all_comment_ids)
+            if seen_ids:
+                # 각 미디어의 comments에서 seen_ids 제거
+                for entry in results:
+                    for m in entry["items"]:
+                        cs = m.get("comments") or []
+                        m["comments"] = [c for c in cs if c.get("id") not in seen_ids]
+        except Exception:
+            # 필터링 실패 시 원본 반환(치명적 아님)
+            pass
 
     return {"ok": True, "personas": results}
 
@@ -581,7 +627,7 @@ async def debug_comments_raw(
     }
 
     try:
-        async with httpx.AsyncClient(timeout=30) as client:
+        async with graph_session() as client:
             mr = await client.get(
                 f"{IG_GRAPH}/{mapping['ig_user_id']}/media",
                 params={
@@ -655,7 +701,7 @@ async def get_media_comments(
         raise HTTPException(status_code=401, detail="persona_oauth_required")
 
     try:
-        async with httpx.AsyncClient(timeout=30) as client:
+        async with graph_session() as client:
             # Fetch top-level comments
             cr = await client.get(
                 f"{IG_GRAPH}/{media_id}/comments",
@@ -669,6 +715,7 @@ async def get_media_comments(
                 try:
                     err = (cr.json() or {}).get("error") or {}
                     if err.get("code") == 190:
+                        _invalidate_token(uid, persona_num)
                         raise HTTPException(status_code=401, detail="persona_oauth_required")
                 except HTTPException:
                     raise
@@ -1,12 +1,14 @@
 from __future__ import annotations
+import logging
 import os
-from datetime import datetime, timedelta, timezone
+from datetime import date, datetime, timedelta, timezone
 import asyncio
 from typing import Any, Dict, List, Optional
 
 from fastapi import APIRouter, HTTPException, Request
-import httpx
 import aiomysql
+from app.api.core import like_totals, posts_sync
+from app.api.core.graph import GraphClient, graph_session
 from app.api.core.mysql import get_mysql_pool
 
 from .oauth_instagram import (
@@ -14,10 +16,14 @@ from .oauth_instagram import (
     _require_login,
     _get_persona_token,
     _get_persona_instagram_mapping,
+    _invalidate_token,
+    _is_token_error,
 )
 
 router = APIRouter(prefix="/api/instagram", tags=["instagram"])
 
+log = logging.getLogger("instagram_insights")
+
 
 def _iso_date(d: datetime) -> str:
     return d.strftime("%Y-%m-%d")
@@ -60,7 +66,7 @@ async def insights_overview(
     since = datetime.now(timezone.utc) - timedelta(days=days)
     until = datetime.now(timezone.utc)
 
-    async with httpx.AsyncClient(timeout=30) as client:
+    async with graph_session() as client:
         # 현재 팔로워 수 및 사용자명
         usr = await client.get(
             f"{IG_GRAPH}/{ig_user_id}",
@@ -75,6 +81,8 @@ async def insights_overview(
             uj = usr.json() or {}
             followers_count = uj.get("followers_count")
             username = uj.get("username")
+        elif _is_token_error(usr):
+            _invalidate_token(user_id, persona_num)
 
         # 사용자 인사이트(일별)
         # impressions는 API v22+에서 views로 대체 예정이므로 둘 다 시도
@@ -208,7 +216,7 @@ REEL_METRICS = "plays,reach,likes,comments,shares,saves,total_interactions"
 FEED_METRICS = "impressions,reach,saved,engagement,video_views"
 
 
-async def _media_insights(client: httpx.AsyncClient, media_id: str, product_type: str | None, token: str) -> Dict[str, Any]:
+async def _media_insights(client: GraphClient, media_id: str, product_type: str | None, token: str) -> Dict[str, Any]:
     """Fetch insights for a single media. Maps 'views' to 'impressions' when present.
 
     Note: Reels and Feed have different metric sets; request the set depending on product type.
@@ -253,7 +261,7 @@ async def media_overview(request: Request, persona_num: int, limit: int = 12, da
     since = _iso_date(datetime.now(timezone.utc) - timedelta(days=days))
 
     items: List[Dict[str, Any]] = []
-    async with httpx.AsyncClient(timeout=30) as client:
+    async with graph_session() as client:
         r = await client.get(
             f"{IG_GRAPH}/{ig_user_id}/media",
             params={
@@ -267,24 +275,22 @@ async def media_overview(request: Request, persona_num: int, limit: int = 12, da
         if r.status_code == 200:
             data = (r.json() or {}).get("data", [])
 
-        sem = asyncio.Semaphore(5)
-
+        # 동시 호출 수는 고정 세마포어 대신 Graph 클라이언트의 계정별 리미터가 사용률에 맞춰 조절
         async def process(m: Dict[str, Any]):
-            async with sem:
-                prod = m.get("media_product_type") or m.get("media_type")
-                ins = await _media_insights(client, str(m.get("id")), prod, token)
-                return {
-                    "id": m.get("id"),
-                    "timestamp": m.get("timestamp"),
-                    "caption": m.get("caption"),
-                    "permalink": m.get("permalink"),
-                    "media_type": m.get("media_type"),
-                    "media_product_type": m.get("media_product_type"),
-                    "preview_url": m.get("thumbnail_url") or m.get("media_url"),
-                    "like_count": m.get("like_count"),
-                    "comments_count": m.get("comments_count"),
-                    "insights": ins,
-                }
+            prod = m.get("media_product_type") or m.get("media_type")
+            ins = await _media_insights(client, str(m.get("id")), prod, token)
+            return {
+                "id": m.get("id"),
+                "timestamp": m.get("timestamp"),
+                "caption": m.get("caption"),
+                "permalink": m.get("permalink"),
+                "media_type": m.get("media_type"),
+                "media_product_type": m.get("media_product_type"),
+                "preview_url": m.get("thumbnail_url") or m.get("media_url"),
+                "like_count": m.get("like_count"),
+                "comments_count": m.get("comments_count"),
+                "insights": ins,
+            }
 
         tasks = [process(m) for m in data if m.get("id")]
         if tasks:
@@ -304,7 +310,7 @@ async def media_detail(request: Request, persona_num: int, media_id: str):
     if not token:
         raise HTTPException(status_code=401, detail="persona_oauth_required")
 
-    async with httpx.AsyncClient(timeout=30) as client:
+    async with graph_session() as client:
         r = await client.get(
             f"{IG_GRAPH}/{media_id}",
             params={
@@ -313,6 +319,8 @@ async def media_detail(request: Request, persona_num: int, media_id: str):
             },
         )
         if r.status_code != 200:
+            if _is_token_error(r):
+                _invalidate_token(user_id, persona_num)
             raise HTTPException(status_code=r.status_code, detail="media_not_found")
         m = r.json() or {}
         prod = m.get("media_product_type") or m.get("media_type")
@@ -339,42 +347,11 @@ async def media_detail(request: Request, persona_num: int, media_id: str):
 
 
 
-async def _paginate_media(client: httpx.AsyncClient, ig_user_id: str, token: str, limit_total: int = 200):
-    total = 0
-    url = f"{IG_GRAPH}/{ig_user_id}/media"
-    params = {
-        "access_token": token,
-        "fields": "id,timestamp,like_count",
-        "limit": 50,
-    }
-    likes_sum = 0
-    while True:
-        r = await client.get(url, params=params)
-        if r.status_code != 200:
-            break
-        body = r.json() or {}
-        for it in body.get("data", []):
-            try:
-                likes_sum += int(it.get("like_count") or 0)
-            except Exception:
-                pass
-            total += 1
-            if total >= limit_total:
-                break
-        if total >= limit_total:
-            break
-        paging = (body or {}).get("paging") or {}
-        next_url = paging.get("next")
-        if not next_url:
-            break
-        # next_url already contains everything
-        url = next_url
-        params = {}
-    return likes_sum
-
-
-async def perform_snapshot(user_id: int, persona_num: int) -> dict:
-    """Core snapshot logic reusable by API and scheduler."""
+async def perform_snapshot(user_id: int, persona_num: int, run_date: Optional[date] = None) -> dict:
+    """Core snapshot logic reusable by API and scheduler.
+
+    run_date: the scheduler's run date (row date for ss_dashboard); defaults to today (UTC).
+    """
 
     mapping = await _get_persona_instagram_mapping(int(user_id), int(persona_num))
     if not mapping or not mapping.get("ig_user_id"):
@@ -383,8 +360,8 @@ async def perform_snapshot(user_id: int, persona_num: int) -> dict:
     if not token:
         raise HTTPException(status_code=401, detail="persona_oauth_required")
     ig_user_id = str(mapping["ig_user_id"])
-    today = datetime.now(timezone.utc).date()
-    async with httpx.AsyncClient(timeout=30) as client:
+    today = run_date or datetime.now(timezone.utc).date()
+    async with graph_session() as client:
         usr = await client.get(f"{IG_GRAPH}/{ig_user_id}", params={"access_token": token, "fields": "followers_count"})
         followers_count = None
         if usr.status_code == 200:
@@ -428,7 +405,19 @@ async def perform_snapshot(user_id: int, persona_num: int) -> dict:
             reach = 0
         if impressions is None:
             impressions = 0
-        total_likes = await _paginate_media(client, ig_user_id, token, limit_total=200)
+        try:
+            # 최근 글/댓글 활동이 있던 미디어만 다시 읽고 저장소에서 합산(like_totals 참고)
+            likes = await like_totals.refresh_totals(client, int(user_id), int(persona_num), ig_user_id, token)
+            total_likes = likes["total_likes"]
+        except Exception as e:
+            # Graph/저장소 실패 시 마지막으로 저장된 카운터 합으로 기록(그것도 실패하면 NULL) — 나머지 지표는 그대로 저장
+            if not isinstance(e, posts_sync.SyncError):
+                log.warning("like total refresh failed user=%s persona=%s: %r", user_id, persona_num, e)
+            try:
+                total_likes = await like_totals.stored_total(int(user_id), int(persona_num))
+            except Exception as e2:
+                log.warning("stored like total unavailable user=%s persona=%s: %r", user_id, persona_num, e2)
+                total_likes = None
     # upsert to ss_dashboard (assumes table already exists)
     pool = await get_mysql_pool()
     async with pool.acquire() as conn:
@@ -516,7 +505,7 @@ async def insights_daily(request: Request, persona_num: int, days: int = 30):
             token = await _get_persona_token(int(user_id), int(persona_num))
             if mapping and mapping.get("ig_user_id") and token:
                 ig_user_id = str(mapping["ig_user_id"])
-                async with httpx.AsyncClient(timeout=20) as client:
+                async with graph_session() as client:
                     ins = await client.get(
                         f"{IG_GRAPH}/{ig_user_id}/insights",
                         params={
@@ -5,7 +5,8 @@ import asyncio
 
 from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel, AnyHttpUrl
-import httpx
+
+from app.api.core.graph import GRAPH_PUBLISH_TIMEOUT, graph_session
 
 # 내부 OAuth/연동 유틸 재사용
 from .oauth_instagram import (
@@ -13,6 +14,8 @@ from .oauth_instagram import (
     _require_login,               # 세션에서 user_id 확인
     _get_persona_token,           # 페르소나별 long-lived user token 조회
     _get_persona_instagram_mapping,  # ss_persona에 저장된 IG 매핑(ig_user_id/fb_page_id)
+    _invalidate_token,            # Graph 190(토큰 무효) 시 토큰 캐시 제거
+    _is_token_error,
 )
 
 
@@ -58,7 +61,7 @@ async def publish_instagram(request: Request, body: InstagramPublishRequest):
     ig_user_id = mapping["ig_user_id"]
 
     # 1) 컨테이너 생성
-    async with httpx.AsyncClient(timeout=60) as client:
+    async with graph_session(timeout=GRAPH_PUBLISH_TIMEOUT) as client:
         create = await client.post(
             f"{IG_GRAPH}/{ig_user_id}/media",
             data={
@@ -68,6 +71,8 @@ async def publish_instagram(request: Request, body: InstagramPublishRequest):
             },
         )
     if create.status_code != 200:
+        if _is_token_error(create):
+            _invalidate_token(user_id, body.persona_num)
         raise HTTPException(status_code=create.status_code, detail=create.text)
     creation_id = (create.json() or {}).get("id")
     if not creation_id:
@@ -75,7 +80,7 @@ async def publish_instagram(request: Request, body: InstagramPublishRequest):
 
     # 1.5) 컨테이너 준비 상태 대기 (status_code == FINISHED)
     try:
-        async with httpx.AsyncClient(timeout=30) as client:
+        async with graph_session() as client:
             finished = False
             for _ in range(20):  # ~20초 대기 (1초 간격)
                 gr = await client.get(
@@ -100,7 +105,7 @@ async def publish_instagram(request: Request, body: InstagramPublishRequest):
         pass
 
     # 2) 발행 (컨테이너 준비가 덜 되었을 수 있어 1회 재시도 포함)
-    async with httpx.AsyncClient(timeout=60) as client:
+    async with graph_session(timeout=GRAPH_PUBLISH_TIMEOUT) as client:
         async def do_publish():
             return await client.post(
                 f"{IG_GRAPH}/{ig_user_id}/media_publish",
@@ -1,19 +1,19 @@
 from __future__ import annotations
 from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel, Field
-import httpx
 from typing import Optional, Dict, Any, List
 import os
-import json
-import aiomysql
 
+from app.api.core.graph import graph_session
 from app.api.core.mysql import get_mysql_pool
+from app.api.models.persona import get_persona
 
 from .oauth_instagram import (
     GRAPH as IG_GRAPH,
     _require_login,
     _get_persona_token,
     _get_persona_instagram_mapping,
+    _invalidate_token,
 )
 
 router = APIRouter(prefix="/api/instagram", tags=["instagram"])
@@ -45,7 +45,7 @@ async def post_comment_on_media(request: Request, media_id: str, body: PostComme
         raise HTTPException(status_code=401, detail="persona_oauth_required")
 
     try:
-        async with httpx.AsyncClient(timeout=20) as client:
+        async with graph_session() as client:
             r = await client.post(
                 f"{IG_GRAPH}/{media_id}/comments",
                 data={"message": body.message, "access_token": token},
@@ -54,6 +54,7 @@ async def post_comment_on_media(request: Request, media_id: str, body: PostComme
             try:
                 err = (r.json() or {}).get("error") or {}
                 if err.get("code") == 190:
+                    _invalidate_token(uid, body.persona_num)
                     raise HTTPException(status_code=401, detail="persona_oauth_required")
             except HTTPException:
                 raise
@@ -84,7 +85,7 @@ async def reply_to_comment(request: Request, body: ReplyBody):
 
     # Graph API endpoint: POST /{comment-id}/replies with message
     try:
-        async with httpx.AsyncClient(timeout=20) as client:
+        async with graph_session() as client:
             r = await client.post(
                 f"{IG_GRAPH}/{body.comment_id}/replies",
                 data={
@@ -98,6 +99,7 @@ async def reply_to_comment(request: Request, body: ReplyBody):
                 err = (r.json() or {}).get("error") or {}
                 code = err.get("code")
                 if code == 190:
+                    _invalidate_token(uid, body.persona_num)
                     raise HTTPException(status_code=401, detail="persona_oauth_required")
             except HTTPException:
                 raise
@@ -173,38 +175,22 @@ async def auto_reply_to_comment(request: Request, body: AutoReplyBody):
     personality: str = ""
     persona_img: Optional[str] = None
     try:
-        pool = await get_mysql_pool()
-        async with pool.acquire() as conn:
-            async with conn.cursor(aiomysql.DictCursor) as cur:
-                await cur.execute(
-                    """
-                    SELECT persona_img, persona_parameters
-                    FROM ss_persona
-                    WHERE user_id=%s AND user_persona_num=%s
-                    LIMIT 1
-                    """,
-                    (int(uid), int(body.persona_num)),
-                )
-                row = await cur.fetchone()
-                if row:
-                    persona_img = row.get("persona_img")
-                    pp_raw = row.get("persona_parameters")
-                    try:
-                        pp = json.loads(pp_raw) if isinstance(pp_raw, str) else (pp_raw or {})
-                    except Exception:
-                        pp = {}
-                    # Try common keys for tone/personality
-                    for key in ("personality", "tone", "style", "voice"):
-                        val = pp.get(key)
-                        if isinstance(val, str) and val.strip():
-                            personality = val.strip()
-                            break
-                    # Instagram nested section fallback
-                    if not personality:
-                        igp = (pp.get("instagram") or {}) if isinstance(pp, dict) else {}
-                        val = igp.get("personality") or igp.get("tone")
-                        if isinstance(val, str):
-                            personality = val.strip()
+        row = await get_persona(int(uid), int(body.persona_num))
+        if row:
+            persona_img = row.get("persona_img")
+            pp = row.get("persona_parameters") or {}
+            # Try common keys for tone/personality
+            for key in ("personality", "tone", "style", "voice"):
+                val = pp.get(key)
+                if isinstance(val, str) and val.strip():
+                    personality = val.strip()
+                    break
+            # Instagram nested section fallback
+            if not personality:
+                igp = (pp.get("instagram") or {}) if isinstance(pp, dict) else {}
+                val = igp.get("personality") or igp.get("tone")
+                if isinstance(val, str):
+                    personality = val.strip()
     except Exception:
         # Non-fatal: continue with empty personality
         pass
@@ -219,7 +205,7 @@ async def auto_reply_to_comment(request: Request, body: AutoReplyBody):
         "persona_img": persona_img,
     }
     try:
-        async with httpx.AsyncClient(timeout=20) as client:
+        async with graph_session() as client:
             ar = await client.post(f"{ai_url}/comment/reply", json=payload)
         if ar.status_code != 200:
             # Bubble up AI failure clearly
@@ -239,7 +225,7 @@ async def auto_reply_to_comment(request: Request, body: AutoReplyBody):
 
     # 4) Post reply to Graph
     try:
-        async with httpx.AsyncClient(timeout=20) as client:
+        async with graph_session() as client:
             gr = await client.post(
                 f"{IG_GRAPH}/{body.comment_id}/replies",
                 data={"message": reply_text, "access_token": token},
@@ -248,6 +234,7 @@ async def auto_reply_to_comment(request: Request, body: AutoReplyBody):
             try:
                 err = (gr.json() or {}).get("error") or {}
                 if err.get("code") == 190:
+                    _invalidate_token(uid, body.persona_num)
                     raise HTTPException(status_code=401, detail="persona_oauth_required")
             except HTTPException:
                 raise
@@ -304,36 +291,20 @@ async def auto_draft_reply(request: Request, body: AutoDraftBody):
     personality: str = ""
     persona_img: Optional[str] = None
     try:
-        pool = await get_mysql_pool()
-        async with pool.acquire() as conn:
-            async with conn.cursor(aiomysql.DictCursor) as cur:
-                await cur.execute(
-                    """
-                    SELECT persona_img, persona_parameters
-                    FROM ss_persona
-                    WHERE user_id=%s AND user_persona_num=%s
-                    LIMIT 1
-                    """,
-                    (int(uid), int(body.persona_num)),
-                )
-                row = await cur.fetchone()
-                if row:
-                    persona_img = row.get("persona_img")
-                    pp_raw = row.get("persona_parameters")
-                    try:
-                        pp = json.loads(pp_raw) if isinstance(pp_raw, str) else (pp_raw or {})
-                    except Exception:
-                        pp = {}
-                    for key in ("personality", "tone", "style", "voice"):
-                        val = pp.get(key)
-                        if isinstance(val, str) and val.strip():
-                            personality = val.strip()
-                            break
-                    if not personality:
-                        igp = (pp.get("instagram") or {}) if isinstance(pp, dict) else {}
-                        val = igp.get("personality") or igp.get("tone")
-                        if isinstance(val, str):
-                            personality = val.strip()
+        row = await get_persona(int(uid), int(body.persona_num))
+        if row:
+            persona_img = row.get("persona_img")
+            pp = row.get("persona_parameters") or {}
+            for key in ("personality", "tone", "style", "voice"):
+                val = pp.get(key)
+                if isinstance(val, str) and val.strip():
+                    personality = val.strip()
+                    break
+            if not personality:
+                igp = (pp.get("instagram") or {}) if isinstance(pp, dict) else {}
+                val = igp.get("personality") or igp.get("tone")
+                if isinstance(val, str):
+                    personality = val.strip()
     except Exception:
         pass
 
@@ -346,7 +317,7 @@ async def auto_draft_reply(request: Request, body: AutoDraftBody):
         "persona_img": persona_img,
     }
     try:
-        async with httpx.AsyncClient(timeout=20) as client:
+        async with graph_session() as client:
             ar = await client.post(f"{ai_url}/comment/reply", json=payload)
         if ar.status_code != 200:
             try:
@@ -393,7 +364,7 @@ async def reply_to_comments_bulk(request: Request, body: BulkReplyBody):
 
     results: List[Dict[str, Any]] = []
     try:
-        async with httpx.AsyncClient(timeout=20) as client:
+        async with graph_session() as client:
             for it in body.items:
                 try:
                     r = await client.post(
@@ -405,6 +376,7 @@ async def reply_to_comments_bulk(request: Request, body: BulkReplyBody):
                             err = (r.json() or {}).get("error") or {}
                             if err.get("code") == 190:
                                 # OAuth required/expired
+                                _invalidate_token(uid, body.persona_num)
                                 results.append({"comment_id": it.comment_id, "ok": False, "status": 401, "error": "persona_oauth_required"})
                                 continue
                         except Exception:
@@ -1,11 +1,16 @@
 from __future__ import annotations
+import json
+import logging
 import os
 from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import PlainTextResponse
 
+from app.api.core import ig_webhooks
+
 router = APIRouter(prefix="/webhooks/instagram", tags=["instagram"])
 
 VERIFY_TOKEN = os.getenv("META_WEBHOOK_VERIFY_TOKEN", "")
+log = logging.getLogger("instagram_webhook")
 
 
 @router.get("")
@@ -29,11 +34,33 @@ async def verify_webhook(request: Request):
 
 
 @router.post("")
-async def receive_webhook(body: dict):
+async def receive_webhook(request: Request):
     """
     Receive Instagram Graph Webhook events.
-    For now, just acknowledge. You can extend to process events.
+
+    - 원문 바이트로 X-Hub-Signature-256(또는 X-Hub-Signature)을 META_APP_SECRET으로 검증
+    - entry[].changes[]를 ss_instagram_webhook_event 큐에 적재하고 즉시 응답(처리는 워커가 담당)
+    - 적재 실패 시 503 → Meta가 재전송
     """
-    # TODO: add signature validation (X-Hub-Signature) if needed
-    # and process body events.
-    return {"ok": True}
+    raw = await request.body()
+    if not ig_webhooks.META_APP_SECRET:
+        if not ig_webhooks.ALLOW_UNSIGNED:
+            raise HTTPException(status_code=503, detail="webhook_secret_not_configured")
+    elif not ig_webhooks.verify_signature(
+        raw,
+        request.headers.get("x-hub-signature-256"),
+        request.headers.get("x-hub-signature"),
+    ):
+        raise HTTPException(status_code=403, detail="invalid_signature")
+    try:
+        body = json.loads(raw or b"{}")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="invalid_json")
+    if not isinstance(body, dict):
+        raise HTTPException(status_code=400, detail="invalid_json")
+    try:
+        queued = await ig_webhooks.enqueue(body)
+    except Exception as e:
+        log.warning("webhook enqueue failed: %s", e)
+        raise HTTPException(status_code=503, detail="enqueue_failed")
+    return {"ok": True, "queued": queued}
@@ -5,7 +5,11 @@ from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import RedirectResponse
 import httpx
 import aiomysql
+from app.api.core.graph import GRAPH, graph_session
 from app.api.core.mysql import get_mysql_pool
+from app.api.core.schema import register_migration, ensure_schema
+from app.api.models.persona import get_persona, invalidate_persona
+from app.core.cache import TTLCache
 from datetime import datetime, timedelta, timezone
 import secrets
 import json
@@ -15,7 +19,6 @@ import base64
 
 router = APIRouter(prefix="/oauth/instagram", tags=["instagram"])
 
-GRAPH = (os.getenv("META_GRAPH") or "https://graph.facebook.com/v20.0").rstrip("/")
 FACEBOOK_DIALOG = (os.getenv("META_FACEBOOK") or "https://www.facebook.com/v20.0").rstrip("/")
 
 # Meta App OAuth 설정(.env)
@@ -30,6 +33,16 @@ ENV_USER_TOKEN = os.getenv("IG_LONG_LIVED_USER_TOKEN") or os.getenv("META_USER_T
 # 서명용 시크릿 (세션 없이 콜백 처리할 때 state 검증에 사용)
 SESSION_SECRET = os.getenv("SESSION_SECRET", "selfstar-secret")
 
+# 토큰 캐시: ("persona", user_id, persona_num) / ("user", user_id) → token | None
+# - 항목 수명은 TOKEN_CACHE_TTL과 DB expires_at 중 빠른 쪽
+# - 없음(None)은 TOKEN_CACHE_NEG_TTL 동안만 기억(다른 워커에서 OAuth 완료 시 빨리 반영)
+# - _store_*_token / unlink / Graph 오류 190 시 즉시 무효화
+_token_cache = TTLCache(
+    maxsize=int(os.getenv("TOKEN_CACHE_MAX", "4096")),
+    ttl=float(os.getenv("TOKEN_CACHE_TTL", "600")),
+)
+_TOKEN_NEG_TTL = float(os.getenv("TOKEN_CACHE_NEG_TTL", "30"))
+
 def _b64url(data: bytes) -> str:
     return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
 
@@ -56,8 +69,12 @@ def _verify_state(state: str) -> Optional[dict]:
         return None
 
 
+@register_migration("ss_persona.instagram_columns.v1")
 async def _ensure_persona_instagram_columns():
-    """ss_persona에 ig_user_id, ig_username, fb_page_id, ig_linked_at 컬럼이 없으면 추가"""
+    """ss_persona에 ig_user_id, ig_username, fb_page_id, ig_linked_at 컬럼이 없으면 추가
+
+    스키마 레지스트리가 startup 시 1회만 실행합니다(요청 경로에서는 ensure_schema()).
+    """
     pool = await get_mysql_pool()
     async with pool.acquire() as conn:
         async with conn.cursor(aiomysql.DictCursor) as cur:
@@ -87,22 +104,28 @@ async def _ensure_persona_instagram_columns():
                 except Exception:
                     pass
 
+# ss_persona.id 컬럼 존재 여부(프로세스당 1회만 INFORMATION_SCHEMA 조회)
+_persona_has_id_col: Optional[bool] = None
+
+
 async def _resolve_persona_num_by_id(user_id: int, persona_id: int) -> Optional[int]:
     """사용자 소유의 persona_id로 user_persona_num을 구한다."""
+    global _persona_has_id_col
     pool = await get_mysql_pool()
     async with pool.acquire() as conn:
         # 테이블 컬럼 확인 후 안전하게 WHERE 절 구성
-        has_id_col = False
-        async with conn.cursor(aiomysql.DictCursor) as curcols:
-            await curcols.execute(
-                """
-                SELECT COLUMN_NAME
-                FROM INFORMATION_SCHEMA.COLUMNS
-                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'ss_persona'
-                """
-            )
-            cols = {r.get("COLUMN_NAME", "").lower() for r in (await curcols.fetchall() or [])}
-            has_id_col = "id" in cols
+        if _persona_has_id_col is None:
+            async with conn.cursor(aiomysql.DictCursor) as curcols:
+                await curcols.execute(
+                    """
+                    SELECT COLUMN_NAME
+                    FROM INFORMATION_SCHEMA.COLUMNS
+                    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'ss_persona'
+                    """
+                )
+                cols = {r.get("COLUMN_NAME", "").lower() for r in (await curcols.fetchall() or [])}
+                _persona_has_id_col = "id" in cols
+        has_id_col = bool(_persona_has_id_col)
 
         where = "user_id=%s AND persona_id=%s"
         params = (user_id, int(persona_id))
@@ -130,7 +153,7 @@ async def _resolve_persona_num_by_id(user_id: int, persona_id: int) -> Optional[
 
 async def _update_persona_instagram_mapping(user_id: int, persona_num: int, ig_user_id: str, ig_username: Optional[str], fb_page_id: str):
     """ss_persona에 instagram 매핑을 저장 (컬럼 + JSON 동기화)"""
-    await _ensure_persona_instagram_columns()
+    await ensure_schema()
     pool = await get_mysql_pool()
     async with pool.acquire() as conn:
         async with conn.cursor(aiomysql.DictCursor) as cur:
@@ -174,10 +197,11 @@ async def _update_persona_instagram_mapping(user_id: int, persona_num: int, ig_u
                 await conn.commit()
             except Exception:
                 pass
+    invalidate_persona(user_id, persona_num)
 
 async def _clear_persona_instagram_mapping(user_id: int, persona_num: int):
     """ss_persona에서 instagram 매핑 제거(컬럼 + JSON 동기화)."""
-    await _ensure_persona_instagram_columns()
+    await ensure_schema()
     pool = await get_mysql_pool()
     async with pool.acquire() as conn:
         # 기존 JSON 로드
@@ -217,51 +241,44 @@ async def _clear_persona_instagram_mapping(user_id: int, persona_num: int):
                 await conn.commit()
             except Exception:
                 pass
+    invalidate_persona(user_id, persona_num)
+
+def _mapping_from_persona_row(user_id: int, persona_num: int, row: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """페르소나 행(get_persona/get_user_personas 결과)에서 IG 매핑 추출."""
+    if not row:
+        return None
+    # 1) 컬럼 우선
+    if row.get("ig_user_id") and row.get("fb_page_id"):
+        return {
+            "user_id": user_id,
+            "user_persona_num": int(persona_num),
+            "ig_user_id": row.get("ig_user_id"),
+            "ig_username": row.get("ig_username"),
+            "fb_page_id": row.get("fb_page_id"),
+        }
+    # 2) 컬럼이 비어있으면 JSON에서 시도(과거 데이터 호환)
+    params = row.get("persona_parameters") or {}
+    ig = params.get("instagram") if isinstance(params, dict) else None
+    if isinstance(ig, dict) and ig.get("ig_user_id") and ig.get("fb_page_id"):
+        return {
+            "user_id": user_id,
+            "user_persona_num": int(persona_num),
+            "ig_user_id": ig.get("ig_user_id"),
+            "ig_username": ig.get("ig_username"),
+            "fb_page_id": ig.get("fb_page_id"),
+        }
+    return None
+
 
 async def _get_persona_instagram_mapping(user_id: int, persona_num: int) -> Optional[Dict[str, Any]]:
-    await _ensure_persona_instagram_columns()
-    pool = await get_mysql_pool()
-    async with pool.acquire() as conn:
-        # 1) 컬럼 우선 조회
-        async with conn.cursor(aiomysql.DictCursor) as cur:
-            await cur.execute(
-                """
-                SELECT ig_user_id, ig_username, fb_page_id, persona_parameters
-                FROM ss_persona
-                WHERE user_id=%s AND user_persona_num=%s
-                LIMIT 1
-                """,
-                (user_id, int(persona_num)),
-            )
-            row = await cur.fetchone()
-            if not row:
-                return None
-            if row.get("ig_user_id") and row.get("fb_page_id"):
-                return {
-                    "user_id": user_id,
-                    "user_persona_num": int(persona_num),
-                    "ig_user_id": row.get("ig_user_id"),
-                    "ig_username": row.get("ig_username"),
-                    "fb_page_id": row.get("fb_page_id"),
-                }
-            # 2) 컬럼이 비어있으면 JSON에서 시도(과거 데이터 호환)
-            try:
-                params = json.loads(row.get("persona_parameters") or "{}") or {}
-            except Exception:
-                params = {}
-            ig = params.get("instagram")
-            if isinstance(ig, dict) and ig.get("ig_user_id") and ig.get("fb_page_id"):
-                return {
-                    "user_id": user_id,
-                    "user_persona_num": int(persona_num),
-                    "ig_user_id": ig.get("ig_user_id"),
-                    "ig_username": ig.get("ig_username"),
-                    "fb_page_id": ig.get("fb_page_id"),
-                }
-            return None
+    await ensure_schema()
+    # 캐시된 페르소나 행 사용(link/unlink 시 무효화됨)
+    row = await get_persona(int(user_id), int(persona_num))
+    return _mapping_from_persona_row(user_id, persona_num, row)
 
 
 
+@register_migration("ss_instagram_connector.v1")
 async def _ensure_connector_table():
     pool = await get_mysql_pool()
     async with pool.acquire() as conn:
@@ -283,6 +300,7 @@ async def _ensure_connector_table():
                 pass
 
 
+@register_migration("ss_instagram_connector_persona.v1")
 async def _ensure_connector_persona_table():
     """Persona별 OAuth 토큰 저장 테이블 생성"""
     pool = await get_mysql_pool()
@@ -307,8 +325,39 @@ async def _ensure_connector_persona_table():
                 pass
 
 
+def _cache_token(key: tuple, token: Optional[str], expires_at: Any) -> None:
+    """조회 결과를 캐시. 만료 시각이 지났거나 임박한 토큰은 캐시하지 않음."""
+    if not token:
+        _token_cache.set(key, None, ttl=_TOKEN_NEG_TTL)
+        return
+    ttl = _token_cache.ttl
+    if isinstance(expires_at, datetime):
+        # DB에는 naive UTC로 저장됨
+        exp = expires_at if expires_at.tzinfo else expires_at.replace(tzinfo=timezone.utc)
+        ttl = min(ttl, (exp - datetime.now(timezone.utc)).total_seconds())
+    _token_cache.set(key, token, ttl=ttl)
+
+
+def _invalidate_token(user_id: int, persona_num: Optional[int] = None) -> None:
+    """토큰 캐시 무효화. persona_num 생략 시 사용자 레벨 토큰."""
+    if persona_num is None:
+        _token_cache.invalidate(("user", int(user_id)))
+    else:
+        _token_cache.invalidate(("persona", int(user_id), int(persona_num)))
+
+
+def _is_token_error(resp: Any) -> bool:
+    """Graph 응답(httpx.Response 또는 dict)이 토큰 무효(code 190)인지."""
+    try:
+        body = resp.json() if hasattr(resp, "json") else resp
+        err = ((body or {}).get("error") or {})
+        return str(err.get("code")) == "190"
+    except Exception:
+        return False
+
+
 async def _store_user_token(user_id: int, token: str, expires_in: Optional[int] = None):
-    await _ensure_connector_table()
+    await ensure_schema()
     expires_at: Optional[datetime] = None
     if isinstance(expires_in, int) and expires_in > 0:
         expires_at = datetime.now(timezone.utc) + timedelta(seconds=expires_in)
@@ -329,10 +378,15 @@ async def _store_user_token(user_id: int, token: str, expires_in: Optional[int]
                 await conn.commit()
             except Exception:
                 pass
+    _invalidate_token(user_id)
 
 
 async def _get_user_token(user_id: int) -> Optional[str]:
-    await _ensure_connector_table()
+    key = ("user", int(user_id))
+    cached = _token_cache.get(key, default=_token_cache)
+    if cached is not _token_cache:
+        return cached
+    await ensure_schema()
     pool = await get_mysql_pool()
     async with pool.acquire() as conn:
         async with conn.cursor(aiomysql.DictCursor) as cur:
@@ -341,13 +395,13 @@ async def _get_user_token(user_id: int) -> Optional[str]:
                 (user_id,),
             )
             row = await cur.fetchone()
-            if not row:
-                return None
-            return row.get("long_lived_user_token")
+    token = row.get("long_lived_user_token") if row else None
+    _cache_token(key, token, row.get("expires_at") if row else None)
+    return token
 
 
 async def _store_persona_token(user_id: int, persona_num: int, token: str, expires_in: Optional[int] = None):
-    await _ensure_connector_persona_table()
+    await ensure_schema()
     expires_at: Optional[datetime] = None
     if isinstance(expires_in, int) and expires_in > 0:
         expires_at = datetime.now(timezone.utc) + timedelta(seconds=expires_in)
@@ -368,10 +422,15 @@ async def _store_persona_token(user_id: int, persona_num: int, token: str, expir
                 await conn.commit()
             except Exception:
                 pass
+    _invalidate_token(user_id, persona_num)
 
 
 async def _get_persona_token(user_id: int, persona_num: int) -> Optional[str]:
-    await _ensure_connector_persona_table()
+    key = ("persona", int(user_id), int(persona_num))
+    cached = _token_cache.get(key, default=_token_cache)
+    if cached is not _token_cache:
+        return cached
+    await ensure_schema()
     pool = await get_mysql_pool()
     async with pool.acquire() as conn:
         async with conn.cursor(aiomysql.DictCursor) as cur:
@@ -384,9 +443,44 @@ async def _get_persona_token(user_id: int, persona_num: int) -> Optional[str]:
                 (user_id, int(persona_num)),
             )
             row = await cur.fetchone()
-            if not row:
-                return None
-            return row.get("long_lived_user_token")
+    token = row.get("long_lived_user_token") if row else None
+    _cache_token(key, token, row.get("expires_at") if row else None)
+    return token
+
+
+async def _get_persona_tokens(user_id: int, persona_nums: List[int]) -> Dict[int, Optional[str]]:
+    """여러 페르소나 토큰을 한 번에 조회(캐시 미스분만 단일 쿼리)."""
+    out: Dict[int, Optional[str]] = {}
+    missing: List[int] = []
+    for num in {int(n) for n in persona_nums}:
+        cached = _token_cache.get(("persona", int(user_id), num), default=_token_cache)
+        if cached is _token_cache:
+            missing.append(num)
+        else:
+            out[num] = cached
+    if not missing:
+        return out
+    await ensure_schema()
+    ph = ",".join(["%s"] * len(missing))
+    pool = await get_mysql_pool()
+    async with pool.acquire() as conn:
+        async with conn.cursor(aiomysql.DictCursor) as cur:
+            await cur.execute(
+                f"""
+                SELECT user_persona_num, long_lived_user_token, expires_at
+                FROM ss_instagram_connector_persona
+                WHERE user_id=%s AND user_persona_num IN ({ph})
+                """,
+                (user_id, *missing),
+            )
+            rows = await cur.fetchall() or []
+    by_num = {int(r["user_persona_num"]): r for r in rows}
+    for num in missing:
+        row = by_num.get(num)
+        token = row.get("long_lived_user_token") if row else None
+        _cache_token(("persona", int(user_id), num), token, row.get("expires_at") if row else None)
+        out[num] = token
+    return out
 
 
 async def _get_effective_token(user_id: int, persona_num: Optional[int]) -> Optional[str]:
@@ -471,7 +565,7 @@ async def start_oauth(
             token_to_revoke = await _get_user_token(uid)
         try:
             if token_to_revoke:
-                async with httpx.AsyncClient(timeout=15) as client:
+                async with graph_session() as client:
                     # DELETE /me/permissions → 사용자와 앱의 연결 권한 제거
                     await client.delete(f"{GRAPH}/me/permissions", params={"access_token": token_to_revoke})
         except Exception:
@@ -506,7 +600,7 @@ async def debug_token(request: Request):
     if not (META_APP_ID and META_APP_SECRET):
         raise HTTPException(status_code=500, detail="meta_app_not_configured")
     app_token = f"{META_APP_ID}|{META_APP_SECRET}"
-    async with httpx.AsyncClient(timeout=30) as client:
+    async with graph_session() as client:
         r = await client.get(f"{GRAPH}/debug_token", params={"input_token": token, "access_token": app_token})
     return {"ok": r.status_code == 200, "status": r.status_code, "json": r.json()}
 
@@ -518,7 +612,7 @@ async def raw_accounts(request: Request):
     token = await _get_user_token(uid) or ENV_USER_TOKEN
     if not token:
         raise HTTPException(status_code=404, detail="no_token")
-    async with httpx.AsyncClient(timeout=30) as client:
+    async with graph_session() as client:
         r = await client.get(
             f"{GRAPH}/me/accounts",
             params={
@@ -536,7 +630,7 @@ async def list_permissions(request: Request):
     token = await _get_user_token(uid) or ENV_USER_TOKEN
     if not token:
         raise HTTPException(status_code=404, detail="no_token")
-    async with httpx.AsyncClient(timeout=30) as client:
+    async with graph_session() as client:
         r = await client.get(f"{GRAPH}/me/permissions", params={"access_token": token})
     return {"ok": r.status_code == 200, "status": r.status_code, "json": r.json()}
 
@@ -565,7 +659,7 @@ async def oauth_callback(request: Request, code: Optional[str] = None, state: Op
         raise HTTPException(status_code=400, detail="persona_required")
 
     # code -> short-lived user access token 교환
-    async with httpx.AsyncClient(timeout=30) as client:
+    async with graph_session() as client:
         token_res = await client.get(
             f"{GRAPH}/oauth/access_token",
             params={
@@ -583,7 +677,7 @@ async def oauth_callback(request: Request, code: Optional[str] = None, state: Op
         raise HTTPException(status_code=502, detail="short_token_missing")
 
     # long-lived user token 교환
-    async with httpx.AsyncClient(timeout=30) as client:
+    async with graph_session() as client:
         ll_res = await client.get(
             f"{GRAPH}/oauth/access_token",
             params={
@@ -623,7 +717,7 @@ async def list_ig_accounts(request: Request, persona_num: Optional[int] = None,
     if not token:
         raise HTTPException(status_code=401, detail="persona_oauth_required")
 
-    async with httpx.AsyncClient(timeout=30) as client:
+    async with graph_session() as client:
         r = await client.get(
             f"{GRAPH}/me/accounts",
             params={
@@ -642,6 +736,7 @@ async def list_ig_accounts(request: Request, persona_num: Optional[int] = None,
             sub = e.get("error_subcode")
             if code == 190 or str(code) == "190" or (e.get("type") == "OAuthException"):
                 # 만료/권한 없음/앱 미승인(458/463/467 등) → 재인증 필요
+                _invalidate_token(user_id, persona_num)
                 raise HTTPException(status_code=401, detail="persona_oauth_required")
         except HTTPException:
             raise
@@ -680,7 +775,7 @@ async def list_ig_accounts(request: Request, persona_num: Optional[int] = None,
             return {"ok": True, "items": items, "warning": initial_error_text}
         app_token = f"{META_APP_ID}|{META_APP_SECRET}"
         try:
-            async with httpx.AsyncClient(timeout=30) as client:
+            async with graph_session() as client:
                 dbg = await client.get(
                     f"{GRAPH}/debug_token",
                     params={"input_token": token, "access_token": app_token},
@@ -695,7 +790,7 @@ async def list_ig_accounts(request: Request, persona_num: Optional[int] = None,
                             if isinstance(pid, str):
                                 page_ids.append(pid)
                 # 각 페이지에 대해 IG 연결 조회
-                async with httpx.AsyncClient(timeout=30) as client:
+                async with graph_session() as client:
                     for pid in page_ids:
                         pr = await client.get(
                             f"{GRAPH}/{pid}",
@@ -741,7 +836,7 @@ async def unlink_persona_account(
     if persona_num is None:
         raise HTTPException(status_code=400, detail="persona_num_required")
 
-    await _ensure_connector_persona_table()
+    await ensure_schema()
     pool = await get_mysql_pool()
     async with pool.acquire() as conn:
         async with conn.cursor() as cur:
@@ -753,6 +848,7 @@ async def unlink_persona_account(
                 await conn.commit()
             except Exception:
                 pass
+    _invalidate_token(user_id, persona_num)
     # ss_persona의 매핑도 정리
     await _clear_persona_instagram_mapping(user_id, int(persona_num))
     return {"ok": True}
@@ -1,8 +1,11 @@
 from fastapi import APIRouter, HTTPException, status, Request
+from typing import Optional
 from ..schemas.persona import PersonaUpsert, PersonaUpdate
 from app.api.models.persona import create_persona, get_user_personas, update_persona_fields, delete_persona
 import logging
-from app.core.s3 import s3_enabled, presign_get_url
+from app.api.routes.oauth_instagram import _invalidate_token
+from app.core.s3 import s3_enabled, apresign_many, stored_image_key
+from app.core.derivatives import SIZES as DERIVATIVE_SIZES, derivative_urls
 import os
 
 log = logging.getLogger("personas")
@@ -10,14 +13,30 @@ log = logging.getLogger("personas")
 
 router = APIRouter(prefix="/api/personas", tags=["personas"])
 
+
 @router.get("/me", status_code=status.HTTP_200_OK)
-async def list_my_personas(request: Request):
+async def list_my_personas(request: Request, size: Optional[str] = None):
+    """내 페르소나 목록. size=thumb|mid 이면 img는 WebP 파생본 URL(없으면 원본)."""
     user_id = request.session.get("user_id") if hasattr(request, "session") else None
     if not user_id:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not logged in")
+    if size is not None and size not in DERIVATIVE_SIZES:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="invalid_size")
 
     try:
         rows = await get_user_personas(int(user_id))
+        # S3 키는 목록 단위로 한 번에 프리사인(캐시 재사용)
+        presigned = {}
+        if s3_enabled():
+            s3_keys = [k for k in (stored_image_key(r.get("persona_img")) for r in rows) if k]
+            try:
+                if size:
+                    presigned = await derivative_urls(s3_keys, size)
+                missing = [k for k in s3_keys if k not in presigned]
+                if missing:
+                    presigned.update(await apresign_many(missing))
+            except Exception as e:
+                log.warning("persona_img presign failed: %s", e)
         items = []
         for r in rows:
             params = r.get("persona_parameters") or {}
@@ -28,11 +47,8 @@ async def list_my_personas(request: Request):
             # 값이 S3 키처럼 보이면(http/https, /media/가 아닌 경우) 즉시 프리사인 URL로 변환
             if raw_img and not raw_img.lower().startswith("http") and not raw_img.startswith("/media/"):
                 if s3_enabled():
-                    try:
-                        img_out = presign_get_url(raw_img)
-                    except Exception:
-                        # 실패 시 원본 키 그대로 반환
-                        img_out = raw_img
+                    # 실패 시 원본 키 그대로 반환
+                    img_out = presigned.get(raw_img) or raw_img
             # 과거 로컬 절대 URL(http://localhost, http://127.0.0.1) 보정
             elif raw_img.lower().startswith("http://localhost") or raw_img.lower().startswith("http://127.0.0.1"):
                 try:
@@ -42,7 +58,7 @@ async def list_my_personas(request: Request):
                     if path.startswith("/personas/") or path.startswith("/uploads/"):
                         # personas/uploads 경로는 S3 키로 간주하여 프리사인
                         if s3_enabled():
-                            img_out = presign_get_url(path.lstrip("/"))
+                            img_out = presigned.get(path.lstrip("/")) or raw_img
                         else:
                             backend_url = (os.getenv("BACKEND_URL") or "http://localhost:8000").rstrip("/")
                             img_out = f"{backend_url}{path}"
@@ -123,6 +139,8 @@ async def remove_my_persona(persona_num: int, request: Request):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not logged in")
     try:
         await delete_persona(int(user_id), int(persona_num))
+        # delete_persona가 ss_instagram_connector_persona도 지우므로 토큰 캐시도 정리
+        _invalidate_token(int(user_id), int(persona_num))
         return {"ok": True}
     except HTTPException:
         raise
@@ -0,0 +1,123 @@
+"""로컬 스토리지 서명 URL 서빙: GET/HEAD /api/storage/{key}?exp=&sig=
+
+- STORAGE_BACKEND=local 일 때만 동작(아니면 404). 서명/만료는 app.core.storage.verify로 검증.
+- 단일 Range(bytes=a-b, a-, -n) → 206, 범위 밖이면 416. ETag/If-None-Match → 304.
+- 서버가 ASGI zerocopy 확장(http.response.zerocopy)을 제공하면 sendfile로, 아니면 청크 스트리밍.
+- 응답은 URL 만료까지 캐시 가능(서명이 URL에 포함되므로 엣지 캐시 키로 그대로 사용 가능).
+"""
+import os
+import re
+import time
+from typing import Any, BinaryIO, Dict, Optional, Tuple
+
+import anyio
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response
+
+from app.core.storage import local_client, local_storage_enabled, verify
+
+router = APIRouter(prefix="/api/storage", tags=["storage"])
+
+_CHUNK = 256 * 1024
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """단일 바이트 범위 → (start, end) 포함 구간. 없거나 해석 불가/다중 범위면 None(전체 응답)."""
+    m = _RANGE.match((header or "").strip())
+    if not m or not (m.group(1) or m.group(2)):
+        return None
+    first, last = m.group(1), m.group(2)
+    if not first:
+        # 접미 범위: 마지막 n바이트
+        n = int(last)
+        if n == 0:
+            raise HTTPException(status_code=416, detail="range_not_satisfiable", headers={"Content-Range": f"bytes */{size}"})
+        return max(0, size - n), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise HTTPException(status_code=416, detail="range_not_satisfiable", headers={"Content-Range": f"bytes */{size}"})
+    return start, end
+
+
+class _FileRangeResponse(Response):
+    """열린 파일의 [start, start+count) 구간을 전송(zerocopy 확장 우선)."""
+
+    def __init__(self, file: BinaryIO, start: int, count: int, status_code: int, headers: Dict[str, str], media_type: str, send_body: bool) -> None:
+        super().__init__(status_code=status_code, headers=headers, media_type=media_type)
+        self.file = file
+        self.start = start
+        self.count = count
+        self.send_body = send_body
+
+    async def __call__(self, scope: Any, receive: Any, send: Any) -> None:
+        try:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            if not self.send_body or self.count == 0:
+                await send({"type": "http.response.body", "body": b""})
+                return
+            if "http.response.zerocopy" in (scope.get("extensions") or {}):
+                await send({"type": "http.response.zerocopy", "file": self.file, "offset": self.start, "count": self.count})
+                return
+            await anyio.to_thread.run_sync(self.file.seek, self.start)
+            remaining = self.count
+            while remaining > 0:
+                chunk = await anyio.to_thread.run_sync(self.file.read, min(_CHUNK, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                # 파일이 중간에 짧아진 경우에도 응답은 닫음
+                await send({"type": "http.response.body", "body": b""})
+        finally:
+            self.file.close()
+
+
+@router.api_route("/{key:path}", methods=["GET", "HEAD"])
+async def get_object(key: str, request: Request, exp: int = 0, sig: str = ""):
+    if not local_storage_enabled():
+        raise HTTPException(status_code=404, detail="local_storage_disabled")
+    now = time.time()
+    if exp < now:
+        raise HTTPException(status_code=403, detail="url_expired")
+    if not verify(key, exp, sig, now=now):
+        raise HTTPException(status_code=403, detail="invalid_signature")
+
+    store = local_client()
+    try:
+        f = open(store.path(key), "rb")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="invalid_key")
+    except (FileNotFoundError, NotADirectoryError, IsADirectoryError):
+        raise HTTPException(status_code=404, detail="not_found")
+
+    try:
+        # 원자적 교체(os.replace) 중이어도 열어 둔 파일은 한 버전으로 일관됨
+        st = os.fstat(f.fileno())
+        etag = f'"{store.etag(st)}"'
+        headers = {
+            "ETag": etag,
+            "Accept-Ranges": "bytes",
+            "Cache-Control": f"public, max-age={max(0, int(exp - now))}",
+            "Last-Modified": time.strftime("%a, %d %b %Y %H:%M:%S GMT", time.gmtime(st.st_mtime)),
+        }
+        if request.headers.get("if-none-match") == etag:
+            f.close()
+            return Response(status_code=304, headers=headers)
+
+        size = st.st_size
+        rng = _parse_range(request.headers.get("range"), size)
+        if rng is None:
+            start, count, status = 0, size, 200
+        else:
+            start, count, status = rng[0], rng[1] - rng[0] + 1, 206
+            headers["Content-Range"] = f"bytes {rng[0]}-{rng[1]}/{size}"
+        headers["Content-Length"] = str(count)
+    except BaseException:
+        f.close()
+        raise
+    return _FileRangeResponse(
+        f, start, count, status, headers, store.content_type(key), send_body=request.method != "HEAD",
+    )
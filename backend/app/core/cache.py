@@ -0,0 +1,85 @@
+"""프로세스 내 TTL + LRU 캐시 (asyncio 단일 스레드 전제, 락 없음)."""
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+_MISSING = object()
+
+
+class TTLCache:
+    """최대 크기와 항목별 만료 시각을 갖는 단순 LRU 캐시.
+
+    - set(key, value, ttl=None): ttl 생략 시 기본 ttl 사용, 0 이하이면 저장하지 않음
+    - get(key): 만료/미존재 시 default 반환(hit/miss 카운트)
+    - invalidate(key) / invalidate_where(pred) / clear()
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0) -> None:
+        self.maxsize = max(1, int(maxsize))
+        self.ttl = float(ttl)
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING, count=False) is not _MISSING
+
+    def get(self, key: Hashable, default: Any = None, count: bool = True) -> Any:
+        item = self._data.get(key)
+        if item is None:
+            if count:
+                self.misses += 1
+            return default
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            self._data.pop(key, None)
+            if count:
+                self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        if count:
+            self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else float(ttl)
+        if ttl <= 0:
+            self._data.pop(key, None)
+            return
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def remaining(self, key: Hashable) -> float:
+        """남은 유효 시간(초). 없거나 만료면 0."""
+        item = self._data.get(key)
+        if item is None:
+            return 0.0
+        return max(0.0, item[0] - time.monotonic())
+
+    def invalidate(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def invalidate_where(self, pred: Callable[[Hashable], bool]) -> int:
+        keys = [k for k in self._data if pred(k)]
+        for k in keys:
+            self._data.pop(k, None)
+        return len(keys)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,180 @@
+"""이미지 파생본(WebP 썸네일/중간 크기) 생성·조회.
+
+- 원본 키 옆(sibling)에 `{원본 경로(확장자 제외)}__{size}.webp`로 저장합니다.
+  예: chat/7/2/gen_20250101_120000.png → chat/7/2/gen_20250101_120000__thumb.webp
+- 업로드 직후 schedule_derivatives()로 백그라운드 생성, 목록 조회 시 없으면 지연 생성합니다.
+- 리사이즈/인코딩은 CPU 작업이므로 프로세스 풀에서 실행합니다(이벤트 루프/GIL과 분리).
+- Pillow가 없으면 비활성화되며 목록 API는 원본 URL을 그대로 반환합니다.
+
+설정(환경변수)
+- DERIVATIVE_THUMB_PX(기본 320), DERIVATIVE_MID_PX(기본 1024): 긴 변 기준 최대 크기
+- DERIVATIVE_WEBP_QUALITY(기본 80), DERIVATIVE_WORKERS(프로세스 수, 기본 2)
+- DERIVATIVES=0 이면 비활성화
+"""
+import asyncio
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Set
+
+from app.core.cache import TTLCache
+from app.core.s3 import ahead_object, aget_object_bytes, apresign_many, aput_bytes, s3_enabled
+
+log = logging.getLogger("derivatives")
+
+SIZES: Dict[str, int] = {
+    "thumb": int(os.getenv("DERIVATIVE_THUMB_PX", "320")),
+    "mid": int(os.getenv("DERIVATIVE_MID_PX", "1024")),
+}
+WEBP_QUALITY = int(os.getenv("DERIVATIVE_WEBP_QUALITY", "80"))
+DERIVATIVE_WORKERS = max(1, int(os.getenv("DERIVATIVE_WORKERS", "2")))
+_ENABLED = os.getenv("DERIVATIVES", "1").strip().lower() in ("1", "true", "yes")
+_SUFFIX = "__"
+
+# 파생본 존재 여부: 있으면 길게, 없으면(생성 중) 짧게 기억해 목록 조회마다 HEAD 하지 않음
+_exists = TTLCache(maxsize=8192, ttl=float(os.getenv("DERIVATIVE_EXISTS_TTL", "3600")))
+_MISSING_TTL = float(os.getenv("DERIVATIVE_MISSING_TTL", "30"))
+_HEAD_CONCURRENCY = 8
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pending: Set[str] = set()
+_tasks: Set["asyncio.Task[None]"] = set()
+
+
+def derivatives_enabled() -> bool:
+    if not (_ENABLED and s3_enabled()):
+        return False
+    try:
+        import PIL  # noqa: F401
+    except Exception:
+        return False
+    return True
+
+
+def is_derivative_key(key: str) -> bool:
+    name = key.rsplit("/", 1)[-1]
+    return any(name.endswith(f"{_SUFFIX}{size}.webp") for size in SIZES)
+
+
+def derivative_key(key: str, size: str) -> str:
+    if size not in SIZES:
+        raise ValueError("invalid_size")
+    head, _, name = key.rpartition("/")
+    stem = name.rsplit(".", 1)[0] if "." in name else name
+    return f"{head}/{stem}{_SUFFIX}{size}.webp" if head else f"{stem}{_SUFFIX}{size}.webp"
+
+
+def derivative_keys(key: str) -> List[str]:
+    return [derivative_key(key, size) for size in SIZES]
+
+
+def _render(raw: bytes, sizes: Dict[str, int], quality: int) -> Dict[str, bytes]:
+    """(프로세스 풀에서 실행) 원본 바이트 → 크기별 WebP 바이트."""
+    from io import BytesIO
+
+    from PIL import Image, ImageOps
+
+    out: Dict[str, bytes] = {}
+    with Image.open(BytesIO(raw)) as src:
+        img = ImageOps.exif_transpose(src)
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+        for name, px in sizes.items():
+            copy = img.copy()
+            copy.thumbnail((px, px), Image.LANCZOS)
+            buf = BytesIO()
+            copy.save(buf, format="WEBP", quality=quality, method=4)
+            out[name] = buf.getvalue()
+    return out
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=DERIVATIVE_WORKERS)
+    return _pool
+
+
+async def build_derivatives(key: str, raw: Optional[bytes] = None) -> Dict[str, str]:
+    """원본 키의 파생본을 만들어 업로드하고 {size: 파생 키}를 반환합니다."""
+    if raw is None:
+        raw, _ = await aget_object_bytes(key)
+    loop = asyncio.get_running_loop()
+    rendered = await loop.run_in_executor(_get_pool(), _render, raw, dict(SIZES), WEBP_QUALITY)
+    keys: Dict[str, str] = {}
+    for size, data in rendered.items():
+        dkey = derivative_key(key, size)
+        # 파생 키는 원본 키에서 결정되고 내용이 바뀌지 않으므로 길게 캐시
+        await aput_bytes(dkey, data, "image/webp", cache_control="public, max-age=31536000, immutable")
+        _exists.set(dkey, True)
+        keys[size] = dkey
+    log.info("derivatives built for %s: %s", key, {k: len(v) for k, v in rendered.items()})
+    return keys
+
+
+def schedule_derivatives(key: Optional[str], raw: Optional[bytes] = None) -> None:
+    """백그라운드 생성 예약(같은 키는 동시에 한 번만). 실패는 로그만 남깁니다."""
+    if not key or not derivatives_enabled() or is_derivative_key(key) or key in _pending:
+        return
+    _pending.add(key)
+
+    async def run() -> None:
+        try:
+            await build_derivatives(key, raw)
+        except Exception as e:
+            log.warning("derivative build failed for %s: %s", key, e)
+        finally:
+            _pending.discard(key)
+
+    task = asyncio.create_task(run())
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+async def _derivative_exists(dkey: str, sem: asyncio.Semaphore) -> bool:
+    known = _exists.get(dkey)
+    if known is not None:
+        return bool(known)
+    async with sem:
+        try:
+            exists = await ahead_object(dkey) is not None
+        except Exception as e:
+            log.warning("derivative head failed for %s: %s", dkey, e)
+            return False
+    _exists.set(dkey, exists, ttl=None if exists else _MISSING_TTL)
+    return exists
+
+
+async def derivative_urls(keys: Iterable[str], size: str) -> Dict[str, str]:
+    """원본 키 → 파생본 프리사인 URL. 아직 없는 키는 결과에서 빠지고 생성이 예약됩니다."""
+    if size not in SIZES or not derivatives_enabled():
+        return {}
+    originals = [k for k in dict.fromkeys(keys) if k and not is_derivative_key(k)]
+    sem = asyncio.Semaphore(_HEAD_CONCURRENCY)
+    found = await asyncio.gather(*(_derivative_exists(derivative_key(k, size), sem) for k in originals))
+    ready: Dict[str, str] = {}
+    for key, ok in zip(originals, found):
+        if ok:
+            ready[key] = derivative_key(key, size)
+        else:
+            schedule_derivatives(key)
+    if not ready:
+        return {}
+    urls = await apresign_many(ready.values())
+    return {key: urls[dkey] for key, dkey in ready.items() if dkey in urls}
+
+
+def forget(key: str) -> None:
+    for dkey in derivative_keys(key):
+        _exists.invalidate(dkey)
+
+
+async def shutdown() -> None:
+    global _pool
+    for task in list(_tasks):
+        task.cancel()
+    if _tasks:
+        await asyncio.gather(*_tasks, return_exceptions=True)
+    pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
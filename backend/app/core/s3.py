@@ -2,10 +2,19 @@ import os
 import base64
 import re
 import mimetypes
+import asyncio
+import hashlib
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from functools import lru_cache
-from typing import Optional, Tuple
+from typing import Any, AsyncIterator, BinaryIO, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from app.core.cache import TTLCache
+from app.core.storage import local_client, local_storage_enabled
 
 
 log = logging.getLogger("s3")
@@ -20,7 +29,10 @@ def s3_enabled() -> bool:
     """최소한의 S3 설정이 갖춰졌는지 여부 반환.
 
     버킷/액세스/시크릿 키가 필요합니다. 엔드포인트/리전은 NCP 오브젝트 스토리지 기본값을 사용합니다.
+    STORAGE_BACKEND=local 이면 로컬 디스크 백엔드가 항상 사용 가능합니다.
     """
+    if local_storage_enabled():
+        return True
     return bool(
         _env("NCP_S3_BUCKET")
         and _env("NCP_S3_ACCESS_KEY")
@@ -28,8 +40,20 @@ def s3_enabled() -> bool:
     )
 
 
-@lru_cache(maxsize=1)
+# boto3 커넥션 풀 크기 / 비동기 래퍼가 쓰는 전용 스레드 수
+S3_MAX_POOL_CONNECTIONS = int(_env("S3_MAX_POOL_CONNECTIONS", "32"))
+S3_MAX_WORKERS = int(_env("S3_MAX_WORKERS", "16"))
+
+
 def get_s3_client():
+    """스토리지 클라이언트. STORAGE_BACKEND=local 이면 같은 API를 구현한 LocalStorage(app.core.storage)."""
+    if local_storage_enabled():
+        return local_client()
+    return _get_boto_client()
+
+
+@lru_cache(maxsize=1)
+def _get_boto_client():
     """NCP 오브젝트 스토리지에 맞춰 설정된 boto3 S3 클라이언트를 생성/캐시합니다.
 
     실제 사용 시점에 지연 임포트하여 테스트 시 불필요한 의존성을 줄입니다.
@@ -46,6 +70,16 @@ def get_s3_client():
     access_key = _env("NCP_S3_ACCESS_KEY")
     secret_key = _env("NCP_S3_SECRET_KEY")
 
+    # 비동기 래퍼(스레드 풀)와 동시 요청 수를 맞춘 커넥션 풀
+    try:
+        from botocore.config import Config  # type: ignore
+        config = Config(
+            max_pool_connections=S3_MAX_POOL_CONNECTIONS,
+            retries={"max_attempts": 3, "mode": "standard"},
+        )
+    except Exception:
+        config = None
+
     session = boto3.session.Session()
     s3 = session.client(
         "s3",
@@ -53,6 +87,7 @@ def get_s3_client():
         region_name=region,
         aws_access_key_id=access_key,
         aws_secret_access_key=secret_key,
+        config=config,
     )
     return s3
 
@@ -106,26 +141,16 @@ def _sanitize_prefix(p: Optional[str]) -> Optional[str]:
     return "/".join(parts) if parts else None
 
 
-def put_data_uri(
-    data_uri: str,
+def _build_key(
+    ext: str,
     model: Optional[str] = None,
     key_prefix: Optional[str] = None,
     base_prefix: Optional[str] = None,
     include_model: bool = True,
     include_date: bool = True,
+    digest: Optional[str] = None,
 ) -> str:
-    """data URI를 S3로 업로드하고 오브젝트 키를 반환합니다.
-
-    키 형식: {prefix}/{model?}/{YYYYMMDD}/gen_{ts}{ext}
-    prefix 기본값은 환경변수 NCP_S3_PREFIX(없으면 'dev').
-    """
-    if not s3_enabled():
-        raise RuntimeError("S3 not enabled/configured")
-
-    raw, ext, content_type = _parse_data_uri(data_uri)
-    s3 = get_s3_client()
-    bucket = _env("NCP_S3_BUCKET")
-
+    """키 형식: {prefix}/{model?}/{YYYYMMDD}/gen_{ts}{ext} (digest가 있으면 파일명은 {digest}{ext})"""
     # 기본 prefix 결정: 전달값이 우선, 빈 문자열은 기본 prefix 비활성화
     if base_prefix is None:
         resolved_base = _env("NCP_S3_PREFIX", "dev")
@@ -140,8 +165,8 @@ def put_data_uri(
     else:
         prefix = sub_prefix or resolved_base
     ts = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-    # 파일 기본 이름: 타임스탬프 기반
-    base_name = f"gen_{ts}"
+    # 파일 기본 이름: 타임스탬프 기반(콘텐츠 주소 모드면 내용 해시)
+    base_name = digest or f"gen_{ts}"
     date_part = datetime.utcnow().strftime("%Y%m%d")
     parts = [prefix]
     if include_model and model:
@@ -150,37 +175,253 @@ def put_data_uri(
         parts.append(date_part)
     parts = [p for p in parts if p]
     key_dir = "/".join(parts) if parts else ""
-    key = f"{key_dir}/{base_name}{ext}" if key_dir else f"{base_name}{ext}"
+    return f"{key_dir}/{base_name}{ext}" if key_dir else f"{base_name}{ext}"
+
 
+# 콘텐츠 주소 키: 파일명 = sha256(내용) 앞 32자. 같은 prefix의 같은 내용은 같은 키 → 업로드 생략
+# 존재 확인은 최근 업로드/확인한 키 캐시 → HEAD 순. 캐시는 aput_*의 스레드 풀에서도 쓰이므로 락으로 보호
+S3_CONTENT_ADDRESSED = (_env("S3_CONTENT_ADDRESSED", "0") or "0").strip().lower() in ("1", "true", "yes")
+_known_keys = TTLCache(maxsize=int(_env("S3_KNOWN_KEYS_MAX", "4096")), ttl=float(_env("S3_KNOWN_KEYS_TTL", "3600")))
+_known_lock = threading.Lock()
+_dedup = {"cache_hits": 0, "head_hits": 0, "uploads": 0}
+
+
+def _content_addressed(flag: Optional[bool]) -> bool:
+    return S3_CONTENT_ADDRESSED if flag is None else bool(flag)
+
+
+def _digest(h: "hashlib._Hash") -> str:
+    return h.hexdigest()[:32]
+
+
+def _remember_key(key: str) -> None:
+    with _known_lock:
+        _known_keys.set(key, True)
+        _dedup["uploads"] += 1
+
+
+def _forget_key(key: str) -> None:
+    with _known_lock:
+        _known_keys.invalidate(key)
+
+
+def _object_exists(key: str) -> bool:
+    with _known_lock:
+        if _known_keys.get(key, False, count=False):
+            _dedup["cache_hits"] += 1
+            log.info("dedup: %s already uploaded (cache)", key)
+            return True
+    try:
+        exists = head_object(key) is not None
+    except Exception as e:
+        # HEAD 실패 시 안전하게 업로드 진행
+        log.warning("head_object failed for %s: %s", key, e)
+        return False
+    if exists:
+        with _known_lock:
+            _known_keys.set(key, True)
+            _dedup["head_hits"] += 1
+        log.info("dedup: %s already exists (HEAD)", key)
+    return exists
+
+
+def _put_extra_args(content_type: str) -> dict:
     extra_args = {"ContentType": content_type}
     sse = _env("NCP_S3_SSE")
     if sse:
         # 예: 'AES256' 또는 'aws:kms' (버킷 정책으로 KMS 키 설정)
         extra_args["ServerSideEncryption"] = sse
+    return extra_args
+
 
-    s3.put_object(Bucket=bucket, Key=key, Body=raw, **extra_args)
+def put_data_uri(
+    data_uri: str,
+    model: Optional[str] = None,
+    key_prefix: Optional[str] = None,
+    base_prefix: Optional[str] = None,
+    include_model: bool = True,
+    include_date: bool = True,
+    content_addressed: Optional[bool] = None,
+) -> str:
+    """data URI를 S3로 업로드하고 오브젝트 키를 반환합니다.
+
+    키 형식: {prefix}/{model?}/{YYYYMMDD}/gen_{ts}{ext}
+    prefix 기본값은 환경변수 NCP_S3_PREFIX(없으면 'dev').
+    content_addressed(기본: S3_CONTENT_ADDRESSED)면 파일명이 내용 해시이고, 이미 있는 객체는 다시 올리지 않습니다.
+    """
+    if not s3_enabled():
+        raise RuntimeError("S3 not enabled/configured")
+
+    raw, ext, content_type = _parse_data_uri(data_uri)
+    s3 = get_s3_client()
+    bucket = _env("NCP_S3_BUCKET")
+    digest = _digest(hashlib.sha256(raw)) if _content_addressed(content_addressed) else None
+    key = _build_key(ext, model, key_prefix, base_prefix, include_model, include_date, digest)
+    if digest and _object_exists(key):
+        return key
+
+    s3.put_object(Bucket=bucket, Key=key, Body=raw, **_put_extra_args(content_type))
+    if digest:
+        _remember_key(key)
     log.info("Uploaded object to s3: s3://%s/%s (%s)", bucket, key, content_type)
     return key
 
 
-def presign_get_url(key: str, expires_in: Optional[int] = None) -> str:
+def put_fileobj(
+    fileobj: BinaryIO,
+    content_type: str,
+    model: Optional[str] = None,
+    key_prefix: Optional[str] = None,
+    base_prefix: Optional[str] = None,
+    include_model: bool = True,
+    include_date: bool = True,
+    content_addressed: Optional[bool] = None,
+) -> str:
+    """파일 객체(바이트 스트림)를 그대로 S3로 업로드하고 오브젝트 키를 반환합니다.
+
+    data URI(base64) 변환 없이 upload_fileobj로 전송하며, 큰 객체는 멀티파트로 나뉩니다.
+    키 형식/content_addressed는 put_data_uri와 같습니다.
+    """
     if not s3_enabled():
         raise RuntimeError("S3 not enabled/configured")
+
+    ext, content_type = _guess_ext_and_content_type((content_type or "").split(";")[0].strip().lower())
     s3 = get_s3_client()
     bucket = _env("NCP_S3_BUCKET")
-    if expires_in is None:
-        try:
-            expires_in = int(_env("PRESIGN_DEFAULT_EXPIRES", "3600"))
-        except Exception:
-            expires_in = 3600
-    url = s3.generate_presigned_url(
+    digest = None
+    if _content_addressed(content_addressed):
+        # 해시를 위해 한 번 읽고 처음으로 되돌림(seek 가능한 파일 객체 전제)
+        start = fileobj.tell()
+        h = hashlib.sha256()
+        for chunk in iter(lambda: fileobj.read(1024 * 1024), b""):
+            h.update(chunk)
+        fileobj.seek(start)
+        digest = _digest(h)
+    key = _build_key(ext, model, key_prefix, base_prefix, include_model, include_date, digest)
+    if digest and _object_exists(key):
+        return key
+
+    s3.upload_fileobj(fileobj, bucket, key, ExtraArgs=_put_extra_args(content_type))
+    if digest:
+        _remember_key(key)
+    log.info("Uploaded object to s3: s3://%s/%s (%s)", bucket, key, content_type)
+    return key
+
+
+# 프리사인 URL 캐시: (key, expires_in, expires_bucket) → url
+# 같은 버킷(시간 구간) 안에서는 같은 URL을 재사용하고, 구간이 끝나면 항목도 만료됩니다.
+# 구간 길이가 B초면 재사용 URL의 남은 유효 시간은 항상 expires_in - B 이상입니다.
+_presign_cache = TTLCache(
+    maxsize=int(_env("PRESIGN_CACHE_MAX", "4096")),
+    ttl=float(_env("PRESIGN_CACHE_BUCKET", "600")),
+)
+
+
+def _default_expires() -> int:
+    try:
+        return int(_env("PRESIGN_DEFAULT_EXPIRES", "3600"))
+    except Exception:
+        return 3600
+
+
+def _presign_bucket(expires_in: int, now: float) -> Tuple[int, float]:
+    """(버킷 번호, 버킷 종료까지 남은 초). 구간 길이는 expires_in의 절반을 넘지 않음."""
+    size = max(1.0, min(_presign_cache.ttl, expires_in / 2))
+    bucket = int(now // size)
+    return bucket, (bucket + 1) * size - now
+
+
+def _sign(key: str, expires_in: int) -> str:
+    s3 = get_s3_client()
+    bucket = _env("NCP_S3_BUCKET")
+    return s3.generate_presigned_url(
         ClientMethod="get_object",
         Params={"Bucket": bucket, "Key": key},
         ExpiresIn=expires_in,
     )
+
+
+def presign_get_url(key: str, expires_in: Optional[int] = None) -> str:
+    if not s3_enabled():
+        raise RuntimeError("S3 not enabled/configured")
+    if expires_in is None:
+        expires_in = _default_expires()
+    bucket, left = _presign_bucket(expires_in, time.time())
+    ck = (key, expires_in, bucket)
+    url = _presign_cache.get(ck)
+    if url is None:
+        url = _sign(key, expires_in)
+        _presign_cache.set(ck, url, ttl=left)
     return url
 
 
+def _presign_lookup(keys: Iterable[str], expires_in: int) -> Tuple[Dict[str, str], List[str], int, float]:
+    """캐시 조회만 수행: (적중 결과, 서명이 필요한 키, 버킷 번호, 버킷 남은 초)."""
+    bucket, left = _presign_bucket(expires_in, time.time())
+    out: Dict[str, str] = {}
+    misses: List[str] = []
+    for key in keys:
+        if not key or key in out or key in misses:
+            continue
+        url = _presign_cache.get((key, expires_in, bucket))
+        if url is None:
+            misses.append(key)
+        else:
+            out[key] = url
+    return out, misses, bucket, left
+
+
+def _sign_many(keys: List[str], expires_in: int) -> Dict[str, str]:
+    signed: Dict[str, str] = {}
+    for key in keys:
+        try:
+            signed[key] = _sign(key, expires_in)
+        except Exception as e:
+            log.warning("presign failed for %s: %s", key, e)
+    return signed
+
+
+def _presign_store(signed: Dict[str, str], expires_in: int, bucket: int, left: float) -> None:
+    for key, url in signed.items():
+        _presign_cache.set((key, expires_in, bucket), url, ttl=left)
+
+
+def presign_many(keys: Iterable[str], expires_in: Optional[int] = None) -> Dict[str, str]:
+    """여러 키를 한 번에 프리사인(중복 제거 + 캐시 재사용). 실패한 키는 결과에서 빠집니다."""
+    if not s3_enabled():
+        raise RuntimeError("S3 not enabled/configured")
+    if expires_in is None:
+        expires_in = _default_expires()
+    out, misses, bucket, left = _presign_lookup(keys, expires_in)
+    if misses:
+        signed = _sign_many(misses, expires_in)
+        _presign_store(signed, expires_in, bucket, left)
+        out.update(signed)
+    return out
+
+
+def stored_image_key(value: Optional[str]) -> Optional[str]:
+    """DB에 저장된 이미지 값(persona_img 등)이 가리키는 버킷 키(프리사인 대상). 키가 아니면 None.
+
+    - 'personas/..' 같은 키는 그대로
+    - 과거 로컬 절대 URL(http://localhost, http://127.0.0.1)의 /personas/, /uploads/ 경로는 키로 간주
+    - 그 밖의 URL, data URI, '/'로 시작하는 경로는 None
+    """
+    s = str(value).strip() if value is not None else ""
+    low = s.lower()
+    if s and not low.startswith("http") and not s.startswith("data:") and not s.startswith("/"):
+        return s
+    if low.startswith("http://localhost") or low.startswith("http://127.0.0.1"):
+        path = urlparse(s).path or ""
+        if path.startswith("/personas/") or path.startswith("/uploads/"):
+            return path.lstrip("/")
+    return None
+
+
+def presign_cache_stats() -> Dict[str, Any]:
+    return _presign_cache.stats()
+
+
 def delete_object(key: str) -> bool:
     """Delete an object by key. Returns True if no exception was raised.
 
@@ -188,12 +429,286 @@ def delete_object(key: str) -> bool:
     """
     if not s3_enabled():
         return False
+    ok = _delete_uncached(key)
+    if ok:
+        _presign_cache.invalidate_where(lambda ck: ck[0] == key)
+    return ok
+
+
+def _delete_uncached(key: str) -> bool:
     try:
         s3 = get_s3_client()
         bucket = _env("NCP_S3_BUCKET")
         s3.delete_object(Bucket=bucket, Key=key)
+        _forget_key(key)
         log.info("Deleted object from s3: s3://%s/%s", bucket, key)
         return True
     except Exception as e:
         log.warning("Failed to delete s3 object %s: %s", key, e)
         return False
+
+
+# DeleteObjects 한 번에 보낼 수 있는 최대 키 수(S3 제한)
+S3_DELETE_BATCH = 1000
+
+
+def _invalidate_presigned(keys: Iterable[str]) -> None:
+    gone = set(keys)
+    if gone:
+        _presign_cache.invalidate_where(lambda ck: ck[0] in gone)
+
+
+def _delete_many_uncached(keys: List[str]) -> Tuple[List[str], Dict[str, str]]:
+    """DeleteObjects를 1000개 단위로 호출. (삭제된 키, {실패 키: 오류 코드}) 반환."""
+    s3 = get_s3_client()
+    bucket = _env("NCP_S3_BUCKET")
+    deleted: List[str] = []
+    errors: Dict[str, str] = {}
+    for i in range(0, len(keys), S3_DELETE_BATCH):
+        chunk = keys[i:i + S3_DELETE_BATCH]
+        try:
+            # Quiet 모드: 응답에는 실패한 키만 포함
+            r = s3.delete_objects(
+                Bucket=bucket,
+                Delete={"Objects": [{"Key": k} for k in chunk], "Quiet": True},
+            )
+        except Exception as e:
+            log.warning("Failed to batch delete %d s3 objects: %s", len(chunk), e)
+            errors.update({k: str(e) for k in chunk})
+            continue
+        failed = {
+            err.get("Key"): str(err.get("Code") or err.get("Message") or "error")
+            for err in (r.get("Errors") or [])
+        }
+        errors.update(failed)
+        for k in chunk:
+            if k not in failed:
+                deleted.append(k)
+                _forget_key(k)
+    log.info("Batch deleted %d s3 objects (%d failed)", len(deleted), len(errors))
+    return deleted, errors
+
+
+def delete_objects(keys: Iterable[str]) -> Dict[str, Any]:
+    """여러 키를 한 번에 삭제(DeleteObjects, 요청당 최대 1000개).
+
+    반환: {"deleted": [키...], "errors": {키: 오류}}. S3 미설정이면 아무것도 하지 않습니다.
+    """
+    unique = [k for k in dict.fromkeys(keys) if k]
+    if not s3_enabled() or not unique:
+        return {"deleted": [], "errors": {}}
+    deleted, errors = _delete_many_uncached(unique)
+    _invalidate_presigned(deleted)
+    return {"deleted": deleted, "errors": errors}
+
+
+def list_objects_page(
+    prefix: str, token: Optional[str] = None, page_size: int = 1000
+) -> Tuple[List[Tuple[str, Any]], Optional[str]]:
+    """list_objects_v2 한 페이지: ([(키, LastModified)...], 다음 continuation token)."""
+    if not s3_enabled():
+        raise RuntimeError("S3 not enabled/configured")
+    kwargs: Dict[str, Any] = {"Bucket": _env("NCP_S3_BUCKET"), "Prefix": prefix, "MaxKeys": page_size}
+    if token:
+        kwargs["ContinuationToken"] = token
+    r = get_s3_client().list_objects_v2(**kwargs)
+    items = [(o["Key"], o.get("LastModified")) for o in (r.get("Contents") or [])]
+    return items, (r.get("NextContinuationToken") if r.get("IsTruncated") else None)
+
+
+def head_object(key: str) -> Optional[Dict[str, Any]]:
+    """오브젝트 메타데이터(size/content_type/etag). 없으면 None."""
+    if not s3_enabled():
+        return None
+    s3 = get_s3_client()
+    try:
+        r = s3.head_object(Bucket=_env("NCP_S3_BUCKET"), Key=key)
+    except Exception as e:
+        code = str(getattr(e, "response", {}).get("Error", {}).get("Code", ""))
+        if code in ("404", "NoSuchKey", "NotFound"):
+            return None
+        raise
+    return {
+        "key": key,
+        "size": r.get("ContentLength"),
+        "content_type": r.get("ContentType"),
+        "etag": (r.get("ETag") or "").strip('"') or None,
+    }
+
+
+def put_bytes(key: str, data: bytes, content_type: str, cache_control: Optional[str] = None) -> str:
+    """지정한 키 그대로 바이트를 업로드(파생 이미지 등 키 규칙을 호출자가 정하는 경우)."""
+    if not s3_enabled():
+        raise RuntimeError("S3 not enabled/configured")
+    extra = _put_extra_args(content_type)
+    if cache_control:
+        extra["CacheControl"] = cache_control
+    get_s3_client().put_object(Bucket=_env("NCP_S3_BUCKET"), Key=key, Body=data, **extra)
+    log.info("Uploaded object to s3: s3://%s/%s (%s)", _env("NCP_S3_BUCKET"), key, content_type)
+    return key
+
+
+def get_object_bytes(key: str) -> Tuple[bytes, str]:
+    """오브젝트 본문과 Content-Type."""
+    if not s3_enabled():
+        raise RuntimeError("S3 not enabled/configured")
+    r = get_s3_client().get_object(Bucket=_env("NCP_S3_BUCKET"), Key=key)
+    body = r["Body"]
+    try:
+        return body.read(), r.get("ContentType") or "application/octet-stream"
+    finally:
+        try:
+            body.close()
+        except Exception:
+            pass
+
+
+# ===== 비동기 API =====
+# boto3는 블로킹이므로 전용 스레드 풀에서 실행합니다(이벤트 루프/기본 executor와 분리).
+# 프리사인 캐시(TTLCache)는 스레드 안전하지 않으므로 조회/저장은 항상 이벤트 루프에서 수행합니다.
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+class _S3Metrics:
+    def __init__(self) -> None:
+        self.in_flight: Dict[str, int] = {}
+        self.calls: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        self.total_ms: Dict[str, float] = {}
+        self.max_in_flight = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "in_flight": sum(self.in_flight.values()),
+            "max_in_flight": self.max_in_flight,
+            "ops": {
+                op: {
+                    "in_flight": self.in_flight.get(op, 0),
+                    "calls": n,
+                    "errors": self.errors.get(op, 0),
+                    "avg_ms": round(self.total_ms.get(op, 0.0) / n, 2) if n else 0.0,
+                }
+                for op, n in sorted(self.calls.items())
+            },
+        }
+
+
+_metrics = _S3Metrics()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=S3_MAX_WORKERS, thread_name_prefix="s3")
+    return _executor
+
+
+async def _run(op: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    m = _metrics
+    m.in_flight[op] = m.in_flight.get(op, 0) + 1
+    m.calls[op] = m.calls.get(op, 0) + 1
+    m.max_in_flight = max(m.max_in_flight, sum(m.in_flight.values()))
+    started = time.perf_counter()
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_executor(), lambda: fn(*args, **kwargs))
+    except Exception:
+        m.errors[op] = m.errors.get(op, 0) + 1
+        raise
+    finally:
+        m.in_flight[op] -= 1
+        m.total_ms[op] = m.total_ms.get(op, 0.0) + (time.perf_counter() - started) * 1000
+
+
+async def aput_data_uri(data_uri: str, **kwargs: Any) -> str:
+    return await _run("put", put_data_uri, data_uri, **kwargs)
+
+
+async def aput_fileobj(fileobj: BinaryIO, content_type: str, **kwargs: Any) -> str:
+    return await _run("put", put_fileobj, fileobj, content_type, **kwargs)
+
+
+async def apresign_get_url(key: str, expires_in: Optional[int] = None) -> str:
+    if not s3_enabled():
+        raise RuntimeError("S3 not enabled/configured")
+    if expires_in is None:
+        expires_in = _default_expires()
+    out, misses, bucket, left = _presign_lookup([key], expires_in)
+    if key in out:
+        return out[key]
+    url = await _run("presign", _sign, key, expires_in)
+    _presign_store({key: url}, expires_in, bucket, left)
+    return url
+
+
+async def apresign_many(keys: Iterable[str], expires_in: Optional[int] = None) -> Dict[str, str]:
+    if not s3_enabled():
+        raise RuntimeError("S3 not enabled/configured")
+    if expires_in is None:
+        expires_in = _default_expires()
+    out, misses, bucket, left = _presign_lookup(keys, expires_in)
+    if misses:
+        signed = await _run("presign", _sign_many, misses, expires_in)
+        _presign_store(signed, expires_in, bucket, left)
+        out.update(signed)
+    return out
+
+
+async def adelete_object(key: str) -> bool:
+    if not s3_enabled():
+        return False
+    ok = await _run("delete", _delete_uncached, key)
+    if ok:
+        _presign_cache.invalidate_where(lambda ck: ck[0] == key)
+    return ok
+
+
+async def adelete_objects(keys: Iterable[str]) -> Dict[str, Any]:
+    unique = [k for k in dict.fromkeys(keys) if k]
+    if not s3_enabled() or not unique:
+        return {"deleted": [], "errors": {}}
+    deleted, errors = await _run("delete_many", _delete_many_uncached, unique)
+    _invalidate_presigned(deleted)
+    return {"deleted": deleted, "errors": errors}
+
+
+async def aiter_objects(prefix: str, page_size: int = 1000) -> AsyncIterator[Tuple[str, Any]]:
+    """prefix 아래 오브젝트를 키 순서(UTF-8 바이트 순)로 한 페이지씩 가져오며 (키, LastModified)를 내보냅니다."""
+    token: Optional[str] = None
+    while True:
+        items, token = await _run("list", list_objects_page, prefix, token, page_size)
+        for item in items:
+            yield item
+        if not token:
+            return
+
+
+async def ahead_object(key: str) -> Optional[Dict[str, Any]]:
+    return await _run("head", head_object, key)
+
+
+async def aput_bytes(key: str, data: bytes, content_type: str, cache_control: Optional[str] = None) -> str:
+    return await _run("put", put_bytes, key, data, content_type, cache_control)
+
+
+async def aget_object_bytes(key: str) -> Tuple[bytes, str]:
+    return await _run("get", get_object_bytes, key)
+
+
+def s3_stats() -> Dict[str, Any]:
+    return {
+        **_metrics.snapshot(),
+        "max_workers": S3_MAX_WORKERS,
+        "max_pool_connections": S3_MAX_POOL_CONNECTIONS,
+        "presign_cache": presign_cache_stats(),
+        "content_addressed": S3_CONTENT_ADDRESSED,
+        "dedup": dict(_dedup),
+    }
+
+
+def shutdown_executor() -> None:
+    global _executor
+    ex, _executor = _executor, None
+    if ex is not None:
+        ex.shutdown(wait=False)
@@ -0,0 +1,312 @@
+"""오브젝트 스토리지 백엔드 선택과 로컬 디스크 구현.
+
+app.core.s3의 모든 함수(업로드/프리사인/삭제/목록/파생본)는 get_s3_client()가 돌려주는
+클라이언트의 boto3 S3 API 일부(StorageClient)만 사용합니다. 그래서 백엔드는 두 가지입니다.
+
+- s3(기본): boto3 클라이언트(NCP 오브젝트 스토리지)
+- local: LocalStorage. 같은 키 레이아웃을 LOCAL_STORAGE_ROOT 아래 파일로 저장합니다.
+  · 쓰기는 같은 디렉터리의 임시 파일에 쓴 뒤 os.replace로 교체합니다(원자적, 읽는 쪽은 항상 완성본).
+  · 프리사인 URL은 HMAC-SHA256 서명과 만료 시각이 붙은 /api/storage/{key} 주소입니다.
+    (routes/storage.py가 검증 후 Range/zerocopy로 서빙)
+  · 목록은 키의 바이트 순서(S3와 동일)로 디렉터리를 순회하며, 페이지 단위로만 읽습니다.
+  버킷 없이 이미지 경로를 개발/부하 테스트하거나, 서명 URL을 캐시 가능한 엣지 계층으로 쓸 때 사용합니다.
+
+설정(환경변수)
+- STORAGE_BACKEND: s3 | local (기본 s3)
+- LOCAL_STORAGE_ROOT: 저장 루트(기본 backend/.storage)
+- LOCAL_STORAGE_URL: 서명 URL 기준 주소(기본 BACKEND_URL + /api/storage)
+- LOCAL_STORAGE_SECRET: 서명 키(기본 SESSION_SECRET, 둘 다 없으면 프로세스별 난수 키 + 경고)
+- LOCAL_STORAGE_FSYNC: 1이면 교체 전에 fsync(기본 1, 벤치마크 시 0)
+"""
+import hashlib
+import hmac
+import logging
+import mimetypes
+import os
+import secrets
+import shutil
+import tempfile
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+from itertools import islice
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Protocol, Tuple
+from urllib.parse import quote, urlencode
+
+log = logging.getLogger("storage")
+
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_TMP = ".tmp-"
+_TYPES = {
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".webp": "image/webp",
+    ".gif": "image/gif",
+    ".svg": "image/svg+xml",
+}
+
+
+def _env(name: str, default: Optional[str] = None) -> Optional[str]:
+    v = os.getenv(name)
+    return v if v not in {None, ""} else default
+
+
+def storage_backend() -> str:
+    return (_env("STORAGE_BACKEND", "s3") or "s3").strip().lower()
+
+
+def local_storage_enabled() -> bool:
+    return storage_backend() == "local"
+
+
+class StorageClient(Protocol):
+    """app.core.s3가 사용하는 boto3 S3 클라이언트 메서드(로컬 구현도 같은 시그니처/응답 형태)."""
+
+    def put_object(self, Bucket: Any, Key: str, Body: Any, **kwargs: Any) -> Dict[str, Any]: ...
+    def upload_fileobj(self, Fileobj: BinaryIO, Bucket: Any, Key: str, ExtraArgs: Optional[Dict[str, Any]] = None) -> None: ...
+    def get_object(self, Bucket: Any, Key: str) -> Dict[str, Any]: ...
+    def head_object(self, Bucket: Any, Key: str) -> Dict[str, Any]: ...
+    def delete_object(self, Bucket: Any, Key: str) -> Dict[str, Any]: ...
+    def delete_objects(self, Bucket: Any, Delete: Dict[str, Any]) -> Dict[str, Any]: ...
+    def list_objects_v2(self, Bucket: Any, Prefix: str = "", MaxKeys: int = 1000, ContinuationToken: Optional[str] = None) -> Dict[str, Any]: ...
+    def generate_presigned_url(self, ClientMethod: str, Params: Dict[str, Any], ExpiresIn: int = 3600) -> str: ...
+
+
+class NoSuchKey(Exception):
+    """boto3 ClientError와 같은 모양(.response["Error"]["Code"])으로 404를 알림."""
+
+    def __init__(self, key: str) -> None:
+        super().__init__(f"NoSuchKey: {key}")
+        self.response = {"Error": {"Code": "NoSuchKey", "Key": key}}
+
+
+# ===== 서명 =====
+
+_fallback_secret: Optional[bytes] = None
+
+
+def _secret() -> bytes:
+    global _fallback_secret
+    configured = _env("LOCAL_STORAGE_SECRET") or _env("SESSION_SECRET")
+    if configured:
+        return configured.encode()
+    if _fallback_secret is None:
+        # 공개된 기본 문자열로 서명하면 누구나 URL을 위조할 수 있으므로 프로세스별 난수 키를 씀
+        # (재시작/다른 워커에서는 이전 URL이 검증되지 않음)
+        _fallback_secret = secrets.token_bytes(32)
+        log.warning("LOCAL_STORAGE_SECRET/SESSION_SECRET not set; signing storage URLs with a random per-process key")
+    return _fallback_secret
+
+
+def sign(key: str, expires: int) -> str:
+    return hmac.new(_secret(), f"{key}\n{expires}".encode(), hashlib.sha256).hexdigest()
+
+
+def verify(key: str, expires: int, signature: str, now: Optional[float] = None) -> bool:
+    if expires < (now if now is not None else time.time()):
+        return False
+    return hmac.compare_digest(sign(key, expires), signature or "")
+
+
+def _base_url() -> str:
+    base = _env("LOCAL_STORAGE_URL") or f"{(_env('BACKEND_URL', 'http://localhost:8000') or '').rstrip('/')}/api/storage"
+    return base.rstrip("/")
+
+
+def signed_url(key: str, expires_in: int, now: Optional[float] = None) -> str:
+    expires = int((now if now is not None else time.time()) + expires_in)
+    return f"{_base_url()}/{quote(key)}?{urlencode({'exp': expires, 'sig': sign(key, expires)})}"
+
+
+# ===== 로컬 디스크 구현 =====
+
+def local_client() -> "LocalStorage":
+    """환경변수 설정별로 캐시된 LocalStorage."""
+    root = _env("LOCAL_STORAGE_ROOT") or os.path.join(_BACKEND_DIR, ".storage")
+    fsync = (_env("LOCAL_STORAGE_FSYNC", "1") or "1").strip().lower() in ("1", "true", "yes")
+    return _local_client(os.path.abspath(root), fsync)
+
+
+@lru_cache(maxsize=4)
+def _local_client(root: str, fsync: bool) -> "LocalStorage":
+    return LocalStorage(root, fsync=fsync)
+
+
+class LocalStorage:
+    def __init__(self, root: str, fsync: bool = True) -> None:
+        self.root = os.path.abspath(root)
+        self.fsync = fsync
+        os.makedirs(self.root, exist_ok=True)
+
+    # --- 경로/메타데이터 ---
+
+    def path(self, key: str) -> str:
+        """키 → 루트 아래 파일 경로. 상위 경로/빈 세그먼트/임시 파일 이름은 거부."""
+        parts = (key or "").split("/")
+        if not key or any(p in ("", ".", "..") or p.startswith(_TMP) or "\\" in p or "\x00" in p for p in parts):
+            raise ValueError("invalid_key")
+        return os.path.join(self.root, *parts)
+
+    @staticmethod
+    def content_type(key: str) -> str:
+        ext = os.path.splitext(key)[1].lower()
+        return _TYPES.get(ext) or mimetypes.guess_type(key)[0] or "application/octet-stream"
+
+    @staticmethod
+    def etag(st: os.stat_result) -> str:
+        return f"{st.st_size:x}-{st.st_mtime_ns:x}"
+
+    def _meta(self, key: str, st: os.stat_result) -> Dict[str, Any]:
+        return {
+            "ContentLength": st.st_size,
+            "ContentType": self.content_type(key),
+            "ETag": f'"{self.etag(st)}"',
+            "LastModified": datetime.fromtimestamp(st.st_mtime, tz=timezone.utc),
+        }
+
+    # --- 쓰기 ---
+
+    def _atomic_write(self, key: str, fill) -> None:
+        dest = self.path(key)
+        parent = os.path.dirname(dest)
+        os.makedirs(parent, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=_TMP, dir=parent)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                fill(f)
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, dest)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+
+    def put_object(self, Bucket: Any, Key: str, Body: Any, **kwargs: Any) -> Dict[str, Any]:
+        if isinstance(Body, (bytes, bytearray, memoryview)):
+            self._atomic_write(Key, lambda f: f.write(Body))
+        else:
+            self._atomic_write(Key, lambda f: shutil.copyfileobj(Body, f, 1024 * 1024))
+        return {"ETag": f'"{self.etag(os.stat(self.path(Key)))}"'}
+
+    def upload_fileobj(self, Fileobj: BinaryIO, Bucket: Any, Key: str, ExtraArgs: Optional[Dict[str, Any]] = None) -> None:
+        self._atomic_write(Key, lambda f: shutil.copyfileobj(Fileobj, f, 1024 * 1024))
+
+    # --- 읽기 ---
+
+    def head_object(self, Bucket: Any, Key: str) -> Dict[str, Any]:
+        try:
+            st = os.stat(self.path(Key))
+        except (FileNotFoundError, NotADirectoryError):
+            raise NoSuchKey(Key)
+        return self._meta(Key, st)
+
+    def get_object(self, Bucket: Any, Key: str) -> Dict[str, Any]:
+        try:
+            f = open(self.path(Key), "rb")
+        except (FileNotFoundError, NotADirectoryError, IsADirectoryError):
+            raise NoSuchKey(Key)
+        return {"Body": f, **self._meta(Key, os.fstat(f.fileno()))}
+
+    # --- 삭제 ---
+
+    def _remove(self, key: str) -> None:
+        path = self.path(key)
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            return
+        # 비어 있는 상위 디렉터리 정리(목록 순회 비용 감소)
+        parent = os.path.dirname(path)
+        while parent != self.root and parent.startswith(self.root):
+            try:
+                os.rmdir(parent)
+            except OSError:
+                break
+            parent = os.path.dirname(parent)
+
+    def delete_object(self, Bucket: Any, Key: str) -> Dict[str, Any]:
+        self._remove(Key)
+        return {}
+
+    def delete_objects(self, Bucket: Any, Delete: Dict[str, Any]) -> Dict[str, Any]:
+        errors: List[Dict[str, str]] = []
+        deleted: List[Dict[str, str]] = []
+        for obj in Delete.get("Objects") or []:
+            key = obj.get("Key")
+            try:
+                self._remove(key)
+                deleted.append({"Key": key})
+            except Exception as e:
+                errors.append({"Key": key, "Code": type(e).__name__, "Message": str(e)})
+        out: Dict[str, Any] = {"Errors": errors} if errors else {}
+        if not Delete.get("Quiet"):
+            out["Deleted"] = deleted
+        return out
+
+    # --- 목록 ---
+
+    def _walk(self, rel: str, prefix: str, after: str) -> Iterator[Tuple[str, os.stat_result]]:
+        """rel 디렉터리 아래 키를 바이트 순서로 생성. 디렉터리는 'name/'로 정렬해 S3 순서와 맞춤."""
+        try:
+            entries = list(os.scandir(self.path(rel) if rel else self.root))
+        except (FileNotFoundError, NotADirectoryError):
+            return
+        items = []
+        for e in entries:
+            if e.name.startswith(_TMP):
+                continue
+            key = f"{rel}/{e.name}" if rel else e.name
+            is_dir = e.is_dir(follow_symlinks=False)
+            items.append((key + "/" if is_dir else key, is_dir, e))
+        items.sort(key=lambda t: t[0])
+        for sort_key, is_dir, e in items:
+            if is_dir:
+                if not (sort_key.startswith(prefix) or prefix.startswith(sort_key)):
+                    continue
+                # 하위 키는 모두 sort_key로 시작 → after보다 앞선 구간이면 통째로 건너뜀
+                if after and sort_key < after and not after.startswith(sort_key):
+                    continue
+                yield from self._walk(sort_key[:-1], prefix, after)
+            elif sort_key.startswith(prefix) and sort_key > after:
+                yield sort_key, e.stat()
+
+    def list_objects_v2(
+        self,
+        Bucket: Any,
+        Prefix: str = "",
+        MaxKeys: int = 1000,
+        ContinuationToken: Optional[str] = None,
+        StartAfter: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        # continuation token은 마지막으로 반환한 키(목록 도중 삭제돼도 밀리지 않음)
+        after = ContinuationToken or StartAfter or ""
+        base = Prefix.rsplit("/", 1)[0] if "/" in Prefix else ""
+        page = list(islice(self._walk(base, Prefix, after), MaxKeys + 1))
+        truncated = len(page) > MaxKeys
+        page = page[:MaxKeys]
+        out: Dict[str, Any] = {
+            "Contents": [
+                {"Key": k, "Size": st.st_size, "LastModified": datetime.fromtimestamp(st.st_mtime, tz=timezone.utc)}
+                for k, st in page
+            ],
+            "KeyCount": len(page),
+            "IsTruncated": truncated,
+        }
+        if truncated:
+            out["NextContinuationToken"] = page[-1][0]
+        return out
+
+    # --- 서명 URL ---
+
+    def generate_presigned_url(self, ClientMethod: str, Params: Dict[str, Any], ExpiresIn: int = 3600) -> str:
+        if ClientMethod != "get_object":
+            raise ValueError(f"unsupported_method:{ClientMethod}")
+        key = Params["Key"]
+        self.path(key)
+        return signed_url(key, int(ExpiresIn))
@@ -0,0 +1,132 @@
+"""이미지 바이너리 업로드 수신(multipart/form-data 또는 raw image/* 본문).
+
+- raw 본문은 request.stream() 청크를 SpooledTemporaryFile에 쓰면서 크기 상한을 검사합니다.
+- multipart는 Starlette 파서(python-multipart)가 파일 파트를 임시 파일로 스풀링합니다.
+  파싱 전에 Content-Length로 상한을 먼저 거릅니다(길이 없는 multipart는 411).
+- 어느 경우도 base64/data URI 사본을 만들지 않으며, 결과 파일 객체를 그대로 S3 업로드에 넘깁니다.
+
+설정: UPLOAD_MAX_BYTES(기본 15MB), UPLOAD_SPOOL_BYTES(메모리 버퍼, 기본 1MB)
+"""
+import os
+import tempfile
+from typing import Any, BinaryIO, Dict, Optional
+
+from fastapi import HTTPException, Request
+
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(15 * 1024 * 1024)))
+UPLOAD_SPOOL_BYTES = int(os.getenv("UPLOAD_SPOOL_BYTES", str(1024 * 1024)))
+# multipart 경계/필드 헤더 여유분
+_MULTIPART_OVERHEAD = 64 * 1024
+
+IMAGE_TYPES = ("image/png", "image/jpeg", "image/webp", "image/gif")
+_MAGIC = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+
+def _sniff(head: bytes) -> Optional[str]:
+    for magic, mime in _MAGIC:
+        if head.startswith(magic):
+            return mime
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+class ImageUpload:
+    """수신한 이미지(파일 객체는 처음 위치로 되감긴 상태)."""
+
+    def __init__(self, file: BinaryIO, content_type: str, size: int, fields: Optional[Dict[str, Any]] = None, form: Any = None) -> None:
+        self.file = file
+        self.content_type = content_type
+        self.size = size
+        self.fields = fields or {}
+        self._form = form
+
+    async def close(self) -> None:
+        if self._form is not None:
+            await self._form.close()
+        else:
+            self.file.close()
+
+
+def _check_type(declared: str, file: BinaryIO) -> str:
+    """선언된 타입과 매직 바이트를 확인해 실제 이미지 MIME을 반환."""
+    head = file.read(16)
+    file.seek(0)
+    sniffed = _sniff(head)
+    if sniffed is None:
+        raise HTTPException(status_code=415, detail="unsupported_image_type")
+    if declared in IMAGE_TYPES or declared in ("", "application/octet-stream"):
+        return sniffed
+    raise HTTPException(status_code=415, detail="unsupported_image_type")
+
+
+async def _read_raw(request: Request, max_bytes: int) -> ImageUpload:
+    buf = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_BYTES)
+    size = 0
+    try:
+        async for chunk in request.stream():
+            size += len(chunk)
+            if size > max_bytes:
+                raise HTTPException(status_code=413, detail="file_too_large")
+            buf.write(chunk)
+        if size == 0:
+            raise HTTPException(status_code=400, detail="empty_body")
+        buf.seek(0)
+        declared = (request.headers.get("content-type") or "").split(";")[0].strip().lower()
+        return ImageUpload(buf, _check_type(declared, buf), size)
+    except BaseException:
+        buf.close()
+        raise
+
+
+async def _read_multipart(request: Request, max_bytes: int) -> ImageUpload:
+    length = request.headers.get("content-length")
+    if not length:
+        raise HTTPException(status_code=411, detail="content_length_required")
+    try:
+        declared_length = int(length.strip())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="invalid_content_length")
+    if declared_length < 0:
+        raise HTTPException(status_code=400, detail="invalid_content_length")
+    if declared_length > max_bytes + _MULTIPART_OVERHEAD:
+        raise HTTPException(status_code=413, detail="file_too_large")
+    try:
+        form = await request.form(max_files=1, max_fields=20)
+    except AssertionError:
+        # python-multipart 미설치
+        raise HTTPException(status_code=415, detail="multipart_not_supported")
+    try:
+        upload = form.get("file") or form.get("image")
+        if upload is None or not hasattr(upload, "file"):
+            raise HTTPException(status_code=400, detail="file_required")
+        f = upload.file
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(0)
+        if size == 0:
+            raise HTTPException(status_code=400, detail="empty_file")
+        if size > max_bytes:
+            raise HTTPException(status_code=413, detail="file_too_large")
+        declared = (upload.content_type or "").split(";")[0].strip().lower()
+        fields = {k: v for k, v in form.items() if isinstance(v, str)}
+        return ImageUpload(f, _check_type(declared, f), size, fields, form)
+    except BaseException:
+        await form.close()
+        raise
+
+
+async def read_image_upload(request: Request, max_bytes: Optional[int] = None) -> ImageUpload:
+    """요청 본문에서 이미지 1개를 읽습니다(multipart의 file/image 필드 또는 raw 본문)."""
+    max_bytes = max_bytes or UPLOAD_MAX_BYTES
+    ctype = (request.headers.get("content-type") or "").lower()
+    if ctype.startswith("multipart/form-data"):
+        return await _read_multipart(request, max_bytes)
+    if ctype.startswith("image/") or ctype.startswith("application/octet-stream"):
+        return await _read_raw(request, max_bytes)
+    raise HTTPException(status_code=415, detail="unsupported_media_type")
@@ -12,12 +12,10 @@ import uvicorn
 import logging
 from dotenv import load_dotenv, dotenv_values, find_dotenv
 import os
-from datetime import datetime, timezone
 from app.core.config import settings
 from app.core.logging import get_logger
 from app.schemas.health import HealthResponse
 from urllib.parse import urlparse
-import asyncio
 
 # .env 파일 로드 순서 (컨테이너/로컬 모두에서 동작)
 # - 앱 디렉터리: /app/app
@@ -114,7 +112,7 @@ app.add_middleware(SessionMiddleware, secret_key=SESSION_SECRET, max_age=86400)
 
 # (디버그) 세션 시크릿과 MySQL 풀 초기화 로그
 logger.info(f"SESSION_SECRET: {SESSION_SECRET}")
-logger.info("Initializing MySQL pool...")
+logger.info("MySQL pool will be initialized on startup")
 
 # ===== Routers =====
 # api 라우터 집계(import 에러 무시)
@@ -160,50 +158,102 @@ def routes_debug():
 def health():
     return HealthResponse.ok()
 
+
+# (디버그) 공유 MySQL 풀 크기/acquire 대기 지표
+@app.get("/__pool")
+def pool_debug():
+    from app.api.core.mysql import mysql_pool_stats
+    return mysql_pool_stats()
+
+
+# (디버그) 프리사인 URL 캐시 지표
+@app.get("/__presign")
+def presign_debug():
+    from app.core.s3 import presign_cache_stats
+    return presign_cache_stats()
+
+
+# (디버그) S3 비동기 작업 지표(진행 중/누적/오류/평균 ms) + 프리사인 캐시
+@app.get("/__s3")
+def s3_debug():
+    from app.core.s3 import s3_stats
+    return s3_stats()
+
+
+# (디버그) Graph API 공유 클라이언트 지표(엔드포인트별 호출/상태/지연)
+@app.get("/__graph")
+def graph_debug():
+    from app.api.core.graph import graph_stats
+    return graph_stats()
+
+
+# (디버그) 웹훅 큐 워커 지표(수신/처리/재시도/저장소 조회)
+@app.get("/__webhooks")
+def webhooks_debug():
+    from app.api.core.ig_webhooks import webhook_stats
+    return webhook_stats()
+
+
+@app.on_event("startup")
+async def _init_graph_client():
+    # 프로세스당 하나의 Graph API 클라이언트(keep-alive/HTTP2 커넥션 재사용)
+    from app.api.core.graph import init_graph_client
+    init_graph_client()
+
+
+@app.on_event("startup")
+async def _init_mysql_pool():
+    # 프로세스당 하나의 aiomysql 풀을 미리 만들어 모든 라우트가 공유
+    from app.api.core.mysql import init_mysql_pool
+    from app.api.core.schema import ensure_schema
+    from app.api.core import snapshot_scheduler  # noqa: F401 — ss_job_run 마이그레이션 등록
+    try:
+        await init_mysql_pool()
+    except Exception as e:
+        # DB가 아직 준비되지 않았어도 서버는 기동; 첫 요청에서 지연 생성 재시도
+        logger.warning(f"MySQL pool init failed (will retry lazily): {e}")
+        return
+    # 1회성 스키마 부트스트랩(_ensure_* DDL) — 요청 경로에서는 DDL을 실행하지 않음
+    result = await ensure_schema()
+    if result.get("applied") or result.get("failed"):
+        logger.info(f"schema bootstrap: {result}")
+
+
+@app.on_event("startup")
+async def _start_webhook_worker():
+    # 웹훅 큐 → 댓글 저장소 워커(DB 미준비 시에도 기동; 배치 실패는 경고 후 다음 주기에 재시도)
+    from app.api.core.ig_webhooks import start_worker
+    start_worker()
+
+
+@app.on_event("shutdown")
+async def _close_mysql_pool():
+    from app.api.core.mysql import close_mysql_pool
+    from app.api.core.graph import close_graph_client
+    from app.api.core.ig_webhooks import stop_worker
+    from app.api.core.snapshot_scheduler import stop_scheduler
+    await stop_scheduler()
+    await stop_worker()
+    await close_mysql_pool()
+    await close_graph_client()
+    from app.core import derivatives
+    from app.core.s3 import shutdown_executor
+    await derivatives.shutdown()
+    shutdown_executor()
+
 if __name__ == "__main__":
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
 
 # ===== Background: Daily insights snapshot =====
-async def _daily_snapshot_loop():
-    """Run once a day: iterate linked personas and perform snapshot."""
-    # Lazy imports to avoid circular
-    from app.api.core.mysql import get_mysql_pool
-    from app.api.routes.instagram_insights import perform_snapshot
-    import aiomysql
-    while True:
-        try:
-            pool = await get_mysql_pool()
-            personas = []
-            async with pool.acquire() as conn:
-                async with conn.cursor(aiomysql.DictCursor) as cur:
-                    # ss_persona에 IG가 연결되어 있고, persona 토큰도 존재하는 페르소나만
-                    await cur.execute(
-                        """
-                        SELECT p.user_id, p.user_persona_num
-                        FROM ss_persona p
-                        JOIN ss_instagram_connector_persona t
-                          ON t.user_id = p.user_id AND t.user_persona_num = p.user_persona_num
-                        WHERE p.ig_user_id IS NOT NULL
-                        LIMIT 500
-                        """
-                    )
-                    personas = await cur.fetchall() or []
-            for row in personas:
-                try:
-                    await perform_snapshot(int(row["user_id"]), int(row["user_persona_num"]))
-                except Exception:
-                    # non-fatal; continue others
-                    pass
-        except Exception:
-            pass
-        # sleep until next run (~24h). Start quickly next day; if server restarts midday, still runs 24h cadence.
-        await asyncio.sleep(60 * 60 * 24)
-
-
+# 고정 시각 스케줄러(keyset 페이징/동시 처리/체크포인트) — app/api/core/snapshot_scheduler.py
 @app.on_event("startup")
 async def _start_background_tasks():
-    # fire-and-forget daily loop
-    try:
-        asyncio.create_task(_daily_snapshot_loop())
-    except Exception:
-        pass
+    from app.api.core.snapshot_scheduler import start_scheduler
+    start_scheduler()
+
+
+# (디버그) 백그라운드 작업 지표(마지막 실행 소요 시간/성공/실패, 진행 중 커서, 다음 실행 시각)
+@app.get("/__jobs")
+def jobs_debug():
+    from app.api.core.snapshot_scheduler import scheduler_stats
+    return scheduler_stats()
@@ -0,0 +1,58 @@
+import argparse
+import asyncio
+import os
+import sys
+
+# backend/ 를 import 경로에 추가하고 app.main과 같은 순서로 .env(backend → backend/app)를 읽습니다.
+_BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, _BACKEND)
+
+from dotenv import load_dotenv  # noqa: E402
+
+load_dotenv(dotenv_path=os.path.join(_BACKEND, ".env"), override=True)
+load_dotenv(dotenv_path=os.path.join(_BACKEND, "app", ".env"), override=True)
+
+from app.api.core.mysql import close_mysql_pool  # noqa: E402
+from app.api.core.reconcile import DEFAULT_MIN_AGE, DEFAULT_PREFIXES, reconcile  # noqa: E402
+from app.core.s3 import s3_enabled, shutdown_executor  # noqa: E402
+
+# 버킷의 chat/, personas/ 오브젝트 중 ss_chat_img / ss_persona 가 더 이상 참조하지 않는 것을 찾습니다.
+# 기본은 보고만 하고(--delete 시 DeleteObjects 1000개 단위 일괄 삭제), 최근 --min-age-hours 이내 오브젝트는 건너뜁니다.
+#   python scripts/reconcile_bucket.py                # 고아 키 출력
+#   python scripts/reconcile_bucket.py --delete       # 고아 삭제
+
+
+async def run(args):
+    if not s3_enabled():
+        print("[reconcile] S3 not configured (NCP_S3_BUCKET / NCP_S3_ACCESS_KEY / NCP_S3_SECRET_KEY)")
+        return 1
+    on_orphan = None if args.quiet else (lambda key: print(key))
+    try:
+        results = await reconcile(
+            prefixes=args.prefix or DEFAULT_PREFIXES,
+            delete=args.delete,
+            min_age=args.min_age_hours * 3600,
+            on_orphan=on_orphan,
+        )
+    finally:
+        await close_mysql_pool()
+        shutdown_executor()
+    for r in results:
+        print(
+            f"[reconcile] {r['prefix']}: scanned={r['scanned']} live={r['live']} recent={r['recent']} "
+            f"orphans={r['orphans']} deleted={r['deleted']} errors={r['errors']}"
+        )
+    return 1 if any(r["errors"] for r in results) else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report or delete bucket objects no longer referenced by the DB")
+    parser.add_argument("--prefix", action="append", help="prefix to scan (repeatable, default: chat/ personas/)")
+    parser.add_argument("--delete", action="store_true", help="delete orphans (default: report only)")
+    parser.add_argument("--min-age-hours", type=float, default=DEFAULT_MIN_AGE / 3600, help="skip objects newer than this")
+    parser.add_argument("--quiet", action="store_true", help="print only the summary")
+    sys.exit(asyncio.run(run(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
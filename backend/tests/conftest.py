@@ -0,0 +1,304 @@
+"""공용 테스트 대역: 여러 테스트 파일이 같이 쓰는 가짜 DB 풀과 외부 클라이언트."""
+import time
+from datetime import timedelta
+
+import httpx
+import pytest
+
+from app.api.core.graph import GraphClient
+from app.api.core.graph_limits import GraphLimits
+from app.core import s3
+from app.core.cache import TTLCache
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self._rows = []
+        self.rowcount = 0
+        self.lastrowid = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, sql, args=None):
+        sql = " ".join(sql.split())
+        self.db.log.append(("execute", sql, args))
+        self.db.queries += 1
+        self._rows, self.rowcount = self.db.respond(sql, args)
+
+    async def executemany(self, sql, seq):
+        sql = " ".join(sql.split())
+        seq = list(seq)
+        if self.db.fail is not None:
+            self.db.fail(sql, seq)
+        self.db.log.append(("executemany", sql, seq))
+        self.rowcount = len(seq)
+
+    async def fetchall(self):
+        return self._rows
+
+    async def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+
+class FakeConn:
+    def __init__(self, db):
+        self.db = db
+
+    def cursor(self, *_):
+        return FakeCursor(self.db)
+
+    async def begin(self):
+        self.db.log.append(("begin", None, None))
+
+    async def commit(self):
+        self.db.commits += 1
+
+    async def rollback(self):
+        self.db.rollbacks += 1
+
+
+class _Acquire:
+    def __init__(self, db):
+        self.db = db
+
+    async def __aenter__(self):
+        return FakeConn(self.db)
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeDB:
+    """get_mysql_pool() 대역. SQL 로그를 남기고, 등록한 접두어에 맞는 행을 돌려줍니다.
+
+    - on(prefix, rows): 공백을 정리한 SQL이 prefix로 시작하면 rows(리스트 또는 (sql, args) → 리스트)를 반환
+    - row: 등록된 응답이 없는 모든 execute의 fetchone 결과(단일 행 조회용)
+    - fail: executemany(sql, seq) 직전에 호출해 예외를 흉내 냄
+    """
+
+    def __init__(self):
+        self.log = []
+        self.queries = 0
+        self.commits = 0
+        self.rollbacks = 0
+        self.row = None
+        self.fail = None
+        self._responses = []
+
+    def on(self, prefix, rows):
+        self._responses.append((prefix, rows))
+        return self
+
+    def respond(self, sql, args):
+        for prefix, rows in self._responses:
+            if sql.startswith(prefix):
+                out = rows(sql, args) if callable(rows) else rows
+                return list(out), len(out)
+        if self.row is not None:
+            return [self.row], 1
+        return [], 0
+
+    def acquire(self):
+        return _Acquire(self)
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    """FakeDB를 만들고, 넘긴 모듈들의 get_mysql_pool을 그것으로 바꿉니다: fake_db(module, ...)."""
+    db = FakeDB()
+
+    async def pool():
+        return db
+
+    def install(*modules):
+        for module in modules:
+            monkeypatch.setattr(module, "get_mysql_pool", pool)
+        return db
+
+    return install
+
+
+@pytest.fixture
+def persona_row():
+    """persona_row(num, **overrides) → _get_user_personas가 돌려주는 IG 연동 페르소나 행."""
+
+    def make(num, **overrides):
+        row = {
+            "user_persona_num": num,
+            "persona_img": None,
+            "persona_parameters": {"name": f"p{num}"},
+            "ig_user_id": f"ig{num}",
+            "ig_username": f"user{num}",
+            "fb_page_id": f"page{num}",
+        }
+        return {**row, **overrides}
+
+    return make
+
+
+@pytest.fixture
+def mock_http(monkeypatch):
+    """mock_http(handler): 이후 만들어지는 httpx.AsyncClient가 모두 MockTransport(handler)로 응답합니다."""
+    real = httpx.AsyncClient
+
+    def install(handler):
+        transport = httpx.MockTransport(handler)
+        monkeypatch.setattr(httpx, "AsyncClient", lambda **kw: real(**{**kw, "transport": transport}))
+
+    return install
+
+
+class _NotFound(Exception):
+    response = {"Error": {"Code": "404"}}
+
+
+class FakeS3:
+    """get_s3_client() 대역(boto3 클라이언트 중 사용하는 메서드만).
+
+    - objects: 키 → 본문, modified: 키 → LastModified(add로 채움)
+    - 키가 "bad"면 서명 실패, ".locked"로 끝나면 delete_objects에서 AccessDenied
+    - put_delay: put_object가 걸리는 시간(동기 호출이 루프를 막지 않는지 확인용)
+    """
+
+    def __init__(self):
+        self.objects = {}
+        self.signed = []
+        self.puts = 0
+        self.put_delay = 0.0
+        self.heads = 0
+        self.modified = {}
+        self.delete_calls = []
+        self.list_calls = 0
+
+    def add(self, keys, modified):
+        for k in sorted(keys):
+            self.objects[k] = b""
+            self.modified[k] = modified
+        return self
+
+    def generate_presigned_url(self, ClientMethod, Params, ExpiresIn):
+        self.signed.append(Params["Key"])
+        if Params["Key"] == "bad":
+            raise RuntimeError("boom")
+        return f"https://s3.test/{Params['Key']}?n={len(self.signed)}&e={ExpiresIn}"
+
+    def put_object(self, Bucket, Key, Body, **kw):
+        if self.put_delay:
+            time.sleep(self.put_delay)
+        self.puts += 1
+        self.objects[Key] = Body
+
+    def upload_fileobj(self, fileobj, bucket, key, ExtraArgs=None):
+        self.puts += 1
+        self.objects[key] = fileobj.read()
+
+    def head_object(self, Bucket, Key):
+        self.heads += 1
+        if Key not in self.objects:
+            raise _NotFound()
+        return {"ContentLength": len(self.objects[Key]), "ContentType": "image/png", "ETag": '"e"'}
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop(Key, None)
+
+    def list_objects_v2(self, Bucket, Prefix, MaxKeys, ContinuationToken=None):
+        self.list_calls += 1
+        # 실제 S3처럼 토큰은 마지막 키 기준(목록 도중 삭제돼도 밀리지 않음)
+        keys = sorted(k for k in self.objects if k.startswith(Prefix) and k > (ContinuationToken or ""))
+        page = keys[:MaxKeys]
+        more = len(keys) > MaxKeys
+        out = {"Contents": [{"Key": k, "LastModified": self.modified.get(k)} for k in page], "IsTruncated": more}
+        if more:
+            out["NextContinuationToken"] = page[-1]
+        return out
+
+    def delete_objects(self, Bucket, Delete):
+        keys = [o["Key"] for o in Delete["Objects"]]
+        self.delete_calls.append(len(keys))
+        errors = [{"Key": k, "Code": "AccessDenied"} for k in keys if k.endswith(".locked")]
+        for k in keys:
+            if not k.endswith(".locked"):
+                self.objects.pop(k, None)
+        return {"Errors": errors} if errors else {}
+
+
+@pytest.fixture
+def fake_s3(monkeypatch):
+    """NCP 설정을 채우고 get_s3_client()를 FakeS3로 바꿉니다(프로세스 캐시도 비움)."""
+    for name in ("NCP_S3_BUCKET", "NCP_S3_ACCESS_KEY", "NCP_S3_SECRET_KEY"):
+        monkeypatch.setenv(name, "x")
+    fake = FakeS3()
+    monkeypatch.setattr(s3, "get_s3_client", lambda: fake)
+    monkeypatch.setattr(s3, "_presign_cache", TTLCache(maxsize=16, ttl=600))
+    monkeypatch.setattr(s3, "_known_keys", TTLCache(maxsize=16, ttl=60))
+    return fake
+
+
+GRAPH_BASE = "https://graph.test/v20.0"
+
+
+def _graph_handler(media, lookup, page_size):
+    """/{ig}/media 최신순 페이지(after 커서), ?ids= 묶음 조회, /{id} 단건 조회.
+
+    lookup에 없는 ID는 code 100(없는 객체), "expired"는 code 190(토큰 오류)으로 답합니다.
+    """
+
+    def handler(request):
+        path = request.url.path
+        if path.endswith("/media"):
+            start = int(request.url.params.get("after") or 0)
+            body = {"data": media[start:start + page_size]}
+            if start + page_size < len(media):
+                body["paging"] = {"next": f"{GRAPH_BASE}/ig1/media?access_token=t&after={start + page_size}"}
+            return httpx.Response(200, json=body)
+        ids = request.url.params.get("ids")
+        if ids is not None:
+            wanted = ids.split(",")
+            if any(i not in lookup for i in wanted):
+                return httpx.Response(400, json={"error": {"code": 100}})
+            return httpx.Response(200, json={i: lookup[i] for i in wanted})
+        mid = path.rsplit("/", 1)[-1]
+        if mid == "expired":
+            return httpx.Response(400, json={"error": {"code": 190}})
+        if mid not in lookup:
+            return httpx.Response(400, json={"error": {"code": 100}})
+        return httpx.Response(200, json=lookup[mid])
+
+    return handler
+
+
+@pytest.fixture
+def fake_graph():
+    """fake_graph(media=[...], lookup={...}, page_size=2) 또는 fake_graph(handler=fn) → (GraphClient, 요청 목록)."""
+
+    def make(media=(), lookup=None, page_size=2, handler=None):
+        calls = []
+        inner = handler or _graph_handler(list(media), lookup or {}, page_size)
+
+        def record(request):
+            calls.append(request)
+            return inner(request)
+
+        raw = httpx.AsyncClient(transport=httpx.MockTransport(record))
+        return GraphClient(raw, base=GRAPH_BASE, limits=GraphLimits()), calls
+
+    return make
+
+
+@pytest.fixture
+def ig_media():
+    """ig_media(i, days_ago, now, likes=None) → /media 항목(id=m{i}, like_count 기본 i)."""
+
+    def make(i, days_ago, now, likes=None):
+        ts = (now - timedelta(days=days_ago)).strftime("%Y-%m-%dT%H:%M:%S+0000")
+        return {
+            "id": f"m{i}", "timestamp": ts, "like_count": i if likes is None else likes,
+            "comments_count": 1, "caption": f"c{i}",
+        }
+
+    return make
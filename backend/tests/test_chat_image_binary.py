@@ -0,0 +1,90 @@
+from urllib.parse import quote
+
+import httpx
+import pytest
+
+from app.api.routes import chat
+
+_IMG = b"\x89PNG\r\n\x1a\n" + b"x" * 4096
+
+
+async def _presign(key):
+    return f"https://s3.test/{key}"
+
+
+@pytest.mark.asyncio
+async def test_binary_response_uploaded_without_data_uri(monkeypatch, mock_http):
+    seen = {}
+
+    def handler(request):
+        seen["format"] = request.url.params.get("format")
+        return httpx.Response(
+            200,
+            content=_IMG,
+            headers={"content-type": "image/png", "x-image-prompt": quote("카페 셀카", safe="")},
+        )
+
+    async def put_fileobj(fileobj, content_type, **kw):
+        seen["body"] = fileobj.read()
+        seen["content_type"] = content_type
+        seen["prefix"] = kw["key_prefix"]
+        return "chat/7/2/gen.png"
+
+    async def insert(user_id, persona_db_id, key):
+        return 11
+
+    async def no_data_uri(*a, **kw):
+        raise AssertionError("put_data_uri must not be used in binary mode")
+
+    mock_http(handler)
+    monkeypatch.setattr(chat, "aput_fileobj", put_fileobj)
+    monkeypatch.setattr(chat, "aput_data_uri", no_data_uri)
+    monkeypatch.setattr(chat, "apresign_get_url", _presign)
+    monkeypatch.setattr(chat, "_insert_chat_img", insert)
+
+    out = await chat._image_binary(7, 2, "http://ai.test", {"user_text": "hi"})
+    assert seen["format"] == "binary"
+    assert seen["body"] == _IMG and seen["content_type"] == "image/png"
+    assert seen["prefix"] == "chat/7/2"
+    assert out["prompt"] == "카페 셀카"
+    assert out["image"] == "https://s3.test/chat/7/2/gen.png"
+    assert out["stored"] == {
+        "key": "chat/7/2/gen.png", "url": out["image"], "id": 11, "size": len(_IMG), "mime": "image/png",
+    }
+
+
+@pytest.mark.asyncio
+async def test_binary_size_cap_and_json_fallback(monkeypatch, mock_http):
+    mock_http(lambda request: httpx.Response(200, content=_IMG, headers={"content-type": "image/png"}))
+    monkeypatch.setattr(chat, "AI_IMAGE_MAX_BYTES", 1024)
+    with pytest.raises(chat.HTTPException) as ei:
+        await chat._image_binary(7, 2, "http://ai.test", {})
+    assert ei.value.detail == "ai_image_too_large"
+
+    # 구버전 AI(JSON 응답)는 기존 저장 경로로 처리
+    legacy = {"ok": True, "prompt": "p", "image": "data:image/png;base64,AAAA"}
+    mock_http(lambda request: httpx.Response(200, json=legacy))
+
+    async def store(user_id, persona_db_id, ai_json):
+        return {**ai_json, "stored": {"key": "k"}}
+
+    monkeypatch.setattr(chat, "_store_chat_image", store)
+    out = await chat._image_binary(7, 2, "http://ai.test", {})
+    assert out["stored"] == {"key": "k"}
+
+
+@pytest.mark.asyncio
+async def test_direct_upload_result_only_recorded(monkeypatch):
+    async def insert(user_id, persona_db_id, key):
+        return 5
+
+    monkeypatch.setattr(chat, "apresign_get_url", _presign)
+    monkeypatch.setattr(chat, "_insert_chat_img", insert)
+    ai_json = {"ok": True, "prompt": "p", "key": "chat/7/2/gen_x.png", "size": 10, "mime": "image/png"}
+    out = await chat._store_chat_image(7, 2, ai_json)
+    assert out["image"] == "https://s3.test/chat/7/2/gen_x.png"
+    assert out["stored"]["id"] == 5 and out["stored"]["size"] == 10
+
+    # 다른 사용자 경로의 키는 기록하지 않음
+    with pytest.raises(chat.HTTPException):
+        await chat._store_chat_image(7, 2, {**ai_json, "key": "chat/8/2/gen_x.png"})
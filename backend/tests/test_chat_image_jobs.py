@@ -0,0 +1,185 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app.api.routes import chat
+
+
+@pytest.fixture
+def job_rows(monkeypatch):
+    """ss_chat_image_job 대역: job_id PK에 INSERT IGNORE 한 번만 성공하는 것과 같은 의미."""
+    rows = {}
+
+    async def record(job_id):
+        row = rows.get(job_id)
+        return None if row is None else {**row, "stale": False}
+
+    async def claim(job_id, user_id):
+        if job_id in rows:
+            return None
+        rows[job_id] = {"user_id": user_id, "status": "storing", "body": None, "token": "t"}
+        return "t"
+
+    async def finish(job_id, token, body):
+        if rows[job_id]["token"] == token:
+            rows[job_id].update(status="done", body=dict(body))
+
+    async def release(job_id, token):
+        rows.pop(job_id, None)
+
+    async def presign(key):
+        return f"https://s3.test/{key}"
+
+    monkeypatch.setattr(chat, "_job_record", record)
+    monkeypatch.setattr(chat, "_claim_job", claim)
+    monkeypatch.setattr(chat, "_finish_job", finish)
+    monkeypatch.setattr(chat, "_release_job", release)
+    monkeypatch.setattr(chat, "apresign_get_url", presign)
+    return rows
+
+
+@pytest.mark.asyncio
+async def test_job_result_stored_once_and_owner_checked(monkeypatch, job_rows, mock_http):
+    calls = []
+
+    def handler(request):
+        calls.append((request.method, request.url.path))
+        if request.method == "DELETE":
+            return httpx.Response(200, json={"ok": True})
+        return httpx.Response(200, json={
+            "job_id": "j1",
+            "status": "succeeded",
+            "meta": {"user_id": 7, "persona_num": 2},
+            "result": {"ok": True, "image": "data:image/png;base64,AAAA"},
+        })
+
+    stored = []
+
+    async def store(user_id, persona_db_id, ai_json):
+        stored.append((user_id, persona_db_id))
+        return {**ai_json, "stored": {"key": "chat/7/2/x.png"}}
+
+    mock_http(handler)
+    monkeypatch.setattr(chat, "_store_chat_image", store)
+
+    req = SimpleNamespace(session={"user_id": 7})
+    first = await chat.image_job_status("j1", req)
+    again = await chat.image_job_status("j1", req)
+    assert first["status"] == "succeeded" and first["stored"]["key"] == "chat/7/2/x.png"
+    assert again["stored"]["key"] == first["stored"]["key"] and again["job_id"] == "j1"
+    assert stored == [(7, 2)]
+    # 저장 후 AI 쪽 작업은 해제
+    assert ("DELETE", "/chat/image/jobs/j1") in calls
+
+    with pytest.raises(HTTPException) as ei:
+        await chat.image_job_status("j1", SimpleNamespace(session={"user_id": 8}))
+    assert ei.value.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_job_pending_status_passthrough(monkeypatch, job_rows, mock_http):
+    def handler(request):
+        return httpx.Response(200, json={"job_id": "j2", "status": "running", "meta": {"user_id": 7}})
+
+    mock_http(handler)
+    out = await chat.image_job_status("j2", SimpleNamespace(session={"user_id": 7}))
+    assert out == {"ok": True, "job_id": "j2", "status": "running"}
+
+    with pytest.raises(HTTPException) as ei:
+        await chat.image_job_status("j2", SimpleNamespace(session={"user_id": 9}))
+    assert ei.value.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_overlapping_polls_and_other_workers_share_one_store(monkeypatch, job_rows, mock_http):
+    ai_jobs = {"j3": {
+        "job_id": "j3", "status": "succeeded", "meta": {"user_id": 7, "persona_num": 2},
+        "result": {"ok": True, "image": "data:image/png;base64,AAAA"},
+    }}
+
+    def handler(request):
+        jid = request.url.path.rsplit("/", 1)[-1]
+        if request.method == "DELETE":
+            ai_jobs.pop(jid, None)
+            return httpx.Response(200, json={"ok": True})
+        if jid not in ai_jobs:
+            return httpx.Response(404, json={"detail": "job_not_found"})
+        return httpx.Response(200, json=ai_jobs[jid])
+
+    gate = asyncio.Event()
+    stored = []
+
+    async def store(user_id, persona_db_id, ai_json):
+        stored.append(user_id)
+        await gate.wait()
+        return {**ai_json, "stored": {"key": "chat/7/2/y.png", "url": "https://old"}}
+
+    mock_http(handler)
+    monkeypatch.setattr(chat, "_store_chat_image", store)
+    req = SimpleNamespace(session={"user_id": 7})
+
+    first = asyncio.create_task(chat.image_job_status("j3", req))
+    await asyncio.sleep(0.05)
+    # 겹친 조회는 저장하지 않고 storing을 돌려받음
+    assert (await chat.image_job_status("j3", req))["status"] == "storing"
+    gate.set()
+    body = await first
+    assert stored == [7] and "j3" not in ai_jobs
+    # AI 쪽 작업이 지워진 뒤 다른 워커로 간 조회도 기록에서 결과를 받음(URL은 다시 발급)
+    again = await chat.image_job_status("j3", req)
+    assert again["stored"]["key"] == body["stored"]["key"]
+    assert again["stored"]["url"] == "https://s3.test/chat/7/2/y.png"
+
+
+@pytest.mark.asyncio
+async def test_failed_store_releases_claim_for_retry(monkeypatch, job_rows, mock_http):
+    def handler(request):
+        if request.method == "DELETE":
+            return httpx.Response(200, json={"ok": True})
+        return httpx.Response(200, json={
+            "job_id": "j4", "status": "succeeded", "meta": {"user_id": 7, "persona_num": 2},
+            "result": {"ok": True, "image": "data:image/png;base64,AAAA"},
+        })
+
+    attempts = []
+
+    async def store(user_id, persona_db_id, ai_json):
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise HTTPException(status_code=500, detail="image_store_failed")
+        return {**ai_json, "stored": {"key": "chat/7/2/z.png"}}
+
+    mock_http(handler)
+    monkeypatch.setattr(chat, "_store_chat_image", store)
+    req = SimpleNamespace(session={"user_id": 7})
+    with pytest.raises(HTTPException):
+        await chat.image_job_status("j4", req)
+    assert "j4" not in job_rows
+    assert (await chat.image_job_status("j4", req))["stored"]["key"] == "chat/7/2/z.png"
+
+
+@pytest.mark.asyncio
+async def test_unstored_result_is_not_recorded(monkeypatch, job_rows, mock_http):
+    calls = []
+
+    def handler(request):
+        calls.append(request.method)
+        return httpx.Response(200, json={
+            "job_id": "j5", "status": "succeeded", "meta": {"user_id": 7, "persona_num": 2},
+            "result": {"ok": True, "image": "data:image/png;base64,AAAA"},
+        })
+
+    async def store(user_id, persona_db_id, ai_json):
+        # S3 업로드가 실패하면 stored 없이 원본 본문이 돌아옴
+        return dict(ai_json)
+
+    mock_http(handler)
+    monkeypatch.setattr(chat, "_store_chat_image", store)
+    with pytest.raises(HTTPException) as ei:
+        await chat.image_job_status("j5", SimpleNamespace(session={"user_id": 7}))
+    assert ei.value.status_code == 502
+    # data URI 본문은 기록되지 않고, AI 쪽 작업도 남아 다시 저장할 수 있음
+    assert "j5" not in job_rows and "DELETE" not in calls
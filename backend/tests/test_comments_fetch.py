@@ -0,0 +1,70 @@
+import httpx
+import pytest
+
+from app.api.routes import instagram_comments as ic
+
+
+def _comment(cid):
+    return {"id": cid, "text": f"t{cid}", "username": "u", "timestamp": "2025-01-01T00:00:00+0000", "like_count": 0}
+
+
+def _client(handler):
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+@pytest.mark.asyncio
+async def test_expand_mode_uses_single_call():
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        assert "comments.limit(2)" in request.url.params["fields"]
+        return httpx.Response(200, json={"data": [
+            {"id": "m1", "caption": "c", "comments_count": 1, "comments": {"data": [_comment("c1")]}},
+            {"id": "m2", "comments_count": 0},
+        ]})
+
+    async with _client(handler) as client:
+        items, dbg = await ic._fetch_recent_media_and_comments(client, "ig1", "tok", comments_limit=2, mode="expand")
+    assert len(calls) == 1
+    assert [i["media_id"] for i in items] == ["m1", "m2"]
+    assert items[0]["comments"] == [_comment("c1")]
+    assert items[1]["comments"] == []
+    assert set(items[0]) == {"media_id", "caption", "permalink", "media_type", "media_url", "thumbnail_url", "timestamp", "comments"}
+
+
+@pytest.mark.asyncio
+async def test_truncated_media_falls_back_per_media():
+    calls = []
+
+    def handler(request):
+        path = request.url.path
+        calls.append(path)
+        if path.endswith("/ig1/media"):
+            return httpx.Response(200, json={"data": [
+                {"id": "m1", "comments_count": 3},  # 엣지 누락(잘림)
+                {"id": "m2", "comments_count": 1, "comments": {"data": [_comment("c9")]}},
+            ]})
+        assert path.endswith("/m1/comments")
+        return httpx.Response(200, json={"data": [_comment("c1"), _comment("c2")]})
+
+    async with _client(handler) as client:
+        items, _ = await ic._fetch_recent_media_and_comments(client, "ig1", "tok", comments_limit=2, mode="expand")
+    assert len(calls) == 2
+    assert [c["id"] for c in items[0]["comments"]] == ["c1", "c2"]
+    assert [c["id"] for c in items[1]["comments"]] == ["c9"]
+
+
+@pytest.mark.asyncio
+async def test_expand_error_retries_per_media():
+    def handler(request):
+        path = request.url.path
+        if path.endswith("/ig1/media"):
+            if "comments.limit" in request.url.params["fields"]:
+                return httpx.Response(500, json={"error": {"code": 1, "message": "Please reduce the amount of data"}})
+            return httpx.Response(200, json={"data": [{"id": "m1"}]})
+        return httpx.Response(200, json={"data": [_comment("c1")]})
+
+    async with _client(handler) as client:
+        items, _ = await ic._fetch_recent_media_and_comments(client, "ig1", "tok", mode="expand")
+    assert items[0]["comments"] == [_comment("c1")]
@@ -0,0 +1,48 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.api.routes import instagram_comments as ic
+
+
+@pytest.mark.asyncio
+async def test_overview_runs_personas_concurrently_with_timeout(monkeypatch, persona_row):
+    token_calls = []
+
+    async def personas(uid):
+        return [persona_row(1), persona_row(2), persona_row(3), persona_row(4, ig_user_id=None, fb_page_id=None)]
+
+    async def tokens(uid, nums):
+        token_calls.append(sorted(nums))
+        return {n: f"tok{n}" for n in nums}
+
+    async def fetch(client, ig_user_id, token, **kwargs):
+        if ig_user_id == "ig3":
+            await asyncio.sleep(5)
+        await asyncio.sleep(0.2)
+        return ([{"media_id": f"m-{ig_user_id}", "comments": [{"id": f"c-{ig_user_id}"}]}], None)
+
+    async def seen(ids):
+        return {"c-ig2"}
+
+    monkeypatch.setattr(ic, "_get_user_personas", personas)
+    monkeypatch.setattr(ic, "_get_persona_tokens", tokens)
+    monkeypatch.setattr(ic, "_fetch_recent_media_and_comments", fetch)
+    monkeypatch.setattr(ic, "_load_seen_comment_ids", seen)
+    monkeypatch.setattr(ic, "OVERVIEW_PERSONA_TIMEOUT", 0.5)
+
+    request = SimpleNamespace(session={"user_id": 7})
+    started = time.perf_counter()
+    out = await ic.comments_overview(request)
+    elapsed = time.perf_counter() - started
+
+    # 2개가 순차였다면 0.4s+타임아웃, 동시 처리라면 타임아웃 근처에서 끝남
+    assert elapsed < 0.9
+    assert token_calls == [[1, 2, 3]]
+    by_num = {p["persona_num"]: p for p in out["personas"]}
+    assert list(by_num) == [1, 2, 3]
+    assert by_num[1]["items"][0]["comments"] == [{"id": "c-ig1"}]
+    assert by_num[2]["items"][0]["comments"] == []
+    assert by_num[3]["items"] == [] and by_num[3]["error"] == "timeout"
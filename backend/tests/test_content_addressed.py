@@ -0,0 +1,42 @@
+import base64
+import hashlib
+import io
+
+import pytest
+
+from app.core import s3
+
+_PNG = b"\x89PNG\r\n\x1a\nsame-bytes"
+_URI = "data:image/png;base64," + base64.b64encode(_PNG).decode()
+
+
+@pytest.fixture(autouse=True)
+def content_addressed(monkeypatch):
+    monkeypatch.setattr(s3, "S3_CONTENT_ADDRESSED", True)
+
+
+def test_same_bytes_same_key_and_single_upload(fake_s3):
+    opts = dict(key_prefix="personas", base_prefix="", include_model=False, include_date=False)
+    k1 = s3.put_data_uri(_URI, **opts)
+    assert k1 == f"personas/{hashlib.sha256(_PNG).hexdigest()[:32]}.png"
+    # 캐시 적중 → HEAD/PUT 없음
+    assert s3.put_data_uri(_URI, **opts) == k1
+    assert (fake_s3.puts, fake_s3.heads) == (1, 1)
+
+    # 다른 프로세스가 올린 객체(캐시 없음)는 HEAD로 확인 후 생략
+    s3._known_keys.clear()
+    buf = io.BytesIO(_PNG)
+    assert s3.put_fileobj(buf, "image/png", **opts) == k1
+    assert fake_s3.puts == 1 and fake_s3.heads == 2
+
+    # 삭제 후에는 다시 업로드
+    s3.delete_object(k1)
+    assert s3.put_fileobj(io.BytesIO(_PNG), "image/png", **opts) == k1
+    assert fake_s3.puts == 2 and fake_s3.objects[k1] == _PNG
+
+
+def test_opt_in_only(fake_s3, monkeypatch):
+    monkeypatch.setattr(s3, "S3_CONTENT_ADDRESSED", False)
+    key = s3.put_data_uri(_URI, key_prefix="chat/1/1", base_prefix="", include_date=False)
+    assert key.startswith("chat/1/1/gen_")
+    assert fake_s3.heads == 0
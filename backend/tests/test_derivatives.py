@@ -0,0 +1,68 @@
+import asyncio
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from app.core import derivatives
+from app.core.cache import TTLCache
+
+
+def _png(w=1200, h=1500):
+    buf = BytesIO()
+    Image.new("RGB", (w, h), (200, 10, 10)).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def test_derivative_keys_are_siblings():
+    assert derivatives.derivative_key("chat/7/2/gen_1.png", "thumb") == "chat/7/2/gen_1__thumb.webp"
+    assert derivatives.derivative_key("a.png", "mid") == "a__mid.webp"
+    assert derivatives.is_derivative_key("chat/7/2/gen_1__mid.webp")
+    assert not derivatives.is_derivative_key("chat/7/2/gen_1.png")
+
+
+def test_render_produces_bounded_webp():
+    out = derivatives._render(_png(), {"thumb": 320, "mid": 1024}, 80)
+    for name, px in (("thumb", 320), ("mid", 1024)):
+        with Image.open(BytesIO(out[name])) as im:
+            assert im.format == "WEBP"
+            assert max(im.size) == px
+
+
+@pytest.fixture
+def fake_storage(monkeypatch):
+    store = {"chat/1/1/a.png": _png(), "chat/1/1/b.png": _png(400, 400)}
+
+    async def head(key):
+        return {"key": key} if key in store else None
+
+    async def get(key):
+        return store[key], "image/png"
+
+    async def put(key, data, content_type, cache_control=None):
+        store[key] = data
+        return key
+
+    async def presign_many(keys):
+        return {k: f"https://s3.test/{k}" for k in keys}
+
+    monkeypatch.setattr(derivatives, "ahead_object", head)
+    monkeypatch.setattr(derivatives, "aget_object_bytes", get)
+    monkeypatch.setattr(derivatives, "aput_bytes", put)
+    monkeypatch.setattr(derivatives, "apresign_many", presign_many)
+    monkeypatch.setattr(derivatives, "derivatives_enabled", lambda: True)
+    monkeypatch.setattr(derivatives, "_exists", TTLCache(maxsize=64, ttl=60))
+    return store
+
+
+@pytest.mark.asyncio
+async def test_lazy_build_on_first_list_then_served(fake_storage):
+    keys = ["chat/1/1/a.png", "chat/1/1/b.png"]
+    # 첫 조회: 파생본이 없으므로 결과 없음 + 백그라운드 생성 예약
+    assert await derivatives.derivative_urls(keys, "thumb") == {}
+    await asyncio.gather(*list(derivatives._tasks))
+    assert "chat/1/1/a__thumb.webp" in fake_storage and "chat/1/1/b__mid.webp" in fake_storage
+
+    urls = await derivatives.derivative_urls(keys, "thumb")
+    assert urls == {k: f"https://s3.test/{k[:-4]}__thumb.webp" for k in keys}
+    await derivatives.shutdown()
@@ -0,0 +1,67 @@
+import httpx
+import pytest
+import pytest_asyncio
+
+from app.api.core import graph
+from app.api.routes import instagram_comments as ic
+
+
+@pytest_asyncio.fixture
+async def mock_graph(monkeypatch):
+    monkeypatch.setattr(graph, "_metrics", graph._GraphMetrics())
+    seen = []
+
+    def handler(request):
+        seen.append(request)
+        if request.url.path.endswith("/boom"):
+            raise httpx.ConnectError("down", request=request)
+        if request.url.path.endswith("/missing"):
+            return httpx.Response(404, json={"error": {"code": 100}})
+        return httpx.Response(200, json={"data": []})
+
+    await graph.close_graph_client()
+    graph.init_graph_client(transport=httpx.MockTransport(handler))
+    yield seen
+    await graph.close_graph_client()
+
+
+@pytest.mark.asyncio
+async def test_sessions_share_one_client_and_resolve_base_url(mock_graph):
+    async with graph.graph_session() as a:
+        await a.get("/17841400/media", params={"access_token": "secret"})
+    async with graph.graph_session(timeout=5) as b:
+        # 블록을 나가도 공유 클라이언트는 닫히지 않음
+        assert b._client is a._client and not a._client.is_closed
+        await b.get(f"{graph.GRAPH}/17841400/media", params={"access_token": "secret", "after": "x"})
+        await b.get("https://graph.facebook.com/v19.0/1234_5678/replies")
+    assert [str(r.url).split("?")[0] for r in mock_graph] == [
+        f"{graph.GRAPH}/17841400/media",
+        f"{graph.GRAPH}/17841400/media",
+        "https://graph.facebook.com/v19.0/1234_5678/replies",
+    ]
+    assert mock_graph[1].extensions["timeout"]["read"] == 5
+
+
+@pytest.mark.asyncio
+async def test_metrics_by_endpoint_without_tokens(mock_graph):
+    client = graph.get_graph_client()
+    await client.get("/1/media", params={"access_token": "secret"})
+    await client.post("/2/media", data={"access_token": "secret"})
+    await client.get("/3/missing")
+    with pytest.raises(httpx.ConnectError):
+        await client.delete("/4/boom")
+    stats = graph.graph_stats()
+    assert stats["requests"] == 4 and stats["errors"] == 1 and stats["in_flight"] == 0
+    eps = stats["endpoints"]
+    assert eps["GET /{id}/media"]["status"] == {"200": 1}
+    assert eps["POST /{id}/media"]["calls"] == 1
+    assert eps["GET /{id}/missing"]["status"] == {"404": 1}
+    assert eps["DELETE /{id}/boom"]["status"] == {"ConnectError": 1}
+    assert "secret" not in repr(stats)
+
+
+@pytest.mark.asyncio
+async def test_route_helpers_accept_shared_client(mock_graph):
+    items, _ = await ic._fetch_recent_media_and_comments(graph.get_graph_client(), "ig1", "tok", mode="expand")
+    assert items == []
+    assert graph.graph_stats()["endpoints"]["GET /ig1/media"]["calls"] == 1
@@ -0,0 +1,118 @@
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from app.api.core import graph, graph_limits
+
+
+@pytest_asyncio.fixture
+async def install(monkeypatch):
+    monkeypatch.setattr(graph, "_metrics", graph._GraphMetrics())
+    monkeypatch.setattr(graph_limits, "backoff_delay", lambda attempt: 0.01)
+    monkeypatch.setattr(graph, "backoff_delay", lambda attempt: 0.01)
+
+    def _install(handler):
+        graph._client = None
+        return graph.init_graph_client(transport=httpx.MockTransport(handler))
+
+    yield _install
+    await graph.close_graph_client()
+
+
+def test_parse_usage_headers():
+    assert graph_limits.parse_app_usage('{"call_count": 12, "total_cputime": 40, "total_time": 7}') == 40
+    assert graph_limits.parse_app_usage("garbage") is None
+    buc = json.dumps({"178414": [{"type": "instagram", "call_count": 91, "total_cputime": 5, "total_time": 3,
+                                  "estimated_time_to_regain_access": 2}]})
+    assert graph_limits.parse_buc_usage(buc) == (91, 120.0)
+    assert graph_limits.throttle_code(400, {"error": {"code": 613}}) == 613
+    assert graph_limits.throttle_code(400, {"error": {"code": 100}}) is None
+    assert graph_limits.throttle_code(429, None) == 4
+
+
+@pytest.mark.asyncio
+async def test_throttle_error_is_retried_and_blocks_account(install):
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.params.get("access_token"))
+        if len(calls) == 1:
+            return httpx.Response(400, json={"error": {"code": 613, "message": "Calls within one hour"}})
+        return httpx.Response(200, json={"data": []})
+
+    client = install(handler)
+    r = await client.get("/1/media", params={"access_token": "tokA"})
+    assert r.status_code == 200 and len(calls) == 2
+    limits = client.limits
+    assert limits.retries == 1
+    acct = limits.account(graph_limits.account_key({"access_token": "tokA"}, None))
+    assert acct.throttled == 1 and limits.app.throttled == 0
+
+
+@pytest.mark.asyncio
+async def test_regain_time_longer_than_max_wait_returns_local_429(install, monkeypatch):
+    monkeypatch.setattr(graph_limits, "GRAPH_MAX_WAIT", 0.05)
+    calls = []
+
+    def handler(request):
+        calls.append(1)
+        buc = {"9": [{"type": "instagram", "call_count": 100, "estimated_time_to_regain_access": 30}]}
+        return httpx.Response(200, json={}, headers={"X-Business-Use-Case-Usage": json.dumps(buc)})
+
+    client = install(handler)
+    await client.get("/9", params={"access_token": "tokB"})
+    r = await client.get("/9/media", params={"access_token": "tokB"})
+    assert r.status_code == 429 and r.headers["X-Local-Throttle"] == "1" and len(calls) == 1
+    # 다른 계정은 영향 없음
+    assert (await client.get("/8", params={"access_token": "tokC"})).status_code == 200
+    assert graph.graph_stats()["endpoints"]["GET /{id}/media"]["status"] == {"throttled": 1}
+
+
+@pytest.mark.asyncio
+async def test_account_concurrency_and_high_usage_serializes(install, monkeypatch):
+    monkeypatch.setattr(graph_limits, "GRAPH_ACCOUNT_CONCURRENCY", 2)
+    monkeypatch.setattr(graph_limits, "GRAPH_MAX_PACING", 0.05)
+    active = {"now": 0, "max": 0}
+    usage = {"value": 10}
+
+    async def handler(request):
+        active["now"] += 1
+        active["max"] = max(active["max"], active["now"])
+        await asyncio.sleep(0.02)
+        active["now"] -= 1
+        return httpx.Response(200, json={}, headers={"X-App-Usage": json.dumps({"call_count": usage["value"]})})
+
+    client = install(handler)
+    await asyncio.gather(*(client.get(f"/{i}", params={"access_token": "tokD"}) for i in range(6)))
+    assert active["max"] == 2
+
+    # 앱 사용률이 소프트 한도를 넘으면 동시 1개 + 간격 벌림
+    usage["value"] = 95
+    await client.get("/0", params={"access_token": "tokE"})
+    active["max"] = 0
+    started = time.monotonic()
+    await asyncio.gather(*(client.get(f"/{i}", params={"access_token": "tokE"}) for i in range(3)))
+    assert active["max"] == 1
+    assert time.monotonic() - started >= 0.08
+
+
+@pytest.mark.asyncio
+async def test_cancel_while_waiting_for_app_slot_releases_account_slot():
+    limits = graph_limits.GraphLimits()
+    acc = limits.account("acc")
+    # 앱 사용률이 높아 동시 1개: 다른 요청이 앱 슬롯을 잡고 있음
+    limits.app.observe(99)
+    assert await limits.acquire(None, max_wait=1)
+    waiter = asyncio.create_task(limits.acquire(acc, max_wait=60))
+    await asyncio.sleep(0.05)
+    assert acc.active == 1 and limits.app.waiting == 1
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert acc.active == 0 and limits.app.waiting == 0
+    await limits.release(None)
+    assert limits.app.active == 0
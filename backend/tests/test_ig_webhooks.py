@@ -0,0 +1,231 @@
+import hashlib
+import hmac
+import json
+from datetime import datetime
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.api.core import ig_webhooks as wh
+from app.api.routes import instagram_comments as ic
+from app.api.routes import instagram_webhook
+
+SECRET = "app-secret"
+
+
+def _sign(body: bytes, algo=hashlib.sha256, prefix="sha256") -> str:
+    return f"{prefix}=" + hmac.new(SECRET.encode(), body, algo).hexdigest()
+
+
+def _comment_event(cid="c1", media="m1", ig="ig1", parent=None):
+    value = {"id": cid, "text": "hi", "from": {"id": "u9", "username": "fan"}, "media": {"id": media}}
+    if parent:
+        value["parent_id"] = parent
+    return {"object": "instagram", "entry": [{"id": ig, "time": 1714564800, "changes": [{"field": "comments", "value": value}]}]}
+
+
+def test_verify_signature():
+    body = b'{"object":"instagram"}'
+    assert wh.verify_signature(body, _sign(body), secret=SECRET)
+    assert wh.verify_signature(body, None, _sign(body, hashlib.sha1, "sha1"), secret=SECRET)
+    assert not wh.verify_signature(body + b" ", _sign(body), secret=SECRET)
+    assert not wh.verify_signature(body, "sha1=" + _sign(body).split("=")[1], secret=SECRET)
+    assert not wh.verify_signature(body, None, None, secret=SECRET)
+    assert not wh.verify_signature(body, _sign(body), secret="")
+
+
+def test_split_and_normalize():
+    body = _comment_event(parent="c0")
+    body["entry"][0]["changes"].append({"field": "mentions", "value": {"media_id": "m7", "comment_id": "c7"}})
+    body["entry"][0]["changes"].append({"field": "story_insights", "value": {"reach": 1}})
+    rows = wh.split_events(body)
+    assert [r[2] for r in rows] == ["comments", "mentions", "story_insights"]
+    assert rows[0][1] == "ig1" and rows[0][4] == datetime(2024, 5, 1, 12, 0, 0)
+
+    norm = [wh.normalize_change(r[1], r[2], json.loads(r[3]), r[4]) for r in rows]
+    assert norm[0]["comment_id"] == "c1" and norm[0]["media_id"] == "m1"
+    assert norm[0]["parent_id"] == "c0" and norm[0]["username"] == "fan" and norm[0]["kind"] == "comment"
+    assert norm[1]["comment_id"] == "c7" and norm[1]["kind"] == "mention" and norm[1]["text"] is None
+    assert norm[2] is None
+
+
+def test_group_overview_limits_and_orders_media():
+    t = lambda h: datetime(2024, 5, 1, h)
+    rows = [
+        {"user_persona_num": 1, "media_id": "old", "comment_id": "a", "commented_at": t(9), "posted_at": t(1)},
+        {"user_persona_num": 1, "media_id": "new", "comment_id": "b", "commented_at": t(8), "posted_at": t(5)},
+        {"user_persona_num": 1, "media_id": "new", "comment_id": "c", "commented_at": t(7), "posted_at": t(5)},
+        {"user_persona_num": 1, "media_id": "new", "comment_id": "d", "commented_at": t(6), "posted_at": t(5)},
+        {"user_persona_num": 2, "media_id": "x", "comment_id": "e", "commented_at": t(3), "posted_at": None},
+    ]
+    out = wh.group_overview(rows, media_limit=5, comments_limit=2)
+    assert [m["media_id"] for m in out[1]] == ["new", "old"]
+    assert [c["id"] for c in out[1][0]["comments"]] == ["b", "c"]
+    assert out[1][0]["timestamp"] == "2024-05-01T05:00:00+0000"
+    assert out[2][0]["comments"][0]["timestamp"] == "2024-05-01T03:00:00+0000"
+    assert "_order" not in out[2][0]
+
+
+@pytest.fixture
+def webhook_client(monkeypatch):
+    queued = []
+
+    async def enqueue(body):
+        queued.append(body)
+        return len(wh.split_events(body))
+
+    monkeypatch.setattr(wh, "META_APP_SECRET", SECRET)
+    monkeypatch.setattr(wh, "enqueue", enqueue)
+    app = FastAPI()
+    app.include_router(instagram_webhook.router)
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+    return client, queued
+
+
+@pytest.mark.asyncio
+async def test_webhook_enqueues_signed_events(webhook_client):
+    client, queued = webhook_client
+    body = json.dumps(_comment_event()).encode()
+    async with client:
+        r = await client.post("/webhooks/instagram", content=body, headers={"X-Hub-Signature-256": _sign(body)})
+        assert r.status_code == 200 and r.json() == {"ok": True, "queued": 1}
+        bad = await client.post("/webhooks/instagram", content=body, headers={"X-Hub-Signature-256": "sha256=00"})
+        assert bad.status_code == 403
+        missing = await client.post("/webhooks/instagram", content=body)
+        assert missing.status_code == 403
+    assert len(queued) == 1
+
+
+@pytest.mark.asyncio
+async def test_webhook_rejects_without_secret(webhook_client, monkeypatch):
+    client, queued = webhook_client
+    monkeypatch.setattr(wh, "META_APP_SECRET", "")
+    async with client:
+        r = await client.post("/webhooks/instagram", content=b"{}")
+    assert r.status_code == 503 and not queued
+
+
+@pytest.mark.asyncio
+async def test_overview_reads_store_and_fetches_only_misses(monkeypatch, persona_row):
+    fetched, saved, loaded = [], [], []
+
+    async def personas(uid):
+        return [persona_row(1), persona_row(2), persona_row(3)]
+
+    async def tokens(uid, nums):
+        return {n: f"tok{n}" for n in nums}
+
+    async def fetch(client, ig_user_id, token, **kwargs):
+        fetched.append(ig_user_id)
+        return ([{"media_id": f"m-{ig_user_id}", "comments": [{"id": f"c-{ig_user_id}"}]}], None)
+
+    async def seen(ids):
+        return set()
+
+    async def fresh(uid, nums):
+        # 3번은 동기화 이후 다른 IG 계정으로 재연동됨 → 미스
+        return {1: "ig1", 3: "ig-old"}
+
+    async def load(uid, nums, media_limit, comments_limit):
+        loaded.append(nums)
+        return {1: [{"media_id": "m-store", "comments": [{"id": "c-store"}]}]}
+
+    async def save(uid, num, ig_user_id, items):
+        saved.append((num, ig_user_id))
+
+    monkeypatch.setattr(ic, "_get_user_personas", personas)
+    monkeypatch.setattr(ic, "_get_persona_tokens", tokens)
+    monkeypatch.setattr(ic, "_fetch_recent_media_and_comments", fetch)
+    monkeypatch.setattr(ic, "_load_seen_comment_ids", seen)
+    monkeypatch.setattr(wh, "COMMENT_STORE_ENABLED", True)
+    monkeypatch.setattr(wh, "fresh_personas", fresh)
+    monkeypatch.setattr(wh, "load_overview", load)
+    monkeypatch.setattr(wh, "save_graph_items", save)
+
+    out = await ic.comments_overview(SimpleNamespace(session={"user_id": 7}))
+    by_num = {p["persona_num"]: p for p in out["personas"]}
+    assert loaded == [[1]]
+    assert by_num[1]["source"] == "store" and by_num[1]["items"][0]["media_id"] == "m-store"
+    assert by_num[2]["source"] == by_num[3]["source"] == "graph"
+    assert sorted(fetched) == ["ig2", "ig3"]
+    assert sorted(saved) == [(2, "ig2"), (3, "ig3")]
+
+    # refresh=true → 저장소를 건너뛰고 전부 Graph
+    fetched.clear()
+    out = await ic.comments_overview(SimpleNamespace(session={"user_id": 7}), refresh=True)
+    assert sorted(fetched) == ["ig1", "ig2", "ig3"]
+    assert loaded == [[1]]
+
+
+@pytest.mark.asyncio
+async def test_bad_event_is_isolated_from_the_batch(fake_db):
+    events = [(i, *wh.split_events(_comment_event(cid=cid))[0][1:], 1) for i, cid in enumerate(["c1", "bad", "c3"], 1)]
+    db = fake_db(wh).on("SELECT event_id", events).on("SELECT ig_user_id", [("ig1", 7, 1)])
+
+    def fail(sql, seq):
+        if sql.startswith("INSERT INTO ss_instagram_comment (") and any(p[2] == "bad" for p in seq):
+            raise ValueError("Incorrect string value")
+
+    db.fail = fail
+    before = dict(wh._stats)
+    assert await wh.process_batch(limit=10) == 3
+    # 묶음 실패 후 이벤트별로 다시 처리: 문제 행만 시도 횟수/오류를 남기고 나머지는 done
+    marks = [
+        ("done" if "status='done'" in sql else "retry", args[-2])
+        for k, sql, args in db.log
+        if k == "execute" and sql.endswith("WHERE event_id=%s AND claim_token=%s")
+    ]
+    assert marks == [("done", 1), ("retry", 2), ("done", 3)]
+    stored = [p[2] for k, sql, seq in db.log if k == "executemany" and sql.startswith("INSERT INTO ss_instagram_comment (") for p in seq]
+    assert stored == ["c1", "c3"]
+    assert db.rollbacks == 2
+    assert wh._stats["comments"] - before["comments"] == 2 and wh._stats["retried"] - before["retried"] == 1
+
+    # 모두 실패하면 예외를 올려 워커가 기록
+    def down(sql, seq):
+        if sql.startswith("INSERT INTO ss_instagram_comment ("):
+            raise ValueError("db down")
+
+    db.fail = down
+    with pytest.raises(ValueError):
+        await wh.process_batch(limit=10)
+
+
+@pytest.mark.asyncio
+async def test_store_keeps_media_metadata_and_media_without_comments(fake_db):
+    db = fake_db(wh)
+    items = [
+        {"media_id": "m2", "caption": "new", "media_url": "https://cdn/m2.jpg", "timestamp": "2024-05-02T00:00:00+0000", "comments": []},
+        {"media_id": "m1", "caption": "old", "media_url": "https://cdn/m1.jpg", "timestamp": "2024-05-01T00:00:00+0000",
+         "comments": [{"id": "c1", "text": "hi", "timestamp": "2024-05-01T01:00:00+0000"}]},
+    ]
+    await wh.save_graph_items(7, 1, "ig1", items)
+    begin, delete, media, comments, prune, sync = db.log
+    assert delete[1].startswith("DELETE FROM ss_instagram_comment_media") and delete[2] == (7, 1)
+    assert [(p[2], p[8], p[9]) for p in media[2]] == [("m2", "new", datetime(2024, 5, 2)), ("m1", "old", datetime(2024, 5, 1))]
+    assert [p[2] for p in comments[2]] == ["c1"] and db.commits == 1
+    # 수집한 미디어에서 이번에 돌아오지 않은 댓글(인스타그램에서 삭제됨)은 같은 트랜잭션에서 정리
+    assert prune[1].startswith("DELETE FROM ss_instagram_comment WHERE") and "comment_id NOT IN (%s)" in prune[1]
+    assert prune[2] == (7, 1, "m2", "m1", "c1")
+
+    # 댓글이 하나도 없으면 수집한 미디어의 댓글을 모두 정리
+    db.log.clear()
+    await wh.save_graph_items(7, 1, "ig1", [{**items[1], "comments": []}])
+    prune = next(e for e in db.log if e[1] and e[1].startswith("DELETE FROM ss_instagram_comment WHERE"))
+    assert "NOT IN" not in prune[1] and prune[2] == (7, 1, "m1")
+
+    # 저장소 읽기: 댓글 없는 m2도 캡션/URL과 함께 개요에 포함
+    media_rows = [
+        {"user_persona_num": 1, "media_id": "m2", "caption": "new", "media_url": "https://cdn/m2.jpg", "posted_at": datetime(2024, 5, 2)},
+        {"user_persona_num": 1, "media_id": "m1", "caption": "old", "media_url": "https://cdn/m1.jpg", "posted_at": datetime(2024, 5, 1)},
+    ]
+    comment_rows = [
+        {"user_persona_num": 1, "media_id": "m1", "comment_id": "c1", "caption": "old", "posted_at": datetime(2024, 5, 1),
+         "commented_at": datetime(2024, 5, 1, 1)},
+    ]
+    db.on("(SELECT user_persona_num, media_id", media_rows).on("SELECT c.user_persona_num", comment_rows)
+    out = await wh.load_overview(7, [1], media_limit=5, comments_limit=3)
+    assert [(m["media_id"], m["caption"], len(m["comments"])) for m in out[1]] == [("m2", "new", 0), ("m1", "old", 1)]
+    assert out[1][0]["media_url"] == "https://cdn/m2.jpg"
@@ -0,0 +1,92 @@
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from app.api.routes import files, images
+from app.core import uploads
+from app.main import app
+
+_PNG = b"\x89PNG\r\n\x1a\n" + b"\0" * 2048
+
+
+@pytest.fixture
+def storage(monkeypatch):
+    monkeypatch.setenv("DEV_ALLOW_DEBUG_USER", "1")
+    puts = []
+
+    async def put_fileobj(fileobj, content_type, **kw):
+        body = fileobj.read()
+        puts.append((body, content_type, kw))
+        return f"{kw['key_prefix']}/k.png"
+
+    async def presign(key):
+        return f"https://s3.test/{key}"
+
+    for mod in (images, files):
+        monkeypatch.setattr(mod, "s3_enabled", lambda: True)
+        monkeypatch.setattr(mod, "aput_fileobj", put_fileobj)
+        monkeypatch.setattr(mod, "apresign_get_url", presign)
+    monkeypatch.setattr(images, "schedule_derivatives", lambda key: None)
+    return puts
+
+
+def _client():
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://test", headers={"X-Debug-User-Id": "7"})
+
+
+@pytest.mark.asyncio
+async def test_raw_body_upload_streams_without_data_uri(storage):
+    async with _client() as ac:
+        r = await ac.post(
+            "/api/images/upload?prefix=personas&base_prefix=&include_model=false&include_date=false",
+            content=_PNG,
+            headers={"Content-Type": "image/png"},
+        )
+    assert r.status_code == 200, r.text
+    assert r.json()["url"] == "https://s3.test/personas/k.png"
+    body, ctype, kw = storage[0]
+    assert body == _PNG and ctype == "image/png"
+    assert kw["key_prefix"] == "personas" and kw["include_date"] is False
+
+
+@pytest.mark.asyncio
+async def test_size_cap_and_type_check(storage, monkeypatch):
+    monkeypatch.setattr(uploads, "UPLOAD_MAX_BYTES", 1024)
+    async with _client() as ac:
+        r = await ac.post("/api/files/upload", content=_PNG, headers={"Content-Type": "image/png"})
+        assert r.status_code == 413
+        monkeypatch.setattr(uploads, "UPLOAD_MAX_BYTES", 1 << 20)
+        r = await ac.post("/api/files/upload", content=b"not an image", headers={"Content-Type": "image/png"})
+        assert r.status_code == 415
+        r = await ac.post("/api/files/upload?persona_num=2", content=_PNG, headers={"Content-Type": "application/octet-stream"})
+        assert r.status_code == 200
+        assert r.json()["key"] == "chat/7/2/k.png"
+    assert storage[0][1] == "image/png"
+
+
+@pytest.mark.asyncio
+async def test_multipart_upload(storage):
+    pytest.importorskip("multipart")
+    async with _client() as ac:
+        r = await ac.post(
+            "/api/images/upload",
+            files={"file": ("a.png", _PNG, "image/png")},
+            data={"prefix": "personas", "include_date": "false"},
+        )
+    assert r.status_code == 200, r.text
+    body, ctype, kw = storage[0]
+    assert body == _PNG and kw["key_prefix"] == "personas" and kw["include_date"] is False
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("length", ["abc", "-5", "1e3"])
+async def test_malformed_content_length_is_400(length):
+    from starlette.requests import Request
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "headers": [(b"content-type", b"multipart/form-data; boundary=x"), (b"content-length", length.encode())],
+    }
+    with pytest.raises(uploads.HTTPException) as ei:
+        await uploads.read_image_upload(Request(scope))
+    assert ei.value.status_code == 400 and ei.value.detail == "invalid_content_length"
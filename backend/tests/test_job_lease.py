@@ -0,0 +1,115 @@
+import asyncio
+import time
+from datetime import datetime
+
+import pytest
+
+from app.api.core import job_lease as jl
+
+
+class _Clock:
+    def __init__(self):
+        self.t = 1_700_000_000.0
+
+    def __call__(self):
+        return self.t
+
+
+def test_may_take():
+    now = datetime(2024, 5, 1, 12, 0, 0)
+    assert jl.may_take(None, "a", now)
+    assert jl.may_take(("a", datetime(2024, 5, 1, 12, 1)), "a", now)
+    assert not jl.may_take(("b", datetime(2024, 5, 1, 12, 1)), "a", now)
+    assert jl.may_take(("b", datetime(2024, 5, 1, 11, 59)), "a", now)
+
+
+@pytest.mark.asyncio
+async def test_crashed_holder_is_taken_over_after_ttl():
+    clock = _Clock()
+    store = jl.LocalLeaseStore(clock)
+    a = await store.acquire("job", "a", ttl=30)
+    assert a is not None and a.token == 1
+    assert await store.acquire("job", "b", ttl=30) is None
+
+    # a가 하트비트 없이 죽음 → TTL 전에는 못 가져가고, 지나면 b가 새 토큰으로 가져감
+    clock.t += 29
+    assert await store.acquire("job", "b", ttl=30) is None
+    clock.t += 2
+    b = await store.acquire("job", "b", ttl=30)
+    assert b is not None and b.token == 2
+    # 되살아난 a는 연장/해제해도 b의 리스에 영향 없음
+    assert not await store.renew(a)
+    await store.release(a)
+    assert await store.acquire("job", "a", ttl=30) is None
+    assert await store.renew(b)
+
+
+@pytest.mark.asyncio
+async def test_run_singleton_runs_once_and_heartbeats():
+    store = jl.LocalLeaseStore()
+    started = asyncio.Event()
+    release = asyncio.Event()
+
+    async def job():
+        started.set()
+        await release.wait()
+        return "done"
+
+    first = asyncio.create_task(jl.run_singleton("job", job, ttl=3, store=store, owner="a"))
+    await started.wait()
+    # 보유 중에는 다른 워커가 실행하지 않음
+    ran, _ = await jl.run_singleton("job", job, ttl=3, store=store, owner="b")
+    assert ran is False
+    release.set()
+    assert await first == (True, "done")
+    # 끝나면 리스가 풀려 바로 다른 워커가 가져갈 수 있음
+    assert await store.acquire("job", "b", ttl=3) is not None
+
+
+@pytest.mark.asyncio
+async def test_lost_lease_cancels_work(monkeypatch):
+    store = jl.LocalLeaseStore()
+    cancelled = asyncio.Event()
+
+    async def job():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def steal():
+        await asyncio.sleep(0.2)
+        # 하트비트가 늦어 만료된 사이 다른 워커가 가져간 상황
+        store.rows["job"].update(owner="b", token=store.rows["job"]["token"] + 1)
+
+    started = time.monotonic()
+    thief = asyncio.create_task(steal())
+    with pytest.raises(jl.LeaseLost):
+        await jl.run_singleton("job", job, ttl=3, store=store, owner="a")
+    await thief
+    assert cancelled.is_set()
+    assert time.monotonic() - started < 2
+    assert store.rows["job"]["owner"] == "b"
+
+
+@pytest.mark.asyncio
+async def test_failing_renewals_give_up_before_expiry():
+    store = jl.LocalLeaseStore()
+    renewals = []
+
+    async def broken_renew(lease):
+        renewals.append(time.monotonic())
+        raise ConnectionError("db down")
+
+    store.renew = broken_renew
+
+    async def job():
+        await asyncio.sleep(10)
+
+    # 연장이 계속 실패하면 마지막 성공(획득) + TTL 전에 작업을 취소 — 다른 워커와 겹쳐 돌지 않음
+    started = time.monotonic()
+    with pytest.raises(jl.LeaseLost):
+        await jl.run_singleton("job", job, ttl=0.6, store=store, owner="a")
+    assert len(renewals) == 2
+    assert time.monotonic() - started < 0.6
@@ -0,0 +1,139 @@
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+
+from app.api.core import like_totals as lt
+from app.api.core import posts_sync as ps
+
+NOW = datetime(2024, 6, 30, 12, 0, 0)
+
+
+@pytest.fixture
+def media(ig_media):
+    return lambda i, days_ago, likes=None: ig_media(i, days_ago, NOW, likes)
+
+
+@pytest.mark.asyncio
+async def test_fetch_counters_batches_and_isolates_deleted_media(fake_graph):
+    lookup = {f"o{i}": {"like_count": i, "timestamp": "2024-01-01T00:00:00+0000"} for i in range(60)}
+    client, calls = fake_graph([], lookup)
+    out = await lt.fetch_counters(client, "t", [f"o{i}" for i in range(60)])
+    assert len(calls) == 2 and out["gone"] == [] and len(out["items"]) == 60
+
+    # 묶음에 삭제된 미디어가 섞이면 그 묶음만 개별 조회로 가려냄
+    client, calls = fake_graph([], lookup)
+    out = await lt.fetch_counters(client, "t", ["o1", "deleted", "o2"])
+    assert [m["id"] for m in out["items"]] == ["o1", "o2"] and out["gone"] == ["deleted"]
+    assert out["calls"] == 4
+
+    client, _ = fake_graph([], lookup)
+    with pytest.raises(ps.SyncError):
+        await lt.fetch_counters(client, "t", ["o1", "expired"])
+
+
+@pytest.fixture
+def store(monkeypatch):
+    state = {"ig_user_id": "ig1", "full_at": NOW - timedelta(days=1), "newest": None}
+    captured = {}
+
+    async def load_state(uid, num):
+        return dict(state)
+
+    async def active_media(uid, num, limit=200):
+        return list(state.get("active", []))
+
+    async def apply_counters(uid, num, ig, items, gone, full, total_media=200):
+        captured.update(items=[m["id"] for m in items], gone=gone, full=full)
+        return {"total_likes": sum(int(m.get("like_count") or 0) for m in items), "pruned": len(gone)}
+
+    monkeypatch.setattr(lt, "load_state", load_state)
+    monkeypatch.setattr(lt, "active_media", active_media)
+    monkeypatch.setattr(lt, "apply_counters", apply_counters)
+    return state, captured
+
+
+@pytest.mark.asyncio
+async def test_incremental_refresh_reads_recent_page_and_active_media_only(store, media, fake_graph):
+    state, captured = store
+    items = [media(1, 0), media(2, 2), media(3, 20), media(4, 30), media(5, 40)]
+    state["newest"] = (ps.parse_timestamp(items[1]["timestamp"]), "m2")
+    # m2는 최근 글이라 /media에서 이미 읽음, m5는 오래된 글이지만 댓글 활동이 있었음
+    state["active"] = ["m2", "m5"]
+    client, calls = fake_graph(items, lookup={"m5": {"like_count": 9}})
+    result = await lt.refresh_totals(client, 7, 1, "ig1", "t", now=NOW)
+    assert captured == {"items": ["m1", "m2", "m5"], "gone": [], "full": False}
+    # /media 2페이지(m3에서 멈춤) + ids 조회 1번 — 200개를 훑지 않음
+    assert result["graph_calls"] == 3 and len(calls) == 3
+    assert calls[-1].url.params["ids"] == "m5"
+    assert result["full"] is False
+
+
+@pytest.mark.asyncio
+async def test_full_refresh_when_stale_or_relinked(store, media, fake_graph):
+    state, captured = store
+    items = [media(i, i * 10) for i in range(1, 6)]
+    state["ig_user_id"] = "old_ig"
+    client, calls = fake_graph(items)
+    result = await lt.refresh_totals(client, 7, 1, "ig1", "t", total_media=3, now=NOW)
+    assert captured["full"] is True and captured["items"] == ["m1", "m2", "m3"]
+    assert result["total_likes"] == 6
+
+    state.update(ig_user_id="ig1", full_at=NOW - timedelta(days=8))
+    client, _ = fake_graph(items)
+    result = await lt.refresh_totals(client, 7, 1, "ig1", "t", total_media=3, now=NOW)
+    assert result["full"] is True
+
+
+@pytest.mark.asyncio
+async def test_apply_counters_full_prunes_and_aggregates_in_sql(media, fake_db):
+    db = fake_db(lt).on("SELECT COALESCE(SUM", [(42,)]).on("SELECT media_id", [("m1",), ("m2",), ("beyond_window",)])
+    out = await lt.apply_counters(7, 1, "ig1", [media(1, 0), media(2, 1)], [], full=True, total_media=2)
+    assert out == {"total_likes": 42, "pruned": 1}
+    begin, upsert, select, delete, state, total = db.log
+    assert begin[0] == "begin"
+    assert [p[2] for p in upsert[2]] == ["m1", "m2"] and upsert[2][0][5] == 1
+    assert delete[2] == [(7, 1, "beyond_window")]
+    assert state[1].startswith("INSERT INTO ss_instagram_media_likes_sync")
+    assert "ORDER BY posted_at DESC LIMIT %s" in total[1] and total[2] == (7, 1, 2)
+    assert db.commits == 1
+
+    # 증분 반영은 전체 목록을 읽지 않고 사라진 미디어만 지움
+    db.log.clear()
+    out = await lt.apply_counters(7, 1, "ig1", [media(1, 0)], ["gone"], full=False)
+    assert out["pruned"] == 1
+    assert [entry[0] for entry in db.log] == ["begin", "executemany", "executemany", "execute"]
+
+
+@pytest.mark.parametrize("stored, expected", [(17, 17), (None, None)])
+@pytest.mark.asyncio
+async def test_snapshot_falls_back_when_like_store_fails(monkeypatch, fake_db, fake_graph, stored, expected):
+    from app.api.routes import instagram_insights as ii
+
+    db = fake_db(ii)
+    client, _ = fake_graph(handler=lambda r: httpx.Response(200, json={"followers_count": 5, "data": []}))
+
+    async def mapping(uid, num):
+        return {"ig_user_id": "ig1"}
+
+    async def token(uid, num):
+        return "t"
+
+    async def refresh(*a, **k):
+        raise RuntimeError("deadlock")
+
+    async def stored_total(uid, num):
+        if stored is None:
+            raise RuntimeError("db down")
+        return stored
+
+    monkeypatch.setattr(ii, "_get_persona_instagram_mapping", mapping)
+    monkeypatch.setattr(ii, "_get_persona_token", token)
+    monkeypatch.setattr(ii, "graph_session", lambda: client)
+    monkeypatch.setattr(lt, "refresh_totals", refresh)
+    monkeypatch.setattr(lt, "stored_total", stored_total)
+    out = await ii.perform_snapshot(7, 1)
+    # 좋아요 저장소가 실패해도 나머지 지표는 기록됨
+    assert out["total_likes"] == expected and out["followers_count"] == 5
+    (_, sql, args), = db.log
+    assert sql.startswith("INSERT INTO ss_dashboard") and args[4:6] == (5, expected)
@@ -0,0 +1,120 @@
+import base64
+import os
+import time
+from urllib.parse import urlparse
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from app.core import s3, storage
+from app.core.cache import TTLCache
+from app.main import app
+
+_PNG = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 4
+_URI = "data:image/png;base64," + base64.b64encode(_PNG).decode()
+
+
+@pytest.fixture
+def local(monkeypatch, tmp_path):
+    monkeypatch.setenv("STORAGE_BACKEND", "local")
+    monkeypatch.setenv("LOCAL_STORAGE_ROOT", str(tmp_path))
+    monkeypatch.setenv("LOCAL_STORAGE_FSYNC", "0")
+    monkeypatch.setenv("LOCAL_STORAGE_URL", "http://test/api/storage")
+    monkeypatch.setenv("LOCAL_STORAGE_SECRET", "s3cr3t")
+    monkeypatch.setattr(s3, "_presign_cache", TTLCache(maxsize=16, ttl=60))
+    monkeypatch.setattr(s3, "_known_keys", TTLCache(maxsize=16, ttl=60))
+    return tmp_path
+
+
+def _client():
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+
+def _path(url):
+    u = urlparse(url)
+    return f"{u.path}?{u.query}"
+
+
+def test_same_key_layout_and_atomic_write(local):
+    key = s3.put_data_uri(_URI, key_prefix="chat/7/2", base_prefix="", include_model=False, include_date=False)
+    assert key.startswith("chat/7/2/") and key.endswith(".png")
+    with open(os.path.join(local, *key.split("/")), "rb") as f:
+        assert f.read() == _PNG
+    # 임시 파일이 남지 않음
+    assert [n for n in os.listdir(os.path.join(local, "chat", "7", "2")) if n.startswith(".tmp-")] == []
+    assert s3.head_object(key)["size"] == len(_PNG)
+    assert s3.head_object("chat/7/2/missing.png") is None
+    with pytest.raises(ValueError):
+        storage.LocalStorage(str(local)).path("chat/../../etc/passwd")
+
+
+def test_listing_matches_s3_byte_order_and_batch_delete(local):
+    keys = ["chat/1.png", "chat/1/a.png", "chat/1-x.png", "chat/10.png", "chat/1/b/c.png", "personas/p.png"]
+    for k in keys:
+        s3.put_bytes(k, b"x", "image/png")
+    store = storage.LocalStorage(str(local))
+    seen, token = [], None
+    while True:
+        r = store.list_objects_v2(Bucket=None, Prefix="chat/", MaxKeys=2, ContinuationToken=token)
+        seen += [o["Key"] for o in r["Contents"]]
+        token = r.get("NextContinuationToken")
+        if not token:
+            break
+    assert seen == sorted(k for k in keys if k.startswith("chat/"))
+
+    out = s3.delete_objects(["chat/1/a.png", "chat/1/b/c.png"])
+    assert out == {"deleted": ["chat/1/a.png", "chat/1/b/c.png"], "errors": {}}
+    # 빈 디렉터리도 정리
+    assert not os.path.exists(os.path.join(local, "chat", "1"))
+
+
+@pytest.mark.asyncio
+async def test_signed_url_serves_full_and_range(local):
+    key = await s3.aput_data_uri(_URI, key_prefix="personas", base_prefix="", include_model=False, include_date=False)
+    url = await s3.apresign_get_url(key, expires_in=600)
+    assert url.startswith("http://test/api/storage/personas/")
+    async with _client() as ac:
+        r = await ac.get(_path(url))
+        assert r.status_code == 200 and r.content == _PNG
+        assert r.headers["content-type"] == "image/png" and r.headers["accept-ranges"] == "bytes"
+
+        r = await ac.get(_path(url), headers={"Range": "bytes=8-15"})
+        assert r.status_code == 206 and r.content == _PNG[8:16]
+        assert r.headers["content-range"] == f"bytes 8-15/{len(_PNG)}"
+
+        r = await ac.get(_path(url), headers={"Range": "bytes=-4"})
+        assert r.status_code == 206 and r.content == _PNG[-4:]
+
+        r = await ac.get(_path(url), headers={"Range": f"bytes={len(_PNG)}-"})
+        assert r.status_code == 416
+
+        r = await ac.get(_path(url), headers={"If-None-Match": r.headers.get("etag") or (await ac.head(_path(url))).headers["etag"]})
+        assert r.status_code == 304
+
+        r = await ac.head(_path(url))
+        assert r.status_code == 200 and r.content == b"" and r.headers["content-length"] == str(len(_PNG))
+
+
+@pytest.mark.asyncio
+async def test_signature_and_expiry_are_enforced(local):
+    s3.put_bytes("personas/a.png", _PNG, "image/png")
+    exp = int(time.time()) + 60
+    good = storage.sign("personas/a.png", exp)
+    async with _client() as ac:
+        assert (await ac.get(f"/api/storage/personas/a.png?exp={exp}&sig={good}")).status_code == 200
+        assert (await ac.get(f"/api/storage/personas/b.png?exp={exp}&sig={good}")).status_code == 403
+        assert (await ac.get(f"/api/storage/personas/a.png?exp={exp + 1}&sig={good}")).status_code == 403
+        past = int(time.time()) - 1
+        r = await ac.get(f"/api/storage/personas/a.png?exp={past}&sig={storage.sign('personas/a.png', past)}")
+        assert r.status_code == 403 and r.json()["detail"] == "url_expired"
+
+
+def test_unconfigured_secret_is_random_not_public_default(monkeypatch):
+    monkeypatch.delenv("LOCAL_STORAGE_SECRET", raising=False)
+    monkeypatch.delenv("SESSION_SECRET", raising=False)
+    monkeypatch.setattr(storage, "_fallback_secret", None)
+    exp = int(time.time()) + 60
+    forged = storage.hmac.new(b"default_secret_key", f"personas/a.png\n{exp}".encode(), storage.hashlib.sha256).hexdigest()
+    assert not storage.verify("personas/a.png", exp, forged)
+    # 같은 프로세스 안에서는 서명/검증이 일관됨
+    assert storage.verify("personas/a.png", exp, storage.sign("personas/a.png", exp))
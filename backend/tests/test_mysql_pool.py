@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+
+from app.api.core import mysql
+
+
+class _FakeRawPool:
+    def __init__(self):
+        self.released = []
+        self.size = 1
+        self.freesize = 1
+        self.minsize = 1
+        self.maxsize = 1
+
+    async def acquire(self):
+        await asyncio.sleep(0)
+        return object()
+
+    async def release(self, conn):
+        self.released.append(conn)
+
+
+@pytest.mark.asyncio
+async def test_metered_pool_records_acquire_and_release():
+    raw = _FakeRawPool()
+    pool = mysql.MeteredPool(raw)
+    async with pool.acquire() as conn:
+        assert conn is not None
+        assert pool.stats.in_use == 1
+    assert raw.released == [conn]
+    stats = pool.stats.as_dict()
+    assert stats["acquires"] == 1
+    assert stats["in_use"] == 0
+    assert stats["max_wait_ms"] >= 0
+    # 나머지 속성은 원본 풀에 위임
+    assert pool.maxsize == 1
+
+
+@pytest.mark.asyncio
+async def test_get_mysql_pool_is_shared(monkeypatch):
+    created = []
+
+    async def fake_create_pool(**kwargs):
+        created.append(kwargs)
+        return _FakeRawPool()
+
+    monkeypatch.setattr(mysql.aiomysql, "create_pool", fake_create_pool)
+    monkeypatch.setattr(mysql, "_pool", None)
+    monkeypatch.setattr(mysql, "_pool_lock", None)
+    monkeypatch.setenv("DB_POOL_MAXSIZE", "4")
+
+    p1, p2 = await asyncio.gather(mysql.get_mysql_pool(), mysql.get_mysql_pool())
+    assert p1 is p2
+    assert len(created) == 1
+    assert created[0]["maxsize"] == 4
+    monkeypatch.setattr(mysql, "_pool", None)
@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from app.api.models import persona as persona_model
+
+
+@pytest.fixture
+def fake_select(monkeypatch):
+    calls = []
+    rows = {
+        1: {"user_persona_num": 1, "persona_img": "personas/a.png", "persona_parameters": {"name": "A"},
+            "ig_user_id": None, "ig_username": None, "fb_page_id": None},
+    }
+
+    async def _select(user_id, persona_num=None):
+        calls.append((user_id, persona_num))
+        if persona_num is None:
+            return [dict(r) for r in rows.values()]
+        r = rows.get(persona_num)
+        return [dict(r)] if r else []
+
+    monkeypatch.setattr(persona_model, "_select_personas", _select)
+    persona_model._persona_cache.clear()
+    yield calls, rows
+    persona_model._persona_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_get_persona_is_cached_and_invalidated(fake_select):
+    calls, rows = fake_select
+    first = await persona_model.get_persona(7, 1)
+    second = await persona_model.get_persona(7, 1)
+    assert first == second
+    assert len(calls) == 1
+    # 반환값 수정이 캐시를 오염시키지 않음
+    second["persona_parameters"]["name"] = "changed"
+    assert (await persona_model.get_persona(7, 1))["persona_parameters"]["name"] == "A"
+
+    rows[1]["persona_img"] = "personas/b.png"
+    persona_model.invalidate_persona(7, 1)
+    assert (await persona_model.get_persona(7, 1))["persona_img"] == "personas/b.png"
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_missing_persona_is_negative_cached(fake_select, monkeypatch):
+    calls, rows = fake_select
+    monkeypatch.setattr(persona_model, "_PERSONA_NEG_TTL", 0.05)
+    assert await persona_model.get_persona(7, 3) is None
+    assert await persona_model.get_persona(7, 3) is None
+    assert len(calls) == 1
+    # 없는 페르소나는 짧게만 캐시: 다른 워커가 만든 행이 전체 TTL을 기다리지 않고 보임
+    rows[3] = {**rows[1], "user_persona_num": 3}
+    await asyncio.sleep(0.1)
+    assert (await persona_model.get_persona(7, 3))["user_persona_num"] == 3
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_user_list_fills_single_keys(fake_select):
+    calls, _ = fake_select
+    personas = await persona_model.get_user_personas(7)
+    assert [p["user_persona_num"] for p in personas] == [1]
+    await persona_model.get_persona(7, 1)
+    assert calls == [(7, None)]
+    persona_model.invalidate_persona(7)
+    await persona_model.get_user_personas(7)
+    assert len(calls) == 2
@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+
+from app.api.core import posts_sync as ps
+
+NOW = datetime(2024, 6, 30, 12, 0, 0)
+
+
+@pytest.fixture
+def media(ig_media):
+    return lambda i, days_ago: ig_media(i, days_ago, NOW)
+
+
+@pytest.mark.asyncio
+async def test_incremental_scan_stops_after_high_water_and_window(media, fake_graph):
+    items = [media(1, 0), media(2, 1), media(3, 3), media(4, 10), media(5, 20), media(6, 30)]
+    client, calls = fake_graph(items)
+    hwm = (ps.parse_timestamp(items[1]["timestamp"]), "m2")
+    scan = await ps.scan_media(client, "ig1", "t", hwm, limit=2, refresh_days=7, now=NOW)
+    assert [(k, m["id"]) for k, m in scan["items"]] == [("new", "m1"), ("recent", "m2"), ("recent", "m3")]
+    # m4(10일 전)에서 멈춤 → 3페이지 중 2페이지만 읽음
+    assert len(calls) == 2 and scan["pages"] == 2
+    assert scan["complete"] and scan["boundary"] == ps.parse_timestamp(items[3]["timestamp"])
+    assert calls[1].url.params["after"] == "2"
+
+
+@pytest.mark.asyncio
+async def test_first_sync_reads_limit_then_window(media, fake_graph):
+    items = [media(1, 20), media(2, 21), media(3, 22), media(4, 23)]
+    client, calls = fake_graph(items)
+    scan = await ps.scan_media(client, "ig1", "t", None, limit=3, refresh_days=7, now=NOW)
+    assert [m["id"] for _, m in scan["items"]] == ["m1", "m2", "m3"]
+    assert {k for k, _ in scan["items"]} == {"new"}
+
+    # 끝까지 읽으면 complete(boundary 없음), 페이지 상한에 걸리면 확인한 구간까지만
+    client, _ = fake_graph(items)
+    scan = await ps.scan_media(client, "ig1", "t", None, limit=10, refresh_days=7, now=NOW)
+    assert scan["complete"] and scan["boundary"] is None and len(scan["items"]) == 4
+    client, _ = fake_graph(items)
+    scan = await ps.scan_media(client, "ig1", "t", None, limit=10, refresh_days=7, max_pages=1, now=NOW)
+    assert scan["complete"] and scan["boundary"] == ps.parse_timestamp(items[1]["timestamp"]) - timedelta(seconds=1)
+
+
+@pytest.mark.asyncio
+async def test_incremental_scan_refreshes_newest_limit_rows_outside_window(media, fake_graph):
+    # 최근 글이 없어도 화면의 최신 limit개는 다시 읽어 만료된 CDN URL을 갱신
+    items = [media(1, 20), media(2, 21), media(3, 22), media(4, 23), media(5, 24)]
+    client, calls = fake_graph(items)
+    hwm = (ps.parse_timestamp(items[0]["timestamp"]), "m1")
+    scan = await ps.scan_media(client, "ig1", "t", hwm, limit=3, refresh_days=7, now=NOW)
+    assert [(k, m["id"]) for k, m in scan["items"]] == [("recent", "m1"), ("recent", "m2"), ("recent", "m3")]
+    assert len(calls) == 2 and scan["boundary"] == ps.parse_timestamp(items[3]["timestamp"])
+
+
+@pytest.mark.asyncio
+async def test_scan_raises_sync_error(fake_graph):
+    client, _ = fake_graph(handler=lambda r: httpx.Response(400, json={"error": {"code": 190}}))
+    with pytest.raises(ps.SyncError) as ei:
+        await ps.scan_media(client, "ig1", "t", None)
+    assert ei.value.response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_apply_scan_bulk_upserts_prunes_and_moves_high_water(media, fake_db):
+    db = fake_db(ps).on("SELECT media_id", [("m1",), ("m2",), ("gone",)])
+    scan = {
+        "items": [("new", media(1, 0)), ("recent", media(2, 2))],
+        "boundary": NOW - timedelta(days=8),
+        "complete": True,
+        "pages": 1,
+    }
+    result = await ps.apply_scan(7, 1, "ig1", scan, hwm=None)
+    assert result == {"synced": 2, "new": 1, "refreshed": 1, "pruned": 1, "pages": 1}
+    begin, upsert, likes, select, delete, likes_delete, state = db.log
+    assert begin[0] == "begin"
+    assert upsert[0] == "executemany" and upsert[1].startswith("INSERT INTO ss_instagram_post (")
+    assert [p[0] for p in upsert[2]] == ["m1", "m2"]
+    # 같은 트랜잭션에서 좋아요 저장소도 갱신/정리
+    assert likes[1].startswith("INSERT INTO ss_instagram_media_likes") and [p[2] for p in likes[2]] == ["m1", "m2"]
+    assert select[2] == (7, 1, NOW - timedelta(days=8))
+    assert delete[0] == "executemany" and delete[2] == [(7, 1, "gone")]
+    assert likes_delete[1].startswith("DELETE FROM ss_instagram_media_likes") and likes_delete[2] == [(7, 1, "gone")]
+    assert state[1].startswith("INSERT INTO ss_instagram_post_sync") and state[2][3:] == (NOW, "m1")
+    assert db.commits == 1
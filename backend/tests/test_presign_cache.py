@@ -0,0 +1,78 @@
+import asyncio
+import time
+
+import pytest
+
+from app.core import s3
+from app.core.cache import TTLCache
+
+
+@pytest.fixture
+def small_cache(monkeypatch):
+    monkeypatch.setattr(s3, "_presign_cache", TTLCache(maxsize=3, ttl=600))
+
+
+def test_presign_reuses_url_within_bucket(fake_s3, monkeypatch):
+    monkeypatch.setattr(s3.time, "time", lambda: 1000.0)
+    a = s3.presign_get_url("k1")
+    assert s3.presign_get_url("k1") == a
+    assert fake_s3.signed == ["k1"]
+    # 다른 만료 시간은 별도 항목
+    assert s3.presign_get_url("k1", expires_in=60) != a
+    assert s3.presign_cache_stats()["hits"] == 1
+
+    # 다음 구간으로 넘어가면 새로 서명(남은 유효 시간 보장)
+    monkeypatch.setattr(s3.time, "time", lambda: 1200.0 + 600)
+    assert s3.presign_get_url("k1") != a
+
+
+def test_presign_many_dedups_and_skips_failures(fake_s3, small_cache):
+    s3.presign_get_url("k1")
+    out = s3.presign_many(["k1", "k2", "k2", "bad", ""])
+    assert set(out) == {"k1", "k2"}
+    assert fake_s3.signed == ["k1", "k2", "bad"]
+    # 캐시 크기 제한(maxsize=3)
+    s3.presign_many(["k3", "k4", "k5"])
+    assert s3.presign_cache_stats()["size"] == 3
+    assert s3.presign_cache_stats()["evictions"] >= 1
+
+
+def test_delete_invalidates_presigned_url(fake_s3):
+    first = s3.presign_get_url("k1")
+    assert s3.delete_object("k1") is True
+    assert s3.presign_get_url("k1") != first
+
+
+@pytest.mark.asyncio
+async def test_async_ops_run_off_loop_with_metrics(fake_s3, monkeypatch):
+    monkeypatch.setattr(s3, "_metrics", s3._S3Metrics())
+    fake_s3.put_delay = 0.3
+    upload = asyncio.create_task(s3.aput_data_uri("data:image/png;base64,AAAA", key_prefix="chat/1/1", base_prefix="", include_date=False))
+    await asyncio.sleep(0.05)
+    # 업로드(0.3s) 중에도 루프는 다른 작업을 처리하고, 진행 중 지표가 보임
+    assert s3.s3_stats()["ops"]["put"]["in_flight"] == 1
+    started = time.perf_counter()
+    await asyncio.sleep(0.01)
+    assert time.perf_counter() - started < 0.1
+    key = await upload
+    assert key.startswith("chat/1/1/gen_")
+
+    url = await s3.apresign_get_url(key)
+    assert await s3.apresign_get_url(key) == url
+    many = await s3.apresign_many([key, "k2"])
+    assert many[key] == url and "k2" in many
+    assert await s3.adelete_object(key) is True
+
+    st = s3.s3_stats()
+    assert st["in_flight"] == 0
+    assert st["ops"]["put"]["calls"] == 1
+    # 캐시 적중은 스레드 풀을 거치지 않음
+    assert st["ops"]["presign"]["calls"] == 2
+    assert st["ops"]["delete"]["calls"] == 1
+
+
+def test_stored_image_key_contract():
+    assert s3.stored_image_key("personas/1.png") == "personas/1.png"
+    assert s3.stored_image_key("http://localhost:8000/uploads/a.png") == "uploads/a.png"
+    for value in (None, "", "https://cdn/x.png", "data:image/png;base64,AA", "/media/x.png", "http://localhost/media/x.png"):
+        assert s3.stored_image_key(value) is None
@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.api.core import reconcile
+from app.core import s3
+
+_NOW = datetime(2025, 1, 10, tzinfo=timezone.utc)
+_OLD = _NOW - timedelta(days=3)
+
+
+async def _aiter(items):
+    for item in items:
+        yield item
+
+
+def test_delete_objects_batches_and_reports_errors(fake_s3):
+    keys = [f"chat/1/{i:05d}.png" for i in range(2300)] + ["chat/1/x.locked"]
+    fake = fake_s3.add(keys, _OLD)
+    s3._presign_cache.set(("chat/1/00000.png", 600, 0), "https://old")
+    out = s3.delete_objects(keys + ["chat/1/00001.png", ""])
+    assert fake.delete_calls == [1000, 1000, 301]
+    assert len(out["deleted"]) == 2300
+    assert out["errors"] == {"chat/1/x.locked": "AccessDenied"}
+    assert s3._presign_cache.get(("chat/1/00000.png", 600, 0)) is None
+    assert list(fake.objects) == ["chat/1/x.locked"]
+
+
+@pytest.mark.asyncio
+async def test_find_orphans_merge_join_keeps_live_derivatives():
+    objects = [
+        ("chat/1/a.png", _OLD),
+        ("chat/1/a1.png", _OLD),           # 고아(같은 stem 구간 안)
+        ("chat/1/a1__thumb.webp", _OLD),    # 고아 원본의 파생본
+        ("chat/1/a__mid.webp", _OLD),       # 살아 있는 a의 파생본
+        ("chat/1/a__thumb.webp", _OLD),
+        ("chat/1/b.png", _NOW),             # 최근 업로드 → 건너뜀
+        ("chat/1/b__thumb.webp", _OLD),
+        ("chat/1/c__thumb.webp", _OLD),     # 원본 없는 파생본
+        ("chat/1/d.png", _OLD),
+    ]
+    live = ["chat/1/a.png", "chat/1/a.png", "chat/1/d.png", "chat/1/z.png"]
+    stats = {}
+    orphans = [k async for k in reconcile.find_orphans(_aiter(objects), _aiter(live), min_age=3600, stats=stats, now=_NOW)]
+    assert orphans == ["chat/1/a1.png", "chat/1/a1__thumb.webp", "chat/1/c__thumb.webp"]
+    assert stats == {"scanned": 9, "live": 5, "recent": 1, "orphans": 3}
+
+
+@pytest.mark.asyncio
+async def test_reconcile_prefix_streams_pages_and_deletes_in_bulk(fake_s3):
+    live = [f"chat/7/{i:05d}.png" for i in range(0, 2500, 2)]
+    fake = fake_s3.add([f"chat/7/{i:05d}.png" for i in range(2500)] + ["personas/7/p.png"], _OLD)
+    seen = []
+    stats = await reconcile.reconcile_prefix(
+        "chat/", delete=True, min_age=0, on_orphan=seen.append, live=_aiter(live),
+    )
+    assert fake.list_calls == 3
+    assert stats["orphans"] == stats["deleted"] == 1250 and stats["errors"] == 0
+    assert fake.delete_calls == [1000, 250]
+    assert seen[0] == "chat/7/00001.png"
+    assert sorted(fake.objects) == sorted(live + ["personas/7/p.png"])
+
+    # 보고 모드는 삭제하지 않음
+    fake.delete_calls.clear()
+    stats = await reconcile.reconcile_prefix("personas/", min_age=0, live=_aiter([]))
+    assert stats["orphans"] == 1 and stats["deleted"] == 0 and fake.delete_calls == []
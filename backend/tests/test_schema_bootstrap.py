@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from app.api.core import schema
+
+
+@pytest.mark.asyncio
+async def test_ensure_schema_runs_pending_migrations_once(monkeypatch):
+    calls = []
+    recorded = []
+
+    async def m1():
+        calls.append("m1")
+
+    async def m2():
+        calls.append("m2")
+
+    async def fake_load_applied():
+        return {"t.v1"}
+
+    async def fake_record(version):
+        recorded.append(version)
+
+    monkeypatch.setattr(schema, "_MIGRATIONS", [("t.v1", m1), ("t.v2", m2)])
+    monkeypatch.setattr(schema, "_done", False)
+    monkeypatch.setattr(schema, "_lock", None)
+    monkeypatch.setattr(schema, "_last_failure", 0.0)
+    monkeypatch.setattr(schema, "_load_applied", fake_load_applied)
+    monkeypatch.setattr(schema, "_record_applied", fake_record)
+
+    result = await schema.ensure_schema()
+    assert result == {"applied": ["t.v2"], "skipped": ["t.v1"], "failed": []}
+    assert calls == ["m2"]
+    assert recorded == ["t.v2"]
+
+    # 두 번째 호출은 DDL/조회 없이 즉시 반환
+    await schema.ensure_schema()
+    assert calls == ["m2"]
+    assert schema.schema_ready()
+
+
+@pytest.mark.asyncio
+async def test_failed_migration_is_retried_after_interval(monkeypatch):
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError("lock wait timeout")
+
+    async def fake_load_applied():
+        return set()
+
+    async def fake_record(version):
+        pass
+
+    monkeypatch.setattr(schema, "_MIGRATIONS", [("t.v1", flaky)])
+    monkeypatch.setattr(schema, "_done", False)
+    monkeypatch.setattr(schema, "_lock", None)
+    monkeypatch.setattr(schema, "_last_failure", 0.0)
+    monkeypatch.setattr(schema, "_load_applied", fake_load_applied)
+    monkeypatch.setattr(schema, "_record_applied", fake_record)
+
+    assert (await schema.ensure_schema())["failed"] == ["t.v1"]
+    assert not schema.schema_ready()
+    # 최소 간격 안에서는 재시도하지 않음
+    await schema.ensure_schema()
+    assert len(attempts) == 1
+    monkeypatch.setattr(schema, "_last_failure", 0.0)
+    assert (await schema.ensure_schema())["applied"] == ["t.v1"]
+    assert schema.schema_ready()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_wait_for_running_bootstrap(monkeypatch):
+    gate = asyncio.Event()
+
+    async def slow():
+        await gate.wait()
+
+    async def fake_load_applied():
+        return set()
+
+    async def fake_record(version):
+        pass
+
+    monkeypatch.setattr(schema, "_MIGRATIONS", [("t.v1", slow)])
+    monkeypatch.setattr(schema, "_done", False)
+    monkeypatch.setattr(schema, "_lock", None)
+    monkeypatch.setattr(schema, "_last_failure", 0.0)
+    monkeypatch.setattr(schema, "_load_applied", fake_load_applied)
+    monkeypatch.setattr(schema, "_record_applied", fake_record)
+
+    first = asyncio.create_task(schema.ensure_schema())
+    await asyncio.sleep(0.01)
+    # 진행 중인 부트스트랩이 끝나기 전에는 돌아오지 않음(테이블이 없는 상태로 진행하지 않도록)
+    second = asyncio.create_task(schema.ensure_schema())
+    await asyncio.sleep(0.01)
+    assert not second.done()
+    gate.set()
+    assert (await first)["applied"] == ["t.v1"]
+    await second
+    assert schema.schema_ready()
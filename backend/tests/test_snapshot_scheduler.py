@@ -0,0 +1,128 @@
+import asyncio
+from datetime import date, datetime, timezone
+from zoneinfo import ZoneInfo
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app.api.core import snapshot_scheduler as ss
+
+KST = ZoneInfo("Asia/Seoul")
+
+
+def test_wall_clock_slots():
+    at = (3, 0)
+    # 02:59 KST → 아직 오늘 실행 전이므로 현재 run_date는 어제, 다음 실행은 오늘 03:00
+    now = datetime(2024, 5, 1, 17, 59, tzinfo=timezone.utc)  # 2024-05-02 02:59 KST
+    assert ss.current_run_date(now, KST, at) == date(2024, 5, 1)
+    assert ss.next_run_at(now, KST, at) == datetime(2024, 5, 2, 3, 0, tzinfo=KST)
+    later = datetime(2024, 5, 1, 18, 1, tzinfo=timezone.utc)  # 03:01 KST
+    assert ss.current_run_date(later, KST, at) == date(2024, 5, 2)
+    assert ss.next_run_at(later, KST, at) == datetime(2024, 5, 3, 3, 0, tzinfo=KST)
+
+
+@pytest.fixture
+def runs(monkeypatch):
+    store = {}
+
+    async def load_run(job, run_date):
+        return dict(store[(job, run_date)]) if (job, run_date) in store else None
+
+    async def save_run(job, run_date, status, cursor, ok, failed):
+        store[(job, run_date)] = {"status": status, "cursor": cursor, "ok": ok, "failed": failed}
+
+    monkeypatch.setattr(ss, "load_run", load_run)
+    monkeypatch.setattr(ss, "save_run", save_run)
+    return store
+
+
+def _pager(keys, fail_after_pages=None):
+    calls = []
+
+    async def page(after, limit):
+        calls.append(after)
+        if fail_after_pages is not None and len(calls) > fail_after_pages:
+            raise ConnectionError("db down")
+        rest = [k for k in keys if after is None or k > after]
+        return rest[:limit]
+
+    return page, calls
+
+
+@pytest.mark.asyncio
+async def test_run_pages_all_personas_with_bounded_concurrency(runs):
+    keys = [(u, n) for u in range(1, 4) for n in range(1, 4)]  # 9개, 3페이지
+    page, calls = _pager(keys)
+    active = peak = 0
+    done = []
+
+    async def snapshot(uid, num, run_date):
+        nonlocal active, peak
+        assert run_date == date(2024, 5, 1)
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        if (uid, num) == (2, 2):
+            raise HTTPException(status_code=401, detail="persona_oauth_required")
+        done.append((uid, num))
+
+    result = await ss.run_snapshot(date(2024, 5, 1), snapshot=snapshot, page=page, concurrency=2, page_size=4)
+    assert result["ok"] == 8 and result["failed"] == 1
+    assert result["failure_reasons"] == {"persona_oauth_required": 1}
+    assert peak == 2
+    assert calls == [None, (2, 1), (3, 2)]
+    assert runs[(ss.JOB_NAME, date(2024, 5, 1))]["status"] == "done"
+    # 같은 run_date는 다시 실행하지 않음
+    again = await ss.run_snapshot(date(2024, 5, 1), snapshot=snapshot, page=page)
+    assert again["skipped"] == "already_done"
+
+
+@pytest.mark.asyncio
+async def test_restart_resumes_from_checkpoint(runs):
+    keys = [(1, n) for n in range(1, 7)]
+    seen = []
+
+    async def snapshot(uid, num, run_date):
+        seen.append((uid, num))
+
+    page, _ = _pager(keys, fail_after_pages=1)
+    with pytest.raises(ConnectionError):
+        await ss.run_snapshot(date(2024, 5, 1), snapshot=snapshot, page=page, page_size=2)
+    state = runs[(ss.JOB_NAME, date(2024, 5, 1))]
+    assert state["status"] == "running" and state["cursor"] == (1, 2) and state["ok"] == 2
+
+    page, calls = _pager(keys)
+    result = await ss.run_snapshot(date(2024, 5, 1), snapshot=snapshot, page=page, page_size=2)
+    assert calls[0] == (1, 2)
+    assert seen == keys
+    assert result["resumed"] and result["ok"] == 6
+
+
+@pytest.mark.asyncio
+async def test_perform_snapshot_dates_row_with_run_date(monkeypatch, fake_db, fake_graph):
+    from app.api.core import like_totals
+    from app.api.routes import instagram_insights as ii
+
+    db = fake_db(ii)
+    client, _ = fake_graph(handler=lambda r: httpx.Response(200, json={"followers_count": 5, "data": []}))
+
+    async def mapping(uid, num):
+        return {"ig_user_id": "ig1"}
+
+    async def token(uid, num):
+        return "t"
+
+    async def refresh(*a, **k):
+        return {"total_likes": 3}
+
+    monkeypatch.setattr(ii, "_get_persona_instagram_mapping", mapping)
+    monkeypatch.setattr(ii, "_get_persona_token", token)
+    monkeypatch.setattr(ii, "graph_session", lambda: client)
+    monkeypatch.setattr(like_totals, "refresh_totals", refresh)
+    # 자정을 넘겨 이어받은 실행도 예정된 날짜의 행을 채움
+    out = await ii.perform_snapshot(7, 1, date(2024, 5, 1))
+    assert out["date"] == "2024-05-01"
+    (_, sql, args), = db.log
+    assert args[3] == date(2024, 5, 1)
@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.api.routes import oauth_instagram as oi
+
+
+@pytest.fixture
+def db(monkeypatch, fake_db):
+    fake = fake_db(oi)
+
+    async def _noop(*a, **k):
+        return {}
+
+    monkeypatch.setattr(oi, "ensure_schema", _noop)
+    oi._token_cache.clear()
+    yield fake
+    oi._token_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_persona_token_cached_until_invalidated(db):
+    db.row = {"long_lived_user_token": "tok-1", "expires_at": datetime.utcnow() + timedelta(days=30)}
+    assert await oi._get_persona_token(1, 2) == "tok-1"
+    assert await oi._get_persona_token(1, 2) == "tok-1"
+    assert db.queries == 1
+
+    await oi._store_persona_token(1, 2, "tok-2", expires_in=3600)
+    db.row = {"long_lived_user_token": "tok-2", "expires_at": None}
+    assert await oi._get_persona_token(1, 2) == "tok-2"
+
+
+@pytest.mark.asyncio
+async def test_expired_token_is_not_cached(db):
+    db.row = {"long_lived_user_token": "old", "expires_at": datetime.utcnow() - timedelta(seconds=5)}
+    await oi._get_persona_token(1, 2)
+    await oi._get_persona_token(1, 2)
+    assert db.queries == 2
+
+
+@pytest.mark.asyncio
+async def test_token_error_evicts(db):
+    db.row = {"long_lived_user_token": "tok", "expires_at": None}
+    await oi._get_persona_token(1, 2)
+    assert oi._is_token_error({"error": {"code": 190, "type": "OAuthException"}})
+    assert not oi._is_token_error({"error": {"code": 4}})
+    oi._invalidate_token(1, 2)
+    await oi._get_persona_token(1, 2)
+    assert db.queries == 2
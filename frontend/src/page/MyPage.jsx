@@ -315,7 +315,7 @@ export default function MyPage() {
       setGalleryLoading(true);
       setGalleryError(null);
       try {
-        const res = await fetch(`${API_BASE}/api/chat/gallery?persona_num=${activePersona.num}`, { credentials: "include" });
+        const res = await fetch(`${API_BASE}/api/chat/gallery?persona_num=${activePersona.num}&size=thumb`, { credentials: "include" });
         if (!res.ok) throw new Error(`HTTP ${res.status}`);
         const data = await res.json();
         setGallery(Array.isArray(data?.items) ? data.items : []);
@@ -439,7 +439,7 @@ export default function MyPage() {
                       setGalleryLoading(true);
                       (async () => {
                         try {
-                          const res = await fetch(`${API_BASE}/api/chat/gallery?persona_num=${activePersona?.num || ''}`, { credentials: "include" });
+                          const res = await fetch(`${API_BASE}/api/chat/gallery?persona_num=${activePersona?.num || ''}&size=thumb`, { credentials: "include" });
                           if (res.ok) {
                             const data = await res.json();
                             setGallery(Array.isArray(data?.items) ? data.items : []);